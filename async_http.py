@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+One pooled async HTTP client for the asyncio updaters
+
+open_client() returns, first installed wins:
+- httpx.AsyncClient   (pip install httpx)
+- ThreadedClient      a requests.Session driven from a thread pool (always available)
+
+Force one with SP100_HTTP_BACKEND=httpx|requests.
+
+Both expose `await client.get(url, timeout=...)`, returning a response with
+.status_code and .content, and `await client.aclose()`. Connection pools are
+sized to the concurrency, so a long-running process (e.g.
+update_market_caps.py --watch) keeps its connections warm between rounds.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+httpx = None
+if os.environ.get('SP100_HTTP_BACKEND', '').lower() in ('', 'httpx'):
+    try:
+        import httpx
+    except ImportError:
+        httpx = None
+
+BACKEND = 'httpx' if httpx else 'requests'
+
+# What a timed-out request raises, whichever backend is in use
+TIMEOUT_ERRORS = (asyncio.TimeoutError, requests.Timeout) + ((httpx.TimeoutException,) if httpx else ())
+
+
+class ThreadedClient:
+    """Async facade over a pooled requests.Session (used when httpx isn't installed)"""
+
+    def __init__(self, concurrency: int, headers: Optional[dict] = None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(headers or {})
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='http')
+
+    async def get(self, url: str, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self.session.get(url, **kwargs))
+
+    async def aclose(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart across tasks (0 = no limit), e.g. SEC's 10 req/s"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        delay = self._next_start - now
+        self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def open_client(concurrency: int, headers: Optional[dict] = None, timeout: float = 10.0):
+    """A pooled async client allowing `concurrency` connections"""
+    if httpx:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        return httpx.AsyncClient(headers=headers, limits=limits, timeout=timeout)
+    return ThreadedClient(concurrency, headers)
@@ -0,0 +1,199 @@
+"""
+Minimal benchmark harness for the offline suite (pytest-benchmark style)
+
+The `bench` fixture times a callable over several rounds, can measure peak
+and retained traced memory, and compares the result with benchmarks/baselines.json.
+A benchmark fails when it is slower (or uses more memory) than its baseline
+by more than the regression threshold. Timings within a fixed noise floor of
+the baseline never fail, and sub-10 ms benchmarks are run for extra rounds
+and compared on their fastest round, which is far steadier than the median.
+
+Options (or environment variables):
+    --bench-update-baselines   BENCH_UPDATE_BASELINES=1   rewrite baselines.json
+    --bench-threshold 1.3      BENCH_THRESHOLD=1.3        allowed slowdown factor
+    --bench-noise-ms 1.0       BENCH_NOISE_MS=1.0         timing deltas below this never fail
+    BENCH_SIZES=100,500,1000                              universe sizes to run
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baselines.json')
+SIZES = [int(s) for s in os.environ.get('BENCH_SIZES', '100,500,1000').split(',') if s.strip()]
+
+_results: Dict[str, dict] = {}
+
+# Benchmarks faster than this run at least FAST_ROUNDS rounds and are judged on min_s
+FAST_SECONDS = 0.01
+FAST_ROUNDS = 30
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--bench-update-baselines', action='store_true', default=False,
+                    help='Rewrite benchmarks/baselines.json with this run\'s results')
+    group.addoption('--bench-threshold', type=float, default=None,
+                    help='Allowed regression factor vs. baseline (default: 1.3)')
+    group.addoption('--bench-noise-ms', type=float, default=None,
+                    help='Timing deltas vs. baseline below this many ms never fail (default: 1.0)')
+
+
+def _option(config, name, env, default):
+    try:
+        value = config.getoption(name)
+    except ValueError:
+        value = None
+    if value in (None, False):
+        value = os.environ.get(env, default)
+    return value
+
+
+def _load_baselines() -> dict:
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get('results', {})
+    return {}
+
+
+class Bench:
+    """Times one benchmark and checks it against its baseline"""
+
+    def __init__(self, name: str, baseline: dict, threshold: float, update: bool, noise_s: float = 0.001):
+        self.name = name
+        self.baseline = baseline
+        self.threshold = threshold
+        self.noise_s = noise_s
+        self.update = update
+        self.result: dict = {}
+
+    def __call__(self, fn: Callable, *args, rounds: int = 5, warmup: int = 1,
+                 units: int = 1, setup: Callable = None, **kwargs):
+        """
+        Run fn(*args, **kwargs) `rounds` times and record timings.
+        `units` is the number of items processed per call (for throughput);
+        `setup`, if given, is called before every round and its return value
+        is passed as the first argument (not timed). Sub-FAST_SECONDS calls
+        get extra rounds, up to FAST_ROUNDS.
+        """
+        value = None
+        timings = []
+        i = 0
+        while i < warmup + rounds or (timings and len(timings) < FAST_ROUNDS
+                                      and statistics.median(timings) < FAST_SECONDS):
+            call_args = ((setup(),) + args) if setup else args
+            start = time.perf_counter()
+            value = fn(*call_args, **kwargs)
+            elapsed = time.perf_counter() - start
+            if i >= warmup:
+                timings.append(elapsed)
+            i += 1
+
+        median = statistics.median(timings)
+        self.result.update({
+            'rounds': len(timings),
+            'min_s': round(min(timings), 6),
+            'median_s': round(median, 6),
+            'stdev_s': round(statistics.stdev(timings), 6) if len(timings) > 1 else 0.0,
+            'per_unit_ms': round(median / units * 1000, 4),
+            'units_per_s': round(units / median, 1) if median else None
+        })
+        return value
+
+    def peak_memory(self, fn: Callable, *args, setup: Callable = None, **kwargs):
+        """Run fn once under tracemalloc and record the peak traced allocation"""
+        call_args = ((setup(),) + args) if setup else args
+        tracemalloc.start()
+        try:
+            value = fn(*call_args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.result['peak_mb'] = round(peak / 1024 / 1024, 2)
+        return value
+
+    def retained_memory(self, fn: Callable, *args, **kwargs):
+        """Run fn once under tracemalloc and record what its (kept) return value still holds"""
+        tracemalloc.start()
+        try:
+            value = fn(*args, **kwargs)
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.result['retained_mb'] = round(current / 1024 / 1024, 3)
+        return value
+
+    def check(self):
+        _results[self.name] = self.result
+        if self.update or not self.baseline:
+            return
+        failures = []
+        timing = 'median_s'
+        if self.baseline.get('median_s', FAST_SECONDS) < FAST_SECONDS and self.baseline.get('min_s'):
+            timing = 'min_s'                # fast: the best round is the stable signal
+        for key in (timing, 'peak_mb', 'retained_mb'):
+            old, new = self.baseline.get(key), self.result.get(key)
+            if key == timing and old and new and new - old < self.noise_s:
+                continue                    # inside the noise floor, whatever the ratio
+            if old and new and new > old * self.threshold:
+                failures.append(f"{key} {new} > baseline {old} x {self.threshold}")
+        if failures:
+            pytest.fail(f"{self.name} regressed: " + '; '.join(failures))
+
+
+@pytest.fixture
+def bench(request):
+    config = request.config
+    threshold = float(_option(config, '--bench-threshold', 'BENCH_THRESHOLD', 1.3))
+    noise_s = float(_option(config, '--bench-noise-ms', 'BENCH_NOISE_MS', 1.0)) / 1000
+    update = bool(_option(config, '--bench-update-baselines', 'BENCH_UPDATE_BASELINES', False))
+    name = request.node.name.replace('test_', '', 1)
+    harness = Bench(name, _load_baselines().get(name, {}), threshold, update, noise_s)
+    yield harness
+    if harness.result:
+        harness.check()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _results:
+        return
+    update = bool(_option(session.config, '--bench-update-baselines', 'BENCH_UPDATE_BASELINES', False))
+    if update:
+        merged = _load_baselines()
+        merged.update(_results)
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({
+                'recorded_on': {
+                    'python': platform.python_version(),
+                    'machine': platform.machine(),
+                    'date': time.strftime('%Y-%m-%d')
+                },
+                'results': dict(sorted(merged.items()))
+            }, f, indent=2)
+            f.write('\n')
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    baselines = _load_baselines()
+    terminalreporter.section('benchmarks')
+    terminalreporter.write_line(f"{'name':42s} {'median':>10s} {'per unit':>11s} {'mem MB':>8s} {'vs base':>8s}")
+    for name, result in sorted(_results.items()):
+        base = baselines.get(name, {}).get('median_s')
+        ratio = f"{result['median_s'] / base:.2f}x" if base and 'median_s' in result else '-'
+        median = f"{result['median_s']:.4f}s" if 'median_s' in result else '-'
+        per_unit = f"{result['per_unit_ms']:.3f}ms" if 'per_unit_ms' in result else '-'
+        terminalreporter.write_line(
+            f"{name:42s} {median:>10s} {per_unit:>11s} {result.get('peak_mb', result.get('retained_mb', '-')):>8} {ratio:>8s}")
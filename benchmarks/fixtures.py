@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Upstream fixtures for offline benchmarks
+
+The benchmarks replay upstream responses from mock_upstream.MockUpstreamServer
+(a local stand-in for SEC EDGAR, Yahoo Finance and FMP). Two sources, in
+order of preference:
+1. Recorded responses under benchmarks/fixtures/recorded/ (gzip JSON),
+   captured from the real APIs with:
+       python3 benchmarks/fixtures.py record AAPL MSFT NVDA JPM XOM
+   At scale the recorded companyfacts bodies are replayed round-robin.
+2. Deterministic synthetic payloads shaped like the real APIs (10-K and
+   10-Q facts, prior-year comparatives, alias switches, filler concepts).
+"""
+
+import gzip
+import os
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import endpoints  # noqa: E402
+from mock_upstream import (  # noqa: E402,F401
+    MockUpstreamServer, synthetic_companies, synthetic_companyfacts, synthetic_tickers
+)
+
+RECORDED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'recorded')
+USER_AGENT = 'sp100-financial-tracker benchmark-recorder contact@example.com'
+
+
+def FixtureServer(companies: int = 100, use_recorded: bool = True, **kwargs) -> MockUpstreamServer:
+    """Fault-free mock upstream that prefers the recorded bodies"""
+    return MockUpstreamServer(companies=companies, recorded_dir=RECORDED_DIR if use_recorded else None, **kwargs)
+
+
+def record(symbols: List[str]):
+    """Capture real responses for `symbols` into benchmarks/fixtures/recorded/"""
+    import requests
+
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT})
+    tickers = session.get(endpoints.SEC_TICKERS_URL, timeout=30).json()
+    ciks = {item['ticker']: str(item['cik_str']).zfill(10) for item in tickers.values()}
+
+    def save(kind: str, stem: str, body: bytes):
+        directory = os.path.join(RECORDED_DIR, kind)
+        os.makedirs(directory, exist_ok=True)
+        with gzip.open(os.path.join(directory, f'{stem}.json.gz'), 'wb') as f:
+            f.write(body)
+        print(f"  ✓ {kind}/{stem} ({len(body) / 1024:.0f} KB)")
+
+    for symbol in symbols:
+        print(f"Recording {symbol}...")
+        cik = ciks.get(symbol)
+        if cik:
+            response = session.get(endpoints.SEC_COMPANYFACTS_URL.format(cik=cik), timeout=30)
+            if response.ok:
+                save('companyfacts', f'CIK{cik}', response.content)
+        response = requests.get(endpoints.YAHOO_CHART_URL.format(symbol=symbol),
+                                headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
+        if response.ok:
+            save('chart', symbol, response.content)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == 'record':
+        record(sys.argv[2:])
+    else:
+        print("Usage: python3 benchmarks/fixtures.py record SYMBOL [SYMBOL ...]")
+        sys.exit(1)
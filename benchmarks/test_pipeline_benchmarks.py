@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Offline performance benchmarks for the SEC EDGAR pipeline
+
+Replays recorded (or synthetic) upstream responses from a local fixture
+server, so no network access is needed.
+
+Run with:
+    pytest benchmarks -m benchmark
+    BENCH_SIZES=100 pytest benchmarks -m benchmark          # quick pass
+    pytest benchmarks -m benchmark --bench-update-baselines  # accept new numbers
+"""
+
+import copy
+import json
+import os
+
+import pytest
+
+import fastjson
+import fetch_comprehensive_data
+import schema
+from company_table import CompanyTable
+from data_checks import Quarantine
+from fetch_comprehensive_data import ComprehensiveDataFetcher, apply_fundamentals
+from conftest import SIZES
+from fixtures import FixtureServer, synthetic_companies, synthetic_companyfacts
+from mock_upstream import Faults
+
+pytestmark = pytest.mark.benchmark
+
+REAL_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'data', 'financial_data.json')
+
+
+@pytest.fixture(scope='module', params=SIZES, ids=lambda n: f'n{n}')
+def universe(request):
+    """Fixture server sized for one universe, with its companies list"""
+    size = request.param
+    with FixtureServer(companies=size) as server:
+        server.prewarm()
+        yield size, server, synthetic_companies(size)
+
+
+@pytest.fixture
+def offline_fetcher(monkeypatch, universe):
+    """Point the SEC URLs at the fixture server and disable the rate-limit sleep"""
+    _, server, _ = universe
+    monkeypatch.setattr(fetch_comprehensive_data, 'SEC_TICKERS_URL', server.url('/files/company_tickers.json'))
+    monkeypatch.setattr(fetch_comprehensive_data, 'SEC_COMPANYFACTS_URL',
+                        server.url('/api/xbrl/companyfacts/CIK{cik}.json'))
+    monkeypatch.setattr(fetch_comprehensive_data.time, 'sleep', lambda s: None)
+    monkeypatch.setattr('builtins.print', lambda *a, **k: None)
+
+
+@pytest.fixture(scope='module')
+def latent_universe():
+    """Fixture server with 20 ms per response, like a nearby real upstream"""
+    size = SIZES[0]
+    with FixtureServer(companies=size, faults=Faults(latency_ms=20)) as server:
+        server.prewarm()
+        yield size, server, synthetic_companies(size)
+
+
+@pytest.fixture
+def latent_fetcher(monkeypatch, latent_universe):
+    """Point the SEC URLs at the latent server; keep time.sleep (the server uses it) but drop the rate limit"""
+    _, server, _ = latent_universe
+    monkeypatch.setattr(fetch_comprehensive_data, 'SEC_TICKERS_URL', server.url('/files/company_tickers.json'))
+    monkeypatch.setattr(fetch_comprehensive_data, 'SEC_COMPANYFACTS_URL',
+                        server.url('/api/xbrl/companyfacts/CIK{cik}.json'))
+    monkeypatch.setattr(fetch_comprehensive_data, 'RATE_LIMIT_DELAY', 0)
+    monkeypatch.setattr('builtins.print', lambda *a, **k: None)
+
+
+def enriched_companies(n: int) -> list:
+    """The checked-in dataset tiled up to n companies (the shape save_data serializes)"""
+    with open(REAL_DATA_FILE, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    companies = []
+    for i in range(n):
+        company = dict(base[i % len(base)])
+        company['symbol'] = f"{company['symbol']}{i // len(base) or ''}"
+        companies.append(company)
+    return companies
+
+
+def test_process_companies(bench, universe, offline_fetcher):
+    """End-to-end process_companies throughput (fetch + decode + extract + derive)"""
+    size, _, companies = universe
+
+    def run(batch):
+        fetcher = ComprehensiveDataFetcher()
+        fetcher.process_companies(batch)
+        return fetcher
+
+    fetcher = bench(run, rounds=max(1, 300 // size), warmup=0, units=size,
+                    setup=lambda: copy.deepcopy(companies))
+    assert len(fetcher.processed) == size
+
+
+@pytest.mark.parametrize('mode', ['sequential', 'pipelined'])
+def test_process_companies_latency(bench, latent_universe, latent_fetcher, mode):
+    """process_companies vs process_companies_pipelined when every response takes 20 ms"""
+    size, _, companies = latent_universe
+
+    def run(batch):
+        fetcher = ComprehensiveDataFetcher()
+        if mode == 'sequential':
+            fetcher.process_companies(batch)
+        else:
+            fetcher.process_companies_pipelined(batch)
+        return fetcher
+
+    fetcher = bench(run, rounds=1, warmup=0, units=size, setup=lambda: copy.deepcopy(companies))
+    assert len(fetcher.processed) == size
+
+
+def test_process_companies_peak_memory(bench, universe, offline_fetcher):
+    """Peak traced memory while processing the whole universe"""
+    size, _, companies = universe
+    fetcher = ComprehensiveDataFetcher()
+    bench.peak_memory(fetcher.process_companies, copy.deepcopy(companies))
+    assert len(fetcher.processed) == size
+
+
+def test_extract_latest_value(bench):
+    """Extract every metrics_map metric from one companyfacts document"""
+    fetcher = ComprehensiveDataFetcher()
+    documents = [synthetic_companyfacts(i) for i in range(20)]
+
+    def run():
+        for data in documents:
+            for field_names in fetcher.metrics_map.values():
+                fetcher.extract_latest_value(data, field_names)
+
+    bench(run, rounds=10, units=len(documents))
+
+
+@pytest.mark.parametrize('size', SIZES, ids=lambda n: f'n{n}')
+def test_serialize_dataset(bench, size):
+    """json.dumps(indent=2) of the full dataset (the stdlib baseline for write_dataset)"""
+    companies = enriched_companies(size)
+    body = bench(json.dumps, companies, indent=2, ensure_ascii=False, rounds=10, units=size)
+    assert len(json.loads(body)) == size
+
+
+@pytest.mark.parametrize('size', SIZES, ids=lambda n: f'n{n}')
+def test_deserialize_dataset(bench, size):
+    """json.loads of the full dataset (the stdlib baseline for schema.load_companies)"""
+    body = json.dumps(enriched_companies(size), indent=2, ensure_ascii=False)
+    companies = bench(json.loads, body, rounds=10, units=size)
+    assert len(companies) == size
+
+
+@pytest.mark.parametrize('size', SIZES, ids=lambda n: f'n{n}')
+def test_serialize_dataset_fastjson(bench, size):
+    """fastjson.dumps_pretty of the full dataset, as write_dataset writes it"""
+    companies = enriched_companies(size)
+    body = bench(fastjson.dumps_pretty, companies, rounds=10, units=size)
+    assert body == json.dumps(companies, indent=2, ensure_ascii=False)
+
+
+@pytest.mark.parametrize('size', SIZES, ids=lambda n: f'n{n}')
+def test_deserialize_dataset_fastjson(bench, size):
+    """fastjson.loads of the full dataset"""
+    body = json.dumps(enriched_companies(size), indent=2, ensure_ascii=False).encode()
+    companies = bench(fastjson.loads, body, rounds=10, units=size)
+    assert len(companies) == size
+
+
+@pytest.mark.parametrize('size', SIZES, ids=lambda n: f'n{n}')
+def test_load_companies_validated(bench, size, tmp_path):
+    """schema.load_companies: fast decode plus Company validation, as every script's main() does"""
+    path = str(tmp_path / 'financial_data.json')
+    fastjson.dump(path, enriched_companies(size))
+    companies = bench(schema.load_companies, path, rounds=10, units=size)
+    assert len(companies) == size
+
+
+@pytest.mark.parametrize('decoder', ['stdlib', 'fastjson'])
+def test_decode_companyfacts(bench, decoder):
+    """Decode 20 companyfacts bodies (the largest responses we parse)"""
+    bodies = [json.dumps(synthetic_companyfacts(i)).encode() for i in range(20)]
+    loads = json.loads if decoder == 'stdlib' else fastjson.loads
+
+    def run():
+        return [loads(body) for body in bodies]
+
+    documents = bench(run, rounds=10, units=len(bodies))
+    assert documents[0] == json.loads(bodies[0])
+
+
+@pytest.mark.parametrize('layout', ['dicts', 'table'])
+@pytest.mark.parametrize('size', SIZES, ids=lambda n: f'n{n}')
+def test_dataset_memory(bench, size, layout):
+    """Memory held by the decoded dataset: list of dicts vs CompanyTable columns"""
+    body = fastjson.dumps(enriched_companies(size))
+    if layout == 'dicts':
+        companies = bench.retained_memory(fastjson.loads, body)
+    else:
+        companies = bench.retained_memory(lambda: CompanyTable.from_records(fastjson.loads(body)))
+    assert len(companies) == size
+
+
+@pytest.mark.parametrize('layout', ['dicts', 'table'])
+@pytest.mark.parametrize('size', SIZES, ids=lambda n: f'n{n}')
+def test_derive_metrics(bench, size, layout):
+    """Recompute FCF, D/E and margins for every company: per-dict loop vs CompanyTable.derive()"""
+    companies = enriched_companies(size)
+    if layout == 'dicts':
+        bench(lambda: [apply_fundamentals(company, {}) for company in companies], rounds=20, units=size)
+    else:
+        table = CompanyTable.from_records(companies)
+        bench(table.derive, rounds=20, units=size)
+
+
+@pytest.mark.parametrize('size', SIZES, ids=lambda n: f'n{n}')
+def test_sanity_checks(bench, size):
+    """Pre-save checks + quarantine over the whole table (previous run = same data, 2% of revenues jumped)"""
+    companies = enriched_companies(size)
+    previous = CompanyTable.from_records(companies)
+
+    def fresh_table():
+        table = CompanyTable.from_records(companies)
+        revenue, has_revenue = table.column('revenue')
+        revenue[::50] *= 10
+        return table
+
+    items = bench(lambda table: Quarantine('bench').run(table, previous, confirmed={}),
+                  setup=fresh_table, rounds=20, units=size)
+    assert any(item['check'] == 'jump' for item in items)
+    assert bench.result['median_s'] < 0.05
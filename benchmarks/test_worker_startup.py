@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Worker cold-start benchmarks
+
+Each round starts a fresh interpreter, the way a scale-to-zero host does:
+- time to first response: `python worker/app.py` until GET /healthz answers
+- import cost: `python -X importtime -c "import app"`, per module the worker imports
+
+Run with:
+    pytest benchmarks/test_worker_startup.py -m benchmark
+"""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+WORKER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'worker')
+sys.path.insert(0, WORKER_DIR)
+import app as worker  # noqa: E402
+
+# Never imported at startup: the pipeline modules and the stacks behind them
+LAZY_MODULES = worker.PIPELINE_MODULES + ('numpy', 'requests', 'asyncio')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def first_response() -> dict:
+    """Start the worker and poll /healthz; returns its startup timings plus the wall time to the first 200"""
+    port = free_port()
+    env = {**os.environ, 'PORT': str(port), 'WORKER_PREWARM': '0'}
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=WORKER_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < 30:
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+                conn.request('GET', '/healthz')
+                response = conn.getresponse()
+                if response.status == 200:
+                    wall = time.perf_counter() - started
+                    response.read()
+                    conn.request('GET', '/healthz')         # the cold start is recorded once the first response is out
+                    return {'wall_s': wall, **json.loads(conn.getresponse().read())['startup']}
+            except OSError:
+                time.sleep(0.005)
+        raise TimeoutError('worker did not answer /healthz within 30s')
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def import_times() -> dict:
+    """
+    Import cost at startup (python -X importtime): 'modules' maps every module
+    imported to its cumulative seconds, 'direct' the ones app.py imports itself.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=WORKER_DIR,
+                            capture_output=True, text=True, check=True)
+    modules, direct, children = {}, {}, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name, seconds = name.strip(), int(cumulative) / 1e6
+        modules[name] = seconds
+        if depth == 1:
+            children[name] = seconds
+        elif depth == 0:                # a parent is printed after its children
+            if name == 'app':
+                direct = children
+            children = {}
+    return {'modules': modules, 'direct': direct}
+
+
+def test_worker_time_to_first_response(bench):
+    samples = []
+    bench(lambda: samples.append(first_response()), rounds=5, warmup=1)
+
+    cold_starts = sorted(sample['cold_start'] for sample in samples)
+    bench.result['cold_start_s'] = round(cold_starts[len(cold_starts) // 2], 4)
+    bench.result['wall_s'] = round(sorted(sample['wall_s'] for sample in samples)[len(samples) // 2], 4)
+    # In-process: import + create_app + first response, the part the worker controls
+    assert bench.result['cold_start_s'] < worker.COLD_START_BUDGET
+
+
+def test_worker_import_cost(bench):
+    times = bench(import_times, rounds=5, warmup=1)
+
+    bench.result['app_ms'] = round(times['modules']['app'] * 1000, 1)
+    bench.result['imports_ms'] = {name: round(seconds * 1000, 1) for name, seconds in
+                                  sorted(times['direct'].items(), key=lambda item: -item[1])}
+    assert not [name for name in LAZY_MODULES if name in times['modules']]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Append-only checkpoint journal for resumable fetch runs
+
+Each completed company is appended (and fsync'd) to
+data/.checkpoint_<job>.jsonl as soon as it finishes, so a run that dies at
+company 80 keeps companies 1-79. Re-running with --resume restores those
+records and only fetches the rest; once the final JSON has been saved the
+journal is deleted.
+
+Line format:
+    {"job": "...", "started": "...", "version": 1}                       (header)
+    {"symbol": "AAPL", "status": "ok", "company": {...}, "aliases": {...}}
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+CHECKPOINT_DIR = './data'
+CHECKPOINT_VERSION = 1
+MAX_RESUME_AGE_HOURS = float(os.environ.get('CHECKPOINT_MAX_AGE_HOURS', '24'))
+
+
+def checkpoint_path(job: str) -> str:
+    return os.path.join(CHECKPOINT_DIR, f'.checkpoint_{job}.jsonl')
+
+
+class CheckpointJournal:
+    """Per-company journal; `completed` holds the entries restored by open(resume=True)"""
+
+    def __init__(self, job: str, path: Optional[str] = None):
+        self.job = job
+        self.path = path or checkpoint_path(job)
+        self.completed: Dict[str, dict] = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, dict]:
+        """Read the journal; returns symbol -> latest entry. Torn (partially written) lines are skipped."""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if 'symbol' in entry:
+                    entries[entry['symbol']] = entry
+        return entries
+
+    def _header(self) -> Optional[dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+            return header if 'started' in header else None
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def open(self, resume: bool = False) -> Dict[str, dict]:
+        """
+        Start journaling. With resume=True, keep an existing (recent, same-job)
+        journal and return its completed companies; otherwise start a fresh one.
+        """
+        self.completed = {}
+        header = self._header() if resume else None
+        if header:
+            started = datetime.fromisoformat(header['started'])
+            age_hours = (datetime.now(timezone.utc) - started).total_seconds() / 3600
+            if header.get('job') != self.job or header.get('version') != CHECKPOINT_VERSION:
+                print(f"⚠️  Ignoring checkpoint {self.path}: written by another job/version")
+                header = None
+            elif age_hours > MAX_RESUME_AGE_HOURS:
+                print(f"⚠️  Ignoring checkpoint {self.path}: {age_hours:.0f}h old (max {MAX_RESUME_AGE_HOURS:.0f}h)")
+                header = None
+
+        if header:
+            self.completed = {s: e for s, e in self.load().items() if e.get('status') == 'ok'}
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if self._file.tell() and not self._ends_with_newline():
+                self._file.write('\n')      # terminate a line torn by the crash
+        else:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._write({'job': self.job, 'started': datetime.now(timezone.utc).isoformat(),
+                         'version': CHECKPOINT_VERSION})
+        return self.completed
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _write(self, entry: dict):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def record(self, symbol: str, status: str, company: Optional[dict] = None, **extra):
+        """Append one finished company (status ok/failed) and force it to disk"""
+        if self._file is None:
+            return
+        entry = {'symbol': symbol, 'status': status, 'ts': round(time.time(), 3)}
+        if company is not None:
+            entry['company'] = dict(company)     # also accepts CompanyRow views
+        entry.update({k: v for k, v in extra.items() if v})
+        self._write(entry)
+
+    def restore(self, company: dict) -> Optional[dict]:
+        """Copy a completed company's checkpointed record onto `company`; returns the entry"""
+        entry = self.completed.get(company['symbol'])
+        if entry and 'company' in entry:
+            company.update(entry['company'])
+            return entry
+        return None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """The final JSON has been saved: drop the journal"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
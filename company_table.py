@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Column-oriented in-memory company table
+
+The dataset is normally a list of ~25-key dicts, one per company. CompanyTable
+stores it as one NumPy column per numeric metric (int64 for USD amounts and
+share counts, float64 for ratios) plus a validity mask per column, and a
+symbol -> row index. String fields are plain lists, with low-cardinality ones
+(sector, timestamps) interned.
+
+Existing per-company code keeps working: iterating the table yields
+CompanyRow views that behave like the old dicts (company['revenue'],
+company.get(...), 'capex' in company, company[...] = ...), and writes go
+straight into the columns. Whole-column work (derived metrics, validation,
+screening) reads `values`/`valid` directly.
+
+Fiscal periods: the optional per-company "periods" object
+({"revenue": {"fy": 2024, "end": "2024-09-28"}, ...}, written by the
+fetchers; fy is left out where the source has none) is held as one
+datetime64 end column and one fiscal-year column per metric, so ratios are
+only derived from inputs of the same period. A metric's period columns are
+allocated the first time a row records one.
+
+Round trip: to_records() rebuilds the dicts with each company's original key
+order, so load -> save writes identical JSON.
+
+    table = CompanyTable.load('data/financial_data.json')
+    revenue, has_revenue = table.column('revenue')
+    table.derive()
+    fastjson.dump(path, table.to_records())
+"""
+
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import profiling
+import schema
+
+NUMERIC_DTYPES = {
+    **{name: np.int64 for name in schema.INTEGER_FIELDS},
+    **{name: np.float64 for name in schema.FLOAT_FIELDS},
+}
+INTERNED_FIELDS = ('sector', 'market_cap_updated')
+PERIOD_METRICS = schema.INTEGER_FIELDS
+NO_PERIOD = np.datetime64('NaT', 'D')
+
+
+class CompanyRow(MutableMapping):
+    """Dict-like view of one table row (reads and writes go to the columns)"""
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table: 'CompanyTable', row: int):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key: str):
+        return self.table.get_value(self.row, key)
+
+    def __setitem__(self, key: str, value):
+        self.table.set_value(self.row, key, value)
+
+    def __delitem__(self, key: str):
+        self.table.delete_value(self.row, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.table.layout(self.row)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.table.layout(self.row))
+
+    def __len__(self) -> int:
+        return len(self.table.layout(self.row))
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self}
+
+    def __repr__(self) -> str:
+        return f'CompanyRow({self.to_dict()!r})'
+
+
+class CompanyTable:
+    """One column per metric, a symbol -> row index and per-column validity masks"""
+    __slots__ = ('symbols', 'index', 'strings', 'values', 'valid', 'period_end', 'period_fy', 'extras',
+                 '_layouts', '_layout_ids', '_layout_lookup', '_interned')
+
+    def __init__(self, size: int = 0):
+        self.symbols: List[str] = [''] * size
+        self.index: Dict[str, int] = {}
+        self.strings: Dict[str, List[Optional[str]]] = {
+            name: [None] * size for name in schema.STRING_FIELDS if name != 'symbol'
+        }
+        self.values: Dict[str, np.ndarray] = {name: np.zeros(size, dtype) for name, dtype in NUMERIC_DTYPES.items()}
+        self.valid: Dict[str, np.ndarray] = {name: np.zeros(size, bool) for name in NUMERIC_DTYPES}
+        # Fiscal period each value was reported for (NaT / 0 = unknown), only for metrics that have one
+        self.period_end: Dict[str, np.ndarray] = {}
+        self.period_fy: Dict[str, np.ndarray] = {}
+        self.extras: List[Optional[dict]] = [None] * size
+        # Key order per row: distinct orders are stored once and referenced by id
+        self._layouts: List[Tuple[str, ...]] = []
+        self._layout_lookup: Dict[Tuple[str, ...], int] = {}
+        self._layout_ids = np.zeros(size, np.int32)
+        self._interned: Dict[str, str] = {}
+
+    # -- construction / round trip --------------------------------------------------
+
+    @classmethod
+    def from_records(cls, records: List[dict]) -> 'CompanyTable':
+        """Build from dataset dicts (assumed schema-valid, e.g. from schema.load_companies)"""
+        table = cls(len(records))
+        columns = {name: [0] * len(records) for name in NUMERIC_DTYPES}
+        masks = {name: [False] * len(records) for name in NUMERIC_DTYPES}
+        for i, record in enumerate(records):
+            for key, value in record.items():
+                if key in columns:
+                    if value is not None:
+                        columns[key][i] = value
+                        masks[key][i] = True
+                elif key == 'symbol':
+                    table.symbols[i] = value
+                elif key in table.strings:
+                    table.strings[key][i] = table._intern(key, value)
+                elif key == 'periods':
+                    table.set_periods(i, value)
+                else:
+                    if table.extras[i] is None:
+                        table.extras[i] = {}
+                    table.extras[i][key] = value
+            table._layout_ids[i] = table._layout_id(tuple(record))
+        for name, dtype in NUMERIC_DTYPES.items():
+            table.values[name] = np.array(columns[name], dtype)
+            table.valid[name] = np.array(masks[name], bool)
+        table.index = {symbol: i for i, symbol in enumerate(table.symbols)}
+        if len(table.index) != len(records):
+            raise schema.SchemaError(['duplicate symbols in table'])
+        return table
+
+    @classmethod
+    def load(cls, path: str) -> 'CompanyTable':
+        """Load and validate the dataset JSON into a table"""
+        return cls.from_records(schema.load_companies(path))
+
+    def to_records(self) -> List[dict]:
+        """Plain dicts in each company's original key order (what the JSON files hold)"""
+        numeric = {name: column.tolist() for name, column in self.values.items()}
+        valid = {name: mask.tolist() for name, mask in self.valid.items()}
+        records = []
+        for i, layout_id in enumerate(self._layout_ids.tolist()):
+            record = {}
+            for key in self._layouts[layout_id]:
+                if key in numeric:
+                    record[key] = numeric[key][i] if valid[key][i] else None
+                elif key == 'symbol':
+                    record[key] = self.symbols[i]
+                elif key in self.strings:
+                    record[key] = self.strings[key][i]
+                elif key == 'periods':
+                    record[key] = self.periods(i)
+                else:
+                    record[key] = self.extras[i][key]
+            records.append(record)
+        return records
+
+    def copy(self) -> 'CompanyTable':
+        """Independent snapshot (e.g. the published values, before a fetch updates the table)"""
+        table = CompanyTable(0)
+        table.symbols = list(self.symbols)
+        table.index = dict(self.index)
+        table.strings = {name: list(column) for name, column in self.strings.items()}
+        table.values = {name: column.copy() for name, column in self.values.items()}
+        table.valid = {name: mask.copy() for name, mask in self.valid.items()}
+        table.period_end = {name: column.copy() for name, column in self.period_end.items()}
+        table.period_fy = {name: column.copy() for name, column in self.period_fy.items()}
+        table.extras = [dict(extra) if extra is not None else None for extra in self.extras]
+        table._layouts = list(self._layouts)
+        table._layout_lookup = dict(self._layout_lookup)
+        table._layout_ids = self._layout_ids.copy()
+        table._interned = self._interned
+        return table
+
+    # -- row access -------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __iter__(self) -> Iterator[CompanyRow]:
+        return (CompanyRow(self, i) for i in range(len(self.symbols)))
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.index
+
+    def __getitem__(self, symbol: str) -> CompanyRow:
+        return CompanyRow(self, self.index[symbol])
+
+    def layout(self, row: int) -> Tuple[str, ...]:
+        return self._layouts[self._layout_ids[row]]
+
+    def get_value(self, row: int, key: str):
+        if key not in self.layout(row):
+            raise KeyError(key)
+        if key in self.values:
+            return self.values[key][row].item() if self.valid[key][row] else None
+        if key == 'symbol':
+            return self.symbols[row]
+        if key in self.strings:
+            return self.strings[key][row]
+        if key == 'periods':
+            return self.periods(row)
+        return self.extras[row][key]
+
+    def set_value(self, row: int, key: str, value):
+        if key in self.values:
+            if value is None:
+                self.valid[key][row] = False
+            else:
+                self.values[key][row] = schema.coerce(value, schema.FIELD_TYPES[key])
+                self.valid[key][row] = True
+        elif key == 'symbol':
+            del self.index[self.symbols[row]]
+            self.symbols[row] = value
+            self.index[value] = row
+        elif key in self.strings:
+            self.strings[key][row] = self._intern(key, schema.coerce(value, str))
+        elif key == 'periods':
+            self.set_periods(row, value)
+        else:
+            if self.extras[row] is None:
+                self.extras[row] = {}
+            self.extras[row][key] = value
+        layout = self.layout(row)
+        if key not in layout:
+            self._layout_ids[row] = self._layout_id(layout + (key,))
+
+    def delete_value(self, row: int, key: str):
+        layout = self.layout(row)
+        if key not in layout:
+            raise KeyError(key)
+        if key in self.values:
+            self.valid[key][row] = False
+            if key in self.period_end:
+                self.period_end[key][row] = NO_PERIOD
+                self.period_fy[key][row] = 0
+        elif key in self.strings:
+            self.strings[key][row] = None
+        elif key == 'periods':
+            self.set_periods(row, {})
+        elif key != 'symbol':
+            del self.extras[row][key]
+        self._layout_ids[row] = self._layout_id(tuple(k for k in layout if k != key))
+
+    def periods(self, row: int) -> Dict[str, dict]:
+        """The row's {"metric": {"fy": ..., "end": ...}} object (a copy; write back with set_periods)"""
+        periods = {}
+        for metric in PERIOD_METRICS:
+            if metric in self.period_end and not np.isnat(self.period_end[metric][row]):
+                fy, end = int(self.period_fy[metric][row]), str(self.period_end[metric][row])
+                periods[metric] = {'fy': fy, 'end': end} if fy else {'end': end}
+        return periods
+
+    def set_periods(self, row: int, periods: Optional[Dict[str, dict]]):
+        """Replace the row's recorded periods"""
+        for metric in self.period_end:
+            self.period_end[metric][row] = NO_PERIOD
+            self.period_fy[metric][row] = 0
+        for metric, period in (periods or {}).items():
+            if metric not in PERIOD_METRICS or not isinstance(period, dict):
+                raise TypeError(f'periods.{metric}: expected a tracked metric with {{"fy", "end"}}')
+            end, fy = self.period_column(metric, create=True)
+            end[row] = np.datetime64(period['end'], 'D')
+            fy[row] = period.get('fy') or 0
+
+    # -- columns ------------------------------------------------------------------
+
+    def column(self, metric: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(values, valid) arrays for a numeric metric; values where valid is False are meaningless"""
+        return self.values[metric], self.valid[metric]
+
+    def has_key(self, key: str) -> np.ndarray:
+        """Boolean mask of rows whose record contains `key` (even if its value is null)"""
+        in_layout = np.array([key in layout for layout in self._layouts], bool)
+        return in_layout[self._layout_ids] if len(self._layouts) else np.zeros(len(self), bool)
+
+    def period_column(self, metric: str, create: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (end, fy) period columns for a metric. A metric no row has a period for
+        reads as all-unknown; create=True allocates its columns to write into.
+        """
+        if metric not in self.period_end:
+            end, fy = np.full(len(self), NO_PERIOD), np.zeros(len(self), np.int16)
+            if not create:
+                return end, fy
+            self.period_end[metric], self.period_fy[metric] = end, fy
+        return self.period_end[metric], self.period_fy[metric]
+
+    def aligned(self, a: str, b: str) -> np.ndarray:
+        """Rows where metrics a and b come from the same fiscal period (or neither period is known)"""
+        if a not in self.period_end and b not in self.period_end:
+            return np.ones(len(self), bool)
+        end_a, end_b = self.period_column(a)[0], self.period_column(b)[0]
+        return (np.isnat(end_a) & np.isnat(end_b)) | (end_a == end_b)
+
+    def set_column(self, metric: str, values: np.ndarray, where: np.ndarray):
+        """Vectorized write of `values` into the rows selected by the boolean mask `where`"""
+        self.values[metric][where] = values[where] if np.ndim(values) else values
+        self.valid[metric][where] = True
+        for row in np.flatnonzero(where & ~self.has_key(metric)).tolist():
+            self._layout_ids[row] = self._layout_id(self.layout(row) + (metric,))
+
+    def clear_column(self, metric: str, where: np.ndarray):
+        """Remove `metric` from the rows selected by `where`"""
+        if not where.any():
+            return
+        for row in np.flatnonzero(where & self.has_key(metric)).tolist():
+            self.delete_value(row, metric)
+
+    def derive(self, rows: Optional[List[int]] = None):
+        """
+        Recompute free_cash_flow, debt_to_equity and the margins for every row
+        (or just `rows`) at once. Same rules and rounding as the per-dict code:
+        a derived value is only (re)written where its inputs are present, come
+        from the same fiscal period and the denominator is positive. Where the
+        inputs are from different periods the derived value is removed;
+        otherwise an existing value is left alone.
+        """
+        v, ok = self.values, self.valid
+        selected = np.ones(len(self), bool)
+        if rows is not None:
+            selected[:] = False
+            selected[rows] = True
+        with np.errstate(divide='ignore', invalid='ignore'), profiling.span('derive', step='ratios'):
+            both = self._drop_misaligned('free_cash_flow', 'operating_cash_flow', 'capex',
+                                         selected & ok['operating_cash_flow'] & ok['capex'])
+            self.set_column('free_cash_flow', v['operating_cash_flow'] + v['capex'], both)
+
+            both = self._drop_misaligned('debt_to_equity', 'long_term_debt', 'stockholders_equity',
+                                         selected & ok['long_term_debt'] & ok['stockholders_equity'])
+            self.set_column('debt_to_equity', np.round(v['long_term_debt'] / v['stockholders_equity'], 2),
+                            both & (v['stockholders_equity'] > 0))
+
+            positive_revenue = selected & ok['revenue'] & (v['revenue'] > 0)
+            for margin, numerator in (('operating_margin', 'operating_income'), ('profit_margin', 'earnings')):
+                both = self._drop_misaligned(margin, numerator, 'revenue', ok[numerator] & positive_revenue)
+                self.set_column(margin, np.round(v[numerator] / v['revenue'] * 100, 1), both)
+
+    # -- internals ----------------------------------------------------------------
+
+    def _drop_misaligned(self, derived: str, a: str, b: str, where: np.ndarray) -> np.ndarray:
+        """Remove `derived` from the rows of `where` whose inputs a and b disagree on the period; returns the rest"""
+        if a not in self.period_end and b not in self.period_end:
+            return where                    # no periods recorded for either input
+        aligned = self.aligned(a, b)
+        self.clear_column(derived, where & ~aligned)
+        return where & aligned
+
+    def _layout_id(self, layout: Tuple[str, ...]) -> int:
+        layout_id = self._layout_lookup.get(layout)
+        if layout_id is None:
+            layout_id = self._layout_lookup[layout] = len(self._layouts)
+            self._layouts.append(layout)
+        return layout_id
+
+    def _intern(self, key: str, value: Optional[str]) -> Optional[str]:
+        if value is None or key not in INTERNED_FIELDS:
+            return value
+        return self._interned.setdefault(value, value)
+
+    def __repr__(self) -> str:
+        return f'CompanyTable({len(self)} companies, {len(NUMERIC_DTYPES)} numeric columns)'
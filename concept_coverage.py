@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+XBRL concept coverage: which company reports which concept, and how recently
+
+A sparse company x concept matrix built in one pass over companyfacts
+documents, read from either:
+- SEC's bulk archive companyfacts.zip (one CIK##########.json per filer)
+- a directory of CIK##########.json files
+
+Only the CIKs asked for are decoded, so scanning our universe out of the
+full archive doesn't parse every filer. Each cell holds the latest period end
+reported for the concept (any form), the latest 10-K period end and the
+number of facts. Cells are stored sorted by concept (CSC): "who reports X" is
+a slice and per-concept counts are one bincount.
+
+The matrix is saved as a .npz and queried by explore-sec-data.py
+(--coverage, --aliases, --company), e.g. to pick metrics_map aliases by how
+many companies still report them.
+"""
+
+import os
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import fastjson
+
+COVERAGE_VERSION = 1
+CACHE_DIR = './data/cache'
+ARCHIVE_FILE = os.path.join(CACHE_DIR, 'companyfacts.zip')
+COVERAGE_FILE = os.path.join(CACHE_DIR, 'coverage.npz')
+DEFAULT_TAXONOMY = 'us-gaap'
+NO_END = np.datetime64('NaT', 'D')
+IN_FLIGHT_PER_WORKER = 4    # documents handed to the scan processes ahead of the one being added
+
+CIK_NAME = re.compile(r'CIK(\d{10})\.json$')
+
+# One company's cells: (entity name, concepts, latest ends, latest 10-K ends, fact counts)
+Scan = Tuple[str, List[str], List[str], List[str], List[int]]
+
+
+def scan_companyfacts(body: bytes) -> Scan:
+    """Every concept one companyfacts document reports, with its latest period ends and fact count"""
+    data = fastjson.loads(body)
+    concepts, latest, annual, counts = [], [], [], []
+    for taxonomy, facts_by_concept in (data.get('facts') or {}).items():
+        for concept, detail in facts_by_concept.items():
+            last = last_annual = ''
+            count = 0
+            for facts in (detail.get('units') or {}).values():
+                count += len(facts)
+                for fact in facts:
+                    end = fact.get('end') or ''
+                    if end > last:
+                        last = end
+                    if end > last_annual and fact.get('form') == '10-K':
+                        last_annual = end
+            if count:
+                concepts.append(f'{taxonomy}:{concept}')
+                latest.append(last)
+                annual.append(last_annual)
+                counts.append(count)
+    return data.get('entityName') or '', concepts, latest, annual, counts
+
+
+def iter_companyfacts(source: str, ciks: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, bytes]]:
+    """(cik, body) for every companyfacts file in a zip archive or directory, optionally only some CIKs"""
+    wanted = set(ciks) if ciks is not None else None
+
+    def selected(name: str) -> Optional[int]:
+        match = CIK_NAME.search(name)
+        if not match:
+            return None
+        cik = int(match.group(1))
+        return cik if wanted is None or cik in wanted else None
+
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                cik = selected(info.filename)
+                if cik is not None:
+                    yield cik, archive.read(info)
+        return
+    for entry in sorted(os.scandir(source), key=lambda e: e.name):
+        cik = selected(entry.name)
+        if cik is not None and entry.is_file():
+            with open(entry.path, 'rb') as f:
+                yield cik, f.read()
+
+
+def to_dates(values: Sequence[str]) -> np.ndarray:
+    """ISO date strings -> datetime64[D] ('' -> NaT)"""
+    return np.array(values, 'datetime64[D]') if len(values) else np.array([], 'datetime64[D]')
+
+
+def since_date(year: Optional[int]) -> Optional[np.datetime64]:
+    return np.datetime64(f'{year}-01-01', 'D') if year else None
+
+
+class CoverageMatrix:
+    """Sparse company x concept matrix, cells sorted by concept (column) then company (row)"""
+
+    def __init__(self, ciks: np.ndarray, symbols: np.ndarray, names: np.ndarray, concepts: np.ndarray,
+                 indptr: np.ndarray, rows: np.ndarray, latest: np.ndarray, annual: np.ndarray, facts: np.ndarray):
+        self.ciks = ciks
+        self.symbols = symbols
+        self.names = names
+        self.concepts = concepts
+        self.indptr = indptr
+        self.rows = rows
+        self.latest = latest
+        self.annual = annual
+        self.facts = facts
+        self.cols = np.repeat(np.arange(len(concepts), dtype=np.int32), np.diff(indptr))
+        self._concept_index = {name: i for i, name in enumerate(concepts.tolist())}
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.ciks), len(self.concepts)
+
+    @property
+    def cells(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def build(cls, bodies: Iterable[Tuple[int, bytes]], symbols: Optional[Dict[int, str]] = None,
+              workers: int = 0) -> 'CoverageMatrix':
+        """
+        Scan (cik, body) pairs, in `workers` processes (0 = in-process). Bodies
+        are read from `bodies` as the scans keep up, so at most a few documents
+        per worker are held in memory at once.
+        """
+        ciks: List[int] = []
+        names: List[str] = []
+        vocabulary: Dict[str, int] = {}
+        rows, cols, latest, annual, facts = [], [], [], [], []
+
+        def add(cik: int, scan: Scan):
+            name, concepts, last, last_annual, counts = scan
+            row = len(ciks)
+            ciks.append(cik)
+            names.append(name)
+            rows.append(np.full(len(concepts), row, np.int32))
+            cols.append(np.fromiter((vocabulary.setdefault(c, len(vocabulary)) for c in concepts), np.int32,
+                                    len(concepts)))
+            latest.append(to_dates(last))
+            annual.append(to_dates(last_annual))
+            facts.append(np.array(counts, np.int32))
+
+        if workers:
+            in_flight = deque()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for cik, body in bodies:
+                    in_flight.append((cik, pool.submit(scan_companyfacts, body)))
+                    if len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                        done_cik, future = in_flight.popleft()
+                        add(done_cik, future.result())
+                while in_flight:
+                    done_cik, future = in_flight.popleft()
+                    add(done_cik, future.result())
+        else:
+            for cik, body in bodies:
+                add(cik, scan_companyfacts(body))
+
+        def joined(parts: list, dtype) -> np.ndarray:
+            return np.concatenate(parts) if parts else np.array([], dtype)
+
+        col = joined(cols, np.int32)
+        row = joined(rows, np.int32)
+        order = np.lexsort((row, col))
+        indptr = np.zeros(len(vocabulary) + 1, np.int64)
+        np.cumsum(np.bincount(col, minlength=len(vocabulary)), out=indptr[1:])
+        symbols = symbols or {}
+        return cls(np.array(ciks, np.int64), np.array([symbols.get(c, '') for c in ciks], str),
+                   np.array(names, str), np.array(list(vocabulary), str), indptr, row[order],
+                   joined(latest, 'datetime64[D]')[order], joined(annual, 'datetime64[D]')[order],
+                   joined(facts, np.int32)[order])
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str = COVERAGE_FILE) -> str:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp.npz'
+        np.savez_compressed(tmp_path, version=COVERAGE_VERSION, ciks=self.ciks, symbols=self.symbols,
+                            names=self.names, concepts=self.concepts, indptr=self.indptr, rows=self.rows,
+                            latest=self.latest, annual=self.annual, facts=self.facts)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str = COVERAGE_FILE) -> 'CoverageMatrix':
+        with np.load(path, allow_pickle=False) as saved:
+            if int(saved['version']) != COVERAGE_VERSION:
+                raise ValueError(f'{path}: coverage format {int(saved["version"])}, expected {COVERAGE_VERSION}')
+            return cls(*(saved[key] for key in ('ciks', 'symbols', 'names', 'concepts', 'indptr', 'rows',
+                                                  'latest', 'annual', 'facts')))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def concept(self, name: str) -> Optional[int]:
+        """Column of a concept; bare names are us-gaap ('Revenues' = 'us-gaap:Revenues')"""
+        return self._concept_index.get(name if ':' in name else f'{DEFAULT_TAXONOMY}:{name}')
+
+    def row(self, key: str) -> Optional[int]:
+        """Row of a company by symbol or CIK"""
+        hits = np.flatnonzero(self.symbols == key.upper())
+        if not len(hits) and key.isdigit():
+            hits = np.flatnonzero(self.ciks == int(key))
+        return int(hits[0]) if len(hits) else None
+
+    def _current(self, since: Optional[int], annual: bool) -> np.ndarray:
+        """Per cell: reported (in a 10-K if annual) with a period ending on or after Jan 1 of `since`"""
+        ends = self.annual if annual else self.latest
+        current = ~np.isnat(ends)
+        start = since_date(since)
+        if start is not None:
+            current &= ends >= start
+        return current
+
+    def reporters(self, name: str, since: Optional[int] = None, annual: bool = False) -> np.ndarray:
+        """Rows reporting a concept"""
+        col = self.concept(name)
+        if col is None:
+            return np.array([], np.int32)
+        cells = slice(self.indptr[col], self.indptr[col + 1])
+        return self.rows[cells][self._current(since, annual)[cells]]
+
+    def counts(self, since: Optional[int] = None, annual: bool = False,
+               rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Companies reporting each concept (optionally only among some rows)"""
+        current = self._current(since, annual)
+        if rows is not None:
+            current &= np.isin(self.rows, rows)
+        return np.bincount(self.cols[current], minlength=len(self.concepts))
+
+    def top(self, limit: int = 30, like: Optional[str] = None, since: Optional[int] = None, annual: bool = False,
+            rows: Optional[np.ndarray] = None) -> List[Tuple[str, int]]:
+        """Most reported concepts, optionally matching a regex"""
+        counts = self.counts(since, annual, rows)
+        order = np.argsort(-counts, kind='stable')
+        pattern = re.compile(like, re.IGNORECASE) if like else None
+        ranked = []
+        for col in order:
+            if not counts[col]:
+                break
+            if pattern is None or pattern.search(self.concepts[col]):
+                ranked.append((str(self.concepts[col]), int(counts[col])))
+                if len(ranked) == limit:
+                    break
+        return ranked
+
+    def company(self, row: int) -> List[Tuple[str, str, str, int]]:
+        """(concept, latest end, latest 10-K end, facts) for every concept a company reports, newest first"""
+        cells = np.flatnonzero(self.rows == row)
+        cells = cells[np.argsort(self.latest[cells])[::-1]]
+        return [(str(self.concepts[self.cols[i]]), str(self.latest[i]),
+                 '' if np.isnat(self.annual[i]) else str(self.annual[i]), int(self.facts[i])) for i in cells]
+
+    def alias_coverage(self, aliases: Sequence[str], since: Optional[int] = None,
+                       annual: bool = True) -> Tuple[List[Tuple[str, int, int]], np.ndarray]:
+        """
+        For one metrics_map entry: (alias, companies reporting it, companies it
+        is the first reported alias for) per alias, and the rows none covers
+        """
+        covered = np.zeros(len(self.ciks), bool)
+        stats = []
+        for alias in aliases:
+            reporting = np.zeros(len(self.ciks), bool)
+            reporting[self.reporters(alias, since, annual)] = True
+            stats.append((alias, int(reporting.sum()), int((reporting & ~covered).sum())))
+            covered |= reporting
+        return stats, np.flatnonzero(~covered)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Sanity checks and quarantine for fetched metrics
+
+Runs over the CompanyTable right before a fetcher saves, comparing against
+the previously published data. Every check is a whole-column NumPy
+expression, so the stage costs well under a millisecond per 1000 companies.
+
+Checks:
+- margin_bounds      operating/profit margin outside [-100%, 100%]. Above 100%
+                     the numerator exceeds revenue, so revenue (from a stale or
+                     mismatched GAAP concept) is quarantined; below -100% only
+                     the margin is.
+- gross_profit       gross profit larger than revenue (revenue quarantined)
+- balance_sheet      total assets differ from liabilities + equity by more
+                     than 10%. Only flagged: noncontrolling interest and
+                     temporary equity sit outside StockholdersEquity, so
+                     real filers (AVGO, UNH, V, ...) miss the identity too.
+- period_alignment   a ratio's numerator and denominator come from different
+                     fiscal periods (the older input and the ratio quarantined).
+                     Uses the per-metric "periods" the fetchers record; an
+                     input with no recorded period counts as the older one.
+- jump               a value moved by more than its JUMP_LIMITS factor since the
+                     last published run (reverted to the published value)
+
+Quarantined values are never published: jumps keep the previous value,
+everything else is removed from the record (the site already hides missing
+metrics), along with any derived ratio computed from it. Everything
+quarantined or flagged is listed with its reason in data/quarantine_<job>.json.
+
+A jump is only held back once: if the next run fetches the same value again
+it is treated as confirmed (e.g. a stock split or an acquisition) and
+published.
+
+Check the committed dataset by hand:
+    python3 data_checks.py
+    git show HEAD~1:data/financial_data.json > /tmp/old.json
+    python3 data_checks.py --previous /tmp/old.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from company_table import CompanyTable
+
+QUARANTINE_DIR = './data'
+QUARANTINE_VERSION = 1
+
+MARGIN_BOUNDS = {'operating_margin': (-100.0, 100.0), 'profit_margin': (-100.0, 100.0)}
+BALANCE_SHEET_TOLERANCE = 0.10
+# Checks that are reported but never change the data
+FLAG_ONLY_CHECKS = ('balance_sheet',)
+# Largest plausible run-over-run change (factor, either direction) for values that are always positive
+JUMP_LIMITS = {
+    'revenue': 3.0,
+    'total_assets': 3.0,
+    'shares_outstanding': 3.0,
+    'market_cap': 2.0,
+}
+# Derived metric -> (numerator, denominator) it is computed from
+DERIVED_INPUTS = {
+    'free_cash_flow': ('operating_cash_flow', 'capex'),
+    'debt_to_equity': ('long_term_debt', 'stockholders_equity'),
+    'operating_margin': ('operating_income', 'revenue'),
+    'profit_margin': ('earnings', 'revenue'),
+}
+
+UNKNOWN_PERIOD = np.datetime64('0001-01-01', 'D')
+
+# (metric, mask of offending rows, check name, reason)
+Finding = Tuple[str, np.ndarray, str, str]
+
+
+def quarantine_path(job: str) -> str:
+    return os.path.join(QUARANTINE_DIR, f'quarantine_{job}.json')
+
+
+def find_anomalies(table: CompanyTable, previous: Optional[CompanyTable] = None) -> List[Finding]:
+    """Run every check; returns one (metric, rows mask, check, reason) per check and metric"""
+    v, ok = table.values, table.valid
+    findings: List[Finding] = []
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        positive_revenue = ok['revenue'] & (v['revenue'] > 0)
+        for margin, (low, high) in MARGIN_BOUNDS.items():
+            numerator = DERIVED_INPUTS[margin][0]
+            findings.append(('revenue', ok[margin] & positive_revenue & (v[margin] > high), 'margin_bounds',
+                             f'{margin} above {high:g}%: {numerator} exceeds revenue'))
+            findings.append((margin, ok[margin] & (v[margin] < low), 'margin_bounds', f'{margin} below {low:g}%'))
+
+        findings.append(('revenue', ok['gross_profit'] & positive_revenue & (v['gross_profit'] > v['revenue']),
+                         'gross_profit', 'gross_profit exceeds revenue'))
+
+        has_balance_sheet = ok['total_assets'] & ok['total_liabilities'] & ok['stockholders_equity'] \
+            & (v['total_assets'] > 0)
+        gap = np.abs(v['total_assets'] - (v['total_liabilities'] + v['stockholders_equity'])) / v['total_assets']
+        broken = has_balance_sheet & (gap > BALANCE_SHEET_TOLERANCE)
+        reason = f'assets differ from liabilities + equity by more than {BALANCE_SHEET_TOLERANCE:.0%}'
+        findings.append(('total_liabilities', broken, 'balance_sheet', reason))
+        findings.append(('stockholders_equity', broken, 'balance_sheet', reason))
+
+        for derived, (numerator, denominator) in DERIVED_INPUTS.items():
+            misaligned = ok[numerator] & ok[denominator] & ~table.aligned(numerator, denominator)
+            # Unknown period = older: a value kept from before periods were recorded
+            a, b = (np.where(np.isnat(end), UNKNOWN_PERIOD, end)
+                    for end in (table.period_column(numerator)[0], table.period_column(denominator)[0]))
+            reason = f'{numerator} and {denominator} are from different fiscal periods'
+            findings.append((derived, misaligned & ok[derived], 'period_alignment', reason))
+            findings.append((numerator, misaligned & (a < b), 'period_alignment', reason))
+            findings.append((denominator, misaligned & (b < a), 'period_alignment', reason))
+
+        if previous is not None:
+            for metric, limit in JUMP_LIMITS.items():
+                old, old_ok = previous.values[metric], previous.valid[metric]
+                both = ok[metric] & old_ok & (v[metric] > 0) & (old > 0)
+                ratio = v[metric] / old
+                jumped = both & ((ratio > limit) | (ratio < 1 / limit))
+                findings.append((metric, jumped, 'jump', f'changed more than {limit:g}x since the last published run'))
+
+    return [finding for finding in findings if finding[1].any()]
+
+
+def load_confirmations(job: str) -> Dict[Tuple[str, str], float]:
+    """(symbol, metric) -> value held back as a jump by the previous run"""
+    try:
+        with open(quarantine_path(job), 'r', encoding='utf-8') as f:
+            items = json.load(f).get('items', [])
+    except (OSError, ValueError):
+        return {}
+    return {(i['symbol'], i['metric']): i['value'] for i in items if i.get('action') == 'reverted'}
+
+
+class Quarantine:
+    """Applies find_anomalies() results to a table and reports what was held back"""
+
+    def __init__(self, job: str):
+        self.job = job
+        self.items: List[dict] = []
+        self.checked = 0
+        self.elapsed = 0.0
+
+    def run(self, table: CompanyTable, previous: Optional[CompanyTable] = None,
+            confirmed: Optional[Dict[Tuple[str, str], float]] = None) -> List[dict]:
+        """Check `table`, quarantine offending values in place and return the quarantined items"""
+        start = time.perf_counter()
+        confirmed = load_confirmations(self.job) if confirmed is None else confirmed
+        self.checked = len(table)
+        if previous is not None and previous.symbols != table.symbols:
+            previous = _aligned(previous, table)
+
+        reverted, withheld = {}, {}
+        for metric, rows, check, reason in find_anomalies(table, previous):
+            for row in np.flatnonzero(rows).tolist():
+                symbol = table.symbols[row]
+                value = table.get_value(row, metric)
+                if check in FLAG_ONLY_CHECKS:
+                    self._add(table, row, metric, value, check, reason, 'flagged')
+                elif check == 'jump':
+                    if confirmed.get((symbol, metric)) == value:
+                        continue        # same value two runs running: accept it
+                    reverted.setdefault((row, metric), (check, reason, value))
+                else:
+                    withheld.setdefault((row, metric), (check, reason, value))
+
+        for (row, metric), (check, reason, value) in reverted.items():
+            if (row, metric) in withheld:
+                continue
+            old = previous.values[metric][row].item()
+            table.set_value(row, metric, old)
+            if metric in table.period_end or metric in previous.period_end:
+                end, fy = table.period_column(metric, create=True)
+                end[row], fy[row] = (column[row] for column in previous.period_column(metric))
+            self._add(table, row, metric, value, check, reason, 'reverted', previous=old)
+        if reverted:
+            table.derive(rows=sorted({row for row, _ in reverted}))
+
+        for (row, metric), (check, reason, value) in withheld.items():
+            self._withhold(table, row, metric, value, check, reason)
+            for derived, inputs in DERIVED_INPUTS.items():
+                if metric in inputs and derived in table.layout(row) and (row, derived) not in withheld:
+                    self._withhold(table, row, derived, table.get_value(row, derived), 'derived',
+                                   f'computed from quarantined {metric}')
+
+        self.elapsed = time.perf_counter() - start
+        return self.items
+
+    def _withhold(self, table: CompanyTable, row: int, metric: str, value, check: str, reason: str):
+        if metric in table.layout(row):
+            table.delete_value(row, metric)
+            self._add(table, row, metric, value, check, reason, 'withheld')
+
+    def _add(self, table: CompanyTable, row: int, metric: str, value, check: str, reason: str,
+             action: str, previous=None):
+        item = {'symbol': table.symbols[row], 'metric': metric, 'value': value,
+                'check': check, 'reason': reason, 'action': action}
+        if action == 'reverted':
+            item['previous'] = previous
+        self.items.append(item)
+
+    @property
+    def quarantined(self) -> List[dict]:
+        """Items whose value was withheld or reverted (flagged ones are published as is)"""
+        return [item for item in self.items if item['action'] != 'flagged']
+
+    def to_dict(self) -> dict:
+        by_check = {}
+        for item in self.items:
+            by_check[item['check']] = by_check.get(item['check'], 0) + 1
+        return {
+            'version': QUARANTINE_VERSION,
+            'job': self.job,
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime()),
+            'totals': {
+                'companies': self.checked,
+                'quarantined': len(self.quarantined),
+                'withheld': sum(1 for i in self.items if i['action'] == 'withheld'),
+                'reverted': sum(1 for i in self.items if i['action'] == 'reverted'),
+                'flagged': sum(1 for i in self.items if i['action'] == 'flagged'),
+                'by_check': dict(sorted(by_check.items())),
+                'check_ms': round(self.elapsed * 1000, 3)
+            },
+            'items': sorted(self.items, key=lambda i: (i['symbol'], i['metric']))
+        }
+
+    def write(self, path: Optional[str] = None) -> str:
+        path = path or quarantine_path(self.job)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        return path
+
+    def print_summary(self, top: int = 10):
+        if not self.items:
+            print(f"✓ Sanity checks passed for {self.checked} companies ({self.elapsed * 1000:.1f} ms)")
+            return
+        flagged = len(self.items) - len(self.quarantined)
+        print(f"⚠️  Quarantined {len(self.quarantined)} values"
+              f"{f', flagged {flagged}' if flagged else ''} in {len({i['symbol'] for i in self.items})} companies "
+              f"({self.elapsed * 1000:.1f} ms):")
+        for item in sorted(self.items, key=lambda i: i['symbol'])[:top]:
+            action = f"kept {item['previous']}" if item['action'] == 'reverted' else item['action']
+            print(f"  ⊘ {item['symbol']:6s} {item['metric']:20s} {item['value']!s:>16}  {item['reason']} ({action})")
+        if len(self.items) > top:
+            print(f"  ... and {len(self.items) - top} more")
+
+
+def _aligned(previous: CompanyTable, table: CompanyTable) -> CompanyTable:
+    """`previous` re-indexed to `table`'s rows (companies it doesn't have come out all-invalid)"""
+    aligned = CompanyTable.from_records([{'symbol': s, 'name': s} for s in table.symbols])
+    rows = np.array([previous.index.get(s, -1) for s in table.symbols], np.int64)
+    found = rows >= 0
+    for metric in aligned.values:
+        aligned.values[metric][found] = previous.values[metric][rows[found]]
+        aligned.valid[metric][found] = previous.valid[metric][rows[found]]
+    for metric in previous.period_end:
+        end, fy = aligned.period_column(metric, create=True)
+        end[found] = previous.period_end[metric][rows[found]]
+        fy[found] = previous.period_fy[metric][rows[found]]
+    return aligned
+
+
+def check_before_save(table: CompanyTable, previous: Optional[CompanyTable], job: str) -> Quarantine:
+    """The pre-save stage every fetcher runs: quarantine in place, print and write the report"""
+    print()
+    print("=" * 80)
+    print("SANITY CHECKS")
+    print("=" * 80)
+    quarantine = Quarantine(job)
+    quarantine.run(table, previous)
+    quarantine.print_summary()
+    print(f"📋 Quarantine report: {quarantine.write()}")
+    return quarantine
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Run the pre-save sanity checks over a dataset file')
+    parser.add_argument('path', nargs='?', default='data/financial_data.json')
+    parser.add_argument('--previous', help='Previously published dataset, for the jump check')
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args(argv)
+
+    table = CompanyTable.load(args.path)
+    previous = CompanyTable.load(args.previous) if args.previous else None
+    quarantine = Quarantine('check')
+    quarantine.run(table, previous, confirmed={})
+    quarantine.print_summary(top=args.top)
+    return 1 if quarantine.quarantined else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
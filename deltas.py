@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Versioned deltas of financial_data.json
+
+Every save that changes the dataset bumps its version and publishes a patch
+from the previous version, so a client holding version N can catch up by
+applying deltas N+1..latest instead of downloading the whole file:
+
+- versions.json          {"version", "hash", "updated_at", "deltas": [...]}
+                         the last MAX_DELTAS deltas, oldest first; a client
+                         older than the first one re-downloads the dataset
+- deltas/<version>.json  {"from", "to", "base", "hash", "generated_at",
+                          "changed": {symbol: {"set": {...}, "unset": [...], "was": {...}}},
+                          "added": [records], "removed": [symbols], "order": [symbols]?}
+
+"set" and "unset" are the patch (whole field values, nested objects
+included); "was" holds the replaced values so the same delta can be read
+as a change summary. "order" is only present when the company order changed
+in a way the patch alone doesn't reproduce. "base" and "hash" are the
+SHA-256 of financial_data.json before and after: a client only applies a
+delta whose "base" is the hash it holds. If the file being replaced doesn't
+match the manifest (edited by hand or by another tool) the delta history is
+restarted, so clients on older versions re-download.
+
+Change summary for commit messages:
+    python3 deltas.py version                # current version number
+    python3 deltas.py summary --since 41     # everything published after v41
+"""
+
+import argparse
+import hashlib
+import os
+import time
+from typing import Dict, List, Optional
+
+import fastjson
+
+DELTA_VERSION = 1
+DELTA_DIR = 'deltas'
+MANIFEST_FILE = 'versions.json'
+MAX_DELTAS = 30
+DATA_DIR = './data'
+
+
+def dataset_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def diff(previous: List[dict], records: List[dict]) -> dict:
+    """Per-company, per-field changes from `previous` to `records` (empty dict = identical)"""
+    old = {r['symbol']: r for r in previous}
+    new_symbols = {r['symbol'] for r in records}
+    changed, added = {}, []
+    for record in records:
+        before = old.get(record['symbol'])
+        if before is None:
+            added.append(record)
+            continue
+        patch = {'set': {}, 'unset': [], 'was': {}}
+        for key, value in record.items():
+            if key not in before or before[key] != value or type(before[key]) is not type(value):
+                patch['set'][key] = value
+                if key in before:
+                    patch['was'][key] = before[key]
+        for key in before:
+            if key not in record:
+                patch['unset'].append(key)
+                patch['was'][key] = before[key]
+        if patch['set'] or patch['unset']:
+            changed[record['symbol']] = {k: v for k, v in patch.items() if v}
+    removed = [r['symbol'] for r in previous if r['symbol'] not in new_symbols]
+
+    delta = {}
+    if changed:
+        delta['changed'] = changed
+    if added:
+        delta['added'] = added
+    if removed:
+        delta['removed'] = removed
+    order = [r['symbol'] for r in records]
+    if _patched_order(previous, delta) != order:
+        delta['order'] = order
+    return delta
+
+
+def _patched_order(previous: List[dict], delta: dict) -> List[str]:
+    removed = set(delta.get('removed', ()))
+    return [r['symbol'] for r in previous if r['symbol'] not in removed] + \
+        [r['symbol'] for r in delta.get('added', ())]
+
+
+def apply(previous: List[dict], delta: dict) -> List[dict]:
+    """Apply a delta to the records it was computed from (the reference client)"""
+    removed = set(delta.get('removed', ()))
+    records = {r['symbol']: dict(r) for r in previous if r['symbol'] not in removed}
+    for symbol, patch in delta.get('changed', {}).items():
+        record = records[symbol]
+        record.update(patch.get('set', {}))
+        for key in patch.get('unset', ()):
+            record.pop(key, None)
+    for record in delta.get('added', ()):
+        records[record['symbol']] = dict(record)
+    order = delta.get('order') or _patched_order(previous, delta)
+    return [records[symbol] for symbol in order]
+
+
+def load_manifest(data_dir: str = DATA_DIR) -> dict:
+    try:
+        manifest = fastjson.load(os.path.join(data_dir, MANIFEST_FILE))
+    except (OSError, ValueError):
+        return {'version': 0, 'hash': None, 'updated_at': None, 'deltas': []}
+    return manifest if isinstance(manifest, dict) else {'version': 0, 'hash': None, 'updated_at': None, 'deltas': []}
+
+
+def delta_path(version: int) -> str:
+    return f'{DELTA_DIR}/{version:06d}.json'
+
+
+def publish(previous_text: Optional[str], records: List[dict], text: str, data_dirs: List[str]) -> Optional[dict]:
+    """
+    Bump the version and write the delta from `previous_text` (the dataset
+    being replaced, None if there was none) to `records` into every data dir.
+    Returns the new manifest, or None when nothing changed.
+    """
+    manifest = load_manifest(data_dirs[0])
+    new_hash = dataset_hash(text)
+    if previous_text is not None and new_hash == dataset_hash(previous_text):
+        return None
+
+    base = dataset_hash(previous_text) if previous_text is not None else None
+    history = manifest.get('deltas', [])
+    if base is None or base != manifest.get('hash'):
+        history = []        # unknown starting point: clients on older versions re-download
+    version = manifest.get('version', 0) + 1
+    now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+    entry = None
+    delta = None
+    if base is not None:
+        delta = {'version': DELTA_VERSION, 'from': version - 1, 'to': version, 'base': base, 'hash': new_hash,
+                 'generated_at': now}
+        delta.update(diff(fastjson.loads(previous_text), records))
+        entry = {'from': version - 1, 'to': version, 'path': delta_path(version),
+                 'companies': len(delta.get('changed', {})) + len(delta.get('added', ())) + len(delta.get('removed', ()))}
+        history = history + [entry]
+    history = history[-MAX_DELTAS:]
+    manifest = {'version': version, 'hash': new_hash, 'updated_at': now, 'deltas': history}
+
+    keep = {item['path'] for item in history}
+    for data_dir in data_dirs:
+        os.makedirs(os.path.join(data_dir, DELTA_DIR), exist_ok=True)
+        if delta is not None:
+            with open(os.path.join(data_dir, entry['path']), 'wb') as f:
+                f.write(fastjson.dumps(delta))
+        for name in os.listdir(os.path.join(data_dir, DELTA_DIR)):
+            if f'{DELTA_DIR}/{name}' not in keep:
+                os.remove(os.path.join(data_dir, DELTA_DIR, name))
+        tmp_path = os.path.join(data_dir, MANIFEST_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(fastjson.dumps_pretty(manifest))
+        os.replace(tmp_path, os.path.join(data_dir, MANIFEST_FILE))
+    return manifest
+
+
+# -- change summaries ---------------------------------------------------------------
+
+def format_value(value, field: str = '') -> str:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 'updated' if isinstance(value, (dict, list)) else str(value)
+    unit = '' if field == 'shares_outstanding' else '$'
+    if abs(value) >= 1e9:
+        return f'{unit}{value / 1e9:.1f}B'
+    if abs(value) >= 1e6:
+        return f'{unit}{value / 1e6:.1f}M'
+    return f'{value:g}'
+
+
+def describe_change(field: str, was, now, removed: bool = False) -> str:
+    if removed:
+        return f'{field} removed'
+    if was is None or isinstance(now, (dict, list)):
+        return f'{field} {format_value(now, field)}'
+    text = f'{field} {format_value(was, field)} → {format_value(now, field)}'
+    if isinstance(was, (int, float)) and isinstance(now, (int, float)) and was and not isinstance(was, bool):
+        text += f' ({(now - was) / abs(was):+.1%})'
+    return text
+
+
+def combine(deltas: List[dict]) -> dict:
+    """Fold consecutive deltas into one (first 'was', last value) for summaries"""
+    changed: Dict[str, Dict[str, tuple]] = {}
+    added, removed = [], []
+    for delta in deltas:
+        for symbol, patch in delta.get('changed', {}).items():
+            fields = changed.setdefault(symbol, {})
+            for key, value in patch.get('set', {}).items():
+                was = fields[key][0] if key in fields else patch.get('was', {}).get(key)
+                fields[key] = (was, value, False)
+            for key in patch.get('unset', ()):
+                was = fields[key][0] if key in fields else patch.get('was', {}).get(key)
+                fields[key] = (was, None, True)
+        added.extend(r['symbol'] for r in delta.get('added', ()))
+        removed.extend(delta.get('removed', ()))
+    return {'changed': changed, 'added': added, 'removed': removed}
+
+
+# Fields that change on every run and would drown the summary
+QUIET_FIELDS = ('market_cap_updated',)
+
+
+def summary(deltas: List[dict], top: int = 15, fields_per_company: int = 4) -> str:
+    """Human-readable change summary (used as the auto-update commit message body)"""
+    if not deltas:
+        return 'No data changes.'
+    combined = combine(deltas)
+    changed = {symbol: {k: v for k, v in fields.items() if k not in QUIET_FIELDS and v[0] != v[1]}
+               for symbol, fields in combined['changed'].items()}
+    changed = {symbol: fields for symbol, fields in changed.items() if fields}
+    lines = [f"Data v{deltas[0]['from']} → v{deltas[-1]['to']}: {len(changed)} companies changed, "
+             f"{len(combined['added'])} added, {len(combined['removed'])} removed"]
+    if combined['added']:
+        lines.append(f"  + {', '.join(combined['added'])}")
+    if combined['removed']:
+        lines.append(f"  - {', '.join(combined['removed'])}")
+
+    # Companies with the most changed fields first
+    for symbol in sorted(changed, key=lambda s: (-len(changed[s]), s))[:top]:
+        fields = changed[symbol]
+        parts = [describe_change(key, was, now, removed) for key, (was, now, removed) in list(fields.items())[:fields_per_company]]
+        if len(fields) > fields_per_company:
+            parts.append(f'{len(fields) - fields_per_company} more')
+        lines.append(f"  {symbol:6s} {', '.join(parts)}")
+    if len(changed) > top:
+        lines.append(f"  ... and {len(changed) - top} more companies")
+    return '\n'.join(lines)
+
+
+def load_deltas(since: int, data_dir: str = DATA_DIR) -> List[dict]:
+    """Published deltas after version `since`, oldest first"""
+    manifest = load_manifest(data_dir)
+    return [fastjson.load(os.path.join(data_dir, item['path']))
+            for item in manifest.get('deltas', []) if item['from'] >= since]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Dataset versions and change summaries')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('version', help='Print the current dataset version')
+    summary_parser = sub.add_parser('summary', help='Summarize the changes published after a version')
+    summary_parser.add_argument('--since', type=int, required=True)
+    summary_parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == 'version':
+        print(load_manifest(args.data_dir).get('version', 0))
+    else:
+        print(summary(load_deltas(args.since, args.data_dir), top=args.top))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
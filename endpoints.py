@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Upstream endpoints used by the fetch/update scripts
+
+Every base URL can be overridden from the environment, e.g. to point the
+whole pipeline at the local stand-in server (mock_upstream.py):
+
+    UPSTREAM_BASE_URL=http://127.0.0.1:8080 python3 fetch_comprehensive_data.py
+
+Per-host overrides take precedence over UPSTREAM_BASE_URL:
+    SEC_WWW_BASE_URL       https://www.sec.gov
+    SEC_DATA_BASE_URL      https://data.sec.gov
+    YAHOO_QUERY1_BASE_URL  https://query1.finance.yahoo.com
+    YAHOO_QUERY2_BASE_URL  https://query2.finance.yahoo.com
+    FMP_BASE_URL           https://financialmodelingprep.com
+"""
+
+import os
+
+DEFAULTS = {
+    'SEC_WWW_BASE_URL': 'https://www.sec.gov',
+    'SEC_DATA_BASE_URL': 'https://data.sec.gov',
+    'YAHOO_QUERY1_BASE_URL': 'https://query1.finance.yahoo.com',
+    'YAHOO_QUERY2_BASE_URL': 'https://query2.finance.yahoo.com',
+    'FMP_BASE_URL': 'https://financialmodelingprep.com',
+}
+
+
+def base_url(name: str) -> str:
+    """Resolve one base URL: per-host env var, then UPSTREAM_BASE_URL, then the real host"""
+    value = os.environ.get(name) or os.environ.get('UPSTREAM_BASE_URL') or DEFAULTS[name]
+    return value.rstrip('/')
+
+
+SEC_WWW = base_url('SEC_WWW_BASE_URL')
+SEC_DATA = base_url('SEC_DATA_BASE_URL')
+YAHOO_QUERY1 = base_url('YAHOO_QUERY1_BASE_URL')
+YAHOO_QUERY2 = base_url('YAHOO_QUERY2_BASE_URL')
+FMP = base_url('FMP_BASE_URL')
+
+# Format with .format(cik=..., symbol=..., concept=..., unit=..., period=...)
+SEC_TICKERS_URL = f"{SEC_WWW}/files/company_tickers.json"
+SEC_COMPANYFACTS_URL = f"{SEC_DATA}/api/xbrl/companyfacts/CIK{{cik}}.json"
+SEC_COMPANYFACTS_BULK_URL = f"{SEC_WWW}/Archives/edgar/daily-index/xbrl/companyfacts.zip"
+SEC_SUBMISSIONS_URL = f"{SEC_DATA}/submissions/CIK{{cik}}.json"
+SEC_FRAMES_URL = f"{SEC_DATA}/api/xbrl/frames/us-gaap/{{concept}}/{{unit}}/{{period}}.json"
+YAHOO_CHART_URL = f"{YAHOO_QUERY1}/v8/finance/chart/{{symbol}}"
+YAHOO_QUOTE_URL = f"{YAHOO_QUERY1}/v7/finance/quote"
+YAHOO_QUOTE_SUMMARY_URL = f"{YAHOO_QUERY2}/v10/finance/quoteSummary/{{symbol}}"
+FMP_API_URL = f"{FMP}/api/v3"
@@ -2,15 +2,35 @@
 """
 Explore what financial data is available from SEC EDGAR for a company
 This will show you ALL the metrics you can fetch for free!
+
+Coverage across the whole universe (see concept_coverage.py):
+    python3 explore-sec-data.py --matrix --download     # fetch companyfacts.zip, build the matrix
+    python3 explore-sec-data.py --matrix --source DIR   # or build it from cached CIK##########.json files
+    python3 explore-sec-data.py --aliases               # how many companies each metrics_map alias covers
+    python3 explore-sec-data.py --coverage --like Revenue --since 2023
+    python3 explore-sec-data.py --company AAPL          # every concept one company reports
 """
 
-import requests
+import argparse
+import datetime
 import json
+import os
 import sys
+import time
+
+import requests
+
+import concept_coverage
+import endpoints
+import fastjson
+from fetch_comprehensive_data import default_parse_workers
+
+DATA_FILE = './data/financial_data.json'
+HEADERS = {'User-Agent': 'sp100-financial-tracker explorer contact@example.com'}
 
 def get_company_cik(symbol):
     """Get CIK for a ticker symbol"""
-    url = "https://www.sec.gov/files/company_tickers.json"
+    url = endpoints.SEC_TICKERS_URL
     headers = {'User-Agent': 'sp100-financial-tracker explorer contact@example.com'}
     response = requests.get(url, headers=headers, timeout=10)
     
@@ -38,7 +58,7 @@ def explore_company_data(symbol):
     print(f"✓ Found CIK: {cik}\n")
     
     # Get company facts
-    url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json"
+    url = endpoints.SEC_COMPANYFACTS_URL.format(cik=cik)
     headers = {'User-Agent': 'sp100-financial-tracker explorer contact@example.com'}
     
     print(f"📡 Fetching data from SEC EDGAR...")
@@ -172,14 +192,148 @@ def explore_company_data(symbol):
     return available_metrics
 
 
+def universe_ciks():
+    """{cik: symbol} for the companies in our dataset, via the SEC ticker map"""
+    symbols = {company['symbol'] for company in fastjson.load(DATA_FILE)}
+    response = requests.get(endpoints.SEC_TICKERS_URL, headers=HEADERS, timeout=30)
+    response.raise_for_status()
+    ciks = {}
+    for item in response.json().values():
+        if item.get('ticker') in symbols:
+            ciks.setdefault(int(item['cik_str']), item['ticker'])
+    return ciks
+
+
+def download_archive(path):
+    """Stream SEC's bulk companyfacts.zip to disk"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    print(f"📡 Downloading {endpoints.SEC_COMPANYFACTS_BULK_URL}...")
+    start = time.perf_counter()
+    with requests.get(endpoints.SEC_COMPANYFACTS_BULK_URL, headers=HEADERS, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(f'{path}.tmp', 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    os.replace(f'{path}.tmp', path)
+    print(f"✓ Saved {path} ({os.path.getsize(path) / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s)")
+
+
+def build_matrix(source, output, all_filers=False, workers=0):
+    """Scan the archive (or directory) into a coverage matrix and save it"""
+    print(f"\n{'='*80}")
+    print(f"CONCEPT COVERAGE MATRIX - {source}")
+    print(f"{'='*80}\n")
+
+    symbols = universe_ciks()
+    if not all_filers:
+        print(f"🔍 {len(symbols)} companies in {DATA_FILE} resolved to CIKs")
+    start = time.perf_counter()
+    bodies = concept_coverage.iter_companyfacts(source, None if all_filers else symbols)
+    matrix = concept_coverage.CoverageMatrix.build(bodies, symbols, workers=workers)
+    elapsed = time.perf_counter() - start
+
+    companies, concepts = matrix.shape
+    print(f"✓ {companies} companies x {concepts} concepts, {matrix.cells:,} cells ({elapsed:.1f}s)")
+    missing = sorted(set(symbols.values()) - set(matrix.symbols.tolist())) if not all_filers else []
+    if missing:
+        print(f"⚠️  No companyfacts for {len(missing)}: {', '.join(missing[:20])}")
+    print(f"✓ Saved {matrix.save(output)}")
+    return matrix
+
+
+def print_coverage(matrix, like=None, since=None, annual=False, limit=30):
+    companies = matrix.shape[0]
+    scope = f"{'10-K ' if annual else ''}periods ending {since} or later" if since else \
+        ('any 10-K' if annual else 'any filing')
+    print(f"\n📊 Most reported concepts ({scope}), {companies} companies")
+    print(f"{'-'*80}")
+    for concept, count in matrix.top(limit, like, since, annual):
+        print(f"  • {concept:60s} {count:5d} {count / companies:6.1%}")
+
+
+def print_aliases(matrix, metrics_map, since=None, limit=5):
+    """Per metric: who each alias covers, and what the companies none covers report instead"""
+    companies = matrix.shape[0]
+    print(f"\n📋 metrics_map coverage (10-K periods ending {since} or later), {companies} companies")
+    for metric, aliases in metrics_map.items():
+        stats, uncovered = matrix.alias_coverage(aliases, since)
+        print(f"\n{metric}")
+        print(f"{'-'*80}")
+        for alias, reporting, first in stats:
+            print(f"  • {alias:60s} {reporting:5d} reporting, first for {first}")
+        if not len(uncovered):
+            print(f"  ✓ every company covered")
+            continue
+        names = ', '.join(matrix.symbols[uncovered][:10].tolist()) or f"{len(uncovered)} CIKs"
+        print(f"  ✗ {len(uncovered)} uncovered ({names}{'...' if len(uncovered) > 10 else ''})")
+        # Candidates: concepts the uncovered companies report, named like the aliases
+        stems = '|'.join(sorted({alias[:8] for alias in aliases}))
+        for concept, count in matrix.top(limit, stems, since, annual=True, rows=uncovered):
+            print(f"    ↺ {concept:58s} {count:5d} of them")
+
+
+def print_company(matrix, key, limit=None):
+    row = matrix.row(key)
+    if row is None:
+        print(f"❌ {key} is not in the coverage matrix")
+        return
+    concepts = matrix.company(row)
+    print(f"\n🏛️ {matrix.symbols[row] or matrix.ciks[row]} - {matrix.names[row]} ({len(concepts)} concepts)")
+    print(f"{'-'*80}")
+    for concept, latest, annual, facts in concepts[:limit]:
+        print(f"  • {concept:60s} {latest}  10-K {annual or '-':10s} {facts:4d} facts")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Explore SEC EDGAR data for one company or the whole universe')
+    parser.add_argument('symbol', nargs='?', default='AAPL', help='Company to explore (default AAPL)')
+    parser.add_argument('--matrix', action='store_true', help='Build the concept coverage matrix')
+    parser.add_argument('--download', action='store_true', help='Download companyfacts.zip first (--matrix)')
+    parser.add_argument('--source', default=concept_coverage.ARCHIVE_FILE,
+                        help='companyfacts.zip or a directory of CIK##########.json files')
+    parser.add_argument('--all-filers', action='store_true', help='Every filer in the source, not just our dataset')
+    parser.add_argument('--workers', type=int, default=default_parse_workers(),
+                        help='Scan processes (default one per core; 0 = in-process)')
+    parser.add_argument('--output', default=concept_coverage.COVERAGE_FILE, help='Saved coverage matrix')
+    parser.add_argument('--coverage', action='store_true', help='Most reported concepts')
+    parser.add_argument('--aliases', action='store_true', help='Coverage of each metrics_map alias')
+    parser.add_argument('--company', help='Every concept one company (symbol or CIK) reports')
+    parser.add_argument('--like', help='Only concepts matching this regex (--coverage)')
+    parser.add_argument('--since', type=int, help='Only periods ending in this year or later')
+    parser.add_argument('--annual', action='store_true', help='Only count 10-K facts (--coverage)')
+    parser.add_argument('--limit', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    if not (args.matrix or args.coverage or args.aliases or args.company):
+        explore_company_data(args.symbol)
+        return 0
+
+    if args.matrix:
+        if args.download:
+            download_archive(args.source)
+        matrix = build_matrix(args.source, args.output, args.all_filers, args.workers)
+    else:
+        if not os.path.exists(args.output):
+            print(f"❌ {args.output} not found - build it with --matrix first")
+            return 1
+        matrix = concept_coverage.CoverageMatrix.load(args.output)
+
+    if args.coverage:
+        print_coverage(matrix, args.like, args.since, args.annual, args.limit)
+    if args.aliases:
+        from fetch_comprehensive_data import ComprehensiveDataFetcher
+        since = args.since or datetime.date.today().year - 2
+        print_aliases(matrix, ComprehensiveDataFetcher().metrics_map, since)
+    if args.company:
+        print_company(matrix, args.company, args.limit)
+    return 0
+
+
 if __name__ == '__main__':
-    # Default to AAPL if no symbol provided
-    symbol = sys.argv[1] if len(sys.argv) > 1 else 'AAPL'
-    
     try:
-        explore_company_data(symbol)
+        sys.exit(main())
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
         import traceback
         traceback.print_exc()
-
+        sys.exit(1)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Fast JSON with automatic stdlib fallback
+
+Used for upstream response decoding and dataset encoding. Backends, first
+installed wins:
+- orjson   (pip install orjson)
+- msgspec  (pip install msgspec)
+- json     (stdlib, always available)
+
+Force one with SP100_JSON_BACKEND=orjson|msgspec|stdlib.
+
+dumps_pretty() writes the same bytes as json.dumps(obj, indent=2,
+ensure_ascii=False) for our data (ints, strings, fixed-point floats), so
+switching backends doesn't churn the committed JSON files. Values a fast
+backend can't encode (e.g. ints beyond 64 bits) fall back to stdlib per call.
+Note orjson decodes integers beyond 64 bits as floats; XBRL values never are.
+"""
+
+import json
+import os
+from typing import Any, Union
+
+_requested = os.environ.get('SP100_JSON_BACKEND', '').lower()
+
+orjson = None
+msgspec = None
+if _requested in ('', 'orjson'):
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+if orjson is None and _requested in ('', 'msgspec'):
+    try:
+        import msgspec
+    except ImportError:
+        msgspec = None
+
+BACKEND = 'orjson' if orjson else 'msgspec' if msgspec else 'stdlib'
+
+if msgspec:
+    _encoder = msgspec.json.Encoder()
+    _decoder = msgspec.json.Decoder()
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """Decode JSON from bytes or str"""
+    try:
+        if orjson:
+            return orjson.loads(data)
+        if msgspec:
+            return _decoder.decode(data)
+    except ValueError:
+        pass    # re-decode with stdlib: same result for valid JSON, stdlib's error otherwise
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON"""
+    try:
+        if orjson:
+            return orjson.dumps(obj)
+        if msgspec:
+            return _encoder.encode(obj)
+    except (TypeError, OverflowError):
+        pass
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps_pretty(obj: Any) -> str:
+    """Same output as json.dumps(obj, indent=2, ensure_ascii=False)"""
+    try:
+        if orjson:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+        if msgspec:
+            return msgspec.json.format(_encoder.encode(obj), indent=2).decode('utf-8')
+    except (TypeError, OverflowError):
+        pass
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def load(path: str) -> Any:
+    """Read and decode a JSON file"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump(path: str, obj: Any):
+    """Write obj as pretty JSON (see dumps_pretty)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(dumps_pretty(obj))
+
+
+def response_json(response) -> Any:
+    """Decode a requests response body (replaces response.json())"""
+    return loads(response.content)
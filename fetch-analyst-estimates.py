@@ -11,14 +11,24 @@ This fetches:
 - Analyst recommendation (Buy/Hold/Sell)
 
 100% AUTOMATED - runs weekly via GitHub Actions
+
+Profile a slow run (writes reports/profile-analyst-estimates.*):
+    python3 fetch-analyst-estimates.py --profile
 """
 
-import json
+import argparse
 import time
 import requests
 import os
 from typing import Optional, Dict
 
+import endpoints
+import profiling
+from instrumentation import Metrics, timed_get
+from publish import publish_dataset
+from run_report import RunReport
+from schema import SchemaError, load_companies
+
 DATA_FILE = './data/financial_data.json'
 PUBLIC_DATA_FILE = './public/data/financial_data.json'
 RATE_LIMIT_DELAY = 0.3  # FMP free tier: ~3 calls/second max
@@ -33,15 +43,18 @@ class AnalystEstimatesFetcher:
         self.processed = []
         self.failed = []
         self.skipped = []
+        self.metrics = Metrics('analyst-estimates')
+        self.report = RunReport('analyst-estimates', self.metrics)
         
     def fetch_analyst_estimates(self, symbol: str) -> Optional[Dict]:
         """Fetch analyst estimates from FMP"""
-        url = f"https://financialmodelingprep.com/api/v3/analyst-estimates/{symbol}?limit=1&apikey={self.api_key}"
+        url = f"{endpoints.FMP_API_URL}/analyst-estimates/{symbol}?limit=1&apikey={self.api_key}"
         
         try:
-            response = requests.get(url, timeout=10)
+            response = timed_get(requests, url, self.metrics, retries=1, timeout=10)
             response.raise_for_status()
-            data = response.json()
+            with self.metrics.parse_timer('analyst-estimates'):
+                data = response.json()
             
             self.api_calls += 1
             
@@ -64,12 +77,13 @@ class AnalystEstimatesFetcher:
     
     def fetch_price_target(self, symbol: str) -> Optional[Dict]:
         """Fetch analyst price target consensus"""
-        url = f"https://financialmodelingprep.com/api/v3/price-target-consensus?symbol={symbol}&apikey={self.api_key}"
+        url = f"{endpoints.FMP_API_URL}/price-target-consensus?symbol={symbol}&apikey={self.api_key}"
         
         try:
-            response = requests.get(url, timeout=10)
+            response = timed_get(requests, url, self.metrics, retries=1, timeout=10)
             response.raise_for_status()
-            data = response.json()
+            with self.metrics.parse_timer('price-target-consensus'):
+                data = response.json()
             
             self.api_calls += 1
             
@@ -88,12 +102,13 @@ class AnalystEstimatesFetcher:
     
     def fetch_analyst_recommendation(self, symbol: str) -> Optional[str]:
         """Fetch analyst recommendation (Buy/Hold/Sell)"""
-        url = f"https://financialmodelingprep.com/api/v3/grade/{symbol}?limit=1&apikey={self.api_key}"
+        url = f"{endpoints.FMP_API_URL}/grade/{symbol}?limit=1&apikey={self.api_key}"
         
         try:
-            response = requests.get(url, timeout=10)
+            response = timed_get(requests, url, self.metrics, retries=1, timeout=10)
             response.raise_for_status()
-            data = response.json()
+            with self.metrics.parse_timer('grade'):
+                data = response.json()
             
             self.api_calls += 1
             
@@ -105,6 +120,11 @@ class AnalystEstimatesFetcher:
         
         return None
     
+    def throttle(self):
+        """Stay under the FMP free-tier request rate"""
+        with profiling.span('throttle'):
+            time.sleep(RATE_LIMIT_DELAY)
+    
     def process_companies(self, companies: list):
         """Process all companies and add analyst estimates"""
         total = len(companies)
@@ -117,22 +137,25 @@ class AnalystEstimatesFetcher:
             if company.get('analyst_estimates'):
                 print(f"[{idx}/{total}] ⏭️  {name} ({symbol}) - Already has estimates")
                 self.skipped.append(symbol)
+                self.report.record({'symbol': symbol}, 'skipped')
                 continue
             
             print(f"\n[{idx}/{total}] 📊 Processing {name} ({symbol})...")
+            stats = self.metrics.begin_company(symbol)
+            status, reason = 'failed', None
             
             try:
                 # Fetch analyst estimates
                 estimates = self.fetch_analyst_estimates(symbol)
-                time.sleep(RATE_LIMIT_DELAY)
+                self.throttle()
                 
                 # Fetch price target
                 price_target = self.fetch_price_target(symbol)
-                time.sleep(RATE_LIMIT_DELAY)
+                self.throttle()
                 
                 # Fetch recommendation
                 recommendation = self.fetch_analyst_recommendation(symbol)
-                time.sleep(RATE_LIMIT_DELAY)
+                self.throttle()
                 
                 # Combine all data
                 if estimates or price_target or recommendation:
@@ -166,17 +189,30 @@ class AnalystEstimatesFetcher:
                         print(f"       Recommendation: {recommendation}")
                     
                     self.processed.append(symbol)
+                    status = 'ok'
                 else:
                     print(f"    ⚠️  No analyst data available")
                     self.failed.append(symbol)
+                    reason = 'no estimates, price target or grade from FMP'
                 
             except Exception as e:
                 print(f"    ❌ Error: {str(e)}")
                 self.failed.append(symbol)
+                reason = f'update error: {str(e)}'
+            
+            self.report.record(self.metrics.end_company(stats), status, reason=reason)
         
         return companies
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch analyst estimates and price targets from FMP')
+    profiling.add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    with profiling.profiled('analyst-estimates', args.profile):
+        return run()
+
+
+def run():
     print("=" * 70)
     print("📈 ANALYST ESTIMATES & FORECASTS FETCHER")
     print("=" * 70)
@@ -195,12 +231,14 @@ def main():
     # Load existing data
     print(f"📂 Loading data from {DATA_FILE}...")
     try:
-        with open(DATA_FILE, 'r') as f:
-            companies = json.load(f)
+        companies = load_companies(DATA_FILE)
         print(f"   ✓ Loaded {len(companies)} companies\n")
     except FileNotFoundError:
         print(f"   ❌ ERROR: {DATA_FILE} not found")
         return 1
+    except SchemaError as e:
+        print(f"   ❌ ERROR: {DATA_FILE} failed validation: {e}")
+        return 1
     
     # Fetch analyst estimates
     fetcher = AnalystEstimatesFetcher(api_key)
@@ -210,10 +248,8 @@ def main():
     print("\n" + "=" * 70)
     print("💾 Saving updated data...")
     
-    for file_path in [DATA_FILE, PUBLIC_DATA_FILE]:
-        with open(file_path, 'w') as f:
-            json.dump(companies, f, indent=2)
-        print(f"   ✓ Saved to {file_path}")
+    for path in publish_dataset(companies, (DATA_FILE, PUBLIC_DATA_FILE)):
+        print(f"   ✓ Saved {path}")
     
     # Summary
     print("\n" + "=" * 70)
@@ -228,6 +264,9 @@ def main():
     if fetcher.failed:
         print(f"\n⚠️  Companies without analyst data: {', '.join(fetcher.failed)}")
     
+    print(f"📈 Metrics report: {fetcher.metrics.write_report()}")
+    print(f"📋 Run report: {fetcher.report.write()}")
+    
     print("\n✨ Done! Analyst estimates added to financial data.")
     print("🚀 Commit and push to deploy to production.\n")
     
@@ -21,22 +21,325 @@ Plus calculates:
 - Debt-to-Equity Ratio
 - Operating Margin
 - Profit Margin
+
+Downloads and parsing run as a pipeline (threads → bounded queue → process
+pool); --sequential restores the one-company-at-a-time loop. --frames reads
+SEC's XBRL frames instead (one request per concept and period for every
+filer, see sec_frames.py): a few dozen requests whatever the universe size.
+
+The same companyfacts documents carry every 10-Q; their quarters are rolled
+up into each company's "ttm" object (quarterly.py) at no extra requests.
+
+Each finished company is checkpointed; after an interrupted run use:
+    python3 fetch_comprehensive_data.py --resume
+
+To see where a slow run spends its time (writes reports/profile-comprehensive.*):
+    python3 fetch_comprehensive_data.py --profile sample
 """
 
-import json
+import argparse
+import datetime
+import os
+import queue
+import threading
 import time
 import requests
-from typing import Optional, Dict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
+
+import endpoints
+import fastjson
+import profiling
+import quarterly
+import schema
+import sec_frames
+from checkpoint import CheckpointJournal
+from company_table import CompanyRow, CompanyTable
+from data_checks import check_before_save
+from instrumentation import Metrics, timed_get
+from publish import publish_dataset
+from run_report import RunReport
+from schema import SchemaError
 
 DATA_FILE = './data/financial_data.json'
 PUBLIC_DATA_FILE = './public/data/financial_data.json'
 RATE_LIMIT_DELAY = 0.15
+DEFAULT_IO_WORKERS = 8
+
+SEC_TICKERS_URL = endpoints.SEC_TICKERS_URL
+SEC_COMPANYFACTS_URL = endpoints.SEC_COMPANYFACTS_URL
+
+# Flow facts (income and cash flow statements) must cover a fiscal year
+ANNUAL_DAYS = (300, 380)
+# Metrics whose latest fiscal year decides the company's period
+PERIOD_ANCHORS = ('revenue', 'earnings')
+
+INTEGER_METRICS = [
+    'revenue', 'earnings', 'operating_income', 'gross_profit', 'operating_cash_flow',
+    'total_assets', 'total_liabilities', 'stockholders_equity', 'long_term_debt',
+    'cash', 'rd_expense', 'shares_outstanding'
+]
+
+
+def record_periods(company: dict, written: list, periods: Optional[Dict[str, dict]]):
+    """Update company['periods'] for the metrics just written (no period given = unknown)"""
+    current = company.get('periods')
+    if not current and not periods:
+        return                          # nothing recorded before or now
+    current = current or {}
+    updated = {k: v for k, v in current.items() if k not in written}
+    updated.update({metric: periods[metric] for metric in written if periods and metric in periods})
+    if updated != current:
+        company['periods'] = {m: updated[m] for m in schema.INTEGER_FIELDS if m in updated}
+
+
+def periods_aligned(periods: Dict[str, dict], a: str, b: str) -> bool:
+    """Whether metrics a and b come from the same fiscal period (or neither period is known)"""
+    return periods.get(a, {}).get('end') == periods.get(b, {}).get('end')
+
+
+def frame_periods(company: dict, metrics, end: str) -> Dict[str, dict]:
+    """
+    Periods for metrics read from XBRL frames. Frames carry no fiscal year, so
+    fy is kept from an earlier companyfacts run for the same period end and
+    left out otherwise (consumers key on end).
+    """
+    recorded = company.get('periods') or {}
+    periods = {}
+    for metric in metrics:
+        previous = recorded.get(metric) or {}
+        fy = previous.get('fy') if previous.get('end') == end else None
+        periods[metric] = {'fy': fy, 'end': end} if fy else {'end': end}
+    return periods
+
+
+def apply_fundamentals(company: dict, data: dict, periods: Optional[Dict[str, dict]] = None) -> dict:
+    """
+    Write fetched metrics onto a company record and recalculate derived metrics.
+    `periods` ({metric: {'fy', 'end'}}) is recorded under company['periods'];
+    a ratio whose inputs come from different periods is removed, not computed.
+    """
+    written = []
+    if data:
+        for metric in INTEGER_METRICS:
+            if metric in data:
+                company[metric] = int(data[metric])
+                written.append(metric)
+        if 'capex' in data:
+            # CapEx is usually positive in GAAP, make it negative
+            capex_val = abs(int(data['capex']))
+            company['capex'] = -capex_val if capex_val > 0 else capex_val
+            written.append('capex')
+    if written or periods:
+        record_periods(company, written, periods)
+    
+    if isinstance(company, CompanyRow):
+        # Table-backed record: the vectorized derivation, restricted to this row
+        company.table.derive(rows=[company.row])
+        return company
+    
+    # Calculate derived metrics (a ratio of inputs from different periods is dropped)
+    recorded = company.get('periods')
+    if 'operating_cash_flow' in company and 'capex' in company:
+        if recorded and not periods_aligned(recorded, 'operating_cash_flow', 'capex'):
+            company.pop('free_cash_flow', None)
+        else:
+            company['free_cash_flow'] = company['operating_cash_flow'] + company['capex']
+    
+    if 'long_term_debt' in company and 'stockholders_equity' in company:
+        if recorded and not periods_aligned(recorded, 'long_term_debt', 'stockholders_equity'):
+            company.pop('debt_to_equity', None)
+        elif company['stockholders_equity'] > 0:
+            company['debt_to_equity'] = round(company['long_term_debt'] / company['stockholders_equity'], 2)
+    
+    if 'revenue' in company:
+        for margin, numerator in (('operating_margin', 'operating_income'), ('profit_margin', 'earnings')):
+            if numerator not in company:
+                continue
+            if recorded and not periods_aligned(recorded, numerator, 'revenue'):
+                company.pop(margin, None)
+            elif company['revenue'] > 0:
+                company[margin] = round(company[numerator] / company['revenue'] * 100, 1)
+    
+    return company
+
+
+def write_dataset(companies) -> list:
+    """
+    Write the dataset (list of dicts or CompanyTable) to the data/ and public/data/
+    copies, with its versioned delta and per-company shards; returns what was written
+    """
+    if isinstance(companies, CompanyTable):
+        companies = companies.to_records()
+    return publish_dataset(companies, (DATA_FILE, PUBLIC_DATA_FILE))
+
+
+def default_frame_years() -> List[int]:
+    """Calendar years whose annual frames can hold a company's latest fiscal year"""
+    this_year = datetime.date.today().year
+    return [this_year - 1, this_year - 2]
+
+
+def default_parse_workers() -> int:
+    """One parse process per core; 0 (in-process) when there is only one core"""
+    cores = os.cpu_count() or 1
+    return cores if cores > 1 else 0
+
+
+def describe_updates(company: dict) -> str:
+    """Short summary of the headline numbers, for progress output"""
+    updates = []
+    if 'earnings' in company:
+        updates.append(f"Earnings ${company['earnings']/1e9:.1f}B")
+    if 'operating_income' in company:
+        updates.append(f"OpInc ${company['operating_income']/1e9:.1f}B")
+    if 'free_cash_flow' in company:
+        updates.append(f"FCF ${company['free_cash_flow']/1e9:.1f}B")
+    if 'debt_to_equity' in company:
+        updates.append(f"D/E {company['debt_to_equity']}")
+    return ', '.join(updates)
+
+
+def extract_latest_fact(data: dict, field_names: list) -> Optional[Tuple[float, str]]:
+    """Extract latest annual value for a metric, plus the GAAP alias it came from"""
+    us_gaap = data.get('facts', {}).get('us-gaap', {})
+    
+    for field_name in field_names:
+        if field_name not in us_gaap:
+            continue
+        
+        units = us_gaap[field_name].get('units', {})
+        
+        # Try USD first
+        usd_data = units.get('USD', [])
+        if usd_data:
+            annual = [d for d in usd_data if d.get('form') == '10-K']
+            if annual:
+                latest = sorted(annual, key=lambda x: x.get('end', ''), reverse=True)[0]
+                return latest['val'], field_name
+        
+        # Try shares
+        shares_data = units.get('shares', [])
+        if shares_data:
+            annual = [d for d in shares_data if d.get('form') == '10-K']
+            if annual:
+                latest = sorted(annual, key=lambda x: x.get('end', ''), reverse=True)[0]
+                return latest['val'], field_name
+    
+    return None
+
+
+def annual_facts(data: dict, field_name: str) -> list:
+    """10-K facts (USD, else shares) for one GAAP alias; duration facts must span about a year"""
+    units = data.get('facts', {}).get('us-gaap', {}).get(field_name, {}).get('units', {})
+    facts = [d for d in units.get('USD') or units.get('shares') or [] if d.get('form') == '10-K' and d.get('end')]
+    annual = []
+    for fact in facts:
+        if fact.get('start'):
+            days = (datetime.date.fromisoformat(fact['end']) - datetime.date.fromisoformat(fact['start'])).days
+            if not ANNUAL_DAYS[0] <= days <= ANNUAL_DAYS[1]:
+                continue    # a quarter or nine months reported inside the 10-K
+        annual.append(fact)
+    return annual
+
+
+def select_period_facts(data: dict, metrics_map: Dict[str, list]) -> Tuple[Dict, Dict, Dict]:
+    """
+    Pick one fiscal period for the company and extract every metric for it.
+    
+    The period is the latest fiscal year end reported for revenue or earnings
+    (any tracked metric if neither is reported). Each metric then takes the
+    first alias in metrics_map with a fact for that year end, so a stale alias
+    (e.g. a revenue concept the company stopped using in 2019) falls through
+    to the next one instead of mixing fiscal years. Metrics not reported for
+    the period are left out. Restated facts: the latest filing wins.
+    
+    Returns (values, aliases, periods), periods being {metric: {'fy', 'end'}}
+    ('fy' left out when no 10-K for the period states it).
+    """
+    facts = {
+        metric: [(field_name, annual_facts(data, field_name)) for field_name in field_names]
+        for metric, field_names in metrics_map.items()
+    }
+    
+    def latest_end(metrics) -> str:
+        return max((f['end'] for m in metrics for _, fs in facts.get(m, ()) for f in fs), default='')
+    
+    target = latest_end(PERIOD_ANCHORS) or latest_end(metrics_map)
+    values, aliases, periods = {}, {}, {}
+    shared = {}         # fy -> period: metrics of the same period share one dict
+    if not target:
+        return values, aliases, periods
+    
+    for metric, candidates in facts.items():
+        for field_name, annual in candidates:
+            matching = [f for f in annual if f['end'] == target]
+            if matching:
+                fact = max(matching, key=lambda f: f.get('filed', ''))
+                values[metric], aliases[metric] = fact['val'], field_name
+                # fy is the filing's fiscal year, so take it from the 10-K that first reported this
+                # year end (later ones carry it as a comparative); never guessed from the end date
+                fy = min(matching, key=lambda f: f.get('filed', '')).get('fy')
+                if fy not in shared:
+                    shared[fy] = {'fy': fy, 'end': target} if fy else {'end': target}
+                periods[metric] = shared[fy]
+                break
+    return values, aliases, periods
+
+
+def parse_companyfacts(body: bytes, metrics_map: Dict[str, list], quarters: bool = False) -> Tuple:
+    """
+    Decode a raw companyfacts body and extract every metric for one fiscal period.
+    Runs in a worker process (see process_companies_pipelined), so it only
+    takes and returns plain picklable data: (values, aliases, periods, decode_s, extract_s),
+    plus the company's "ttm" object (quarterly.company_ttm, None without one) with quarters=True.
+    """
+    start = time.perf_counter()
+    data = fastjson.loads(body)
+    decoded = time.perf_counter()
+    
+    values, aliases, periods = select_period_facts(data, metrics_map)
+    if not quarters:
+        return values, aliases, periods, decoded - start, time.perf_counter() - decoded
+    ttm = quarterly.company_ttm(quarterly.quarterly_facts(data, metrics_map))
+    return values, aliases, periods, decoded - start, time.perf_counter() - decoded, ttm
+
+
+class RateLimiter:
+    """Spaces request starts at least `interval` seconds apart across threads (0 = no limit)"""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+    
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            with profiling.span('throttle'):
+                time.sleep(delay)
+
 
 class ComprehensiveDataFetcher:
     def __init__(self):
         self.api_calls = 0
         self.processed = []
         self.failed = []
+        self.metrics = Metrics('comprehensive')
+        self.report = RunReport('comprehensive', self.metrics)
+        self.failure_reasons = {}
+        self.resolved_aliases = {}
+        self.resolved_periods = {}      # fetch_comprehensive_data() -> process_companies(), popped there
+        self.frame_errors = []
+        self.rollup = quarterly.QuarterlyRollup()
+        self._ticker_map = None
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'sp100-financial-tracker comprehensive-fetcher contact@example.com'
@@ -59,17 +362,30 @@ class ComprehensiveDataFetcher:
             'capex': ['PaymentsToAcquirePropertyPlantAndEquipment']
         }
     
+    def load_ticker_map(self) -> Dict[str, str]:
+        """Download company_tickers.json once and index it by ticker"""
+        if self._ticker_map is not None:
+            self.metrics.cache_hit('tickers')
+            return self._ticker_map
+        
+        self.metrics.cache_miss('tickers')
+        response = timed_get(self.session, SEC_TICKERS_URL, self.metrics, retries=2, timeout=10)
+        
+        if not response.ok:
+            return {}
+        
+        with self.metrics.parse_timer('tickers'):
+            tickers = response.json()
+            self._ticker_map = {
+                item['ticker']: str(item['cik_str']).zfill(10)
+                for item in tickers.values() if item.get('ticker')
+            }
+        return self._ticker_map
+    
     def get_company_cik(self, symbol: str) -> Optional[str]:
         """Get CIK for a ticker symbol"""
         try:
-            url = "https://www.sec.gov/files/company_tickers.json"
-            response = self.session.get(url, timeout=10)
-            
-            if response.ok:
-                tickers = response.json()
-                for item in tickers.values():
-                    if item.get('ticker') == symbol:
-                        return str(item['cik_str']).zfill(10)
+            return self.load_ticker_map().get(symbol)
         except Exception as e:
             print(f"    Error getting CIK: {str(e)}")
         
@@ -77,63 +393,54 @@ class ComprehensiveDataFetcher:
     
     def extract_latest_value(self, data: dict, field_names: list) -> Optional[float]:
         """Extract latest annual value for a metric"""
-        us_gaap = data.get('facts', {}).get('us-gaap', {})
-        
-        for field_name in field_names:
-            if field_name not in us_gaap:
-                continue
-            
-            units = us_gaap[field_name].get('units', {})
-            
-            # Try USD first
-            usd_data = units.get('USD', [])
-            if usd_data:
-                annual = [d for d in usd_data if d.get('form') == '10-K']
-                if annual:
-                    latest = sorted(annual, key=lambda x: x.get('end', ''), reverse=True)[0]
-                    return latest['val']
-            
-            # Try shares
-            shares_data = units.get('shares', [])
-            if shares_data:
-                annual = [d for d in shares_data if d.get('form') == '10-K']
-                if annual:
-                    latest = sorted(annual, key=lambda x: x.get('end', ''), reverse=True)[0]
-                    return latest['val']
-        
-        return None
+        fact = self.extract_latest_fact(data, field_names)
+        return fact[0] if fact else None
+    
+    def extract_latest_fact(self, data: dict, field_names: list) -> Optional[Tuple[float, str]]:
+        """Extract latest annual value for a metric, plus the GAAP alias it came from"""
+        return extract_latest_fact(data, field_names)
     
     def fetch_comprehensive_data(self, symbol: str) -> Optional[Dict]:
         """Fetch all metrics from SEC EDGAR"""
         try:
             cik = self.get_company_cik(symbol)
             if not cik:
+                self.failure_reasons[symbol] = 'CIK not found for ticker'
                 return None
             
-            url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json"
-            response = self.session.get(url, timeout=15)
+            url = SEC_COMPANYFACTS_URL.format(cik=cik)
+            response = timed_get(self.session, url, self.metrics, retries=2, timeout=15)
             
             if not response.ok:
+                self.failure_reasons[symbol] = f'companyfacts HTTP {response.status_code}'
                 return None
             
-            data = response.json()
+            with self.metrics.parse_timer('companyfacts'):
+                data = fastjson.response_json(response)
             self.api_calls += 1
             
-            # Extract all metrics
-            result = {}
-            for metric, field_names in self.metrics_map.items():
-                value = self.extract_latest_value(data, field_names)
-                if value is not None:
-                    result[metric] = value
+            # Extract all metrics for one fiscal period
+            with self.metrics.parse_timer('extract'):
+                result, aliases, periods = select_period_facts(data, self.metrics_map)
+                self.rollup.set_result(symbol, quarterly.company_ttm(quarterly.quarterly_facts(data, self.metrics_map)))
             
+            self.resolved_aliases[symbol] = aliases
+            self.resolved_periods[symbol] = periods
+            if not result:
+                self.failure_reasons[symbol] = 'no 10-K facts for any tracked concept'
             return result if result else None
             
         except Exception as e:
             print(f"    SEC EDGAR error: {str(e)}")
+            self.failure_reasons[symbol] = f'SEC EDGAR error: {str(e)}'
             return None
     
-    def process_companies(self, companies: list):
-        """Process all companies and add comprehensive data"""
+    def process_companies(self, companies: list, journal: Optional[CheckpointJournal] = None):
+        """
+        Process all companies and add comprehensive data.
+        With a journal, each finished company is checkpointed and companies
+        already completed in journal.completed are restored instead of fetched.
+        """
         print("=" * 80)
         print("COMPREHENSIVE DATA FETCHER - SEC EDGAR (100% FREE)")
         print("=" * 80)
@@ -157,69 +464,27 @@ class ComprehensiveDataFetcher:
             
             print(f"[{i + 1}/{len(companies)}] {name} ({symbol})")
             
+            restored = journal.restore(company) if journal else None
+            if restored:
+                print(f"  ↺ Restored from checkpoint")
+                self.processed.append(symbol)
+                self.report.record({'symbol': symbol}, 'skipped', reason='restored from checkpoint',
+                                   aliases=restored.get('aliases'))
+                continue
+            
+            stats = self.metrics.begin_company(symbol)
+            status = 'failed'
+            
             try:
                 # Fetch comprehensive data
                 data = self.fetch_comprehensive_data(symbol)
                 
                 if data:
-                    # Update company with fetched data
-                    if 'revenue' in data:
-                        company['revenue'] = int(data['revenue'])
-                    if 'earnings' in data:
-                        company['earnings'] = int(data['earnings'])
-                    if 'capex' in data:
-                        # CapEx is usually positive in GAAP, make it negative
-                        capex_val = abs(int(data['capex']))
-                        company['capex'] = -capex_val if capex_val > 0 else capex_val
-                    
-                    # Add new metrics
-                    if 'operating_income' in data:
-                        company['operating_income'] = int(data['operating_income'])
-                    if 'gross_profit' in data:
-                        company['gross_profit'] = int(data['gross_profit'])
-                    if 'operating_cash_flow' in data:
-                        company['operating_cash_flow'] = int(data['operating_cash_flow'])
-                    if 'total_assets' in data:
-                        company['total_assets'] = int(data['total_assets'])
-                    if 'total_liabilities' in data:
-                        company['total_liabilities'] = int(data['total_liabilities'])
-                    if 'stockholders_equity' in data:
-                        company['stockholders_equity'] = int(data['stockholders_equity'])
-                    if 'long_term_debt' in data:
-                        company['long_term_debt'] = int(data['long_term_debt'])
-                    if 'cash' in data:
-                        company['cash'] = int(data['cash'])
-                    if 'rd_expense' in data:
-                        company['rd_expense'] = int(data['rd_expense'])
-                    if 'shares_outstanding' in data:
-                        company['shares_outstanding'] = int(data['shares_outstanding'])
-                    
-                    # Calculate derived metrics
-                    if 'operating_cash_flow' in company and 'capex' in company:
-                        company['free_cash_flow'] = company['operating_cash_flow'] + company['capex']
-                    
-                    if 'long_term_debt' in company and 'stockholders_equity' in company and company['stockholders_equity'] > 0:
-                        company['debt_to_equity'] = round(company['long_term_debt'] / company['stockholders_equity'], 2)
-                    
-                    if 'operating_income' in company and 'revenue' in company and company['revenue'] > 0:
-                        company['operating_margin'] = round(company['operating_income'] / company['revenue'] * 100, 1)
+                    apply_fundamentals(company, data, self.resolved_periods.pop(symbol, None))
                     
-                    if 'earnings' in company and 'revenue' in company and company['revenue'] > 0:
-                        company['profit_margin'] = round(company['earnings'] / company['revenue'] * 100, 1)
-                    
-                    # Show what was updated
-                    updates = []
-                    if 'earnings' in company:
-                        updates.append(f"Earnings ${company['earnings']/1e9:.1f}B")
-                    if 'operating_income' in company:
-                        updates.append(f"OpInc ${company['operating_income']/1e9:.1f}B")
-                    if 'free_cash_flow' in company:
-                        updates.append(f"FCF ${company['free_cash_flow']/1e9:.1f}B")
-                    if 'debt_to_equity' in company:
-                        updates.append(f"D/E {company['debt_to_equity']}")
-                    
-                    print(f"  ✓ {', '.join(updates)}")
+                    print(f"  ✓ {describe_updates(company)}")
                     self.processed.append(symbol)
+                    status = 'ok'
                 else:
                     print(f"  ✗ No data available")
                     self.failed.append(symbol)
@@ -230,6 +495,14 @@ class ComprehensiveDataFetcher:
             except Exception as e:
                 print(f"  ✗ Error: {str(e)}")
                 self.failed.append(symbol)
+                self.failure_reasons[symbol] = f'update error: {str(e)}'
+            
+            reason = self.failure_reasons.get(symbol) if status == 'failed' else None
+            self.report.record(self.metrics.end_company(stats), status,
+                               reason=reason, aliases=self.resolved_aliases.get(symbol))
+            if journal:
+                journal.record(symbol, status, company=company if status == 'ok' else None,
+                               reason=reason, aliases=self.resolved_aliases.get(symbol))
             
             # Progress update
             if (i + 1) % 25 == 0:
@@ -239,6 +512,252 @@ class ComprehensiveDataFetcher:
         
         return companies
     
+    def process_companies_pipelined(self, companies: list, journal: Optional[CheckpointJournal] = None,
+                                    io_workers: int = DEFAULT_IO_WORKERS,
+                                    parse_workers: Optional[int] = None,
+                                    queue_size: Optional[int] = None):
+        """
+        Same result as process_companies, with network I/O and parsing overlapped:
+        
+          io_workers threads ──raw bytes──▶ bounded queue ──▶ parse_workers processes
+        
+        Download threads block once `queue_size` bodies are waiting, and at most
+        2 × parse_workers bodies are being parsed, so memory stays bounded however
+        large the universe (backpressure). Decoding and metrics_map extraction run
+        in a process pool, outside the GIL; parse_workers=0 parses on a single
+        in-process thread instead (the default on one-core machines, where a
+        process pool only adds pickling).
+        """
+        if parse_workers is None:
+            parse_workers = default_parse_workers()
+        queue_size = queue_size or max(parse_workers, 1) * 2
+        max_in_flight = max(parse_workers, 1) * 2
+        
+        print("=" * 80)
+        print("COMPREHENSIVE DATA FETCHER - SEC EDGAR (100% FREE)")
+        print("=" * 80)
+        print(f"Total companies: {len(companies)}")
+        parse_stage = f"{parse_workers} parse processes" if parse_workers else "in-process parse thread"
+        print(f"Pipeline: {io_workers} download threads → queue({queue_size}) → {parse_stage}")
+        print("=" * 80)
+        print()
+        
+        pending = []
+        for company in companies:
+            restored = journal.restore(company) if journal else None
+            if restored:
+                self.processed.append(company['symbol'])
+                self.report.record({'symbol': company['symbol']}, 'skipped', reason='restored from checkpoint',
+                                   aliases=restored.get('aliases'))
+            else:
+                pending.append(company)
+        if len(pending) < len(companies):
+            print(f"↺ Restored {len(companies) - len(pending)} companies from checkpoint")
+        
+        try:
+            self.load_ticker_map()
+        except Exception as e:
+            print(f"    Error getting CIK map: {str(e)}")
+        
+        by_symbol = {c['symbol']: c for c in pending}
+        stats = {symbol: self.metrics.begin_company(symbol, attach=False) for symbol in by_symbol}
+        raw = queue.Queue(maxsize=queue_size)
+        limiter = RateLimiter(RATE_LIMIT_DELAY)
+        
+        def download(symbol: str):
+            """I/O stage: always puts exactly one (symbol, body, reason) item"""
+            body, reason = None, None
+            with self.metrics.company_scope(stats[symbol]):
+                try:
+                    cik = self.get_company_cik(symbol)
+                    if not cik:
+                        reason = 'CIK not found for ticker'
+                    else:
+                        limiter.wait()
+                        response = timed_get(self.session, SEC_COMPANYFACTS_URL.format(cik=cik), self.metrics,
+                                             retries=2, timeout=15)
+                        if response.ok:
+                            body = response.content
+                        else:
+                            reason = f'companyfacts HTTP {response.status_code}'
+                except Exception as e:
+                    reason = f'SEC EDGAR error: {str(e)}'
+            raw.put((symbol, body, reason))     # blocks while the parse stage is behind
+        
+        done_count = 0
+        
+        def finish(symbol: str, values: Optional[Dict], aliases: Optional[Dict], periods: Optional[Dict],
+                   reason: Optional[str]):
+            nonlocal done_count
+            company = by_symbol[symbol]
+            done_count += 1
+            status = 'failed'
+            if values:
+                apply_fundamentals(company, values, periods)
+                self.resolved_aliases[symbol] = aliases
+                self.processed.append(symbol)
+                status = 'ok'
+                print(f"[{done_count}/{len(pending)}] {company['name']} ({symbol})  ✓ {describe_updates(company)}")
+            else:
+                self.failure_reasons[symbol] = reason or 'no 10-K facts for any tracked concept'
+                self.failed.append(symbol)
+                print(f"[{done_count}/{len(pending)}] {company['name']} ({symbol})  ✗ {self.failure_reasons[symbol]}")
+            
+            reason = self.failure_reasons.get(symbol) if status == 'failed' else None
+            self.report.record(self.metrics.end_company(stats[symbol]), status,
+                               reason=reason, aliases=self.resolved_aliases.get(symbol))
+            if journal:
+                journal.record(symbol, status, company=company if status == 'ok' else None,
+                               reason=reason, aliases=self.resolved_aliases.get(symbol))
+        
+        parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers else ThreadPoolExecutor(max_workers=1)
+        with ThreadPoolExecutor(max_workers=io_workers) as io_pool, parse_pool:
+            for symbol in by_symbol:
+                io_pool.submit(download, symbol)
+            
+            received = 0
+            in_flight = {}
+            while received < len(by_symbol) or in_flight:
+                # Feed the process pool up to its in-flight limit
+                while received < len(by_symbol) and len(in_flight) < max_in_flight:
+                    try:
+                        symbol, body, reason = raw.get(timeout=0.05 if in_flight else None)
+                    except queue.Empty:
+                        break
+                    received += 1
+                    if body is None:
+                        finish(symbol, None, None, None, reason)
+                    else:
+                        self.api_calls += 1
+                        in_flight[parse_pool.submit(parse_companyfacts, body, self.metrics_map, True)] = symbol
+                
+                if not in_flight:
+                    continue
+                done, _ = wait(list(in_flight), timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    symbol = in_flight.pop(future)
+                    try:
+                        values, aliases, periods, decode_s, extract_s, ttm = future.result()
+                    except Exception as e:
+                        finish(symbol, None, None, None, f'parse error: {str(e)}')
+                        continue
+                    self.rollup.set_result(symbol, ttm)
+                    with self.metrics.company_scope(stats[symbol]):
+                        self.metrics.record_parse('companyfacts', decode_s)
+                        self.metrics.record_parse('extract', extract_s)
+                    finish(symbol, values, aliases, periods, None)
+        
+        return companies
+    
+    def fetch_frames(self, keys: List[sec_frames.FrameKey], ciks: np.ndarray,
+                     io_workers: int = DEFAULT_IO_WORKERS) -> Dict[sec_frames.FrameKey, sec_frames.Joined]:
+        """Download (metric, alias, period) frames concurrently and join each onto our CIKs"""
+        limiter = RateLimiter(RATE_LIMIT_DELAY)
+        
+        def download(key):
+            metric, alias, period = key
+            limiter.wait()
+            try:
+                response = timed_get(self.session, sec_frames.frame_url(alias, sec_frames.unit(metric), period),
+                                     self.metrics, retries=2, timeout=30)
+                if response.status_code == 404:
+                    return key, sec_frames.parse_frame({}), None     # nobody reported it for that period (yet)
+                if not response.ok:
+                    return key, None, f'{alias} {period}: HTTP {response.status_code}'
+                with self.metrics.parse_timer('frames'):
+                    return key, sec_frames.parse_frame(fastjson.response_json(response)), None
+            except Exception as e:
+                return key, None, f'{alias} {period}: {str(e)}'
+        
+        joined = {}
+        with ThreadPoolExecutor(max_workers=io_workers) as pool:
+            for (metric, alias, period), frame, error in pool.map(download, keys):
+                self.api_calls += 1
+                if frame is None:
+                    self.frame_errors.append(error)
+                    print(f"  ✗ {error}")
+                    continue
+                with self.metrics.parse_timer('join'):
+                    column = joined[(metric, alias, period)] = sec_frames.join(frame, ciks)
+                print(f"  ✓ {alias} {period}: {len(frame.cik)} filers, {int(column.found.sum())} of ours")
+        return joined
+    
+    def process_companies_frames(self, companies, years: Optional[List[int]] = None,
+                                 io_workers: int = DEFAULT_IO_WORKERS):
+        """
+        Same result as process_companies, from XBRL frames: annual frames for
+        every duration alias and year, then instant frames for the quarters
+        our fiscal years end in, each joined against the CIK index as arrays.
+        If any frame can't be downloaded nothing is written (a missing frame
+        would silently fall through to the next alias).
+        """
+        years = years or default_frame_years()
+        print("=" * 80)
+        print("COMPREHENSIVE DATA FETCHER - SEC EDGAR XBRL FRAMES (100% FREE)")
+        print("=" * 80)
+        print(f"Total companies: {len(companies)}")
+        print(f"Annual frames: {', '.join(sec_frames.annual_period(year) for year in years)}")
+        print("=" * 80)
+        print()
+        
+        try:
+            ticker_map = self.load_ticker_map()
+        except Exception as e:
+            print(f"    Error getting CIK map: {str(e)}")
+            ticker_map = {}
+        ciks = np.array([int(ticker_map.get(company['symbol']) or 0) for company in companies], np.int64)
+        durations = [m for m in self.metrics_map if m not in sec_frames.INSTANT_METRICS]
+        instants = [m for m in self.metrics_map if m in sec_frames.INSTANT_METRICS]
+        
+        joined = self.fetch_frames([(metric, alias, sec_frames.annual_period(year))
+                                    for metric in durations for alias in self.metrics_map[metric] for year in years],
+                                   ciks, io_workers)
+        target = sec_frames.target_ends(joined, PERIOD_ANCHORS, len(companies))
+        quarters = sec_frames.instant_periods(target)
+        print(f"\nBalance sheet frames for fiscal years ending in: {', '.join(quarters) or 'none'}")
+        joined.update(self.fetch_frames([(metric, alias, quarter)
+                                         for metric in instants for alias in self.metrics_map[metric]
+                                         for quarter in quarters], ciks, io_workers))
+        print()
+        
+        selected = sec_frames.select(joined, self.metrics_map, target)
+        for row, company in enumerate(companies):
+            symbol = company['symbol']
+            values = {metric: int(vals[row]) for metric, (vals, found, _) in selected.items() if found[row]}
+            if self.frame_errors:
+                reason = f'frames incomplete ({len(self.frame_errors)} failed), nothing written'
+            elif not ciks[row]:
+                reason = 'CIK not found for ticker'
+            elif not values:
+                reason = 'no annual frame facts for any tracked concept'
+            else:
+                periods = frame_periods(company, values, str(target[row]))
+                aliases = {metric: chosen[row] for metric, (_, found, chosen) in selected.items() if found[row]}
+                apply_fundamentals(company, values, periods)
+                self.resolved_aliases[symbol] = aliases
+                self.processed.append(symbol)
+                self.report.record({'symbol': symbol}, 'ok', aliases=aliases)
+                print(f"[{row + 1}/{len(companies)}] {company['name']} ({symbol})  ✓ {describe_updates(company)}")
+                continue
+            self.failure_reasons[symbol] = reason
+            self.failed.append(symbol)
+            self.report.record({'symbol': symbol}, 'failed', reason=reason)
+            print(f"[{row + 1}/{len(companies)}] {company['name']} ({symbol})  ✗ {reason}")
+        
+        return companies
+    
+    def apply_ttm(self, companies) -> List[str]:
+        """Write the TTM rolled up for every company downloaded this run onto its "ttm" object"""
+        if not self.rollup.results:
+            return []
+        start = time.perf_counter()
+        with profiling.span('derive', step='ttm'):
+            changed = self.rollup.apply(companies)
+        found = sum(ttm is not None for ttm in self.rollup.results.values())
+        print(f"📈 TTM for {found}/{len(self.rollup.results)} companies ({len(changed)} changed, "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms)")
+        return changed
+    
     def save_data(self, companies: list):
         """Save updated data"""
         print()
@@ -246,15 +765,8 @@ class ComprehensiveDataFetcher:
         print("SAVING DATA...")
         print("=" * 80)
         
-        json_data = json.dumps(companies, indent=2, ensure_ascii=False)
-        
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            f.write(json_data)
-        print(f"✓ Saved to {DATA_FILE}")
-        
-        with open(PUBLIC_DATA_FILE, 'w', encoding='utf-8') as f:
-            f.write(json_data)
-        print(f"✓ Saved to {PUBLIC_DATA_FILE}")
+        for path in write_dataset(companies):
+            print(f"✓ Saved to {path}")
     
     def print_summary(self, total_companies: int):
         """Print summary"""
@@ -271,7 +783,7 @@ class ComprehensiveDataFetcher:
             print()
             print("Failed companies:")
             for symbol in self.failed[:10]:
-                print(f"  - {symbol}")
+                print(f"  - {symbol}: {self.failure_reasons.get(symbol, 'unknown')}")
             if len(self.failed) > 10:
                 print(f"  ... and {len(self.failed) - 10} more")
         
@@ -281,19 +793,71 @@ class ComprehensiveDataFetcher:
         print()
 
 
-def main():
+def main(argv=None):
     """Main execution"""
+    parser = argparse.ArgumentParser(description='Fetch comprehensive financial data from SEC EDGAR')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip companies completed by an interrupted run (from the checkpoint journal)')
+    parser.add_argument('--io-workers', type=int, default=DEFAULT_IO_WORKERS,
+                        help='Concurrent downloads (default: %(default)s)')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Parse processes (default: CPU count; 0 = parse in-process)')
+    parser.add_argument('--sequential', action='store_true',
+                        help='Fetch and parse one company at a time (no pipeline)')
+    parser.add_argument('--frames', action='store_true',
+                        help='Read XBRL frames (one request per concept and period) instead of per-company documents')
+    parser.add_argument('--frame-years', type=lambda text: [int(year) for year in text.split(',')],
+                        help='--frames: calendar years to read, e.g. 2024,2023 (default: the last two)')
+    profiling.add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    if args.resume and args.frames:
+        parser.error('--resume does not apply to --frames (frames are not checkpointed per company)')
+    with profiling.profiled('comprehensive', args.profile):
+        return run(args)
+
+
+def run(args) -> int:
+    """One fetch-and-save pass with parsed command-line options"""
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            companies = json.load(f)
+        companies = CompanyTable.load(DATA_FILE)
     except FileNotFoundError:
         print(f"Error: {DATA_FILE} not found!")
         return 1
+    except SchemaError as e:
+        print(f"Error: {DATA_FILE} failed validation:")
+        for problem in e.problems:
+            print(f"  ✗ {problem}")
+        return 1
+    
+    published = companies.copy()
+    # Frames are fetched for every company at once: nothing to checkpoint per company
+    journal = None if args.frames else CheckpointJournal('comprehensive')
+    completed = journal.open(resume=args.resume) if journal else None
+    if completed:
+        print(f"↺ Resuming: {len(completed)} companies already completed ({journal.path})")
     
     fetcher = ComprehensiveDataFetcher()
-    companies = fetcher.process_companies(companies)
-    fetcher.save_data(companies)
+    try:
+        if args.frames:
+            companies = fetcher.process_companies_frames(companies, years=args.frame_years,
+                                                         io_workers=args.io_workers)
+        elif args.sequential:
+            companies = fetcher.process_companies(companies, journal=journal)
+        else:
+            companies = fetcher.process_companies_pipelined(companies, journal=journal,
+                                                            io_workers=args.io_workers,
+                                                            parse_workers=args.parse_workers)
+        fetcher.apply_ttm(companies)
+        check_before_save(companies, published, 'comprehensive')
+        fetcher.save_data(companies)
+    finally:
+        if journal:
+            journal.close()
+    if journal:
+        journal.finish()
     fetcher.print_summary(len(companies))
+    print(f"📈 Metrics report: {fetcher.metrics.write_report()}")
+    print(f"📋 Run report: {fetcher.report.write()}")
     
     return 0
 
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+SEC filings and filing-based news for every company
+
+Polls the SEC submissions feed (data.sec.gov/submissions/CIK##########.json)
+for every CIK concurrently (at most SEC_RATE requests a second) and writes
+the two files script.js loads:
+
+- company_filings.json  {"generated_at", "total_filings", "companies":
+                          {symbol: {"cik", "name", "filings": [...]}}}
+                        the latest MAX_FILINGS filings per company, newest
+                        first, without insider ownership forms (3/4/5/144)
+- company_news.json     {"generated_at", "total_articles", "companies":
+                          {symbol: {"news": [...]}}}
+                        the latest MAX_NEWS material-event filings (8-K)
+                        per company as articles: title, summary, link,
+                        source, timestamp
+
+Incremental: data/filings_state.json remembers each company's CIK, the
+last accession seen and the feed's ETag/Last-Modified. A run sends
+conditional requests and an unchanged feed answers 304 with no body. Only
+filings newer than the last accession are added to the rolling lists, so a
+quiet run costs a few hundred bytes per company and writes nothing. Both
+files are replaced atomically (temp file + rename) in data/ and
+public/data/.
+
+Usage:
+    python3 fetch_filings.py
+    python3 fetch_filings.py --concurrency 8 --symbols AAPL,MSFT
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import async_http
+import endpoints
+import fastjson
+from instrumentation import Metrics, timed_get_async
+from run_report import RunReport
+from schema import SchemaError, load_companies
+
+DATA_FILE = './data/financial_data.json'
+DATA_DIRS = ('./data', './public/data')
+FILINGS_FILE = 'company_filings.json'
+NEWS_FILE = 'company_news.json'
+STATE_FILE = './data/filings_state.json'
+STATE_VERSION = 1
+HEADERS = {'User-Agent': 'sp100-financial-tracker filings-fetcher contact@example.com'}
+DEFAULT_CONCURRENCY = 8
+SEC_RATE = 10           # SEC fair-access limit, requests per second
+REQUEST_TIMEOUT = 15.0
+MAX_FILINGS = 40
+MAX_NEWS = 20
+
+# Insider ownership reports outnumber everything else and aren't company news
+SKIPPED_FORMS = ('3', '3/A', '4', '4/A', '5', '5/A', '144', '144/A')
+NEWS_FORMS = ('8-K', '8-K/A')
+ITEM_DESCRIPTIONS = {
+    '1.01': 'Entry into a material agreement',
+    '1.02': 'Termination of a material agreement',
+    '1.05': 'Material cybersecurity incident',
+    '2.01': 'Completed acquisition or disposition',
+    '2.02': 'Results of operations',
+    '2.03': 'New financial obligation',
+    '2.05': 'Exit or restructuring costs',
+    '2.06': 'Material impairment',
+    '3.02': 'Unregistered sale of equity',
+    '4.01': 'Change of auditor',
+    '5.02': 'Director or officer change',
+    '5.03': 'Bylaw or charter amendment',
+    '5.07': 'Shareholder vote results',
+    '7.01': 'Regulation FD disclosure',
+    '8.01': 'Other events',
+    '9.01': 'Financial statements and exhibits',
+}
+
+SEC_SUBMISSIONS_URL = endpoints.SEC_SUBMISSIONS_URL
+SEC_TICKERS_URL = endpoints.SEC_TICKERS_URL
+
+
+def filing_url(cik: str, accession: str) -> str:
+    return f"https://www.sec.gov/Archives/edgar/data/{int(cik)}/{accession.replace('-', '')}/{accession}-index.htm"
+
+
+def parse_submissions(data: dict, cik: str, since: Optional[str] = None) -> List[dict]:
+    """Filings in a submissions feed newer than accession `since` (all of them without one), newest first"""
+    recent = (data.get('filings') or {}).get('recent') or {}
+    accessions = recent.get('accessionNumber') or []
+    filings = []
+    for i, accession in enumerate(accessions):
+        if accession == since:
+            break
+        form = recent['form'][i]
+        if form in SKIPPED_FORMS:
+            continue
+        filing = {
+            'form': form,
+            'date': recent['filingDate'][i],
+            'accession': accession,
+            'description': (recent.get('primaryDocDescription') or [''] * len(accessions))[i] or form,
+            'timestamp': (recent.get('acceptanceDateTime') or recent['filingDate'])[i],
+            'url': filing_url(cik, accession),
+        }
+        items = (recent.get('items') or [''] * len(accessions))[i]
+        if items:
+            filing['items'] = items
+        filings.append(filing)
+    return filings
+
+
+def news_article(filing: dict, name: str) -> dict:
+    """A material-event filing as a news item for the news modal"""
+    items = [item for item in filing.get('items', '').split(',') if item]
+    topics = [ITEM_DESCRIPTIONS.get(item, f'Item {item}') for item in items]
+    headline = next((topic for item, topic in zip(items, topics) if item != '9.01'), filing['description'])
+    return {
+        'title': f"{name}: {headline}",
+        'summary': f"Form {filing['form']} filed {filing['date']}" + (f": {'; '.join(topics)}" if topics else ''),
+        'link': filing['url'],
+        'source': f"SEC EDGAR ({filing['form']})",
+        'timestamp': filing['timestamp'],
+        'form': filing['form'],
+        'accession': filing['accession'],
+    }
+
+
+def merge(existing: List[dict], new: List[dict], limit: int) -> List[dict]:
+    """New items (newest first) ahead of the existing ones, without duplicates, capped at `limit`"""
+    seen = set()
+    merged = []
+    for item in new + existing:
+        if item['accession'] not in seen:
+            seen.add(item['accession'])
+            merged.append(item)
+    return merged[:limit]
+
+
+def load_json(path: str, default: dict) -> dict:
+    try:
+        data = fastjson.load(path)
+    except (OSError, ValueError):
+        return default
+    return data if isinstance(data, dict) else default
+
+
+def write_atomic(path: str, data: dict):
+    """Readers see the old file or the new one, never half of one"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(fastjson.dumps_pretty(data))
+    os.replace(tmp_path, path)
+
+
+async def fetch_submissions(client, limiter: async_http.RateLimiter, semaphore: asyncio.Semaphore,
+                            symbol: str, state: dict, metrics: Metrics,
+                            timeout: float) -> Tuple[Optional[List[dict]], Optional[str], dict]:
+    """
+    One conditional request for one company: (new filings or None if
+    unchanged, error, stats). Updates `state` (etag, last_modified,
+    last_accession) in place on success; never raises.
+    """
+    stats = metrics.begin_company(symbol, attach=False)
+    headers = {}
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('last_modified'):
+        headers['If-Modified-Since'] = state['last_modified']
+    async with semaphore:
+        await limiter.wait()
+        try:
+            response = await asyncio.wait_for(
+                timed_get_async(client, SEC_SUBMISSIONS_URL.format(cik=state['cik']), metrics, retries=2,
+                                stats=stats, headers=headers, timeout=timeout), timeout * 3 + 1)
+        except async_http.TIMEOUT_ERRORS:
+            return None, f'timed out after {timeout:g}s', metrics.end_company(stats)
+        except Exception as e:
+            return None, f'error: {str(e) or type(e).__name__}', metrics.end_company(stats)
+
+    if response.status_code == 304:
+        return None, None, metrics.end_company(stats)
+    if response.status_code != 200:
+        return None, f'submissions HTTP {response.status_code}', metrics.end_company(stats)
+    with metrics.company_scope(stats), metrics.parse_timer('submissions'):
+        data = fastjson.loads(response.content)
+        filings = parse_submissions(data, state['cik'], state.get('last_accession'))
+    accessions = ((data.get('filings') or {}).get('recent') or {}).get('accessionNumber') or []
+    if accessions:
+        state['last_accession'] = accessions[0]
+    for header, key in (('ETag', 'etag'), ('Last-Modified', 'last_modified')):
+        if response.headers.get(header):
+            state[key] = response.headers[header]
+    return filings, None, metrics.end_company(stats)
+
+
+async def load_ciks(client, symbols: List[str], companies_state: Dict[str, dict], metrics: Metrics):
+    """
+    Fill in CIKs for symbols new to the state (one ticker map download, only
+    when there are some). Symbols SEC doesn't list are remembered with cik None;
+    the next ticker map download retries them.
+    """
+    missing = [symbol for symbol in symbols if symbol not in companies_state]
+    if not missing:
+        metrics.cache_hit('tickers')
+        return
+    metrics.cache_miss('tickers')
+    response = await timed_get_async(client, SEC_TICKERS_URL, metrics, retries=2, timeout=REQUEST_TIMEOUT)
+    if response.status_code != 200:
+        print(f"⚠️  Ticker map HTTP {response.status_code}; {len(missing)} companies without a CIK are skipped")
+        return
+    with metrics.parse_timer('tickers'):
+        tickers = {item['ticker']: str(item['cik_str']).zfill(10)
+                   for item in fastjson.loads(response.content).values() if item.get('ticker')}
+    for symbol in [s for s in symbols if not companies_state.get(s, {}).get('cik')]:
+        companies_state.setdefault(symbol, {})['cik'] = tickers.get(symbol)
+
+
+async def update_filings(companies: List[dict], state: dict, filings_doc: dict, news_doc: dict,
+                         metrics: Metrics, report: RunReport, concurrency: int = DEFAULT_CONCURRENCY,
+                         timeout: float = REQUEST_TIMEOUT) -> int:
+    """Poll every company and merge new filings into the two documents; returns how many filings were new"""
+    companies_state = state.setdefault('companies', {})
+    client = async_http.open_client(concurrency, HEADERS, timeout)
+    limiter = async_http.RateLimiter(SEC_RATE)
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        await load_ciks(client, [c['symbol'] for c in companies], companies_state, metrics)
+        polled = [c for c in companies if companies_state.get(c['symbol'], {}).get('cik')]
+        results = await asyncio.gather(*(
+            fetch_submissions(client, limiter, semaphore, c['symbol'], companies_state[c['symbol']], metrics, timeout)
+            for c in polled))
+    finally:
+        await client.aclose()
+
+    polled_symbols = {c['symbol'] for c in polled}
+    for company in companies:
+        if company['symbol'] not in polled_symbols:
+            report.record({'symbol': company['symbol']}, 'failed', reason='CIK not found for ticker')
+
+    new_total = 0
+    for company, (filings, error, stats) in zip(polled, results):
+        symbol, name = company['symbol'], company.get('name', company['symbol'])
+        if error:
+            report.record(stats, 'failed', reason=error)
+            print(f"  ✗ {symbol:6s} {error}")
+            continue
+        if not filings:
+            report.record(stats, 'skipped', reason='unchanged' if filings is None else 'no new filings')
+            continue
+        entry = filings_doc['companies'].setdefault(symbol, {'cik': companies_state[symbol]['cik'], 'name': name,
+                                                             'filings': []})
+        entry['filings'] = merge(entry['filings'], filings, MAX_FILINGS)
+        articles = [news_article(filing, name) for filing in filings if filing['form'] in NEWS_FORMS]
+        if articles:
+            news_entry = news_doc['companies'].setdefault(symbol, {'news': []})
+            news_entry['news'] = merge(news_entry['news'], articles, MAX_NEWS)
+        new_total += len(filings)
+        report.record(stats, 'ok')
+        print(f"  ✓ {symbol:6s} {len(filings)} new ({', '.join(sorted({f['form'] for f in filings}))})")
+    return new_total
+
+
+def save(filings_doc: dict, news_doc: dict, data_dirs=DATA_DIRS) -> List[str]:
+    """Stamp the totals and replace both documents atomically"""
+    now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    filings_doc.update(generated_at=now,
+                       total_filings=sum(len(c['filings']) for c in filings_doc['companies'].values()))
+    news_doc.update(generated_at=now, total_articles=sum(len(c['news']) for c in news_doc['companies'].values()))
+    written = []
+    for data_dir in data_dirs:
+        for name, doc in ((FILINGS_FILE, filings_doc), (NEWS_FILE, news_doc)):
+            path = os.path.join(data_dir, name)
+            write_atomic(path, doc)
+            written.append(path)
+    return written
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Fetch SEC filings and filing-based news for every company')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Requests in flight (default {DEFAULT_CONCURRENCY}; SEC allows {SEC_RATE}/s)')
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT)
+    parser.add_argument('--symbols', help='Comma-separated subset of the dataset to poll')
+    args = parser.parse_args(argv)
+
+    try:
+        companies = load_companies(DATA_FILE)
+    except FileNotFoundError:
+        print(f"Error: {DATA_FILE} not found!")
+        return 1
+    except SchemaError as e:
+        print(f"Error: {DATA_FILE} failed validation:")
+        for problem in e.problems:
+            print(f"  ✗ {problem}")
+        return 1
+    if args.symbols:
+        wanted = set(args.symbols.split(','))
+        companies = [c for c in companies if c['symbol'] in wanted]
+
+    print("📰 Polling SEC submissions for new filings...")
+    state = load_json(STATE_FILE, {'version': STATE_VERSION, 'companies': {}})
+    state_before = fastjson.dumps(state)
+    filings_doc = load_json(os.path.join(DATA_DIRS[0], FILINGS_FILE), {})
+    news_doc = load_json(os.path.join(DATA_DIRS[0], NEWS_FILE), {})
+    filings_doc.setdefault('companies', {})
+    news_doc.setdefault('companies', {})
+
+    metrics = Metrics('filings')
+    report = RunReport('filings', metrics)
+    new_total = asyncio.run(update_filings(companies, state, filings_doc, news_doc, metrics, report,
+                                           args.concurrency, args.timeout))
+
+    totals = report.totals()
+    print(f"\n✅ {new_total} new filings; {totals['skipped']} companies unchanged, {totals['failed']} failed "
+          f"({totals['requests']} requests, {totals['bytes'] / 1024:.0f} KB)")
+    if new_total:
+        for path in save(filings_doc, news_doc):
+            print(f"✓ Saved {path}")
+    else:
+        print("Nothing new - filings and news left untouched")
+    if fastjson.dumps(state) != state_before:
+        # New CIKs, accessions or validators (even when only skipped forms were filed)
+        write_atomic(STATE_FILE, state)
+        print(f"✓ Saved {STATE_FILE}")
+    print(f"📈 Metrics report: {metrics.write_report()}")
+    print(f"📋 Run report: {report.write()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+Fetch fundamentals from every source in one pass
+Load → concurrent fetch → merge → single save
+
+Sources are pluggable Provider classes:
+- sec    SEC EDGAR companyfacts (FREE) - every tracked metric
+- fmp    Financial Modeling Prep income statement (needs FMP_API_KEY)
+- yahoo  Yahoo Finance quoteSummary (free, unofficial) - revenue/earnings fallback
+
+SOURCE_PRECEDENCE declares, per metric, which source wins. Lower-precedence
+sources are only asked for the companies/metrics the better ones missed, as
+soon as the better ones have answered; everything runs concurrently (each
+source keeps its own concurrency and rate limit). Finished companies are
+checkpointed, so an interrupted run continues with --resume.
+
+Usage:
+    python3 fetch_fundamentals.py                                   # full refresh
+    python3 fetch_fundamentals.py --providers sec,yahoo --metrics earnings --only-missing
+    python3 fetch_fundamentals.py --precedence earnings=fmp,sec --workers 16
+    python3 fetch_fundamentals.py --symbols AAPL,MSFT --dry-run
+    python3 fetch_fundamentals.py --resume                          # after an interrupted run
+    python3 fetch_fundamentals.py --profile sample                  # writes reports/profile-fundamentals.*
+"""
+
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+import endpoints
+import fastjson
+import fetch_comprehensive_data
+import profiling
+from checkpoint import CheckpointJournal
+from company_table import CompanyTable
+from data_checks import check_before_save
+from fetch_comprehensive_data import (
+    ComprehensiveDataFetcher, RateLimiter, apply_fundamentals, default_parse_workers, parse_companyfacts,
+    write_dataset
+)
+from instrumentation import Metrics, timed_get
+from run_report import RunReport
+from schema import SchemaError
+
+DATA_FILE = fetch_comprehensive_data.DATA_FILE
+DEFAULT_WORKERS = 16
+
+# Which source wins for each metric, best first. Metrics not listed use DEFAULT_PRECEDENCE.
+SOURCE_PRECEDENCE = {
+    'revenue': ['sec', 'fmp', 'yahoo'],
+    'earnings': ['sec', 'fmp', 'yahoo'],
+    'operating_income': ['sec', 'fmp'],
+    'gross_profit': ['sec', 'fmp'],
+    'rd_expense': ['sec', 'fmp'],
+}
+DEFAULT_PRECEDENCE = ['sec']
+
+# A provider result maps metric -> (value, source field it came from[, fiscal period])
+# The optional period is {'fy': 2024, 'end': '2024-12-31'}
+ProviderResult = Dict[str, tuple]
+
+
+def statement_period(end: Optional[str], fiscal_year=None) -> Optional[dict]:
+    """{'fy', 'end'} for a statement ending on `end` (YYYY-MM-DD); None if unknown"""
+    if not end or len(end) < 10:
+        return None
+    try:
+        fy = int(fiscal_year) if fiscal_year else int(end[:4])
+    except ValueError:
+        fy = int(end[:4])
+    return {'fy': fy, 'end': end[:10]}
+
+
+class Provider:
+    """
+    One upstream source of fundamentals.
+    Subclasses set `name`, `supplies`, and implement fetch(symbol).
+    """
+    name = ''
+    supplies: Tuple[str, ...] = ()
+    concurrency = 4          # max requests in flight to this source
+    rate_limit = 10.0        # max requests per second to this source
+    call_budget = None       # max requests per run (None = unlimited)
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+        self.api_calls = 0
+        self.failure_reasons = {}
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._lock = threading.Lock()
+        self._limiter = RateLimiter(1.0 / self.rate_limit)
+
+    def unavailable_reason(self) -> Optional[str]:
+        """Why this provider can't run (e.g. missing API key), or None"""
+        return None
+
+    def prepare(self):
+        """One-time setup before the fetch phase (runs on the main thread)"""
+
+    def get(self, client, url: str, retries: int = 0, **kwargs):
+        """Rate-limited, concurrency-limited, instrumented GET"""
+        with self._lock:
+            if self.call_budget is not None and self.api_calls >= self.call_budget:
+                raise RuntimeError(f'{self.name} call budget ({self.call_budget}) exhausted')
+            self.api_calls += 1
+        with self._slots:
+            self._limiter.wait()
+            return timed_get(client, url, self.metrics, retries=retries, **kwargs)
+
+    def close(self):
+        """Release anything prepare() set up"""
+
+    def fetch(self, symbol: str) -> Optional[ProviderResult]:
+        raise NotImplementedError
+
+
+class SecEdgarProvider(Provider):
+    """
+    SEC EDGAR companyfacts: latest 10-K value for every tracked metric.
+    Bodies are decoded in a process pool (parse_workers) so large companyfacts
+    documents don't hold the GIL while other downloads are in flight. The same
+    documents' 10-Q quarters are rolled up into each company's TTM; apply_ttm()
+    writes them.
+    """
+    name = 'sec'
+    concurrency = 8
+    rate_limit = 8.0         # SEC asks for <= 10 requests/second
+
+    def __init__(self, metrics: Metrics, parse_workers: Optional[int] = 0):
+        super().__init__(metrics)
+        self.sec = ComprehensiveDataFetcher()
+        self.sec.metrics = metrics
+        self.supplies = tuple(self.sec.metrics_map)
+        self.parse_workers = parse_workers
+        self.parse_pool = None
+
+    def prepare(self):
+        self.sec.load_ticker_map()
+        workers = default_parse_workers() if self.parse_workers is None else self.parse_workers
+        if workers:
+            self.parse_pool = ProcessPoolExecutor(max_workers=workers)
+
+    def close(self):
+        if self.parse_pool:
+            self.parse_pool.shutdown()
+            self.parse_pool = None
+
+    def fetch(self, symbol: str) -> Optional[ProviderResult]:
+        cik = self.sec.get_company_cik(symbol)
+        if not cik:
+            self.failure_reasons[symbol] = 'CIK not found for ticker'
+            return None
+
+        url = fetch_comprehensive_data.SEC_COMPANYFACTS_URL.format(cik=cik)
+        response = self.get(self.sec.session, url, retries=2, timeout=15)
+        if not response.ok:
+            self.failure_reasons[symbol] = f'companyfacts HTTP {response.status_code}'
+            return None
+
+        if self.parse_pool:
+            parsed = self.parse_pool.submit(parse_companyfacts, response.content, self.sec.metrics_map, True).result()
+        else:
+            parsed = parse_companyfacts(response.content, self.sec.metrics_map, True)
+        values, aliases, periods, decode_s, extract_s, ttm = parsed
+        self.metrics.record_parse('companyfacts', decode_s)
+        self.metrics.record_parse('extract', extract_s)
+        self.sec.rollup.set_result(symbol, ttm)
+
+        if not values:
+            self.failure_reasons[symbol] = 'no 10-K facts for any tracked concept'
+            return None
+        return {metric: (value, aliases[metric], periods[metric]) for metric, value in values.items()}
+
+
+    def apply_ttm(self, companies) -> List[str]:
+        """Write the TTM of every company fetched this run onto its "ttm" object"""
+        return self.sec.apply_ttm(companies)
+
+
+class FmpProvider(Provider):
+    """Financial Modeling Prep: latest annual income statement"""
+    name = 'fmp'
+    concurrency = 4
+    rate_limit = 5.0
+    call_budget = int(os.environ.get('FMP_DAILY_LIMIT', '250'))   # free tier: 250 calls/day
+    fields = {
+        'revenue': 'revenue',
+        'earnings': 'netIncome',
+        'operating_income': 'operatingIncome',
+        'gross_profit': 'grossProfit',
+        'rd_expense': 'researchAndDevelopmentExpenses',
+    }
+    supplies = tuple(fields)
+
+    def __init__(self, metrics: Metrics, api_key: Optional[str] = None):
+        super().__init__(metrics)
+        self.api_key = api_key if api_key is not None else os.environ.get('FMP_API_KEY', '')
+
+    def unavailable_reason(self) -> Optional[str]:
+        return None if self.api_key else 'FMP_API_KEY not set'
+
+    def fetch(self, symbol: str) -> Optional[ProviderResult]:
+        url = f"{endpoints.FMP_API_URL}/income-statement/{symbol}?limit=1&apikey={self.api_key}"
+        response = self.get(requests, url, retries=1, timeout=10)
+        if not response.ok:
+            self.failure_reasons[symbol] = f'FMP income-statement HTTP {response.status_code}'
+            return None
+
+        with self.metrics.parse_timer('income-statement'):
+            data = fastjson.response_json(response)
+
+        latest = data[0] if isinstance(data, list) and data else {}
+        period = statement_period(latest.get('date'), latest.get('calendarYear'))
+        result = {metric: (latest[field], field, period) for metric, field in self.fields.items()
+                  if latest.get(field) is not None}
+        if not result:
+            self.failure_reasons[symbol] = 'no income statement in FMP'
+        return result or None
+
+
+class YahooProvider(Provider):
+    """Yahoo Finance quoteSummary: latest annual income statement"""
+    name = 'yahoo'
+    concurrency = 2
+    rate_limit = 2.0
+    fields = {
+        'revenue': 'totalRevenue',
+        'earnings': 'netIncome',
+    }
+    supplies = tuple(fields)
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+        'Accept': 'application/json'
+    }
+
+    def fetch(self, symbol: str) -> Optional[ProviderResult]:
+        url = endpoints.YAHOO_QUOTE_SUMMARY_URL.format(symbol=symbol) + "?modules=incomeStatementHistory"
+        response = self.get(requests, url, headers=self.headers, timeout=10)
+        if not response.ok:
+            self.failure_reasons[symbol] = f'Yahoo quoteSummary HTTP {response.status_code}'
+            return None
+
+        with self.metrics.parse_timer('quoteSummary'):
+            data = fastjson.response_json(response)
+
+        result = (data.get('quoteSummary') or {}).get('result') or [{}]
+        statements = result[0].get('incomeStatementHistory', {}).get('incomeStatementHistory', [])
+        latest = statements[0] if statements else {}
+        period = statement_period((latest.get('endDate') or {}).get('fmt'))
+        values = {metric: (latest.get(field) or {}).get('raw') for metric, field in self.fields.items()}
+        values = {metric: (value, f'incomeStatementHistory.{self.fields[metric]}', period)
+                  for metric, value in values.items() if value is not None}
+        if not values:
+            self.failure_reasons[symbol] = 'no income statement in Yahoo Finance'
+        return values or None
+
+
+PROVIDERS = {
+    'sec': SecEdgarProvider,
+    'fmp': FmpProvider,
+    'yahoo': YahooProvider,
+}
+
+
+def parse_precedence(overrides: List[str]) -> Dict[str, List[str]]:
+    """Apply METRIC=src1,src2 overrides on top of SOURCE_PRECEDENCE"""
+    precedence = {metric: list(sources) for metric, sources in SOURCE_PRECEDENCE.items()}
+    for override in overrides or []:
+        metric, _, sources = override.partition('=')
+        if not metric or not sources:
+            raise ValueError(f"Invalid precedence '{override}' (expected METRIC=src1,src2)")
+        precedence[metric.strip()] = [s.strip() for s in sources.split(',') if s.strip()]
+    return precedence
+
+
+class FundamentalsEngine:
+    def __init__(self, providers: List[Provider], metrics: Metrics,
+                 wanted: Optional[List[str]] = None,
+                 precedence: Optional[Dict[str, List[str]]] = None,
+                 workers: int = DEFAULT_WORKERS):
+        self.providers = {p.name: p for p in providers}
+        self.metrics = metrics
+        self.report = RunReport('fundamentals', metrics)
+        self.workers = workers
+        self.processed = []
+        self.failed = []
+        self.skipped = []
+        self.failure_reasons = {}
+        self.sources = {}
+        self.requested = {}
+        precedence = precedence or SOURCE_PRECEDENCE
+        supplied = [m for p in providers for m in p.supplies]
+        self.wanted = wanted or list(dict.fromkeys(supplied))
+
+        # Resolve each metric's chain to enabled providers that can supply it
+        self.chains = {}
+        for metric in self.wanted:
+            chain = precedence.get(metric, DEFAULT_PRECEDENCE)
+            chain = [name for name in chain if name in self.providers and metric in self.providers[name].supplies]
+            # Enabled providers missing from the declared chain still act as a last resort
+            chain += [p.name for p in providers if metric in p.supplies and p.name not in chain]
+            self.chains[metric] = chain
+
+    def next_providers(self, results: Dict[str, Optional[ProviderResult]]) -> List[str]:
+        """Providers to ask next for one company: the best not-yet-asked source of each unresolved metric"""
+        needed = []
+        for metric, chain in self.chains.items():
+            for name in chain:
+                if name not in results:
+                    if name not in needed:
+                        needed.append(name)
+                    break
+                if results[name] and metric in results[name]:
+                    break
+        return needed
+
+    def _fetch_one(self, provider: Provider, symbol: str, stats: dict) -> Optional[ProviderResult]:
+        with self.metrics.company_scope(stats):
+            try:
+                return provider.fetch(symbol)
+            except Exception as e:
+                provider.failure_reasons[symbol] = f'{provider.name} error: {str(e)}'
+                return None
+
+    def fetch_all(self, symbols: List[str], stats: Dict[str, dict],
+                  on_complete: Optional[Callable[[str, dict], None]] = None) -> Dict[str, Dict[str, Optional[ProviderResult]]]:
+        """
+        Ask each company's best sources first, then fall back per metric.
+        A company's fallback requests are submitted as soon as its earlier ones
+        answer, so every source stays busy; on_complete(symbol, results) fires
+        the moment a company needs nothing more.
+        """
+        results = {symbol: {} for symbol in symbols}
+        pending = {symbol: 0 for symbol in symbols}
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            def submit_next(symbol: str):
+                needed = self.next_providers(results[symbol])
+                for name in needed:
+                    future = pool.submit(self._fetch_one, self.providers[name], symbol, stats[symbol])
+                    futures[future] = (symbol, name)
+                    self.requested[name] = self.requested.get(name, 0) + 1
+                pending[symbol] = len(needed)
+                if not needed and on_complete:
+                    on_complete(symbol, results[symbol])
+
+            for symbol in symbols:
+                submit_next(symbol)
+
+            while futures:
+                done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+                for future in done:
+                    symbol, name = futures.pop(future)
+                    results[symbol][name] = future.result()
+                    pending[symbol] -= 1
+                    if not pending[symbol]:
+                        submit_next(symbol)
+
+        return results
+
+    def merge(self, results: Dict[str, Optional[ProviderResult]]) -> Tuple[Dict[str, float], Dict[str, str], Dict[str, dict]]:
+        """Pick each metric from its highest-precedence source; returns (values, sources, periods)"""
+        values, sources, periods = {}, {}, {}
+        for metric, chain in self.chains.items():
+            for name in chain:
+                result = results.get(name)
+                if result and metric in result:
+                    values[metric], field, *period = result[metric]
+                    sources[metric] = f'{name}:{field}'
+                    if period and period[0]:
+                        periods[metric] = period[0]
+                    break
+        return values, sources, periods
+
+    def run(self, companies: list, only_missing: bool = False, limit: Optional[int] = None,
+            journal: Optional[CheckpointJournal] = None) -> list:
+        """
+        Fetch, merge and apply fundamentals to `companies` in place.
+        With a journal, each finished company is checkpointed and companies
+        already completed in journal.completed are restored instead of fetched.
+        """
+        print("=" * 80)
+        print("FUNDAMENTALS FETCHER - " + " + ".join(p.name.upper() for p in self.providers.values()))
+        print("=" * 80)
+        print(f"Total companies: {len(companies)}")
+        print(f"Metrics: {', '.join(self.wanted)}")
+        for metric, chain in self.chains.items():
+            if len(chain) > 1:
+                print(f"  {metric}: {' → '.join(chain)}")
+        print("=" * 80)
+        print()
+
+        targets = []
+        for company in companies:
+            restored = journal.restore(company) if journal else None
+            if restored:
+                self.processed.append(company['symbol'])
+                self.report.record({'symbol': company['symbol']}, 'skipped', reason='restored from checkpoint',
+                                   aliases=restored.get('aliases'))
+                continue
+            if only_missing and all(company.get(metric) for metric in self.wanted):
+                self.skipped.append(company['symbol'])
+                self.report.record({'symbol': company['symbol']}, 'skipped')
+                continue
+            targets.append(company)
+        if limit is not None:
+            targets = targets[:limit]
+
+        for provider in self.providers.values():
+            try:
+                provider.prepare()
+            except Exception as e:
+                print(f"⚠️  {provider.name} setup failed: {str(e)}")
+
+        stats = {c['symbol']: self.metrics.begin_company(c['symbol'], attach=False) for c in targets}
+        by_symbol = {c['symbol']: c for c in targets}
+        try:
+            self.fetch_all(list(by_symbol), stats,
+                           on_complete=lambda symbol, results: self.finalize(by_symbol[symbol], results, stats[symbol], journal))
+        finally:
+            for provider in self.providers.values():
+                provider.close()
+
+        print()
+        print("Requests: " + ', '.join(f"{name} × {count}" for name, count in self.requested.items()))
+        return companies
+
+    def finalize(self, company: dict, results: Dict[str, Optional[ProviderResult]], stats: dict,
+                 journal: Optional[CheckpointJournal] = None):
+        """Merge one company's provider results, apply them, and checkpoint it"""
+        symbol = company['symbol']
+        values, sources, periods = self.merge(results)
+        status = 'failed'
+
+        if values:
+            apply_fundamentals(company, values, periods)
+            self.sources[symbol] = sources
+            self.processed.append(symbol)
+            status = 'ok'
+            picked = {}
+            for source in sources.values():
+                name = source.split(':', 1)[0]
+                picked[name] = picked.get(name, 0) + 1
+            print(f"  ✓ {symbol}: {len(values)} metrics ({', '.join(f'{n} {c}' for n, c in picked.items())})")
+        else:
+            reasons = [p.failure_reasons[symbol] for p in self.providers.values() if symbol in p.failure_reasons]
+            self.failure_reasons[symbol] = '; '.join(reasons) or 'no data from any source'
+            self.failed.append(symbol)
+            print(f"  ✗ {symbol}: {self.failure_reasons[symbol]}")
+
+        self.report.record(self.metrics.end_company(stats), status,
+                           reason=self.failure_reasons.get(symbol), aliases=sources)
+        if journal:
+            journal.record(symbol, status, company=company if status == 'ok' else None,
+                           reason=self.failure_reasons.get(symbol), aliases=sources)
+
+    def save_data(self, companies: list):
+        """Save updated data (once, after every source has been merged)"""
+        print()
+        print("=" * 80)
+        print("SAVING DATA...")
+        print("=" * 80)
+
+        for path in write_dataset(companies):
+            print(f"✓ Saved to {path}")
+
+    def print_summary(self, total_companies: int):
+        """Print summary"""
+        print()
+        print("=" * 80)
+        print("SUMMARY")
+        print("=" * 80)
+        print(f"Total companies: {total_companies}")
+        print(f"✓ Successfully processed: {len(self.processed)}")
+        print(f"⊘ Skipped (already complete): {len(self.skipped)}")
+        print(f"✗ Failed: {len(self.failed)}")
+        print(f"API calls made: " + ', '.join(f"{p.name} {p.api_calls}" for p in self.providers.values()))
+
+        if self.failed:
+            print()
+            print("Failed companies:")
+            for symbol in self.failed[:10]:
+                print(f"  - {symbol}: {self.failure_reasons.get(symbol, 'unknown')}")
+            if len(self.failed) > 10:
+                print(f"  ... and {len(self.failed) - 10} more")
+        print()
+
+
+def build_providers(names: List[str], metrics: Metrics, parse_workers: Optional[int] = None) -> List[Provider]:
+    """Instantiate the requested providers, dropping (with a note) any that can't run"""
+    providers = []
+    for name in names:
+        if name not in PROVIDERS:
+            raise ValueError(f"Unknown provider '{name}' (choose from {', '.join(PROVIDERS)})")
+        provider = PROVIDERS[name](metrics)
+        if hasattr(provider, 'parse_workers'):
+            provider.parse_workers = parse_workers
+        reason = provider.unavailable_reason()
+        if reason:
+            print(f"⚠️  Skipping {name}: {reason}")
+            continue
+        providers.append(provider)
+    return providers
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main execution"""
+    parser = argparse.ArgumentParser(description='Fetch fundamentals from SEC EDGAR, FMP and Yahoo Finance in one pass')
+    parser.add_argument('--providers', default=','.join(PROVIDERS),
+                        help='Comma-separated sources to use (default: %(default)s)')
+    parser.add_argument('--metrics', help='Comma-separated metrics to fetch (default: everything the sources supply)')
+    parser.add_argument('--precedence', action='append', metavar='METRIC=SRC1,SRC2',
+                        help='Override the source order for one metric (repeatable)')
+    parser.add_argument('--symbols', help='Only these comma-separated symbols')
+    parser.add_argument('--only-missing', action='store_true',
+                        help='Skip companies that already have every requested metric')
+    parser.add_argument('--limit', type=int, help='Process at most N companies (e.g. to stay inside API quotas)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Max concurrent requests overall')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Processes decoding SEC companyfacts (default: CPU count, or inline on one core; 0 = inline)')
+    parser.add_argument('--dry-run', action='store_true', help='Fetch and merge but do not save')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip companies completed by an interrupted run (from the checkpoint journal)')
+    profiling.add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    with profiling.profiled('fundamentals', args.profile):
+        return run(args)
+
+
+def run(args) -> int:
+    """One fetch-and-save pass with parsed command-line options"""
+    try:
+        companies = CompanyTable.load(DATA_FILE)
+    except FileNotFoundError:
+        print(f"Error: {DATA_FILE} not found!")
+        return 1
+    except SchemaError as e:
+        print(f"Error: {DATA_FILE} failed validation:")
+        for problem in e.problems:
+            print(f"  ✗ {problem}")
+        return 1
+
+    metrics = Metrics('fundamentals')
+    try:
+        providers = build_providers([n.strip() for n in args.providers.split(',') if n.strip()], metrics,
+                                    parse_workers=args.parse_workers)
+        precedence = parse_precedence(args.precedence)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    if not providers:
+        print("Error: no usable providers")
+        return 1
+
+    wanted = [m.strip() for m in args.metrics.split(',')] if args.metrics else None
+    engine = FundamentalsEngine(providers, metrics, wanted=wanted, precedence=precedence, workers=args.workers)
+
+    published = companies.copy()
+    selected = companies
+    if args.symbols:
+        symbols = {s.strip().upper() for s in args.symbols.split(',')}
+        selected = [c for c in companies if c['symbol'] in symbols]
+
+    journal = None if args.dry_run else CheckpointJournal('fundamentals')
+    if journal:
+        completed = journal.open(resume=args.resume)
+        if completed:
+            print(f"↺ Resuming: {len(completed)} companies already completed ({journal.path})")
+
+    try:
+        engine.run(selected, only_missing=args.only_missing, limit=args.limit, journal=journal)
+        if 'sec' in engine.providers:
+            engine.providers['sec'].apply_ttm(companies)
+        if not args.dry_run:
+            check_before_save(companies, published, 'fundamentals')
+            engine.save_data(companies)
+    finally:
+        if journal:
+            journal.close()
+    if journal:
+        journal.finish()
+    engine.print_summary(len(selected))
+    print(f"📈 Metrics report: {metrics.write_report()}")
+    print(f"📋 Run report: {engine.report.write()}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\nFatal error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
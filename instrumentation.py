@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Lightweight instrumentation shared by the fetchers and the worker
+
+Records (per process):
+- HTTP latency histograms per upstream host
+- Bytes downloaded per host
+- Parse (JSON decode / extraction) time
+- Cache hits and misses
+- Retries
+- Per-company wall time
+
+Requests and parse times also become fetch/parse/extract spans while a
+--profile run is active (profiling.py).
+
+Output:
+- Prometheus text exposition (served by the worker on /metrics)
+- JSON run report (written by the GitHub Actions jobs)
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import profiling
+
+NAMESPACE = 'sp100'
+REPORT_DIR = os.environ.get('METRICS_REPORT_DIR', './reports')
+
+# Parse stages that pick values out of an already-decoded document (profiling phase 'extract')
+EXTRACT_STAGES = frozenset({'extract', 'join'})
+
+# Seconds - tuned for SEC/Yahoo/FMP round trips and multi-MB companyfacts bodies
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'avg': round(self.sum / self.count, 6) if self.count else 0.0,
+            'buckets': {str(b): c for b, c in zip(self.buckets, self.counts)}
+        }
+
+
+def _label_key(labels: dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Optional[dict] = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms for one job"""
+
+    def __init__(self, job: str):
+        self.job = job
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------
+    # Primitives
+    # ------------------------------------------------------------------
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        """Record a histogram observation"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            self._buckets.setdefault(name, buckets)
+            if key not in series:
+                series[key] = Histogram(self._buckets[name])
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        """Time a block and record it into a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, buckets=buckets, **labels)
+
+    def counter_value(self, name: str, **labels) -> float:
+        """Current value of a counter series (0 if never incremented)"""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def counter_total(self, name: str) -> float:
+        """Sum of a counter across all label sets"""
+        with self._lock:
+            return sum(self._counters.get(name, {}).values())
+
+    # ------------------------------------------------------------------
+    # Domain helpers
+    # ------------------------------------------------------------------
+
+    def _company_stats(self) -> Optional[dict]:
+        return getattr(self._local, 'company', None)
+
+    def record_request(self, url: str, seconds: float, status: Optional[int] = None, size: int = 0):
+        """Record one upstream HTTP round trip"""
+        host = urlparse(url).hostname or 'unknown'
+        self.observe('http_request_duration_seconds', seconds, host=host)
+        self.inc('http_requests_total', host=host, status=status if status is not None else 'error')
+        if size:
+            self.inc('http_response_bytes_total', size, host=host)
+        stats = self._company_stats()
+        if profiling.active():
+            profiling.record_span('fetch', time.perf_counter() - seconds, seconds, host=host, status=status,
+                                  bytes=size, symbol=stats['symbol'] if stats else None)
+        if stats is not None:
+            stats['requests'] += 1
+            stats['bytes'] += size
+            stats['fetch_seconds'] += seconds
+
+    def record_retry(self, url: str):
+        self.inc('http_retries_total', host=urlparse(url).hostname or 'unknown')
+        stats = self._company_stats()
+        if stats is not None:
+            stats['retries'] += 1
+
+    def cache_hit(self, cache: str):
+        self.inc('cache_hits_total', cache=cache)
+
+    def cache_miss(self, cache: str):
+        self.inc('cache_misses_total', cache=cache)
+
+    def cache_hit_ratio(self, cache: str) -> Optional[float]:
+        hits = self.counter_value('cache_hits_total', cache=cache)
+        misses = self.counter_value('cache_misses_total', cache=cache)
+        total = hits + misses
+        return round(hits / total, 4) if total else None
+
+    @contextmanager
+    def parse_timer(self, stage: str):
+        """Time JSON decoding / fact extraction"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_parse(stage, time.perf_counter() - start)
+
+    def record_parse(self, stage: str, seconds: float):
+        """Record parse time measured elsewhere (e.g. in a worker process)"""
+        self.observe('parse_duration_seconds', seconds, buckets=PARSE_BUCKETS, stage=stage)
+        stats = self._company_stats()
+        if profiling.active():
+            profiling.record_span('extract' if stage in EXTRACT_STAGES else 'parse',
+                                  time.perf_counter() - seconds, seconds, stage=stage,
+                                  symbol=stats['symbol'] if stats else None)
+        if stats is not None:
+            stats['parse_seconds'] += seconds
+
+    def begin_company(self, symbol: str, attach: bool = True) -> dict:
+        """
+        Start attributing requests, bytes and parse time on this thread to `symbol`.
+        Returns the stats dict that end_company() finalises. With attach=False the
+        stats are only attributed inside company_scope() (for work spread over threads).
+        """
+        stats = {
+            'symbol': symbol,
+            'requests': 0,
+            'bytes': 0,
+            'retries': 0,
+            'fetch_seconds': 0.0,
+            'parse_seconds': 0.0,
+            '_started': time.perf_counter()
+        }
+        if attach:
+            self._local.company = stats
+        return stats
+
+    @contextmanager
+    def company_scope(self, stats: dict):
+        """Attribute work on the current thread to an already-started company"""
+        previous = self._company_stats()
+        self._local.company = stats
+        try:
+            yield stats
+        finally:
+            self._local.company = previous
+
+    def end_company(self, stats: dict) -> dict:
+        """Record the wall time spent on one company (fetch, parse, update, rate limit)"""
+        stats['wall_seconds'] = time.perf_counter() - stats.pop('_started')
+        self.observe('company_duration_seconds', stats['wall_seconds'])
+        if self._company_stats() is stats:
+            self._local.company = None
+        return stats
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                full = f"{NAMESPACE}_{name}"
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{full}{_format_labels(key, {'job': self.job})} {value:g}")
+            for name in sorted(self._histograms):
+                full = f"{NAMESPACE}_{name}"
+                lines.append(f"# TYPE {full} histogram")
+                for key, hist in sorted(self._histograms[name].items()):
+                    base = {'job': self.job}
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        lines.append(f"{full}_bucket{_format_labels(key, {**base, 'le': f'{bound:g}'})} {count}")
+                    lines.append(f"{full}_bucket{_format_labels(key, {**base, 'le': '+Inf'})} {hist.count}")
+                    lines.append(f"{full}_sum{_format_labels(key, base)} {hist.sum:.6f}")
+                    lines.append(f"{full}_count{_format_labels(key, base)} {hist.count}")
+        lines.append(f"# TYPE {NAMESPACE}_uptime_seconds gauge")
+        lines.append(f'{NAMESPACE}_uptime_seconds{{job="{self.job}"}} {time.time() - self.started_at:.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self) -> dict:
+        """JSON-friendly snapshot of every series"""
+        with self._lock:
+            counters = {
+                name: [{'labels': dict(key), 'value': value} for key, value in sorted(series.items())]
+                for name, series in sorted(self._counters.items())
+            }
+            histograms = {
+                name: [{'labels': dict(key), **hist.to_dict()} for key, hist in sorted(series.items())]
+                for name, series in sorted(self._histograms.items())
+            }
+            caches = sorted({dict(key).get('cache') for name in ('cache_hits_total', 'cache_misses_total')
+                             for key in self._counters.get(name, {})})
+        return {
+            'job': self.job,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(self.started_at)),
+            'wall_seconds': round(time.time() - self.started_at, 3),
+            'cache_hit_ratio': {cache: self.cache_hit_ratio(cache) for cache in caches},
+            'counters': counters,
+            'histograms': histograms
+        }
+
+    def write_report(self, path: Optional[str] = None) -> str:
+        """Write the JSON run report (defaults to ./reports/metrics-<job>.json)"""
+        path = path or os.path.join(REPORT_DIR, f'metrics-{self.job}.json')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+
+def timed_get(client, url: str, metrics: Metrics, retries: int = 0, **kwargs):
+    """
+    GET through `client` (a requests.Session or the requests module) and record
+    latency, status and body size against the URL's host.
+
+    Retries on connection errors, 429 and 5xx up to `retries` extra attempts.
+    """
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            response = client.get(url, **kwargs)
+        except Exception:
+            metrics.record_request(url, time.perf_counter() - start)
+            if attempt < retries:
+                attempt += 1
+                metrics.record_retry(url)
+                continue
+            raise
+
+        elapsed = time.perf_counter() - start
+        status = response.status_code if isinstance(response.status_code, int) else None
+        retryable = status is not None and (status == 429 or status >= 500)
+        if retryable and attempt < retries:
+            metrics.record_request(url, elapsed, status=status)
+            attempt += 1
+            metrics.record_retry(url)
+            time.sleep(min(2 ** attempt * 0.25, 5))
+            continue
+
+        try:
+            size = len(response.content or b'')
+        except TypeError:
+            size = 0
+        metrics.record_request(url, elapsed, status=status, size=size)
+        return response
+
+
+async def timed_get_async(client, url: str, metrics: Metrics, retries: int = 0,
+                          stats: Optional[dict] = None, **kwargs):
+    """
+    timed_get() for an async client (httpx.AsyncClient or async_http.ThreadedClient).
+    Tasks share one thread, so per-company attribution goes through `stats`.
+    """
+    import asyncio      # only needed inside a running loop; keeps it out of the worker's startup imports
+
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            response = await client.get(url, **kwargs)
+        except Exception:
+            with metrics.company_scope(stats):
+                metrics.record_request(url, time.perf_counter() - start)
+                if attempt < retries:
+                    attempt += 1
+                    metrics.record_retry(url)
+                    continue
+            raise
+
+        elapsed = time.perf_counter() - start
+        status = response.status_code
+        with metrics.company_scope(stats):
+            if (status == 429 or status >= 500) and attempt < retries:
+                metrics.record_request(url, elapsed, status=status)
+                attempt += 1
+                metrics.record_retry(url)
+            else:
+                metrics.record_request(url, elapsed, status=status, size=len(response.content or b''))
+                return response
+        await asyncio.sleep(min(2 ** attempt * 0.25, 5))
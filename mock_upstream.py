@@ -0,0 +1,744 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the upstream APIs (SEC EDGAR, Yahoo Finance, FMP)
+
+Serves synthetic (or recorded) payloads for every endpoint the fetchers use,
+with injectable latency, 429s, 5xx responses and truncated bodies, so
+concurrency, rate limiting and retry behaviour can be load-tested offline.
+
+Usage:
+    python3 mock_upstream.py --port 8080 --companies 500 --latency-ms 80 --jitter-ms 40 \
+        --error-429 0.02 --error-5xx 0.01 --truncate 0.005 --max-rps 10
+
+    # then, in another shell
+    export UPSTREAM_BASE_URL=http://127.0.0.1:8080
+    python3 fetch_comprehensive_data.py
+
+`--companies-file data/financial_data.json` makes the ticker map resolve the
+real symbols in our dataset. Fault settings can be changed at runtime with
+`POST /__faults` (JSON body) and counters read from `GET /__stats`.
+"""
+
+import argparse
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIRST_YEAR = 2014
+LAST_YEAR = 2024
+
+# Distinct companyfacts bodies kept in memory; larger universes replay them round-robin
+TEMPLATE_POOL = 64
+# Filers in each XBRL frame besides the tracked companies (real frames hold a few thousand)
+FRAME_PADDING = 4000
+
+# Concepts the pipeline reads, as (concept, unit, kind, ratio of revenue)
+TRACKED_CONCEPTS = [
+    ('Revenues', 'USD', 'flow', 1.0),
+    ('RevenueFromContractWithCustomerExcludingAssessedTax', 'USD', 'flow', 1.0),
+    ('NetIncomeLoss', 'USD', 'flow', 0.18),
+    ('OperatingIncomeLoss', 'USD', 'flow', 0.24),
+    ('GrossProfit', 'USD', 'flow', 0.42),
+    ('NetCashProvidedByUsedInOperatingActivities', 'USD', 'flow', 0.27),
+    ('PaymentsToAcquirePropertyPlantAndEquipment', 'USD', 'flow', 0.06),
+    ('ResearchAndDevelopmentExpense', 'USD', 'flow', 0.08),
+    ('Assets', 'USD', 'instant', 1.6),
+    ('Liabilities', 'USD', 'instant', 0.95),
+    ('StockholdersEquity', 'USD', 'instant', 0.65),
+    ('LongTermDebt', 'USD', 'instant', 0.3),
+    ('CashAndCashEquivalentsAtCarryingValue', 'USD', 'instant', 0.12),
+    ('CommonStockSharesOutstanding', 'shares', 'instant', 0.05),
+]
+
+SECTORS = ['Technology', 'Healthcare', 'Financials', 'Energy', 'Consumer Discretionary',
+           'Industrials', 'Communication Services', 'Consumer Staples', 'Utilities']
+
+
+def synthetic_symbol(i: int) -> str:
+    """Deterministic, ticker-looking symbol for company index i"""
+    letters = ''
+    n = i
+    for _ in range(4):
+        letters = chr(ord('A') + n % 26) + letters
+        n //= 26
+    return 'Z' + letters
+
+
+def synthetic_cik(i: int) -> int:
+    return 1_000_000 + i * 7
+
+
+def synthetic_companies(n: int) -> List[dict]:
+    """Company records shaped like data/financial_data.json before a refresh"""
+    rng = random.Random(n)
+    return [
+        {
+            'symbol': synthetic_symbol(i),
+            'name': f'Synthetic Company {i}',
+            'sector': SECTORS[i % len(SECTORS)],
+            'year': LAST_YEAR,
+            'market_cap': rng.randint(10, 3000) * 1_000_000_000,
+            'market_cap_updated': '2024-12-31T22:00:00'
+        }
+        for i in range(n)
+    ]
+
+
+def synthetic_tickers(n: int, padding: int = 9000) -> dict:
+    """company_tickers.json for n tracked companies plus `padding` other filers"""
+    tickers = {}
+    for i in range(n + padding):
+        tickers[str(i)] = {
+            'cik_str': synthetic_cik(i),
+            'ticker': synthetic_symbol(i),
+            'title': f'Synthetic Company {i}'
+        }
+    return tickers
+
+
+def _fact(val, end, fy, fp, form, start=None, frame=None, accn_seq=0, cik=0):
+    fact = {
+        'end': end,
+        'val': val,
+        'accn': f'{cik:010d}-{fy % 100:02d}-{accn_seq:06d}',
+        'fy': fy,
+        'fp': fp,
+        'form': form,
+        'filed': f'{fy + 1 if fp == "FY" else fy}-{"02" if fp == "FY" else "05"}-15'
+    }
+    if start:
+        fact = {'start': start, **fact}
+    if frame:
+        fact['frame'] = frame
+    return fact
+
+
+def synthetic_companyfacts(i: int, filler_concepts: int = 120) -> dict:
+    """
+    companyfacts document for company index i.
+
+    Every 10-K reports the current year plus two prior-year comparatives
+    (as real filings do); 10-Qs report Q1-Q3 three-month durations. About one
+    company in ten stops reporting RevenueFromContract... after 2019 while
+    still reporting Revenues - the stale-alias pattern seen in the live data.
+    """
+    rng = random.Random(i)
+    cik = synthetic_cik(i)
+    base_revenue = rng.randint(5, 400) * 1_000_000_000
+    growth = 1 + rng.uniform(-0.05, 0.2)
+    stale_alias = i % 10 == 3
+    primary_revenue = 'RevenueFromContractWithCustomerExcludingAssessedTax' if i % 2 else 'Revenues'
+
+    us_gaap: Dict[str, dict] = {}
+    for concept, unit, kind, ratio in TRACKED_CONCEPTS:
+        if concept in ('Revenues', 'RevenueFromContractWithCustomerExcludingAssessedTax'):
+            if concept != primary_revenue and not stale_alias:
+                continue
+        facts = []
+        for fy in range(FIRST_YEAR, LAST_YEAR + 1):
+            if stale_alias and concept == 'RevenueFromContractWithCustomerExcludingAssessedTax' and fy > 2019:
+                continue
+            annual = int(base_revenue * growth ** (fy - FIRST_YEAR) * ratio * rng.uniform(0.95, 1.05))
+            for back in range(3 if kind == 'flow' else 2):
+                year = fy - back
+                if year < FIRST_YEAR:
+                    continue
+                end = f'{year}-12-31'
+                facts.append(_fact(annual if back == 0 else int(annual * (1 - 0.03 * back)), end, fy, 'FY', '10-K',
+                                   start=f'{year}-01-01' if kind == 'flow' else None,
+                                   frame=(f'CY{year}' if kind == 'flow' else f'CY{year}Q4I') if back == 0 else None,
+                                   accn_seq=fy, cik=cik))
+            for q, (start, end) in enumerate([('01-01', '03-31'), ('04-01', '06-30'), ('07-01', '09-30')], 1):
+                quarterly = int(annual / 4 * rng.uniform(0.9, 1.1)) if kind == 'flow' else int(annual * rng.uniform(0.95, 1.02))
+                facts.append(_fact(quarterly, f'{fy}-{end}', fy, f'Q{q}', '10-Q',
+                                   start=f'{fy}-{start}' if kind == 'flow' else None,
+                                   frame=f'CY{fy}Q{q}' if kind == 'flow' else f'CY{fy}Q{q}I',
+                                   accn_seq=fy * 10 + q, cik=cik))
+        us_gaap[concept] = {
+            'label': concept,
+            'description': f'Synthetic {concept}',
+            'units': {unit: facts}
+        }
+
+    for n in range(filler_concepts):
+        facts = [
+            _fact(rng.randint(1, 10_000) * 1_000_000, f'{fy}-12-31', fy, 'FY', '10-K',
+                  start=f'{fy}-01-01', accn_seq=fy, cik=cik)
+            for fy in range(FIRST_YEAR, LAST_YEAR + 1)
+        ]
+        us_gaap[f'SyntheticFillerConcept{n:03d}'] = {
+            'label': f'Filler {n}',
+            'description': 'Padding so bodies approach real companyfacts sizes',
+            'units': {'USD': facts}
+        }
+
+    return {
+        'cik': cik,
+        'entityName': f'Synthetic Company {i}',
+        'facts': {
+            'dei': {
+                'EntityCommonStockSharesOutstanding': {
+                    'label': 'Entity Common Stock, Shares Outstanding',
+                    'units': {'shares': [_fact(rng.randint(100, 20_000) * 1_000_000, f'{LAST_YEAR}-12-31',
+                                               LAST_YEAR, 'FY', '10-K', accn_seq=LAST_YEAR, cik=cik)]}
+                }
+            },
+            'us-gaap': us_gaap
+        }
+    }
+
+
+def synthetic_chart(symbol: str) -> dict:
+    rng = random.Random(symbol)
+    price = round(rng.uniform(20, 900), 2)
+    return {
+        'chart': {
+            'result': [{
+                'meta': {
+                    'symbol': symbol,
+                    'currency': 'USD',
+                    'regularMarketPrice': price,
+                    'previousClose': round(price * rng.uniform(0.97, 1.03), 2),
+                    'marketCap': int(price * rng.randint(100, 20_000) * 1_000_000)
+                },
+                'timestamp': [],
+                'indicators': {'quote': [{}]}
+            }],
+            'error': None
+        }
+    }
+
+
+def synthetic_quote(symbols: str) -> dict:
+    """Batched last prices for a comma-separated symbol list, matching synthetic_chart()"""
+    result = []
+    for symbol in filter(None, symbols.split(',')):
+        meta = synthetic_chart(symbol)['chart']['result'][0]['meta']
+        price, previous = meta['regularMarketPrice'], meta['previousClose']
+        result.append({'symbol': symbol, 'regularMarketPrice': price,
+                       'regularMarketChangePercent': round((price / previous - 1) * 100, 4),
+                       'marketCap': meta['marketCap'], 'regularMarketVolume': random.Random(symbol).randint(10**5, 10**8),
+                       'regularMarketDayHigh': round(max(price, previous) * 1.01, 2),
+                       'regularMarketDayLow': round(min(price, previous) * 0.99, 2)})
+    return {'quoteResponse': {'result': result, 'error': None}}
+
+
+def synthetic_fmp_income(symbol: str) -> list:
+    rng = random.Random(symbol)
+    revenue = rng.randint(5, 400) * 1_000_000_000
+    return [{
+        'date': f'{LAST_YEAR}-12-31',
+        'symbol': symbol,
+        'calendarYear': str(LAST_YEAR),
+        'period': 'FY',
+        'revenue': revenue,
+        'netIncome': int(revenue * rng.uniform(0.05, 0.3))
+    }]
+
+
+def synthetic_quote_summary(symbol: str) -> dict:
+    income = synthetic_fmp_income(symbol)[0]
+    return {
+        'quoteSummary': {
+            'result': [{
+                'incomeStatementHistory': {
+                    'incomeStatementHistory': [{
+                        'endDate': {'fmt': income['date']},
+                        'totalRevenue': {'raw': income['revenue']},
+                        'netIncome': {'raw': income['netIncome']}
+                    }]
+                }
+            }],
+            'error': None
+        }
+    }
+
+
+def synthetic_fmp_estimates(symbol: str) -> list:
+    rng = random.Random(symbol + ':estimates')
+    revenue = synthetic_fmp_income(symbol)[0]['revenue'] * rng.uniform(1.0, 1.2)
+    return [{
+        'symbol': symbol,
+        'date': f'{LAST_YEAR + 1}-12-31',
+        'estimatedRevenueAvg': int(revenue),
+        'estimatedRevenueLow': int(revenue * 0.9),
+        'estimatedRevenueHigh': int(revenue * 1.1),
+        'estimatedEpsAvg': round(rng.uniform(1, 20), 2),
+        'estimatedEpsLow': round(rng.uniform(0.5, 1), 2),
+        'estimatedEpsHigh': round(rng.uniform(20, 25), 2),
+        'numberAnalystEstimatedRevenue': rng.randint(3, 40)
+    }]
+
+
+def synthetic_fmp_price_target(symbol: str) -> list:
+    price = synthetic_chart(symbol)['chart']['result'][0]['meta']['regularMarketPrice']
+    return [{
+        'symbol': symbol,
+        'targetHigh': round(price * 1.4, 2),
+        'targetLow': round(price * 0.8, 2),
+        'targetConsensus': round(price * 1.1, 2),
+        'targetMedian': round(price * 1.08, 2)
+    }]
+
+
+def synthetic_fmp_grade(symbol: str) -> list:
+    grades = ['Buy', 'Outperform', 'Hold', 'Neutral', 'Sell']
+    return [{'symbol': symbol, 'date': f'{LAST_YEAR}-12-01', 'gradingCompany': 'Synthetic Research',
+             'newGrade': grades[sum(map(ord, symbol)) % len(grades)]}]
+
+
+def synthetic_submissions(i: int, published: int = 0) -> dict:
+    """
+    SEC submissions feed for company index i: two years of 10-K/10-Q/8-K and
+    insider (Form 4) filings, plus `published` newer filings (see
+    MockUpstreamServer.publish_filings), newest first like the real feed
+    """
+    rng = random.Random(f'submissions:{i}')
+    cik = synthetic_cik(i)
+    filings = []    # (filing date, form, items, description), oldest first
+
+    def add(day: datetime.date, form: str, items: str = '', description: str = ''):
+        filings.append((day, form, items, description or form))
+
+    for year in (LAST_YEAR - 1, LAST_YEAR):
+        add(datetime.date(year, 2, 10), '10-K', description='Annual report')
+        for quarter, month in enumerate((5, 8, 11), 1):
+            add(datetime.date(year, month, 1), '8-K', '2.02,9.01', 'Results of operations')
+            add(datetime.date(year, month, 3), '10-Q', description=f'Quarterly report Q{quarter}')
+        for _ in range(rng.randint(2, 5)):
+            add(datetime.date(year, 1, 1) + datetime.timedelta(days=rng.randint(0, 360)), '4',
+                description='Statement of changes in beneficial ownership')
+        if rng.random() < 0.5:
+            add(datetime.date(year, rng.randint(1, 12), 15), '8-K', '5.02', 'Officer departure')
+    for n in range(published):
+        day = datetime.date(LAST_YEAR + 1, 1, 5) + datetime.timedelta(days=3 * n)
+        add(day, '8-K' if n % 2 == 0 else '4', '8.01,9.01' if n % 2 == 0 else '', f'New filing {n + 1}')
+
+    filings.sort(key=lambda filing: filing[0])
+    accessions = [f'{cik:010d}-{day.year % 100:02d}-{seq:06d}' for seq, (day, _, _, _) in enumerate(filings, 1)]
+    filings.reverse()
+    accessions.reverse()
+    return {
+        'cik': str(cik),
+        'entityType': 'operating',
+        'name': f'Synthetic Company {i}',
+        'tickers': [synthetic_symbol(i)],
+        'filings': {
+            'recent': {
+                'accessionNumber': accessions,
+                'filingDate': [day.isoformat() for day, _, _, _ in filings],
+                'acceptanceDateTime': [f'{day.isoformat()}T16:05:00.000Z' for day, _, _, _ in filings],
+                'form': [form for _, form, _, _ in filings],
+                'items': [items for _, _, items, _ in filings],
+                'primaryDocument': [f'doc{n}.htm' for n in range(len(filings))],
+                'primaryDocDescription': [description for _, _, _, description in filings],
+            },
+            'files': []
+        }
+    }
+
+
+def load_recorded(recorded_dir: Optional[str], kind: str) -> Dict[str, bytes]:
+    """Recorded bodies for one endpoint kind (recorded_dir/<kind>/*.json.gz), keyed by file stem"""
+    bodies = {}
+    if not recorded_dir:
+        return bodies
+    directory = os.path.join(recorded_dir, kind)
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.json.gz'):
+                with gzip.open(os.path.join(directory, name), 'rb') as f:
+                    bodies[name[:-len('.json.gz')]] = f.read()
+    return bodies
+
+
+class Faults:
+    """
+    Fault-injection settings, applied to every non-control request in order:
+
+    latency_ms / jitter_ms   fixed + uniform random delay before responding
+    fail_first               first N attempts per path answer 503 (deterministic retries)
+    max_rps                  token bucket; over-limit requests get 429 + Retry-After
+    error_429 / error_5xx    probability of a 429 / 500-502-503 response
+    truncate                 probability of cutting the body in half mid-response
+    """
+
+    FIELDS = ('latency_ms', 'jitter_ms', 'fail_first', 'max_rps', 'error_429', 'error_5xx', 'truncate', 'seed')
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, fail_first: int = 0, max_rps: float = 0.0,
+                 error_429: float = 0.0, error_5xx: float = 0.0, truncate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_first = fail_first
+        self.max_rps = max_rps
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.truncate = truncate
+        self.seed = seed
+
+    def update(self, **changes):
+        for key, value in changes.items():
+            if key not in self.FIELDS:
+                raise ValueError(f"Unknown fault setting: {key}")
+            setattr(self, key, type(getattr(self, key))(value))
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+
+class MockUpstreamServer:
+    """
+    Threaded HTTP server answering every upstream route the fetchers call,
+    bound to 127.0.0.1 (port 0 picks a free port).
+
+        with MockUpstreamServer(companies=500, faults=Faults(error_5xx=0.05)) as server:
+            os.environ['UPSTREAM_BASE_URL'] = server.base_url
+    """
+
+    ROUTES = [
+        (re.compile(r'^/files/company_tickers\.json$'), 'tickers'),
+        (re.compile(r'^/api/xbrl/companyfacts/CIK(\d{10})\.json$'), 'companyfacts'),
+        (re.compile(r'^/submissions/CIK(\d{10})\.json$'), 'submissions'),
+        (re.compile(r'^/Archives/edgar/daily-index/xbrl/companyfacts\.zip$'), 'companyfacts_bulk'),
+        (re.compile(r'^/api/xbrl/frames/us-gaap/([A-Za-z]+)/(USD|shares)/(CY\d{4}(?:Q[1-4]I?)?)\.json$'), 'frames'),
+        (re.compile(r'^/v8/finance/chart/([A-Za-z.\-]+)$'), 'chart'),
+        (re.compile(r'^/v7/finance/quote$'), 'quote'),
+        (re.compile(r'^/v10/finance/quoteSummary/([A-Za-z.\-]+)$'), 'quote_summary'),
+        (re.compile(r'^/api/v3/income-statement/([A-Za-z.\-]+)$'), 'fmp_income'),
+        (re.compile(r'^/api/v3/analyst-estimates/([A-Za-z.\-]+)$'), 'fmp_estimates'),
+        (re.compile(r'^/api/v3/price-target-consensus$'), 'fmp_price_target'),
+        (re.compile(r'^/api/v3/grade/([A-Za-z.\-]+)$'), 'fmp_grade'),
+    ]
+
+    GENERATORS = {
+        'chart': synthetic_chart,
+        'quote': synthetic_quote,
+        'quote_summary': synthetic_quote_summary,
+        'fmp_income': synthetic_fmp_income,
+        'fmp_estimates': synthetic_fmp_estimates,
+        'fmp_price_target': synthetic_fmp_price_target,
+        'fmp_grade': synthetic_fmp_grade,
+    }
+
+    def __init__(self, companies: int = 100, symbols: Optional[List[str]] = None, faults: Optional[Faults] = None,
+                 recorded_dir: Optional[str] = None, filler_concepts: int = 120,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.symbols = list(symbols) if symbols else [synthetic_symbol(i) for i in range(companies)]
+        self.companies = len(self.symbols)
+        self.filler_concepts = filler_concepts
+        self.faults = faults or Faults()
+        self.recorded = {kind: load_recorded(recorded_dir, kind) for kind in ('companyfacts', 'chart', 'fmp_income')}
+        self.address = (host, port)
+        self.stats: Dict[str, int] = {}
+        self.bytes_served = 0
+        self._attempts: Dict[str, int] = {}
+        self._rng = random.Random(self.faults.seed)
+        self._tokens = float(self.faults.max_rps or 0)
+        self._refilled = time.monotonic()
+        self._cache: Dict[str, bytes] = {}
+        self._frame_facts: List[dict] = []
+        self.published: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def requests_served(self) -> int:
+        return sum(self.stats.values())
+
+    # ------------------------------------------------------------------
+    # Payloads
+    # ------------------------------------------------------------------
+
+    def tickers(self, padding: int = 9000) -> dict:
+        """company_tickers.json: our symbols first, then synthetic padding filers"""
+        tickers = {}
+        for i, symbol in enumerate(self.symbols):
+            tickers[str(i)] = {'cik_str': synthetic_cik(i), 'ticker': symbol, 'title': f'Company {symbol}'}
+        for i in range(self.companies, self.companies + padding):
+            tickers[str(i)] = {'cik_str': synthetic_cik(i), 'ticker': synthetic_symbol(i),
+                               'title': f'Synthetic Company {i}'}
+        return tickers
+
+    def companyfacts_archive(self, padding: int = 50) -> bytes:
+        """companyfacts.zip: one CIK##########.json per filer, ours plus some that aren't tracked"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for i in range(self.companies + padding):
+                body = self.render('companyfacts_template', str(i % TEMPLATE_POOL))
+                archive.writestr(f'CIK{synthetic_cik(i):010d}.json', body)
+        return buffer.getvalue()
+
+    def frame(self, concept: str, unit: str, period: str) -> dict:
+        """
+        XBRL frame: the fact tagged with `period` for every filer reporting the
+        concept (tracked companies, then FRAME_PADDING others), as SEC serves it
+        """
+        templates = self._frame_facts
+        if not templates:
+            templates = []
+            for template in range(TEMPLATE_POOL):
+                us_gaap = synthetic_companyfacts(template, filler_concepts=0)['facts']['us-gaap']
+                templates.append({
+                    name: {(u, fact['frame']): fact
+                           for u, facts in concept_facts['units'].items() for fact in facts if 'frame' in fact}
+                    for name, concept_facts in us_gaap.items()
+                })
+            self._frame_facts = templates
+        data = []
+        for i in range(self.companies + FRAME_PADDING):
+            fact = templates[i % TEMPLATE_POOL].get(concept, {}).get((unit, period))
+            if fact:
+                item = {'accn': fact['accn'], 'cik': synthetic_cik(i), 'entityName': f'Company {i}', 'loc': 'US-DE'}
+                item.update({key: fact[key] for key in ('start', 'end', 'val') if key in fact})
+                data.append(item)
+        return {'taxonomy': 'us-gaap', 'tag': concept, 'ccp': period, 'uom': unit, 'label': concept,
+                'description': f'Synthetic {concept}', 'pts': len(data), 'data': data}
+
+    def publish_filings(self, index: int, count: int = 1):
+        """Make `count` new filings appear in company `index`'s submissions feed"""
+        with self._lock:
+            self.published[index] = self.published.get(index, 0) + count
+            self._cache.pop(f'submissions:{synthetic_cik(index):010d}', None)
+
+    def _cik_to_index(self, cik: int) -> Optional[int]:
+        offset = cik - synthetic_cik(0)
+        if offset < 0 or offset % 7:
+            return None
+        index = offset // 7
+        return index if index < self.companies else None
+
+    def render(self, kind: str, key: str) -> Optional[bytes]:
+        """Body for one route (cached), or None for 404"""
+        cache_key = f'{kind}:{key}'
+        with self._lock:
+            if cache_key in self._cache:
+                return self._cache[cache_key]
+
+        body = None
+        recorded = self.recorded.get(kind) or {}
+        if kind == 'tickers':
+            body = json.dumps(self.tickers()).encode()
+        elif kind == 'companyfacts':
+            index = self._cik_to_index(int(key))
+            if index is None:
+                return None
+            if recorded:
+                return list(recorded.values())[index % len(recorded)]
+            return self.render('companyfacts_template', str(index % TEMPLATE_POOL))
+        elif kind == 'companyfacts_template':
+            body = json.dumps(synthetic_companyfacts(int(key), self.filler_concepts)).encode()
+        elif kind == 'companyfacts_bulk':
+            body = self.companyfacts_archive()
+        elif kind == 'submissions':
+            index = self._cik_to_index(int(key))
+            if index is None:
+                return None
+            body = json.dumps(synthetic_submissions(index, self.published.get(index, 0))).encode()
+        elif kind == 'frames':
+            body = json.dumps(self.frame(*key.split('/'))).encode()
+        elif kind in self.GENERATORS:
+            body = recorded.get(key) or json.dumps(self.GENERATORS[kind](key)).encode()
+
+        if body is not None:
+            with self._lock:
+                self._cache[cache_key] = body
+        return body
+
+    def prewarm(self):
+        """Render the ticker map and every companyfacts template up front"""
+        self.render('tickers', '')
+        for i in range(min(self.companies, TEMPLATE_POOL)):
+            self.render('companyfacts', f'{synthetic_cik(i):010d}')
+
+    # ------------------------------------------------------------------
+    # Faults
+    # ------------------------------------------------------------------
+
+    def _take_token(self) -> bool:
+        if not self.faults.max_rps:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.faults.max_rps, self._tokens + (now - self._refilled) * self.faults.max_rps)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def decide_fault(self, path: str) -> Optional[str]:
+        """None, or one of '429', '500', '502', '503', 'truncate'"""
+        faults = self.faults
+        with self._lock:
+            attempt = self._attempts.get(path, 0)
+            self._attempts[path] = attempt + 1
+            if attempt < faults.fail_first:
+                return '503'
+            if not self._take_token():
+                return '429'
+            roll = self._rng.random()
+            if roll < faults.error_429:
+                return '429'
+            if roll < faults.error_429 + faults.error_5xx:
+                return self._rng.choice(['500', '502', '503'])
+            if self._rng.random() < faults.truncate:
+                return 'truncate'
+            delay = faults.latency_ms + (self._rng.uniform(0, faults.jitter_ms) if faults.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+        return None
+
+    def _count(self, key: str, size: int = 0):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+            self.bytes_served += size
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == '/__stats':
+                    return self._send(200, json.dumps({
+                        'requests': server.stats,
+                        'bytes_served': server.bytes_served,
+                        'faults': server.faults.to_dict()
+                    }).encode(), count=False)
+
+                fault = server.decide_fault(parsed.path)
+                if fault == '429':
+                    return self._send(429, b'{"error": "Too Many Requests"}', headers={'Retry-After': '1'})
+                if fault in ('500', '502', '503'):
+                    return self._send(int(fault), b'{"error": "upstream unavailable"}')
+
+                for pattern, kind in server.ROUTES:
+                    match = pattern.match(parsed.path)
+                    if match:
+                        query = parse_qs(parsed.query)
+                        key = '/'.join(match.groups()) if match.groups() else \
+                            (query.get('symbol') or query.get('symbols') or [''])[0]
+                        body = server.render(kind, key)
+                        if body is not None:
+                            # Conditional GETs: unchanged bodies answer 304 to a matching If-None-Match
+                            etag = f'"{hashlib.md5(body).hexdigest()[:16]}"'
+                            if self.headers.get('If-None-Match') == etag:
+                                return self._send(304, b'', headers={'ETag': etag})
+                            return self._send(200, body, headers={'ETag': etag}, truncate=fault == 'truncate')
+                        break
+                self._send(404, b'{"error": "not found"}')
+
+            def do_POST(self):
+                if urlparse(self.path).path != '/__faults':
+                    return self._send(404, b'{"error": "not found"}', count=False)
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    server.faults.update(**json.loads(self.rfile.read(length) or b'{}'))
+                except (ValueError, TypeError) as e:
+                    return self._send(400, json.dumps({'error': str(e)}).encode(), count=False)
+                self._send(200, json.dumps(server.faults.to_dict()).encode(), count=False)
+
+            def _send(self, status: int, body: bytes, headers: Optional[dict] = None,
+                      truncate: bool = False, count: bool = True):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if truncate:
+                    # Promise the full length, deliver half, then hang up
+                    self.wfile.write(body[:len(body) // 2])
+                    self.close_connection = True
+                else:
+                    self.wfile.write(body)
+                if count:
+                    server._count('truncated' if truncate else str(status), len(body))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def start(self) -> 'MockUpstreamServer':
+        self._server = ThreadingHTTPServer(self.address, self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'MockUpstreamServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Local stand-in for SEC EDGAR, Yahoo Finance and FMP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--companies', type=int, default=100, help='Synthetic universe size')
+    parser.add_argument('--companies-file', help='Serve CIKs for the symbols in this JSON dataset instead')
+    parser.add_argument('--recorded-dir', help='Replay recorded bodies from this directory (see benchmarks/fixtures.py)')
+    for field, kind, default in [('latency-ms', float, 0), ('jitter-ms', float, 0), ('fail-first', int, 0),
+                                 ('max-rps', float, 0), ('error-429', float, 0.0), ('error-5xx', float, 0.0),
+                                 ('truncate', float, 0.0), ('seed', int, 0)]:
+        parser.add_argument(f'--{field}', type=kind, default=default)
+    args = parser.parse_args(argv)
+
+    symbols = None
+    if args.companies_file:
+        with open(args.companies_file, 'r', encoding='utf-8') as f:
+            symbols = [company['symbol'] for company in json.load(f)]
+
+    faults = Faults(**{field: getattr(args, field) for field in Faults.FIELDS})
+    server = MockUpstreamServer(companies=args.companies, symbols=symbols, faults=faults,
+                                recorded_dir=args.recorded_dir, host=args.host, port=args.port)
+    server.prewarm()
+    server.start()
+    print(f"🧪 Mock upstream serving {server.companies} companies on {server.base_url}")
+    print(f"   Faults: {json.dumps(faults.to_dict())}")
+    print(f"   export UPSTREAM_BASE_URL={server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Peer-comparison analytics, precomputed after every save
+
+From the dataset's metric columns (screener.table_columns: the numeric
+fields plus derived ratios such as fcf_margin and roe), computed as matrix
+operations over every company at once:
+
+- zscores      (companies x metrics)  each value against its sector's mean and
+                                      standard deviation (NaN with fewer than
+                                      MIN_PEERS sector peers reporting it)
+- sector_mean, sector_std  (sectors x metrics)
+- distances    (companies x companies) Euclidean distance between companies
+                                      over universe-standardized metrics
+- similarity   (companies x companies) cosine similarity over the same
+- correlation  (metrics x metrics)    Pearson correlation of the same,
+                                      across the universe
+
+Size metrics are compared in log10. Universe standardization is robust
+(median and MAD) and clipped at ±CLIP, so a company with near-zero equity
+doesn't dominate every distance and correlation involving ROE. Missing values are
+pairwise-complete: a distance or correlation only uses metrics (companies)
+both sides report, and is NaN with fewer than MIN_SHARED of them.
+
+Stored next to financial_data.json as analytics/peers.bin (float32 arrays
+back to back, 64-byte aligned) and analytics/peers.json, a header with the
+symbols, sectors, metrics and each array's offset, shape and dtype, so
+consumers map the arrays instead of parsing them:
+
+    header = fastjson.load('data/analytics/peers.json')
+    spec = header['arrays']['distances']
+    distances = np.memmap('data/analytics/peers.bin', spec['dtype'], 'r', spec['offset'], tuple(spec['shape']))
+    // browser: new Float32Array(buffer, spec.offset, spec.shape[0] * spec.shape[1])
+
+    python3 peers.py AAPL           # sector z-scores and nearest peers
+    python3 peers.py --correlations
+    python3 peers.py --build        # recompute from data/financial_data.json (data/ and public/data/)
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+import warnings
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+import deltas
+import fastjson
+from company_table import CompanyTable
+from screener import table_columns
+
+PEERS_VERSION = 1
+ANALYTICS_DIR = 'analytics'
+HEADER_FILE = 'peers.json'
+BLOB_FILE = 'peers.bin'
+DATA_DIRS = ('./data', './public/data')
+DTYPE = '<f4'
+ALIGN = 64
+
+PEER_METRICS = (
+    'revenue', 'market_cap', 'operating_margin', 'profit_margin', 'gross_margin', 'fcf_margin',
+    'roe', 'roa', 'debt_to_equity', 'rd_intensity', 'capex_intensity', 'fcf_yield', 'earnings_yield',
+)
+LOG_METRICS = ('revenue', 'market_cap')
+MIN_PEERS = 3           # sector members reporting a metric before its z-scores mean anything
+MIN_SHARED = 4          # metrics two companies both report before a distance is given (and companies per correlation)
+CLIP = 4.0
+MAD_SCALE = 1.4826      # median absolute deviation -> standard deviation for normal data
+UNKNOWN_SECTOR = 'Unknown'
+
+
+class PeerAnalytics(NamedTuple):
+    symbols: List[str]
+    sectors: List[str]          # distinct sectors, sorted
+    sector_index: np.ndarray    # (companies,) position in sectors
+    metrics: Tuple[str, ...]
+    arrays: Dict[str, np.ndarray]
+
+
+def features(table: CompanyTable, metrics: Sequence[str] = PEER_METRICS) -> np.ndarray:
+    """(companies x metrics) float64, log10 for size metrics (non-positive -> NaN), NaN where missing"""
+    columns = table_columns(table)
+    matrix = np.column_stack([columns[metric] for metric in metrics]) if len(table) else np.zeros((0, len(metrics)))
+    for j, metric in enumerate(metrics):
+        if metric in LOG_METRICS:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                matrix[:, j] = np.where(matrix[:, j] > 0, np.log10(matrix[:, j]), np.nan)
+    return matrix
+
+
+def sector_zscores(matrix: np.ndarray, sector_index: np.ndarray, sectors: int) -> Tuple[np.ndarray, ...]:
+    """(zscores, sector_mean, sector_std): one-hot sector sums as matrix products, pairwise NaN-aware"""
+    present = ~np.isnan(matrix)
+    values = np.where(present, matrix, 0.0)
+    onehot = np.zeros((len(matrix), sectors))
+    onehot[np.arange(len(matrix)), sector_index] = 1.0
+    counts = onehot.T @ present
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = (onehot.T @ values) / counts
+        std = np.sqrt(np.maximum((onehot.T @ values ** 2) / counts - mean ** 2, 0.0))
+        usable = (counts >= MIN_PEERS) & (std > 0)
+        mean, std = np.where(usable, mean, np.nan), np.where(usable, std, np.nan)
+        zscores = (matrix - mean[sector_index]) / std[sector_index]
+    return zscores, mean, std
+
+
+def standardize(matrix: np.ndarray) -> np.ndarray:
+    """Robust universe z-scores per metric (median, scaled MAD), clipped at ±CLIP; NaN stays NaN"""
+    if not len(matrix):
+        return matrix.copy()
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)     # all-NaN columns
+        median = np.nanmedian(matrix, axis=0)
+        spread = np.nanmedian(np.abs(matrix - median), axis=0) * MAD_SCALE
+        return np.clip((matrix - median) / np.where(spread > 0, spread, np.nan), -CLIP, CLIP)
+
+
+def pairwise(standardized: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (distances, similarity) between rows over the columns both rows have.
+    With X zero-filled and W the presence mask, every pairwise sum is a matrix
+    product: sum (x_i - x_j)^2 = X^2 W' + W X^2' - 2 X X'. The distance is scaled
+    to the full metric count so rows with fewer shared metrics stay comparable.
+    """
+    present = (~np.isnan(standardized)).astype(np.float64)
+    x = np.where(present > 0, standardized, 0.0)
+    squares = x ** 2
+    shared = present @ present.T
+    cross = x @ x.T
+    own = squares @ present.T           # [i, j]: sum of x_i^2 over metrics j also has
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distances = np.sqrt(np.maximum(own + own.T - 2 * cross, 0.0) / shared * standardized.shape[1])
+        similarity = cross / np.sqrt(own * own.T)
+    np.fill_diagonal(distances, 0.0)       # not the rounding residue of the expansion
+    enough = shared >= MIN_SHARED
+    return np.where(enough, distances, np.nan), np.where(enough, similarity, np.nan)
+
+
+def correlation(matrix: np.ndarray) -> np.ndarray:
+    """Pearson correlation between columns over the rows reporting both (pairwise-complete)"""
+    present = (~np.isnan(matrix)).astype(np.float64)
+    x = np.where(present > 0, matrix, 0.0)
+    n = present.T @ present
+    sum_a = x.T @ present                # [a, b]: sum of a over rows with b
+    sum_sq = (x ** 2).T @ present
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = (x.T @ x) - sum_a * sum_a.T / n
+        variance_a = sum_sq - sum_a ** 2 / n
+        result = covariance / np.sqrt(variance_a * variance_a.T)
+    return np.where(n >= MIN_SHARED, np.clip(result, -1.0, 1.0), np.nan)
+
+
+def compute(table: CompanyTable, metrics: Sequence[str] = PEER_METRICS) -> PeerAnalytics:
+    """The whole analytics stage for one dataset"""
+    labels = [sector or UNKNOWN_SECTOR for sector in table.strings['sector']]
+    sectors, sector_index = np.unique(np.array(labels, dtype=object), return_inverse=True) if labels else \
+        (np.array([], dtype=object), np.zeros(0, np.int64))
+    matrix = features(table, metrics)
+    zscores, mean, std = sector_zscores(matrix, sector_index, len(sectors))
+    standardized = standardize(matrix)
+    distances, similarity = pairwise(standardized)
+    arrays = {
+        'zscores': zscores, 'sector_mean': mean, 'sector_std': std,
+        'distances': distances, 'similarity': similarity, 'correlation': correlation(standardized),
+    }
+    return PeerAnalytics(list(table.symbols), [str(s) for s in sectors], sector_index.astype(np.int32),
+                         tuple(metrics), {name: array.astype(DTYPE) for name, array in arrays.items()})
+
+
+def header(analytics: PeerAnalytics, dataset_hash: Optional[str] = None) -> dict:
+    """The JSON header: labels plus each array's offset/shape/dtype in BLOB_FILE"""
+    offset, arrays = 0, {}
+    for name, array in analytics.arrays.items():
+        arrays[name] = {'offset': offset, 'shape': list(array.shape), 'dtype': DTYPE}
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    return {
+        'version': PEERS_VERSION,
+        'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'dataset_hash': dataset_hash,
+        'file': BLOB_FILE,
+        'bytes': offset,
+        'companies': analytics.symbols,
+        'sectors': analytics.sectors,
+        'sector_index': analytics.sector_index.tolist(),
+        'metrics': list(analytics.metrics),
+        'log10': [metric for metric in analytics.metrics if metric in LOG_METRICS],
+        'arrays': arrays,
+    }
+
+
+def write(analytics: PeerAnalytics, data_dir: str = './data', dataset_hash: Optional[str] = None) -> dict:
+    """Write peers.bin then peers.json (each replaced atomically); returns the header"""
+    directory = os.path.join(data_dir, ANALYTICS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    info = header(analytics, dataset_hash)
+    blob = bytearray(info['bytes'])
+    for name, array in analytics.arrays.items():
+        spec = info['arrays'][name]
+        blob[spec['offset']:spec['offset'] + array.nbytes] = array.tobytes()
+    for filename, body in ((BLOB_FILE, bytes(blob)), (HEADER_FILE, fastjson.dumps(info))):
+        path = os.path.join(directory, filename)
+        with open(f'{path}.tmp', 'wb') as f:
+            f.write(body)
+        os.replace(f'{path}.tmp', path)
+    return info
+
+
+def publish(records: List[dict], data_dirs: Sequence[str] = DATA_DIRS,
+            dataset_hash: Optional[str] = None) -> str:
+    """Compute once and write to every data directory; returns a progress line"""
+    start = time.perf_counter()
+    analytics = compute(CompanyTable.from_records(records))
+    for data_dir in data_dirs:
+        info = write(analytics, data_dir, dataset_hash)
+    elapsed = (time.perf_counter() - start) * 1000
+    return (f"{os.path.join(data_dirs[0], ANALYTICS_DIR, BLOB_FILE)} ({len(analytics.symbols)} companies x "
+            f"{len(analytics.metrics)} metrics, {info['bytes'] / 1024:.0f} KiB, {elapsed:.0f} ms)")
+
+
+def load(data_dir: str = './data') -> Tuple[dict, Dict[str, np.memmap]]:
+    """(header, {name: read-only memmap}) for a written stage"""
+    directory = os.path.join(data_dir, ANALYTICS_DIR)
+    info = fastjson.load(os.path.join(directory, HEADER_FILE))
+    path = os.path.join(directory, info['file'])
+    arrays = {name: np.memmap(path, spec['dtype'], 'r', spec['offset'], tuple(spec['shape']))
+              for name, spec in info['arrays'].items()}
+    return info, arrays
+
+
+def nearest(info: dict, arrays: Dict[str, np.ndarray], symbol: str, limit: int = 10,
+            same_sector: bool = False) -> List[Tuple[str, float]]:
+    """The companies closest to `symbol` by distance, nearest first"""
+    row = info['companies'].index(symbol)
+    distances = np.array(arrays['distances'][row], np.float64)
+    distances[row] = np.nan
+    if same_sector:
+        sector_index = np.array(info['sector_index'])
+        distances[sector_index != sector_index[row]] = np.nan
+    order = np.argsort(distances)       # NaN last
+    return [(info['companies'][j], float(distances[j])) for j in order[:limit] if not np.isnan(distances[j])]
+
+
+def print_company(info: dict, arrays: Dict[str, np.ndarray], symbol: str, limit: int):
+    row = info['companies'].index(symbol)
+    sector = info['sectors'][info['sector_index'][row]]
+    print(f"\n📊 {symbol} vs {sector} peers (z-score within sector)")
+    print(f"{'-'*80}")
+    for j, metric in enumerate(info['metrics']):
+        z = float(arrays['zscores'][row, j])
+        bar = '' if np.isnan(z) else ('+' if z > 0 else '-') * min(int(round(abs(z) * 4)), 20)
+        print(f"  {metric:18s} {'-' if np.isnan(z) else f'{z:+.2f}':>6s}  {bar}")
+    for label, same_sector in (('sector', True), ('universe', False)):
+        peers = nearest(info, arrays, symbol, limit, same_sector)
+        similarity = arrays['similarity'][row]
+        print(f"\n🔎 Nearest in {label}: " + ', '.join(
+            f"{peer} ({distance:.2f}, cos {similarity[info['companies'].index(peer)]:+.2f})" for peer, distance in peers))
+
+
+def print_correlations(info: dict, arrays: Dict[str, np.ndarray]):
+    metrics = info['metrics']
+    print(f"\n📈 Metric correlations across {len(info['companies'])} companies")
+    print(f"{'-'*80}")
+    print(' ' * 18 + ''.join(f"{metric[:6]:>7s}" for metric in metrics))
+    for i, metric in enumerate(metrics):
+        print(f"{metric:18s}" + ''.join(f"{'-' if np.isnan(v) else f'{v:+.2f}':>7s}"
+                                        for v in np.asarray(arrays['correlation'][i], np.float64)))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Sector z-scores, company distances and metric correlations')
+    parser.add_argument('symbols', nargs='*', help='Companies to show')
+    parser.add_argument('--build', action='store_true', help='Recompute from data/financial_data.json first')
+    parser.add_argument('--correlations', action='store_true', help='Print the metric correlation matrix')
+    parser.add_argument('--data-dir', default=DATA_DIRS[0])
+    parser.add_argument('--limit', type=int, default=8, help='Peers shown per company')
+    args = parser.parse_args(argv)
+
+    if args.build:
+        with open(os.path.join(args.data_dir, 'financial_data.json'), encoding='utf-8') as f:
+            text = f.read()
+        data_dirs = DATA_DIRS if args.data_dir == DATA_DIRS[0] else (args.data_dir,)
+        print(f"✓ Saved {publish(fastjson.loads(text), data_dirs, deltas.dataset_hash(text))}")
+    try:
+        info, arrays = load(args.data_dir)
+    except FileNotFoundError:
+        print(f"Error: no {os.path.join(args.data_dir, ANALYTICS_DIR, HEADER_FILE)}; run with --build")
+        return 1
+    print(f"📋 {len(info['companies'])} companies, {len(info['sectors'])} sectors, "
+          f"{len(info['metrics'])} metrics (generated {info['generated_at']})")
+    for symbol in args.symbols:
+        if symbol not in info['companies']:
+            print(f"✗ {symbol}: not in the dataset")
+            continue
+        print_company(info, arrays, symbol, args.limit)
+    if args.correlations:
+        print_correlations(info, arrays)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Cached, coalesced stock quotes for the worker's /api/stock-price endpoints
+
+- TTLCache       LRU with a freshness TTL and a stale-while-revalidate window:
+                 a stale entry is still served while one background refresh runs
+- SingleFlight   concurrent misses for the same key share one upstream call,
+                 so a burst at market open costs one request per symbol
+- PriceService   both, over one pooled requests.Session to Yahoo's batched
+                 quote endpoint (up to QUOTE_BATCH symbols per request);
+                 symbols the upstream has no quote for are remembered for
+                 MISSING_SECONDS so repeated lookups don't each cost a request
+
+Everything is thread-safe; the worker serves requests from a thread pool.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import endpoints
+import fastjson
+from instrumentation import Metrics, timed_get
+
+FRESH_SECONDS = 60          # served as is
+STALE_SECONDS = 300         # after that, served while a refresh runs
+MISSING_SECONDS = 30        # a symbol with no quote upstream isn't asked for again for this long
+MAX_ENTRIES = 2048
+QUOTE_BATCH = 50
+POOL_SIZE = 16
+REQUEST_TIMEOUT = 5
+WAIT_TIMEOUT = 15           # longest a coalesced caller waits for the leader
+SOURCE = 'Yahoo Finance (FREE)'
+HEADERS = {'User-Agent': 'Mozilla/5.0 (compatible; sp100-financial-tracker/1.0)'}
+QUOTE_FIELDS = ('regularMarketPrice', 'regularMarketChangePercent', 'marketCap', 'regularMarketVolume',
+                'regularMarketDayHigh', 'regularMarketDayLow')
+
+FRESH, STALE = 'fresh', 'stale'
+
+
+class TTLCache:
+    """Bounded LRU; entries are fresh for `ttl` seconds, then stale for `stale_ttl` more, then gone"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = FRESH_SECONDS, stale_ttl: float = STALE_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[Any, Optional[str]]:
+        """(value, FRESH | STALE), or (None, None) on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            value, stored = entry
+            age = self.clock() - stored
+            if age > self.ttl + self.stale_ttl:
+                del self._entries[key]
+                return None, None
+            self._entries.move_to_end(key)
+            return value, FRESH if age <= self.ttl else STALE
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class _Call:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent work per key: the first caller (the leader) runs it, the rest wait for its result"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key: Hashable) -> Tuple[_Call, bool]:
+        """(call, leader): a leader must finish() the key; followers wait() on the call"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def finish(self, key: Hashable, value: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            call = self._calls.pop(key)
+        call.value, call.error = value, error
+        call.done.set()
+
+    @staticmethod
+    def wait(call: _Call, timeout: float = WAIT_TIMEOUT) -> Any:
+        if not call.done.wait(timeout):
+            raise TimeoutError('timed out waiting for a coalesced request')
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(call)
+        try:
+            value = fn()
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, value)
+        return value
+
+
+def quote_record(item: dict) -> dict:
+    """One Yahoo quote result in the shape functions/api/stock-price.js returns"""
+    return {
+        'symbol': item['symbol'],
+        'price': item['regularMarketPrice'],
+        'changePercent': item.get('regularMarketChangePercent') or 0,
+        'source': SOURCE,
+        'marketCap': item.get('marketCap'),
+        'volume': item.get('regularMarketVolume'),
+        'dayHigh': item.get('regularMarketDayHigh'),
+        'dayLow': item.get('regularMarketDayLow'),
+    }
+
+
+class PriceService:
+    """Quotes by symbol: cache first, then one coalesced, batched upstream request for the misses"""
+
+    def __init__(self, metrics: Metrics, ttl: float = FRESH_SECONDS, stale_ttl: float = STALE_SECONDS,
+                 max_entries: int = MAX_ENTRIES, pool_size: int = POOL_SIZE, timeout: float = REQUEST_TIMEOUT,
+                 missing_ttl: float = MISSING_SECONDS):
+        self.metrics = metrics
+        self.timeout = timeout
+        self.cache = TTLCache(max_entries, ttl, stale_ttl)
+        # Negative entries: symbols the upstream returned nothing for
+        self.missing = TTLCache(max_entries, missing_ttl, 0)
+        self.flights = SingleFlight()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(HEADERS)
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='price-refresh')
+
+    def fetch(self, symbols: Sequence[str]) -> Dict[str, dict]:
+        """Upstream quotes for some symbols, QUOTE_BATCH per request; raises if a request fails"""
+        quotes = {}
+        for i in range(0, len(symbols), QUOTE_BATCH):
+            batch = symbols[i:i + QUOTE_BATCH]
+            url = f"{endpoints.YAHOO_QUOTE_URL}?symbols={','.join(batch)}&fields={','.join(QUOTE_FIELDS)}"
+            response = timed_get(self.session, url, self.metrics, retries=1, timeout=self.timeout)
+            if response.status_code != 200:
+                raise RuntimeError(f'quote HTTP {response.status_code}')
+            with self.metrics.parse_timer('quote'):
+                result = (fastjson.loads(response.content).get('quoteResponse') or {}).get('result') or []
+            for item in result:
+                if item.get('symbol') and item.get('regularMarketPrice'):
+                    quotes[item['symbol']] = quote_record(item)
+        return quotes
+
+    def _lead(self, symbols: List[str]) -> Dict[str, dict]:
+        """Fetch symbols this thread leads, cache them and release their followers"""
+        try:
+            quotes = self.fetch(symbols)
+        except Exception as e:
+            for symbol in symbols:
+                self.flights.finish(symbol, error=e)
+            raise
+        for symbol in symbols:
+            if symbol in quotes:
+                self.cache.set(symbol, quotes[symbol])
+            else:
+                self.missing.set(symbol, True)
+            self.flights.finish(symbol, quotes.get(symbol))
+        return quotes
+
+    def _refresh(self, symbols: List[str]):
+        try:
+            self._lead(symbols)
+        except Exception:
+            self.metrics.inc('price_refresh_failures_total')
+
+    def _abandon(self, symbols: List[str]):
+        """Release the keys of a refresh that will never run (cancelled by close())"""
+        error = RuntimeError('price service closed before the refresh ran')
+        for symbol in symbols:
+            self.flights.finish(symbol, error=error)
+
+    def quotes(self, symbols: Sequence[str]) -> Dict[str, dict]:
+        """{symbol: quote} for the symbols that have one; raises if the upstream request for a miss fails"""
+        found: Dict[str, dict] = {}
+        missing: List[str] = []
+        stale: List[str] = []
+        for symbol in dict.fromkeys(symbols):
+            quote, state = self.cache.get(symbol)
+            if quote is None:
+                if self.missing.get(symbol)[0]:
+                    self.metrics.cache_hit('prices')       # known to have no quote
+                    continue
+                self.metrics.cache_miss('prices')
+                missing.append(symbol)
+                continue
+            self.metrics.cache_hit('prices')
+            found[symbol] = dict(quote, cached=True, stale=state == STALE)
+            if state == STALE:
+                stale.append(symbol)
+
+        # Stale entries were served as is; refresh each once in the background
+        refresh = [symbol for symbol in stale if self.flights.begin(symbol)[1]]
+        if refresh:
+            self.metrics.inc('price_stale_served_total', len(refresh))
+            try:
+                future = self._refresher.submit(self._refresh, refresh)
+            except RuntimeError:                # closed
+                self._abandon(refresh)
+            else:
+                def release(future, symbols=refresh):
+                    if future.cancelled():
+                        self._abandon(symbols)
+                future.add_done_callback(release)
+
+        # Misses: lead the ones nobody is fetching yet (one batched request), wait for the rest
+        leading, following = [], {}
+        for symbol in missing:
+            call, leader = self.flights.begin(symbol)
+            if not leader:
+                following[symbol] = call
+                continue
+            quote, _ = self.cache.get(symbol)
+            if quote is not None:
+                # Another leader finished between our cache lookup and begin()
+                self.flights.finish(symbol, quote)
+                found[symbol] = dict(quote, cached=True, stale=False)
+            elif self.missing.get(symbol)[0]:
+                self.flights.finish(symbol)     # ... and found nothing
+            else:
+                leading.append(symbol)
+        if following:
+            self.metrics.inc('price_coalesced_total', len(following))
+        if leading:
+            for symbol, quote in self._lead(leading).items():
+                found[symbol] = dict(quote, cached=False, stale=False)
+        for symbol, call in following.items():
+            quote = self.flights.wait(call)
+            if quote is not None:
+                found[symbol] = dict(quote, cached=True, stale=False)
+        return found
+
+    def quote(self, symbol: str) -> Optional[dict]:
+        return self.quotes([symbol]).get(symbol)
+
+    def close(self):
+        """Stop background refreshes; queued ones are cancelled and their waiters released"""
+        self._refresher.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Opt-in profiling shared by the fetch/update scripts and the worker
+
+Every entry point takes --profile (cProfile, the default) or --profile sample
+(a 100 Hz stack sampler that also sees download threads). While a profile is
+running, wall-clock spans are recorded around each phase:
+- fetch:    every upstream request (from instrumentation.timed_get)
+- throttle: time spent waiting on a rate limiter
+- parse:    JSON decoding (instrumentation parse timers)
+- extract:  picking facts out of decoded documents
+- derive:   TTM rollups, peer analytics
+- save:     writing the dataset, deltas, shards and store
+
+Output (./reports, or $PROFILE_DIR):
+- profile-<job>.folded      collapsed stacks for flamegraph.pl, speedscope or inferno
+- profile-<job>.pstats      cProfile stats (python3 -m pstats / snakeviz), cProfile mode only
+- profile-<job>.trace.json  spans as Chrome trace events (Perfetto / chrome://tracing),
+                            with per-phase totals under "phases"
+
+When no profile is running, span() and record_span() cost one global lookup.
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+REPORT_DIR = os.environ.get('PROFILE_DIR') or os.environ.get('METRICS_REPORT_DIR', './reports')
+MODES = ('cprofile', 'sample')
+SAMPLE_INTERVAL = 0.01      # seconds between stack samples
+MAX_SPANS = 200_000         # past this only the per-phase totals keep growing (long-running worker)
+MAX_DEPTH = 96              # frames kept per collapsed stack
+MIN_MICROS = 1              # cProfile paths below this are dropped from the folded output
+
+_active: Optional['Profiler'] = None
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stat_label(func: tuple) -> str:
+    filename, line, name = func
+    if filename == '~':
+        return name                         # builtins, e.g. <method 'read' of '_ssl._SSLSocket' objects>
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def folded_from_stats(stats: dict) -> Dict[str, int]:
+    """
+    Collapse cProfile's caller graph into "root;...;leaf" -> microseconds.
+
+    cProfile keeps one level of callers per function, so a function's time is
+    split across the paths to it in proportion to the time each caller spent in it.
+    """
+    callees: Dict[tuple, Dict[tuple, float]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            if caller != func:
+                callees.setdefault(caller, {})[func] = edge[3]
+    roots = [func for func, entry in stats.items() if not set(entry[4]) - {func}]
+
+    stacks: Dict[str, int] = {}
+
+    def walk(func: tuple, path: List[str], seen: set, share: float):
+        _, _, tottime, cumtime, _ = stats[func]
+        if cumtime * share * 1e6 < MIN_MICROS or len(path) >= MAX_DEPTH:
+            return
+        path = path + [_stat_label(func).replace(';', ',')]
+        micros = int(tottime * share * 1e6)
+        if micros >= MIN_MICROS:
+            key = ';'.join(path)
+            stacks[key] = stacks.get(key, 0) + micros
+        for callee, edge_seconds in callees.get(func, {}).items():
+            callee_cumtime = stats[callee][3]
+            if callee not in seen and callee_cumtime > 0:
+                walk(callee, path, seen | {callee}, share * min(1.0, edge_seconds / callee_cumtime))
+
+    for root in roots:
+        walk(root, [], {root}, 1.0)
+    return stacks
+
+
+class Profiler:
+    """cProfile or stack sampling for one job, plus wall-clock spans around its phases"""
+
+    def __init__(self, job: str, mode: str = 'cprofile', interval: float = SAMPLE_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f"unknown profile mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.job = job
+        self.mode = mode
+        self.interval = interval
+        self.spans: List[dict] = []
+        self.phases: Dict[str, dict] = {}
+        self.samples: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._open: Dict[int, List[str]] = {}
+        self._stats: Optional[pstats.Stats] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._origin = time.perf_counter()
+        self.wall_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> 'Profiler':
+        """Start profiling the calling thread (cProfile) or every thread (sample); makes this the active profiler"""
+        global _active
+        self._origin = time.perf_counter()
+        if self.mode == 'cprofile':
+            self._profile = self.begin_thread()
+        else:
+            self._stopping.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+            self._sampler.start()
+        _active = self
+        return self
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        if self._profile is not None:
+            self.end_thread(self._profile)
+            self._profile = None
+        if self._sampler is not None:
+            self._stopping.set()
+            self._sampler.join()
+            self._sampler = None
+        self.wall_seconds = time.perf_counter() - self._origin
+
+    def begin_thread(self) -> Optional[cProfile.Profile]:
+        """cProfile mode: start profiling the calling thread (e.g. one worker request); pair with end_thread()"""
+        if self.mode != 'cprofile':
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None                     # another profiler already owns this thread
+        return profile
+
+    def end_thread(self, profile: Optional[cProfile.Profile]):
+        if profile is None:
+            return
+        profile.disable()
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    # ------------------------------------------------------------------
+    # Spans
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def span(self, phase: str, **details) -> Iterator[None]:
+        """Time a block as one span of `phase`; sampled stacks taken inside it are prefixed with [phase]"""
+        stack = self._open.setdefault(threading.get_ident(), [])
+        stack.append(phase)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stack.pop()
+            self.record_span(phase, started, time.perf_counter() - started, **details)
+
+    def record_span(self, phase: str, started: float, seconds: float, **details):
+        """Record a span measured elsewhere (`started` is a time.perf_counter() value)"""
+        with self._lock:
+            totals = self.phases.setdefault(phase, {'count': 0, 'seconds': 0.0})
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append({'phase': phase, 'start': started - self._origin, 'seconds': seconds,
+                                   'thread': threading.current_thread().name, 'details': details})
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident != own:
+                    self._sample(ident, frame)
+
+    def _sample(self, ident: int, frame):
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            stack.append(_frame_label(frame.f_code).replace(';', ','))
+            frame = frame.f_back
+        stack.reverse()
+        phases = self._open.get(ident)
+        if phases:
+            stack.insert(0, f"[{phases[-1]}]")
+        key = ';'.join(stack)
+        with self._lock:
+            self.samples[key] = self.samples.get(key, 0) + 1
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def folded(self) -> List[str]:
+        """Collapsed stacks, one "frame;frame;frame count" line each (count: samples, or microseconds)"""
+        with self._lock:
+            if self.mode == 'sample':
+                stacks = dict(self.samples)
+            else:
+                stacks = folded_from_stats(self._stats.stats) if self._stats is not None else {}
+        return [f"{stack} {count}" for stack, count in sorted(stacks.items())]
+
+    def trace(self) -> dict:
+        """Spans as Chrome trace events, plus per-phase totals"""
+        with self._lock:
+            threads = {name: i for i, name in enumerate(sorted({span['thread'] for span in self.spans}))}
+            events = [{'name': span['phase'], 'cat': span['phase'], 'ph': 'X', 'pid': 0,
+                       'tid': threads[span['thread']], 'ts': round(span['start'] * 1e6, 1),
+                       'dur': round(span['seconds'] * 1e6, 1), 'args': span['details']}
+                      for span in self.spans]
+            events += [{'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': tid, 'args': {'name': name}}
+                       for name, tid in threads.items()]
+            phases = {phase: {'count': totals['count'], 'seconds': round(totals['seconds'], 6)}
+                      for phase, totals in sorted(self.phases.items())}
+        return {'job': self.job, 'mode': self.mode, 'wall_seconds': round(self.wall_seconds, 6),
+                'phases': phases, 'traceEvents': events}
+
+    def write(self, directory: Optional[str] = None) -> List[str]:
+        """Write the folded stacks, trace and (cProfile) stats; returns the paths written"""
+        directory = directory or REPORT_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f'profile-{self.job}')
+        written = []
+
+        with open(f'{base}.folded', 'w', encoding='utf-8') as f:
+            f.writelines(line + '\n' for line in self.folded())
+        written.append(f'{base}.folded')
+
+        if self._stats is not None:
+            self._stats.dump_stats(f'{base}.pstats')
+            written.append(f'{base}.pstats')
+
+        with open(f'{base}.trace.json', 'w', encoding='utf-8') as f:
+            json.dump(self.trace(), f)
+        written.append(f'{base}.trace.json')
+        return written
+
+    def print_summary(self):
+        """Per-phase totals: spans overlap across threads, so they can add up to more than the wall time"""
+        print(f"\n⚡ Profile ({self.mode}): {self.wall_seconds:.2f}s wall")
+        for phase, totals in sorted(self.phases.items(), key=lambda item: -item[1]['seconds']):
+            print(f"   {phase:<10} {totals['seconds']:>9.2f}s  {totals['count']:>7} spans")
+
+
+def active() -> Optional[Profiler]:
+    return _active
+
+
+def span(phase: str, **details):
+    """Profiler.span() on the active profiler; a no-op context when nothing is being profiled"""
+    profiler = _active
+    if profiler is None:
+        return nullcontext()
+    return profiler.span(phase, **details)
+
+
+def record_span(phase: str, started: float, seconds: float, **details):
+    profiler = _active
+    if profiler is not None:
+        profiler.record_span(phase, started, seconds, **details)
+
+
+def add_profile_argument(parser: argparse.ArgumentParser):
+    parser.add_argument('--profile', nargs='?', const='cprofile', choices=MODES, default=None,
+                        help='Profile the run and write reports/profile-<job>.{folded,pstats,trace.json} '
+                             '(cprofile, or sample to include download threads)')
+
+
+def profile_from_argv(argv: List[str]) -> Optional[str]:
+    """The --profile mode in a hand-parsed argv (--profile, --profile sample, --profile=sample), else None"""
+    for i, arg in enumerate(argv):
+        if arg.startswith('--profile='):
+            return arg.split('=', 1)[1]
+        if arg == '--profile':
+            return argv[i + 1] if i + 1 < len(argv) and argv[i + 1] in MODES else 'cprofile'
+    return None
+
+
+@contextmanager
+def profiled(job: str, mode: Optional[str]) -> Iterator[Optional[Profiler]]:
+    """Profile the block when `mode` is set (the --profile value), then write and summarise the output"""
+    if not mode:
+        yield None
+        return
+    profiler = Profiler(job, mode).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profiler.print_summary()
+        for path in profiler.write():
+            print(f"⚡ Profile: {path}")
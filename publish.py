@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+The save step shared by every job that writes financial_data.json
+
+publish_dataset() writes the dataset to data/ and public/data/, then in each
+of those directories:
+- the versioned delta from the copy it replaces (deltas.py)
+- the per-company shards and index (shards.py)
+- the peer analytics blobs (peers.py)
+and upserts the snapshot into the SQLite store next to the first path (store.py).
+"""
+
+import os
+from typing import List, Optional, Sequence
+
+import deltas
+import fastjson
+import peers
+import profiling
+import shards
+import store
+
+DATA_FILE = './data/financial_data.json'
+PUBLIC_DATA_FILE = './public/data/financial_data.json'
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def publish_dataset(records: List[dict], paths: Sequence[str] = (DATA_FILE, PUBLIC_DATA_FILE)) -> List[str]:
+    """Write the dataset, its delta and its shards; returns a line per thing written, for progress output"""
+    with profiling.span('save', step='json'):
+        text = fastjson.dumps_pretty(records)
+        previous = _read(paths[0])
+        data_dirs = [os.path.dirname(path) or '.' for path in paths]
+
+        written = []
+        for path in paths:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            written.append(path)
+
+    with profiling.span('save', step='deltas'):
+        manifest = deltas.publish(previous, records, text, data_dirs)
+    if manifest is None:
+        written.append(f"{os.path.join(data_dirs[0], deltas.MANIFEST_FILE)} (unchanged)")
+    else:
+        latest = manifest['deltas'][-1] if manifest['deltas'] else None
+        if latest and latest['to'] == manifest['version']:
+            written.append(f"{os.path.join(data_dirs[0], latest['path'])} "
+                           f"(v{manifest['version']}, {latest['companies']} companies changed)")
+        else:
+            written.append(f"{os.path.join(data_dirs[0], deltas.MANIFEST_FILE)} (v{manifest['version']}, full dataset)")
+
+    with profiling.span('save', step='shards'):
+        for data_dir in data_dirs:
+            written.append(shards.describe(shards.write_shards(records, data_dir)))
+    with profiling.span('derive', step='peers'):
+        written.append(peers.publish(records, data_dirs, deltas.dataset_hash(text)))
+
+    version = manifest['version'] if manifest else deltas.load_manifest(data_dirs[0]).get('version')
+    with profiling.span('save', step='store'):
+        written.append(store.record_snapshot(records, deltas.dataset_hash(text), version,
+                                             os.path.join(data_dirs[0], store.DB_NAME)))
+    return written
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Quarterly and trailing-twelve-month (TTM) rollups from companyfacts 10-Q/10-K facts
+
+financial_data.json holds annual 10-K values, up to a year old by the time
+the next 10-K is filed. The companyfacts documents we already download also
+carry every 10-Q, so the last four quarters give a TTM figure that is at most
+one quarter old.
+
+Filers don't report four clean quarters: income statements come as 3-month
+facts for Q1-Q3 and a fiscal year in the 10-K (no Q4), cash flow statements
+as year-to-date facts (3, 6, 9 and 12 months). Every duration fact of one to
+four quarters is placed on a per-company grid of quarter ends (newest first)
+and quarters are recovered as differences of cumulative facts:
+
+    Q2 = 6M - Q1    Q3 = 9M - (Q1 + Q2)    Q4 = FY - (Q1 + Q2 + Q3) = FY - 9M
+
+All of it is array arithmetic over a (company, metric, duration, quarter) grid,
+so the whole universe rolls up in one pass. The fetchers instead roll each
+company up as its document is parsed (company_ttm) and keep only the TTM
+object, so their memory doesn't grow with the universe. A company's TTM ends at the latest
+quarter with a revenue TTM (earnings if it reports no revenue); the other
+metrics are taken for the same quarter or left out, never mixed across
+periods. Each record gets a "ttm" object:
+
+    "ttm": {"end": "2025-06-28", "filed": "2025-08-01", "revenue": ..., "earnings": ...,
+            "operating_cash_flow": ..., "capex": ..., "free_cash_flow": ...}
+
+Incremental: when a new 10-Q lands (fetch_filings.py lists it in
+company_filings.json), --changed re-reads only the companies whose latest
+10-Q/10-K was filed after the newest one already checked, and rolls up only
+those. Every company read records that filing date as "ttm_checked", so one
+without a TTM (or whose latest filing is an amendment) is not re-read on
+every run.
+
+    python3 quarterly.py --source data/cache/companyfacts.zip      # whole universe from the bulk archive
+    python3 quarterly.py --changed --write                          # companies with a new 10-Q/10-K
+    python3 quarterly.py --source data/cache/companyfacts.zip --symbols AAPL --quarters
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+
+import concept_coverage
+import endpoints
+import fastjson
+from company_table import CompanyTable
+from instrumentation import Metrics, timed_get
+
+DATA_FILE = './data/financial_data.json'
+FILINGS_FILE = './data/company_filings.json'
+HEADERS = {'User-Agent': 'sp100-financial-tracker quarterly-rollup contact@example.com'}
+SEC_COMPANYFACTS_URL = endpoints.SEC_COMPANYFACTS_URL
+
+TTM_METRICS = ('revenue', 'earnings', 'operating_cash_flow', 'capex')
+ANCHORS = ('revenue', 'earnings')
+PERIODIC_FORMS = ('10-Q', '10-K', '10-Q/A', '10-K/A')
+QUARTER_DAYS = 365.25 / 4
+DURATION_SLACK = 20     # days either way: 14-week quarters, 53-week years
+WINDOW = 8              # quarters kept per company (newest first)
+GRID = WINDOW + 3       # a TTM at the oldest kept quarter reaches three further back
+MID_MONTH = 15          # a period ending before the 15th belongs to the previous month (52/53-week years)
+NAT = np.datetime64('NaT', 'D').astype(np.int64)
+
+
+class Facts(NamedTuple):
+    """One company's duration facts of one to four quarters, as parallel arrays"""
+    metric: np.ndarray      # index into TTM_METRICS
+    rank: np.ndarray        # alias position in metrics_map (lower wins)
+    end: np.ndarray         # datetime64[D]
+    quarters: np.ndarray    # duration, 1-4
+    value: np.ndarray
+    filed: np.ndarray       # datetime64[D]
+
+
+class Rollup(NamedTuple):
+    quarters: np.ndarray    # (companies, metrics, WINDOW) quarter values, newest first, NaN = unknown
+    ends: np.ndarray        # (companies, WINDOW) quarter end dates
+    ttm: np.ndarray         # (companies, metrics) at the TTM quarter, NaN = unknown
+    ttm_end: np.ndarray     # (companies,) NaT = no TTM
+    filed: np.ndarray       # (companies,) latest filing date among the company's facts
+
+
+def empty_facts() -> Facts:
+    return Facts(np.zeros(0, np.int8), np.zeros(0, np.int8), np.zeros(0, 'datetime64[D]'),
+                 np.zeros(0, np.int8), np.zeros(0), np.zeros(0, 'datetime64[D]'))
+
+
+def quarterly_facts(data: dict, metrics_map: Dict[str, list]) -> Facts:
+    """Every 10-Q/10-K duration fact of one to four quarters for TTM_METRICS, any alias in metrics_map"""
+    us_gaap = (data.get('facts') or {}).get('us-gaap') or {}
+    rows = []
+    for m, metric in enumerate(TTM_METRICS):
+        for rank, alias in enumerate(metrics_map.get(metric, ())):
+            for fact in ((us_gaap.get(alias) or {}).get('units') or {}).get('USD') or ():
+                if fact.get('start') and fact.get('form') in PERIODIC_FORMS:
+                    rows.append((m, rank, fact['start'], fact['end'], fact['val'], fact.get('filed') or fact['end']))
+    if not rows:
+        return empty_facts()
+    metric, rank, start, end, value, filed = zip(*rows)
+    end, filed = np.array(end, 'datetime64[D]'), np.array(filed, 'datetime64[D]')
+    days = (end - np.array(start, 'datetime64[D]')).astype(np.int64) + 1
+    quarters = np.rint(days / QUARTER_DAYS).astype(np.int64)
+    keep = (quarters >= 1) & (quarters <= 4) & (np.abs(days - quarters * QUARTER_DAYS) <= DURATION_SLACK)
+    if keep.any():
+        # Only the last GRID quarters reach a rollup; the latest filing date is kept too (it is reported)
+        months = end_months(end)
+        keep &= (months[keep].max() - months < GRID * 3) | (filed == filed[keep].max())
+    return Facts(np.array(metric, np.int8)[keep], np.array(rank, np.int8)[keep], end[keep],
+                 quarters[keep].astype(np.int8), np.array(value, np.float64)[keep], filed[keep])
+
+
+def end_months(end: np.ndarray) -> np.ndarray:
+    """Period end dates as month numbers, a period ending early in a month counting for the one before"""
+    month = end.astype('datetime64[M]')
+    day = (end - month.astype('datetime64[D]')).astype(np.int64) + 1
+    return month.astype(np.int64) - (day < MID_MONTH)
+
+
+def _older(grid: np.ndarray, by: int) -> np.ndarray:
+    """grid[..., k + by] at position k (quarters further back), NaN past the end"""
+    shifted = np.full_like(grid, np.nan)
+    shifted[..., :grid.shape[-1] - by] = grid[..., by:]
+    return shifted
+
+
+def rollup(company: np.ndarray, facts: Facts, companies: int) -> Rollup:
+    """Quarters and TTM for stacked facts; company[i] is the row (0..companies-1) fact i belongs to"""
+    metrics = len(TTM_METRICS)
+    months = end_months(facts.end)
+    latest = np.full(companies, NAT)
+    np.maximum.at(latest, company, months)
+    behind = latest[company] - months
+    lag = behind // 3
+    keep = (behind % 3 == 0) & (lag < GRID)     # a fiscal-year change can shift the quarter ends
+
+    # One fact per (company, metric, duration, quarter): the first alias, then the latest filing (restatements)
+    cell = (((company * metrics + facts.metric) * 4 + facts.quarters - 1) * GRID + lag)[keep]
+    filed = facts.filed.astype(np.int64)
+    order = np.lexsort((-filed[keep], facts.rank[keep], cell))
+    first = order[np.diff(cell[order], prepend=-1) != 0]
+    cumulative = np.full((companies, metrics, 4, GRID), np.nan)
+    cumulative.reshape(-1)[cell[first]] = facts.value[keep][first]
+
+    # Quarters: reported 3-month values, else a d-quarter cumulative value less the d-1 quarters before it
+    quarters = cumulative[:, :, 0].copy()
+    for d in (2, 3, 4):
+        derived = cumulative[:, :, d - 1] - sum(_older(quarters, j) for j in range(1, d))
+        quarters = np.where(np.isnan(quarters), derived, quarters)
+
+    ttm = np.where(np.isnan(cumulative[:, :, 3]), sum(_older(quarters, j) for j in range(4)), cumulative[:, :, 3])
+    ends = np.full((companies, GRID), NAT)     # NaT is the smallest int64, so maximum.at keeps the latest date
+    np.maximum.at(ends, (company[keep], lag[keep]), facts.end.astype(np.int64)[keep])
+
+    # The TTM quarter: the latest with an anchor TTM, the same quarter for every metric
+    anchored = np.zeros((companies, GRID), bool)
+    for anchor in ANCHORS:
+        available = ~np.isnan(ttm[:, TTM_METRICS.index(anchor)])
+        anchored = np.where(anchored.any(axis=1, keepdims=True), anchored, available)
+    at = np.argmax(anchored, axis=1)
+    rows = np.arange(companies)
+    has_ttm = anchored[rows, at]
+    ttm_end = np.where(has_ttm, ends[rows, at], NAT).astype('datetime64[D]')
+    values = np.where(has_ttm[:, None], ttm[rows, :, at], np.nan)
+
+    latest_filed = np.full(companies, NAT)
+    np.maximum.at(latest_filed, company, filed)
+    return Rollup(quarters[:, :, :WINDOW], ends[:, :WINDOW].astype('datetime64[D]'), values, ttm_end,
+                  latest_filed.astype('datetime64[D]'))
+
+
+def ttm_record(values: np.ndarray, end: np.datetime64, filed: np.datetime64) -> Optional[dict]:
+    """A company's "ttm" object (capex negative, as in the annual fields); None without a TTM quarter"""
+    if np.isnat(end):
+        return None
+    record = {'end': str(end), 'filed': str(filed)}
+    for metric, value in zip(TTM_METRICS, values.tolist()):
+        if value == value:
+            record[metric] = -abs(int(value)) if metric == 'capex' else int(value)
+    if 'operating_cash_flow' in record and 'capex' in record:
+        record['free_cash_flow'] = record['operating_cash_flow'] + record['capex']
+    return record
+
+
+def company_ttm(facts: Facts) -> Optional[dict]:
+    """One company's "ttm" object, rolled up on its own (the fetchers, as each document is parsed)"""
+    result = rollup(np.zeros(len(facts.value), np.int64), facts, 1)
+    return ttm_record(result.ttm[0], result.ttm_end[0], result.filed[0])
+
+
+class QuarterlyRollup:
+    """Facts by company; compute() rolls up any subset of them in one vectorized pass"""
+
+    def __init__(self):
+        self.facts: Dict[str, Facts] = {}
+        self.results: Dict[str, Optional[dict]] = {}
+        self.series: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def add(self, symbol: str, facts: Facts):
+        """Replace a company's facts; its results are stale until the next compute()"""
+        self.facts[symbol] = facts
+
+    def compute(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, Optional[dict]]:
+        """Roll up some companies (default: all); returns {symbol: ttm object or None} for them"""
+        symbols = list(self.facts if symbols is None else symbols)
+        if not symbols:
+            return {}
+        parts = [self.facts[symbol] for symbol in symbols]
+        company = np.repeat(np.arange(len(symbols)), [len(part.value) for part in parts])
+        stacked = Facts(*(np.concatenate(columns) for columns in zip(*parts)))
+        result = rollup(company, stacked, len(symbols))
+        computed = {}
+        for i, symbol in enumerate(symbols):
+            computed[symbol] = self.results[symbol] = ttm_record(result.ttm[i], result.ttm_end[i], result.filed[i])
+            self.series[symbol] = (result.ends[i], result.quarters[i])
+        return computed
+
+    def set_result(self, symbol: str, ttm: Optional[dict]):
+        """Record a TTM object already rolled up (company_ttm) without keeping the company's facts"""
+        self.results[symbol] = ttm
+
+    def update(self, symbol: str, facts: Facts) -> Optional[dict]:
+        """A new filing for one company: replace its facts and roll up only that company"""
+        self.add(symbol, facts)
+        return self.compute([symbol])[symbol]
+
+    def quarters(self, symbol: str) -> List[dict]:
+        """The company's known quarters, newest first: {"end", metric: value, ...}"""
+        ends, values = self.series[symbol]
+        rows = []
+        for k, end in enumerate(ends):
+            if np.isnat(end):
+                continue
+            row = {'end': str(end)}
+            for m, metric in enumerate(TTM_METRICS):
+                if values[m, k] == values[m, k]:
+                    row[metric] = -abs(int(values[m, k])) if metric == 'capex' else int(values[m, k])
+            rows.append(row)
+        return rows
+
+    def apply(self, companies) -> List[str]:
+        """Write each computed "ttm" object onto the matching company (dicts or CompanyTable); returns the changed symbols"""
+        changed = []
+        for company in companies:
+            symbol = company['symbol']
+            if symbol not in self.results:
+                continue
+            ttm = self.results[symbol]
+            if ttm is None:
+                if 'ttm' in company:
+                    del company['ttm']
+                    changed.append(symbol)
+            elif company.get('ttm') != ttm:
+                company['ttm'] = ttm
+                changed.append(symbol)
+        return changed
+
+
+def newest_filings(filings_doc: dict) -> Dict[str, Tuple[str, str]]:
+    """{symbol: (CIK, date of its newest 10-Q/10-K)} from fetch_filings.py's filings list"""
+    newest = {}
+    for symbol, entry in ((filings_doc or {}).get('companies') or {}).items():
+        if not entry or not entry.get('cik'):
+            continue
+        date = max((f['date'] for f in entry.get('filings') or () if f.get('form') in PERIODIC_FORMS), default=None)
+        if date:
+            newest[symbol] = (entry['cik'], date)
+    return newest
+
+
+def stale_companies(companies, filings_doc: dict) -> Dict[str, str]:
+    """
+    {symbol: CIK} for companies with a 10-Q/10-K filed after the newest one
+    already checked: "ttm_checked", else their TTM's "filed" date (or never)
+    """
+    newest = newest_filings(filings_doc)
+    stale = {}
+    for company in companies:
+        if company['symbol'] not in newest:
+            continue
+        cik, date = newest[company['symbol']]
+        checked = max(company.get('ttm_checked') or '', (company.get('ttm') or {}).get('filed', ''))
+        if date > checked:
+            stale[company['symbol']] = cik
+    return stale
+
+
+def mark_checked(companies, checked: Dict[str, str]) -> List[str]:
+    """
+    Record {symbol: newest 10-Q/10-K date} as each company's "ttm_checked",
+    TTM or not, so stale_companies() skips it until a newer filing lands;
+    returns the changed symbols
+    """
+    changed = []
+    for company in companies:
+        date = checked.get(company['symbol'])
+        if date and company.get('ttm_checked') != date:
+            company['ttm_checked'] = date
+            changed.append(company['symbol'])
+    return changed
+
+
+def download_facts(symbols: Dict[str, str], metrics_map: Dict[str, list], metrics: Metrics,
+                   rate_limit: float = 0.15) -> Dict[str, Facts]:
+    """Fetch and extract companyfacts for {symbol: CIK}; companies that fail are left out"""
+    from fetch_comprehensive_data import RateLimiter
+    limiter = RateLimiter(rate_limit)
+    found = {}
+    with requests.Session() as session:
+        session.headers.update(HEADERS)
+        for symbol, cik in symbols.items():
+            limiter.wait()
+            try:
+                response = timed_get(session, SEC_COMPANYFACTS_URL.format(cik=str(cik).zfill(10)), metrics,
+                                     retries=2, timeout=15)
+            except requests.RequestException as e:
+                print(f"  ✗ {symbol}: {e}")
+                continue
+            if response.status_code != 200:
+                print(f"  ✗ {symbol}: companyfacts HTTP {response.status_code}")
+                continue
+            with metrics.parse_timer('companyfacts'):
+                found[symbol] = quarterly_facts(fastjson.loads(response.content), metrics_map)
+    return found
+
+
+def read_facts(source: str, ciks: Dict[int, str], metrics_map: Dict[str, list]) -> Dict[str, Facts]:
+    """Extract companyfacts for {CIK: symbol} from a bulk archive or directory of CIK##########.json files"""
+    return {ciks[cik]: quarterly_facts(fastjson.loads(body), metrics_map)
+            for cik, body in concept_coverage.iter_companyfacts(source, ciks)}
+
+
+def universe_ciks(filings_doc: dict) -> Dict[int, str]:
+    """{CIK: symbol} from company_filings.json (fetch_filings.py resolves and stores each company's CIK)"""
+    return {int(entry['cik']): symbol for symbol, entry in ((filings_doc or {}).get('companies') or {}).items()
+            if entry.get('cik')}
+
+
+def default_metrics_map() -> Dict[str, list]:
+    from fetch_comprehensive_data import ComprehensiveDataFetcher
+    return ComprehensiveDataFetcher().metrics_map
+
+
+def _billions(value: Optional[int]) -> str:
+    return f"${value / 1e9:,.1f}B" if value is not None else '-'
+
+
+def print_ttm(companies, symbols: Sequence[str], limit: int):
+    by_symbol = {company['symbol']: company for company in companies}
+    print(f"\n📈 {'Symbol':8s} {'TTM end':10s} {'FY end':10s} {'Revenue':>11s} {'TTM rev':>11s} "
+          f"{'TTM earn':>11s} {'TTM FCF':>11s}")
+    print(f"{'-'*80}")
+    for symbol in list(symbols)[:limit]:
+        company = by_symbol.get(symbol) or {}
+        ttm = company.get('ttm') or {}
+        fy_end = ((company.get('periods') or {}).get('revenue') or {}).get('end', '-')
+        print(f"  {symbol:8s} {ttm.get('end', '-'):10s} {fy_end:10s} {_billions(company.get('revenue')):>11s} "
+              f"{_billions(ttm.get('revenue')):>11s} {_billions(ttm.get('earnings')):>11s} "
+              f"{_billions(ttm.get('free_cash_flow')):>11s}")
+    if len(symbols) > limit:
+        print(f"  ... and {len(symbols) - limit} more")
+
+
+def print_quarters(engine: QuarterlyRollup, symbol: str):
+    print(f"\n📊 {symbol} quarters (newest first)")
+    print(f"{'-'*80}")
+    for row in engine.quarters(symbol):
+        print(f"  {row['end']}  " + '  '.join(f"{metric}={_billions(row.get(metric))}" for metric in TTM_METRICS))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Quarterly and TTM rollups from companyfacts 10-Q/10-K facts')
+    parser.add_argument('--source', help='companyfacts.zip or a directory of CIK##########.json files '
+                                         f'(e.g. {concept_coverage.ARCHIVE_FILE})')
+    parser.add_argument('--changed', action='store_true',
+                        help='Only companies with a 10-Q/10-K newer than the last one checked '
+                             '(from company_filings.json)')
+    parser.add_argument('--symbols', type=lambda text: text.split(','), help='Only these companies')
+    parser.add_argument('--quarters', action='store_true', help='Print each company\'s quarter series')
+    parser.add_argument('--write', action='store_true', help=f'Write the TTM objects into {DATA_FILE}')
+    parser.add_argument('--filings', default=FILINGS_FILE)
+    parser.add_argument('--limit', type=int, default=25, help='Rows printed')
+    args = parser.parse_args(argv)
+
+    if not args.source and not args.changed:
+        parser.error('give --source and/or --changed')
+    print("=" * 80)
+    print("QUARTERLY / TTM ROLLUP")
+    print("=" * 80)
+
+    companies = CompanyTable.load(DATA_FILE)
+    published = companies.copy()
+    filings_doc = fastjson.load(args.filings) if os.path.exists(args.filings) else {}
+    ciks = universe_ciks(filings_doc)
+    if args.changed:
+        wanted = stale_companies(companies, filings_doc)
+        print(f"🔎 {len(wanted)} companies with a 10-Q/10-K newer than the last one checked")
+    else:
+        wanted = {symbol: str(cik) for cik, symbol in ciks.items()}
+    if args.symbols:
+        wanted = {symbol: cik for symbol, cik in wanted.items() if symbol in args.symbols}
+    if not wanted:
+        print("✓ Nothing to roll up")
+        return 0
+
+    metrics = Metrics('quarterly')
+    metrics_map = default_metrics_map()
+    start = time.perf_counter()
+    if args.source:
+        facts = read_facts(args.source, {int(cik): symbol for symbol, cik in wanted.items()}, metrics_map)
+    else:
+        facts = download_facts(wanted, metrics_map, metrics)
+    loaded = time.perf_counter()
+
+    engine = QuarterlyRollup()
+    for symbol, company_facts in facts.items():
+        engine.add(symbol, company_facts)
+    computed = engine.compute()
+    rolled = time.perf_counter()
+    changed = engine.apply(companies)
+    newest = newest_filings(filings_doc)
+    checked = mark_checked(companies, {symbol: newest[symbol][1] for symbol in facts if symbol in newest})
+
+    found = sum(ttm is not None for ttm in computed.values())
+    print(f"✓ {found}/{len(wanted)} companies with a TTM ({len(changed)} changed); "
+          f"read {loaded - start:.2f}s, rollup {(rolled - loaded) * 1000:.1f} ms")
+    missing = sorted(set(wanted) - set(facts))
+    if missing:
+        print(f"⚠️  No companyfacts for {len(missing)}: {', '.join(missing[:20])}")
+    print_ttm(companies, sorted(computed), args.limit)
+    if args.quarters:
+        for symbol in sorted(computed)[:args.limit]:
+            print_quarters(engine, symbol)
+
+    if args.write and (changed or checked):
+        from data_checks import check_before_save
+        from fetch_comprehensive_data import write_dataset
+        check_before_save(companies, published, 'quarterly')
+        for path in write_dataset(companies):
+            print(f"✓ Saved {path}")
+    elif args.write:
+        print("✓ No TTM changes to write")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Machine-readable run reports for the fetch/update scripts
+
+Each run writes data/run_report_<job>.json (next to last_updated.json) with:
+- Per-company fetch latency, bytes, parse time and wall time
+- Which GAAP aliases resolved for each metric
+- Failures with reasons
+- Run totals plus the full metrics snapshot from instrumentation.py
+
+Compare two reports to spot performance regressions and slow symbols:
+    python3 run_report.py diff old.json new.json
+    python3 run_report.py diff old.json new.json --threshold 1.5 --fail-on-regression
+
+Tip: the previous week's report is one `git show` away:
+    git show HEAD~1:data/run_report_comprehensive.json > /tmp/old.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+from instrumentation import Metrics
+
+REPORT_DIR = './data'
+REPORT_VERSION = 1
+
+
+def report_path(job: str) -> str:
+    return os.path.join(REPORT_DIR, f'run_report_{job}.json')
+
+
+class RunReport:
+    """Collects per-company outcomes for one run of one job"""
+
+    def __init__(self, job: str, metrics: Metrics):
+        self.job = job
+        self.metrics = metrics
+        self.companies: Dict[str, dict] = {}
+
+    def record(self, stats: dict, status: str, reason: Optional[str] = None,
+               aliases: Optional[Dict[str, str]] = None):
+        """
+        Record the outcome of one company.
+
+        `stats` comes from Metrics.begin_company()/end_company();
+        `status` is 'ok', 'failed' or 'skipped'.
+        """
+        entry = {
+            'status': status,
+            'wall_seconds': round(stats.get('wall_seconds', 0.0), 4),
+            'fetch_seconds': round(stats.get('fetch_seconds', 0.0), 4),
+            'parse_seconds': round(stats.get('parse_seconds', 0.0), 4),
+            'requests': stats.get('requests', 0),
+            'bytes': stats.get('bytes', 0),
+            'retries': stats.get('retries', 0)
+        }
+        if reason:
+            entry['reason'] = reason
+        if aliases:
+            entry['aliases'] = dict(sorted(aliases.items()))
+        self.companies[stats['symbol']] = entry
+
+    def totals(self) -> dict:
+        entries = self.companies.values()
+        by_status = {}
+        for entry in entries:
+            by_status[entry['status']] = by_status.get(entry['status'], 0) + 1
+        return {
+            'companies': len(self.companies),
+            'ok': by_status.get('ok', 0),
+            'failed': by_status.get('failed', 0),
+            'skipped': by_status.get('skipped', 0),
+            'requests': sum(e['requests'] for e in entries),
+            'bytes': sum(e['bytes'] for e in entries),
+            'retries': sum(e['retries'] for e in entries),
+            'fetch_seconds': round(sum(e['fetch_seconds'] for e in entries), 3),
+            'parse_seconds': round(sum(e['parse_seconds'] for e in entries), 3),
+            'company_seconds': round(sum(e['wall_seconds'] for e in entries), 3),
+            'run_seconds': round(time.time() - self.metrics.started_at, 3)
+        }
+
+    def to_dict(self) -> dict:
+        failures = [
+            {'symbol': symbol, 'reason': entry.get('reason', 'unknown')}
+            for symbol, entry in self.companies.items() if entry['status'] == 'failed'
+        ]
+        slowest = sorted(self.companies, key=lambda s: self.companies[s]['wall_seconds'], reverse=True)[:10]
+        return {
+            'version': REPORT_VERSION,
+            'job': self.job,
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime()),
+            'totals': self.totals(),
+            'slowest': slowest,
+            'failures': failures,
+            'companies': dict(sorted(self.companies.items())),
+            'metrics': self.metrics.to_dict()
+        }
+
+    def write(self, path: Optional[str] = None) -> str:
+        path = path or report_path(self.job)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        return path
+
+
+def load_report(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def diff_reports(old: dict, new: dict, threshold: float = 1.5, min_seconds: float = 0.25) -> dict:
+    """
+    Compare two run reports.
+
+    A company is a regression when its wall time grew by more than `threshold`x
+    and by at least `min_seconds` (so 10ms -> 30ms noise is ignored).
+    """
+    old_companies = old.get('companies', {})
+    new_companies = new.get('companies', {})
+
+    totals = {}
+    for key, new_value in new.get('totals', {}).items():
+        old_value = old.get('totals', {}).get(key)
+        if isinstance(new_value, (int, float)) and isinstance(old_value, (int, float)):
+            totals[key] = {
+                'old': old_value,
+                'new': new_value,
+                'change_pct': round((new_value - old_value) / old_value * 100, 1) if old_value else None
+            }
+
+    regressions: List[dict] = []
+    improvements: List[dict] = []
+    newly_failed: List[dict] = []
+    recovered: List[str] = []
+    alias_changes: List[dict] = []
+
+    for symbol, entry in new_companies.items():
+        previous = old_companies.get(symbol)
+        if previous is None:
+            continue
+
+        old_wall = previous.get('wall_seconds', 0.0)
+        new_wall = entry.get('wall_seconds', 0.0)
+        delta = new_wall - old_wall
+        if delta >= min_seconds and new_wall > old_wall * threshold:
+            regressions.append({'symbol': symbol, 'old': old_wall, 'new': new_wall, 'delta': round(delta, 4)})
+        elif -delta >= min_seconds and old_wall > new_wall * threshold:
+            improvements.append({'symbol': symbol, 'old': old_wall, 'new': new_wall, 'delta': round(delta, 4)})
+
+        if entry.get('status') == 'failed' and previous.get('status') != 'failed':
+            newly_failed.append({'symbol': symbol, 'reason': entry.get('reason', 'unknown')})
+        elif previous.get('status') == 'failed' and entry.get('status') == 'ok':
+            recovered.append(symbol)
+
+        old_aliases = previous.get('aliases', {})
+        for metric, alias in entry.get('aliases', {}).items():
+            if metric in old_aliases and old_aliases[metric] != alias:
+                alias_changes.append({'symbol': symbol, 'metric': metric, 'old': old_aliases[metric], 'new': alias})
+
+    regressions.sort(key=lambda r: r['delta'], reverse=True)
+    improvements.sort(key=lambda r: r['delta'])
+
+    return {
+        'totals': totals,
+        'regressions': regressions,
+        'improvements': improvements,
+        'newly_failed': newly_failed,
+        'recovered': sorted(recovered),
+        'alias_changes': alias_changes,
+        'added': sorted(set(new_companies) - set(old_companies)),
+        'removed': sorted(set(old_companies) - set(new_companies))
+    }
+
+
+def print_diff(diff: dict, top: int = 15):
+    """Human-readable rendering of diff_reports()"""
+    print("=" * 70)
+    print("RUN REPORT DIFF")
+    print("=" * 70)
+    for key, values in diff['totals'].items():
+        change = f"{values['change_pct']:+.1f}%" if values['change_pct'] is not None else "n/a"
+        print(f"  {key:18s} {values['old']:>14,} → {values['new']:>14,}  ({change})")
+
+    sections = [
+        ('🐢 Slower', diff['regressions']),
+        ('🚀 Faster', diff['improvements'])
+    ]
+    for title, rows in sections:
+        if rows:
+            print()
+            print(f"{title} ({len(rows)}):")
+            for row in rows[:top]:
+                print(f"  {row['symbol']:8s} {row['old']:8.3f}s → {row['new']:8.3f}s  ({row['delta']:+.3f}s)")
+            if len(rows) > top:
+                print(f"  ... and {len(rows) - top} more")
+
+    if diff['newly_failed']:
+        print()
+        print(f"✗ Newly failed ({len(diff['newly_failed'])}):")
+        for row in diff['newly_failed'][:top]:
+            print(f"  {row['symbol']:8s} {row['reason']}")
+    if diff['recovered']:
+        print()
+        print(f"✓ Recovered: {', '.join(diff['recovered'])}")
+    if diff['alias_changes']:
+        print()
+        print(f"⚠️  GAAP alias changes ({len(diff['alias_changes'])}):")
+        for row in diff['alias_changes'][:top]:
+            print(f"  {row['symbol']:8s} {row['metric']}: {row['old']} → {row['new']}")
+    if diff['added'] or diff['removed']:
+        print()
+        print(f"Added: {len(diff['added'])}, removed: {len(diff['removed'])}")
+    print()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Inspect and compare run reports')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    diff_parser = sub.add_parser('diff', help='Compare two run reports')
+    diff_parser.add_argument('old')
+    diff_parser.add_argument('new')
+    diff_parser.add_argument('--threshold', type=float, default=1.5,
+                             help='Slowdown factor that counts as a regression (default: 1.5)')
+    diff_parser.add_argument('--min-seconds', type=float, default=0.25,
+                             help='Ignore changes smaller than this (default: 0.25)')
+    diff_parser.add_argument('--top', type=int, default=15)
+    diff_parser.add_argument('--json', action='store_true', help='Print the diff as JSON')
+    diff_parser.add_argument('--fail-on-regression', action='store_true',
+                             help='Exit 1 if any company regressed or newly failed')
+
+    args = parser.parse_args(argv)
+
+    diff = diff_reports(load_report(args.old), load_report(args.new), args.threshold, args.min_seconds)
+    if args.json:
+        print(json.dumps(diff, indent=2))
+    else:
+        print_diff(diff, args.top)
+
+    if args.fail_on_regression and (diff['regressions'] or diff['newly_failed']):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
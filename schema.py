@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Typed schema for company records in data/financial_data.json
+
+Company is a __slots__ record with a declared type per known field. It is
+used to validate the dataset when a script loads it: wrong types, duplicate
+symbols and missing identity fields raise SchemaError listing every problem,
+instead of surfacing later as a KeyError or a bad chart.
+
+Unknown fields (e.g. analyst estimates added by other scripts) are kept
+as-is, and to_dict() preserves the original key order so a load/save round
+trip writes identical bytes.
+"""
+
+from typing import List
+
+import fastjson
+
+# Field -> type. Integers are USD amounts (or share counts); floats are ratios/percentages.
+STRING_FIELDS = ('symbol', 'name', 'sector', 'market_cap_updated')
+INTEGER_FIELDS = (
+    'year', 'revenue', 'earnings', 'capex', 'market_cap', 'operating_income', 'gross_profit',
+    'operating_cash_flow', 'total_assets', 'total_liabilities', 'stockholders_equity',
+    'long_term_debt', 'cash', 'rd_expense', 'shares_outstanding', 'free_cash_flow'
+)
+FLOAT_FIELDS = ('debt_to_equity', 'operating_margin', 'profit_margin')
+REQUIRED_FIELDS = ('symbol', 'name')
+
+FIELD_TYPES = {
+    **{name: str for name in STRING_FIELDS},
+    **{name: int for name in INTEGER_FIELDS},
+    **{name: float for name in FLOAT_FIELDS},
+}
+
+
+class SchemaError(ValueError):
+    """The dataset doesn't match the Company schema; .problems lists every issue"""
+
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        shown = '; '.join(problems[:10])
+        more = f' (+{len(problems) - 10} more)' if len(problems) > 10 else ''
+        super().__init__(f'{len(problems)} schema problem(s): {shown}{more}')
+
+
+def coerce(value, expected: type):
+    """Return value as `expected`, or raise TypeError"""
+    if value is None:
+        return None
+    if expected is int:
+        if isinstance(value, bool):
+            raise TypeError
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        raise TypeError
+    if expected is float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError
+        return float(value) if isinstance(value, int) else value
+    if not isinstance(value, expected):
+        raise TypeError
+    return value
+
+
+class Company:
+    """One company record. Known fields are typed attributes; anything else lives in `extra`."""
+    __slots__ = tuple(FIELD_TYPES) + ('extra', '_order')
+
+    def __init__(self, symbol: str, name: str, **fields):
+        for field in FIELD_TYPES:
+            setattr(self, field, None)
+        self.symbol = symbol
+        self.name = name
+        self.extra = {}
+        self._order = ['symbol', 'name']
+        for key, value in fields.items():
+            self[key] = value
+
+    @staticmethod
+    def checked(data: dict) -> dict:
+        """
+        Validate one record dict; returns it with integer fields normalised (a new dict
+        only if something needed coercing). Raises SchemaError listing every problem.
+        """
+        problems = []
+        values = data
+        for key, value in data.items():
+            expected = FIELD_TYPES.get(key)
+            if expected is None or value is None or type(value) is expected:
+                continue
+            try:
+                coerced = coerce(value, expected)
+            except TypeError:
+                problems.append(f"{data.get('symbol', '?')}.{key}: expected {expected.__name__}, "
+                                f"got {type(value).__name__} {value!r}")
+                continue
+            if values is data:
+                values = dict(data)
+            values[key] = coerced
+        for field in REQUIRED_FIELDS:
+            if not isinstance(data.get(field), str) or not data[field].strip():
+                problems.append(f"{data.get('symbol', '?')}: missing {field}")
+        if problems:
+            raise SchemaError(problems)
+        return values
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Company':
+        """Build and validate a record; raises SchemaError on any problem"""
+        values = cls.checked(data)
+        company = cls.__new__(cls)
+        for field in FIELD_TYPES:
+            setattr(company, field, None)
+        company.extra = {}
+        company._order = list(values)
+        for key, value in values.items():
+            if key in FIELD_TYPES:
+                setattr(company, key, value)
+            else:
+                company.extra[key] = value
+        return company
+
+    def __getitem__(self, key: str):
+        if key in FIELD_TYPES:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __setitem__(self, key: str, value):
+        if key in FIELD_TYPES:
+            setattr(self, key, coerce(value, FIELD_TYPES[key]))
+        else:
+            self.extra[key] = value
+        if key not in self._order:
+            self._order.append(key)
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key) if key in FIELD_TYPES else self.extra.get(key)
+        return default if value is None else value
+
+    def to_dict(self) -> dict:
+        """Plain dict in the original key order (fields never set are omitted)"""
+        return {key: getattr(self, key) if key in FIELD_TYPES else self.extra[key] for key in self._order}
+
+    def __repr__(self) -> str:
+        return f'Company({self.symbol!r}, {self.name!r})'
+
+
+def _validate(companies: list, build: bool) -> list:
+    problems = []
+    records = []
+    seen = set()
+    for i, data in enumerate(companies):
+        if not isinstance(data, dict):
+            problems.append(f'record {i}: expected object, got {type(data).__name__}')
+            continue
+        try:
+            records.append(Company.from_dict(data) if build else Company.checked(data))
+        except SchemaError as e:
+            problems.extend(e.problems)
+        symbol = data.get('symbol')
+        if symbol is not None and symbol in seen:
+            problems.append(f"{symbol}: duplicate symbol")
+        seen.add(symbol)
+    if problems:
+        raise SchemaError(problems)
+    return records
+
+
+def validate_companies(companies: List[dict]) -> List[Company]:
+    """Validate every record and check symbols are unique; raises SchemaError listing all problems"""
+    return _validate(companies, build=True)
+
+
+def _load_list(path: str) -> list:
+    companies = fastjson.load(path)
+    if not isinstance(companies, list):
+        raise SchemaError([f'{path}: expected a list of companies, got {type(companies).__name__}'])
+    return companies
+
+
+def load_companies(path: str, validate: bool = True) -> List[dict]:
+    """
+    Load the dataset with the fast JSON backend and validate each record
+    through Company.checked. Returns plain dicts (what the fetch scripts update in place), with
+    whole-number floats in integer fields normalised to int.
+    """
+    companies = _load_list(path)
+    if not validate:
+        return companies
+    return _validate(companies, build=False)
+
+
+def load_company_records(path: str) -> List[Company]:
+    """Load the dataset as typed Company records"""
+    return validate_companies(_load_list(path))
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Stock screener: a small filter/rank language compiled to NumPy over CompanyTable columns
+
+    operating_margin > 20% and debt_to_equity < 0.5 rank by fcf_yield desc limit 20
+    sector == "Technology" and market_cap > 500B rank by pe asc
+    rank by free_cash_flow / revenue desc
+
+Syntax:
+- fields: every numeric field of the dataset plus the derived ones in
+  DERIVED (fcf_yield, pe, roe, ...), and sector/name for == / != against
+  a string literal
+- numbers may carry a suffix: K M B T (thousand ... trillion) or % (a no-op:
+  margins and yields are already in percent, so 20% and 20 are the same)
+- arithmetic + - * /, comparisons < <= > >= == !=, and / or / not, parentheses,
+  abs(x), min(a, b), max(a, b), log(x)
+- optional `rank by <expr> [asc|desc]` (default desc) and `limit N`
+
+Missing values are NaN: a comparison involving one is false (so `not` of it
+is true), and rows whose rank key is missing are left out. A ratio with a
+non-positive denominator is missing, and so is a ratio of two annual metrics
+from different fiscal periods.
+
+An expression is parsed once into a tree of closures over whole columns, so a
+screen is a handful of vectorized operations. Compiled screens are cached by
+expression hash; results are cached by (expression hash, data version) and
+dropped when the data changes.
+
+Each version of the data is an immutable Snapshot. A new version replaces the
+snapshot instead of changing it, so a caller that takes `screener.data` once
+(the worker, per request) runs and renders against one version even while
+another thread loads the next.
+
+    python3 screener.py "operating_margin > 20% and debt_to_equity < 0.5 rank by fcf_yield desc"
+    python3 screener.py --file screens.txt --limit 10
+    python3 screener.py --fields
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+import schema
+from company_table import NUMERIC_DTYPES, CompanyTable
+
+DATA_FILE = './data/financial_data.json'
+RESULT_CACHE_SIZE = 512
+STRING_COLUMNS = ('sector', 'name')
+# Not tied to a fiscal period, so ratios against it are never period-checked
+POINT_IN_TIME = {'market_cap'}
+
+# name -> (numerator, denominator, scale): numerator / denominator * scale, positive denominators only
+DERIVED = {
+    'fcf_yield': ('free_cash_flow', 'market_cap', 100),
+    'earnings_yield': ('earnings', 'market_cap', 100),
+    'pe': ('market_cap', 'earnings', 1),
+    'ps': ('market_cap', 'revenue', 1),
+    'pb': ('market_cap', 'stockholders_equity', 1),
+    'fcf_margin': ('free_cash_flow', 'revenue', 100),
+    'gross_margin': ('gross_profit', 'revenue', 100),
+    'rd_intensity': ('rd_expense', 'revenue', 100),
+    'capex_intensity': ('capex', 'revenue', -100),
+    'roe': ('earnings', 'stockholders_equity', 100),
+    'roa': ('earnings', 'total_assets', 100),
+}
+SUFFIXES = {'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12, '%': 1}
+KEYWORDS = ('and', 'or', 'not', 'rank', 'by', 'asc', 'desc', 'limit')
+FUNCTIONS = {'abs': (1, np.abs), 'min': (2, np.minimum), 'max': (2, np.maximum), 'log': (1, None)}
+
+TOKEN = re.compile(r"""
+    \s*(?:
+      (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)(?P<suffix>[KMBT%])?
+    | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<string>"[^"]*"|'[^']*')
+    | (?P<op><=|>=|==|!=|[<>+\-*/(),])
+    )""", re.VERBOSE)
+
+Columns = Dict[str, np.ndarray]
+Node = Callable[[Columns], np.ndarray]
+
+
+class ScreenError(ValueError):
+    """An expression that doesn't parse or doesn't type-check; the message points at the position"""
+
+
+class Screen(NamedTuple):
+    """A compiled expression"""
+    text: str
+    key: str                    # hash of the normalized expression
+    fields: Tuple[str, ...]     # columns it reads
+    where: Optional[Node]
+    rank: Optional[Node]
+    descending: bool
+    limit: Optional[int]
+
+
+class Result(NamedTuple):
+    rows: np.ndarray            # matching rows, in rank order when ranked
+    values: Optional[np.ndarray]  # rank key per returned row
+
+
+class Snapshot(NamedTuple):
+    """One version of the data as screens read it; replaced, never modified"""
+    version: str
+    table: CompanyTable
+    columns: Columns
+    symbols: np.ndarray
+
+
+def tokenize(text: str) -> List[Tuple[str, str, int]]:
+    """(kind, value, position) tokens; kind is number, name, keyword, string or op"""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise ScreenError(f"unexpected {text[position:].strip()[:10]!r} at position {position}")
+        start = match.start(match.lastgroup)
+        if match.group('number') is not None:
+            value = float(match.group('number')) * SUFFIXES.get(match.group('suffix') or '', 1)
+            tokens.append(('number', value, start))
+        elif match.group('name') is not None:
+            name = match.group('name')
+            tokens.append(('keyword' if name.lower() in KEYWORDS else 'name',
+                           name.lower() if name.lower() in KEYWORDS else name, start))
+        elif match.group('string') is not None:
+            tokens.append(('string', match.group('string')[1:-1], start))
+        else:
+            tokens.append(('op', match.group('op'), start))
+        position = match.end()
+    return tokens
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+class _Parser:
+    """Recursive descent over the token list; every method returns (kind, node) with kind 'num', 'bool' or 'str'"""
+
+    def __init__(self, text: str, fields: Sequence[str]):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.position = 0
+        self.known = set(fields)
+        self.used: List[str] = []
+
+    def peek(self, value: Optional[str] = None) -> bool:
+        if self.position >= len(self.tokens):
+            return False
+        kind, token_value, _ = self.tokens[self.position]
+        return value is None or token_value == value and kind in ('op', 'keyword')
+
+    def take(self) -> Tuple[str, object, int]:
+        if self.position >= len(self.tokens):
+            raise ScreenError(f'unexpected end of expression at position {len(self.text)}')
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def expect(self, value: str):
+        if not self.peek(value):
+            where = self.tokens[self.position][2] if self.position < len(self.tokens) else len(self.text)
+            raise ScreenError(f"expected {value!r} at position {where}")
+        self.position += 1
+
+    def fail(self, message: str, token: Tuple[str, object, int]):
+        raise ScreenError(f"{message} at position {token[2]}")
+
+    def screen(self) -> Tuple[Optional[Node], Optional[Node], bool, Optional[int]]:
+        where = rank = None
+        descending = True
+        limit = None
+        if self.tokens and not self.peek('rank') and not self.peek('limit'):
+            token = self.tokens[0]
+            kind, where = self.disjunction()
+            if kind != 'bool':
+                self.fail('a filter must be a comparison', token)
+        if self.peek('rank'):
+            self.take()
+            self.expect('by')
+            token = self.tokens[self.position] if self.position < len(self.tokens) else ('', '', len(self.text))
+            kind, rank = self.additive()
+            if kind != 'num':
+                self.fail('rank by needs a numeric expression', token)
+            if self.peek('asc') or self.peek('desc'):
+                descending = self.take()[1] == 'desc'
+        if self.peek('limit'):
+            self.take()
+            token = self.take()
+            if token[0] != 'number' or token[1] < 1 or token[1] != int(token[1]):
+                self.fail('limit needs a positive integer', token)
+            limit = int(token[1])
+        if self.position < len(self.tokens):
+            self.fail(f"unexpected {self.tokens[self.position][1]!r}", self.tokens[self.position])
+        return where, rank, descending, limit
+
+    def disjunction(self):
+        kind, node = self.conjunction()
+        while self.peek('or'):
+            token = self.take()
+            other_kind, other = self.conjunction()
+            self.check_bool(kind, other_kind, token)
+            node = (lambda a, b: lambda c: a(c) | b(c))(node, other)
+        return kind, node
+
+    def conjunction(self):
+        kind, node = self.negation()
+        while self.peek('and'):
+            token = self.take()
+            other_kind, other = self.negation()
+            self.check_bool(kind, other_kind, token)
+            node = (lambda a, b: lambda c: a(c) & b(c))(node, other)
+        return kind, node
+
+    def negation(self):
+        if self.peek('not'):
+            token = self.take()
+            kind, node = self.negation()
+            self.check_bool(kind, 'bool', token)
+            return 'bool', (lambda a: lambda c: ~a(c))(node)
+        return self.comparison()
+
+    def check_bool(self, a: str, b: str, token):
+        if a != 'bool' or b != 'bool':
+            self.fail(f"{token[1]!r} needs comparisons on both sides", token)
+
+    def comparison(self):
+        kind, node = self.additive()
+        if not any(self.peek(op) for op in ('<', '<=', '>', '>=', '==', '!=')):
+            return kind, node
+        token = self.take()
+        op = token[1]
+        other_kind, other = self.additive()
+        if 'str' in (kind, other_kind):
+            if kind != other_kind or op not in ('==', '!='):
+                self.fail(f"text fields only support == and != against a string", token)
+        elif kind != 'num' or other_kind != 'num':
+            self.fail(f"{op!r} compares numbers", token)
+        compare = {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+                   '==': np.equal, '!=': np.not_equal}[op]
+        if kind == 'str':
+            return 'bool', (lambda a, b: lambda c: compare(a(c), b(c)))(node, other)
+
+        def numeric(c, a=node, b=other):
+            x, y = a(c), b(c)
+            return compare(x, y) & ~(np.isnan(x) | np.isnan(y))      # missing never matches, even for !=
+        return 'bool', numeric
+
+    def additive(self):
+        kind, node = self.term()
+        while self.peek('+') or self.peek('-'):
+            token = self.take()
+            other_kind, other = self.term()
+            self.check_num(kind, other_kind, token)
+            operation = np.add if token[1] == '+' else np.subtract
+            node = (lambda a, b, f: lambda c: f(a(c), b(c)))(node, other, operation)
+        return kind, node
+
+    def term(self):
+        kind, node = self.unary()
+        while self.peek('*') or self.peek('/'):
+            token = self.take()
+            other_kind, other = self.unary()
+            self.check_num(kind, other_kind, token)
+            if token[1] == '*':
+                node = (lambda a, b: lambda c: a(c) * b(c))(node, other)
+            else:
+                node = (lambda a, b: lambda c: _ratio(a(c), b(c)))(node, other)
+        return kind, node
+
+    def check_num(self, a: str, b: str, token):
+        if a != 'num' or b != 'num':
+            self.fail(f"{token[1]!r} needs numbers on both sides", token)
+
+    def unary(self):
+        if self.peek('-'):
+            token = self.take()
+            kind, node = self.unary()
+            self.check_num(kind, 'num', token)
+            return 'num', (lambda a: lambda c: -a(c))(node)
+        return self.primary()
+
+    def primary(self):
+        token = self.take()
+        kind, value, _ = token
+        if kind == 'number':
+            return 'num', (lambda v: lambda c: v)(value)
+        if kind == 'string':
+            return 'str', (lambda v: lambda c: v)(value)
+        if kind == 'op' and value == '(':
+            result = self.disjunction()
+            self.expect(')')
+            return result
+        if kind == 'name':
+            if self.peek('('):
+                return self.call(token)
+            if value not in self.known:
+                close = [f for f in self.known if f.startswith(value[:3])]
+                hint = f" (did you mean {', '.join(sorted(close)[:3])}?)" if close else ''
+                self.fail(f"unknown field {value!r}{hint}", token)
+            if value not in self.used:
+                self.used.append(value)
+            return ('str' if value in STRING_COLUMNS else 'num'), (lambda name: lambda c: c[name])(value)
+        self.fail(f"unexpected {value!r}", token)
+
+    def call(self, token):
+        name = token[1].lower()
+        if name not in FUNCTIONS:
+            self.fail(f"unknown function {token[1]!r}", token)
+        arity, function = FUNCTIONS[name]
+        self.expect('(')
+        args = []
+        while True:
+            kind, node = self.additive()
+            self.check_num(kind, 'num', token)
+            args.append(node)
+            if not self.peek(','):
+                break
+            self.take()
+        self.expect(')')
+        if len(args) != arity:
+            self.fail(f"{name}() takes {arity} argument{'s' if arity > 1 else ''}", token)
+        if name == 'log':
+            def log(c, a=args[0]):
+                x = a(c)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    return np.where(x > 0, np.log(np.where(x > 0, x, 1)), np.nan)
+            return 'num', log
+        if arity == 1:
+            return 'num', (lambda f, a: lambda c: f(a(c)))(function, args[0])
+        return 'num', (lambda f, a, b: lambda c: f(a(c), b(c)))(function, args[0], args[1])
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.split())
+
+
+def expression_key(text: str) -> str:
+    return hashlib.sha256(normalize(text).encode('utf-8')).hexdigest()[:16]
+
+
+def table_columns(table: CompanyTable) -> Columns:
+    """float64 column per numeric and derived field (NaN where missing), object arrays for text fields"""
+    columns: Columns = {}
+    for name in NUMERIC_DTYPES:
+        values, valid = table.column(name)
+        columns[name] = np.where(valid, values.astype(np.float64), np.nan)
+    for name, (numerator, denominator, scale) in DERIVED.items():
+        ratio = _ratio(columns[numerator], columns[denominator]) * scale
+        if POINT_IN_TIME.isdisjoint((numerator, denominator)):
+            ratio = np.where(table.aligned(numerator, denominator), ratio, np.nan)
+        columns[name] = ratio
+    columns['sector'] = np.array(table.strings['sector'], object)
+    columns['name'] = np.array(table.strings['name'], object)
+    return columns
+
+
+def fields() -> List[str]:
+    return [name for name in NUMERIC_DTYPES if name != 'year'] + list(DERIVED) + list(STRING_COLUMNS)
+
+
+class Screener:
+    """Compiles screens (cached by expression hash) and runs them over one version of the data"""
+
+    def __init__(self, table: CompanyTable, version: str = ''):
+        self._compiled: Dict[str, Screen] = {}
+        self._results: 'OrderedDict[Tuple[str, str], Result]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.update(table, version)
+
+    @classmethod
+    def load(cls, path: str = DATA_FILE) -> 'Screener':
+        screener = cls(CompanyTable(0), '')
+        screener.refresh(path)
+        return screener
+
+    @property
+    def version(self) -> str:
+        return self.data.version
+
+    @property
+    def table(self) -> CompanyTable:
+        return self.data.table
+
+    @property
+    def columns(self) -> Columns:
+        return self.data.columns
+
+    @property
+    def symbols(self) -> np.ndarray:
+        return self.data.symbols
+
+    def update(self, table: CompanyTable, version: str):
+        """New data: publish a new snapshot and drop every cached result"""
+        data = Snapshot(version, table, table_columns(table), np.array(table.symbols, object))
+        with self._lock:
+            self.data = data
+            self._results.clear()
+
+    def refresh(self, path: str = DATA_FILE) -> bool:
+        """Reload the dataset file if it changed since the last load; True when it did"""
+        stat = os.stat(path)
+        version = f'{stat.st_mtime_ns}-{stat.st_size}'
+        if version == self.version:
+            return False
+        self.update(CompanyTable.from_records(schema.load_companies(path)), version)
+        return True
+
+    def compile(self, text: str) -> Screen:
+        key = expression_key(text)
+        screen = self._compiled.get(key)
+        if screen is None:
+            parser = _Parser(normalize(text), fields())
+            where, rank, descending, limit = parser.screen()
+            screen = self._compiled[key] = Screen(normalize(text), key, tuple(parser.used), where, rank,
+                                                  descending, limit)
+        return screen
+
+    def run(self, text: str, data: Optional[Snapshot] = None) -> Result:
+        """Run a screen over `data` (default: the current snapshot)"""
+        data = data or self.data
+        screen = self.compile(text)
+        cache_key = (screen.key, data.version)
+        with self._lock:
+            result = self._results.get(cache_key)
+            if result is not None:
+                self.hits += 1
+                self._results.move_to_end(cache_key)
+                return result
+            self.misses += 1
+        result = self.evaluate(screen, data)
+        with self._lock:
+            if data is self.data:           # a result for a replaced snapshot is never looked up again
+                self._results[cache_key] = result
+                if len(self._results) > RESULT_CACHE_SIZE:
+                    self._results.popitem(last=False)
+        return result
+
+    def evaluate(self, screen: Screen, data: Optional[Snapshot] = None) -> Result:
+        data = data or self.data
+        size = len(data.symbols)
+        mask = np.ones(size, bool)
+        if screen.where is not None:
+            mask &= np.broadcast_to(screen.where(data.columns), (size,))
+        values = None
+        if screen.rank is not None:
+            key = np.broadcast_to(np.asarray(screen.rank(data.columns), np.float64), (size,))
+            mask &= np.isfinite(key)
+            rows = np.flatnonzero(mask)
+            order = np.argsort(-key[rows] if screen.descending else key[rows], kind='stable')
+            rows = rows[order]
+            values = key[rows]
+        else:
+            rows = np.flatnonzero(mask)
+        if screen.limit is not None:
+            rows = rows[:screen.limit]
+            values = values[:screen.limit] if values is not None else None
+        return Result(rows, values)
+
+    def records(self, result: Result, columns: Sequence[str] = (), data: Optional[Snapshot] = None) -> List[dict]:
+        """Result rows as dicts: symbol, name, sector, rank value and the requested columns (from the run's `data`)"""
+        data = data or self.data
+        records = []
+        for i, row in enumerate(result.rows.tolist()):
+            record = {'symbol': data.symbols[row], 'name': data.columns['name'][row],
+                      'sector': data.columns['sector'][row]}
+            if result.values is not None:
+                record['rank'] = round(float(result.values[i]), 4)
+            for name in columns:
+                value = data.columns[name][row]
+                record[name] = value if isinstance(value, str) or value is None else \
+                    (None if np.isnan(value) else round(float(value), 4))
+            records.append(record)
+        return records
+
+
+def print_result(screener: Screener, text: str, limit: int, elapsed_ms: float):
+    screen = screener.compile(text)
+    result = screener.run(text)
+    shown = [f for f in screen.fields if f not in STRING_COLUMNS]
+    print(f"\n🔎 {screen.text}")
+    print(f"{'-'*80}")
+    print(f"{len(result.rows)} companies ({elapsed_ms:.2f} ms)")
+    for record in screener.records(result, shown)[:limit]:
+        values = '  '.join(f"{name}={record[name]:g}" if record[name] is not None else f"{name}=-" for name in shown)
+        rank = f"{record['rank']:>12,.2f}  " if 'rank' in record else ''
+        print(f"  {record['symbol']:6s} {rank}{values}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Screen the dataset with filter/rank expressions')
+    parser.add_argument('expressions', nargs='*', help='e.g. "operating_margin > 20% rank by fcf_yield desc"')
+    parser.add_argument('--file', help='Screens to run, one per line (# comments)')
+    parser.add_argument('--data', default=DATA_FILE)
+    parser.add_argument('--limit', type=int, default=20, help='Rows printed per screen')
+    parser.add_argument('--fields', action='store_true', help='List the fields screens can use')
+    args = parser.parse_args(argv)
+
+    if args.fields:
+        for name in fields():
+            derived = DERIVED.get(name)
+            note = f"  = {derived[0]} / {derived[1]}{' x ' + str(abs(derived[2])) if abs(derived[2]) != 1 else ''}" \
+                if derived else ''
+            print(f"  {name}{note}")
+        return 0
+
+    expressions = list(args.expressions)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            expressions += [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    if not expressions:
+        parser.error('give an expression or --file')
+
+    screener = Screener.load(args.data)
+    failed = 0
+    for text in expressions:
+        try:
+            start = time.perf_counter()
+            screener.run(text)
+            print_result(screener, text, args.limit, (time.perf_counter() - start) * 1000)
+        except ScreenError as e:
+            failed += 1
+            print(f"\n✗ {text}\n  {e}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
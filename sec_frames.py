@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+SEC XBRL frames: one concept for every filer in a single request
+
+A frame (/api/xbrl/frames/us-gaap/<concept>/<unit>/<period>.json) holds the
+latest-filed value of one concept for every company, for one calendar period:
+- CY2023      annual durations (about a year) that mostly fall in 2023
+- CY2023Q3I   instants closest to the end of 2023 Q3 (balance sheet items,
+              share counts)
+
+fetch_comprehensive_data.py --frames reads these instead of one companyfacts
+document per company. A refresh then costs (duration aliases x years) +
+(instant aliases x fiscal-year-end quarters) requests, whatever the size of
+the universe. Each frame is parsed into sorted NumPy arrays and joined
+against our CIKs with one searchsorted. Periods are then picked for all
+companies at once, with the same rules as select_period_facts():
+- the latest fiscal year end for revenue or earnings;
+- per metric, the first alias reported for that year end.
+"""
+
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+import endpoints
+
+SEC_FRAMES_URL = endpoints.SEC_FRAMES_URL
+
+# Balance sheet items and share counts are instants; everything else is an annual duration
+INSTANT_METRICS = ('total_assets', 'total_liabilities', 'stockholders_equity', 'long_term_debt', 'cash',
+                   'shares_outstanding')
+UNITS = {'shares_outstanding': 'shares'}
+NO_END = np.datetime64('NaT', 'D')
+
+# (metric, alias, period) -> joined column
+FrameKey = Tuple[str, str, str]
+
+
+class Frame(NamedTuple):
+    """One frame as arrays sorted by CIK"""
+    cik: np.ndarray     # int64
+    end: np.ndarray     # datetime64[D]
+    val: np.ndarray     # int64
+
+
+class Joined(NamedTuple):
+    """A frame joined onto our rows: value and period end per row, and whether the filer was in the frame"""
+    val: np.ndarray
+    end: np.ndarray
+    found: np.ndarray
+
+
+def unit(metric: str) -> str:
+    return UNITS.get(metric, 'USD')
+
+
+def frame_url(concept: str, unit_name: str, period: str) -> str:
+    return SEC_FRAMES_URL.format(concept=concept, unit=unit_name, period=period)
+
+
+def annual_period(year: int) -> str:
+    return f'CY{year}'
+
+
+def instant_period(end) -> str:
+    """The instant frame a fiscal year end falls in: the calendar quarter whose last day is nearest"""
+    # Nearest quarter end = the one just before (end - 45 days) ends its quarter
+    months = (np.datetime64(end, 'D') - np.timedelta64(45, 'D')).astype('datetime64[M]').astype(np.int64)
+    year, month_index = divmod(int(months), 12)
+    return f'CY{1970 + year}Q{month_index // 3 + 1}I'
+
+
+def parse_frame(data: dict) -> Frame:
+    """Frame JSON -> arrays sorted by CIK (values that aren't whole numbers are rounded)"""
+    rows = [item for item in data.get('data') or []
+            if item.get('cik') and item.get('end') and item.get('val') is not None]
+    cik = np.fromiter((item['cik'] for item in rows), np.int64, len(rows))
+    end = np.array([item['end'] for item in rows], 'datetime64[D]') if rows else np.array([], 'datetime64[D]')
+    val = np.rint(np.fromiter((item['val'] for item in rows), np.float64, len(rows))).astype(np.int64)
+    order = np.argsort(cik, kind='stable')
+    return Frame(cik[order], end[order], val[order])
+
+
+def join(frame: Frame, ciks: np.ndarray) -> Joined:
+    """Look up every row's CIK (0 = unknown) in a frame at once"""
+    if not len(frame.cik):
+        return Joined(np.zeros(len(ciks), np.int64), np.full(len(ciks), NO_END), np.zeros(len(ciks), bool))
+    positions = np.minimum(np.searchsorted(frame.cik, ciks), len(frame.cik) - 1)
+    found = (frame.cik[positions] == ciks) & (ciks > 0)
+    return Joined(np.where(found, frame.val[positions], 0), np.where(found, frame.end[positions], NO_END), found)
+
+
+def latest_end(columns: Sequence[Joined], size: int) -> np.ndarray:
+    """Per row, the latest period end across some joined frames (NaT where none reported)"""
+    latest = np.full(size, NO_END)
+    for column in columns:
+        later = column.found & (np.isnat(latest) | (column.end > latest))
+        latest = np.where(later, column.end, latest)
+    return latest
+
+
+def target_ends(joined: Dict[FrameKey, Joined], anchors: Sequence[str], size: int) -> np.ndarray:
+    """The fiscal year end each row is reported for: latest anchor metric end, else latest of any metric"""
+    target = latest_end([column for (metric, _, _), column in joined.items() if metric in anchors], size)
+    fallback = latest_end(list(joined.values()), size)
+    return np.where(np.isnat(target), fallback, target)
+
+
+def instant_periods(target: np.ndarray) -> List[str]:
+    """Instant frames needed to read the balance sheet at every row's fiscal year end"""
+    return sorted({instant_period(end) for end in np.unique(target[~np.isnat(target)])})
+
+
+def select(joined: Dict[FrameKey, Joined], metrics_map: Dict[str, list],
+           target: np.ndarray) -> Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    {metric: (values, found, aliases)} for the rows' target period: the first
+    alias in metrics_map with a value for the row's target end wins
+    """
+    size = len(target)
+    selected = {}
+    for metric, aliases in metrics_map.items():
+        values = np.zeros(size, np.int64)
+        found = np.zeros(size, bool)
+        chosen = np.full(size, None, object)
+        for alias in aliases:
+            for (m, a, _), column in joined.items():
+                if m != metric or a != alias:
+                    continue
+                hit = column.found & ~found & (column.end == target)
+                values = np.where(hit, column.val, values)
+                chosen[hit] = alias
+                found |= hit
+        selected[metric] = (values, found, chosen)
+    return selected
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Per-company detail shards for lazy loading
+
+Next to financial_data.json every save also writes:
+- companies/<SYMBOL>.<hash>.json   one company's full record (compact JSON).
+                                   The name includes a hash of the content,
+                                   so a shard never changes once published
+                                   and can be cached forever.
+- index.json                       {"version", "count", "companies": [...]}
+                                   with symbol, name, sector, market_cap and
+                                   the shard path per company - enough to
+                                   render the list and fetch details on demand.
+
+Only new shards are written. A shard is deleted once neither the current nor
+the previous index references it, so a client holding the previous index
+can still fetch its shards.
+
+Rebuild the shards from the committed dataset:
+    python3 shards.py
+"""
+
+import hashlib
+import os
+import re
+from typing import Dict, List, Tuple
+
+import fastjson
+
+SHARD_VERSION = 1
+SHARD_DIR = 'companies'
+INDEX_FILE = 'index.json'
+INDEX_FIELDS = ('symbol', 'name', 'sector', 'market_cap')
+HASH_LENGTH = 12
+DATA_DIRS = ('./data', './public/data')
+
+
+def shard_path(symbol: str, body: bytes) -> str:
+    """Path of a shard relative to the data directory, e.g. companies/BRK.B.3f2a9c1d0e4b.json"""
+    digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+    return f"{SHARD_DIR}/{re.sub(r'[^A-Za-z0-9.-]', '_', symbol)}.{digest}.json"
+
+
+def build_shards(records: List[dict]) -> Tuple[dict, Dict[str, bytes]]:
+    """(index, {shard path: body}) for a list of company records"""
+    shards = {}
+    entries = []
+    for record in records:
+        body = fastjson.dumps(record)
+        path = shard_path(record['symbol'], body)
+        shards[path] = body
+        entry = {field: record.get(field) for field in INDEX_FIELDS}
+        entry['shard'] = path
+        entries.append(entry)
+    index = {'version': SHARD_VERSION, 'count': len(entries), 'companies': entries}
+    return index, shards
+
+
+def _referenced(index_path: str) -> set:
+    try:
+        return {entry['shard'] for entry in fastjson.load(index_path).get('companies', [])}
+    except (OSError, ValueError, AttributeError, KeyError, TypeError):
+        return set()
+
+
+def write_shards(records: List[dict], data_dir: str = './data') -> dict:
+    """Write the shards and index for `records` under data_dir; returns counts of what changed"""
+    index, shards = build_shards(records)
+    shard_dir = os.path.join(data_dir, SHARD_DIR)
+    index_path = os.path.join(data_dir, INDEX_FILE)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    written = 0
+    for path, body in shards.items():
+        target = os.path.join(data_dir, path)
+        if not os.path.exists(target):
+            with open(target, 'wb') as f:
+                f.write(body)
+            written += 1
+
+    # Keep the previous generation's shards for clients still holding the old index
+    keep = set(shards) | _referenced(index_path)
+    removed = 0
+    for name in os.listdir(shard_dir):
+        if f'{SHARD_DIR}/{name}' not in keep and name.endswith('.json'):
+            os.remove(os.path.join(shard_dir, name))
+            removed += 1
+
+    # Readers never see a half-written index
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(fastjson.dumps_pretty(index))
+    os.replace(tmp_path, index_path)
+
+    return {'index': index_path, 'shards': len(shards), 'written': written, 'removed': removed}
+
+
+def publish_shards(records: List[dict], data_dirs=DATA_DIRS) -> List[dict]:
+    """write_shards() into every published data directory"""
+    return [write_shards(records, data_dir) for data_dir in data_dirs]
+
+
+def describe(result: dict) -> str:
+    return (f"{result['index']} ({result['shards']} shards, {result['written']} new, "
+            f"{result['removed']} removed)")
+
+
+def main() -> int:
+    records = fastjson.load(os.path.join(DATA_DIRS[0], 'financial_data.json'))
+    for result in publish_shards(records):
+        print(f"✓ Sharded to {describe(result)}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+SQLite analytical store: every published snapshot of the dataset, queryable by period
+
+publish_dataset() upserts each save into data/financial.db:
+- companies   symbol, name, sector, first/last snapshot it appeared in
+- snapshots   one row per distinct financial_data.json (hash, version, time)
+- facts       (symbol, metric, period) -> value, fiscal year, period end and
+              the snapshot that last changed it. Annual metrics use period
+              'FY2024'; market cap is point-in-time ('2025-10-03').
+
+A fiscal year published in several snapshots is one row (restatements
+overwrite it), so facts grow with new periods, not with saves. The primary
+key is the (symbol, metric, period) index; a second, covering index on
+(metric, period) serves cross-sectional queries without touching the table. WAL mode lets readers (the worker) query
+while a fetch writes.
+
+The database is an index over the committed JSON, so it is not committed:
+rebuild it from git history with `python3 store.py backfill`.
+
+Queries:
+    python3 store.py history AAPL revenue,earnings
+    python3 store.py rising free_cash_flow/revenue --years 3     # rose three fiscal years running
+    python3 store.py top operating_margin --fy 2024
+    python3 store.py sql "SELECT metric, COUNT(*) FROM facts GROUP BY metric"
+"""
+
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import deltas
+import fastjson
+import schema
+
+STORE_VERSION = 1
+DB_NAME = 'financial.db'
+DB_FILE = os.path.join('./data', DB_NAME)
+DATA_FILE = './data/financial_data.json'
+
+# Stored metrics; 'year' is the fiscal year itself
+METRICS = tuple(f for f in schema.INTEGER_FIELDS + schema.FLOAT_FIELDS if f != 'year')
+POINT_IN_TIME = {'market_cap': 'market_cap_updated'}
+# A derived metric belongs to the period of its inputs
+DERIVED_FROM = {'free_cash_flow': 'operating_cash_flow', 'debt_to_equity': 'stockholders_equity',
+                'operating_margin': 'revenue', 'profit_margin': 'revenue'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    version INTEGER,
+    taken_at TEXT NOT NULL,
+    companies INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS companies (
+    symbol TEXT PRIMARY KEY,
+    name TEXT,
+    sector TEXT,
+    first_snapshot INTEGER REFERENCES snapshots(id),
+    last_snapshot INTEGER REFERENCES snapshots(id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS facts (
+    symbol TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    period TEXT NOT NULL,
+    fy INTEGER,
+    period_end TEXT,
+    value REAL NOT NULL,
+    snapshot INTEGER REFERENCES snapshots(id),
+    PRIMARY KEY (symbol, metric, period)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS facts_by_metric ON facts (metric, period, fy, value);
+"""
+
+UPSERT_FACT = """
+INSERT INTO facts (symbol, metric, period, fy, period_end, value, snapshot) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (symbol, metric, period) DO UPDATE SET
+    fy = excluded.fy, period_end = excluded.period_end, value = excluded.value, snapshot = excluded.snapshot
+WHERE facts.value IS NOT excluded.value OR facts.period_end IS NOT excluded.period_end
+"""
+
+UPSERT_COMPANY = """
+INSERT INTO companies (symbol, name, sector, first_snapshot, last_snapshot) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (symbol) DO UPDATE SET name = excluded.name, sector = excluded.sector,
+    last_snapshot = excluded.last_snapshot
+"""
+
+Fact = Tuple[str, str, str, Optional[int], Optional[str], float]
+
+
+def connect(path: str = DB_FILE, readonly: bool = False) -> sqlite3.Connection:
+    """Open (creating if needed) the store; read-only connections never create or migrate it"""
+    if readonly:
+        conn = sqlite3.connect(f'file:{os.path.abspath(path)}?mode=ro', uri=True, check_same_thread=False)
+    else:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        conn.execute('INSERT OR IGNORE INTO meta VALUES (?, ?)', ('store_version', str(STORE_VERSION)))
+        conn.commit()
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def facts_of(record: dict) -> List[Fact]:
+    """(symbol, metric, period, fy, period end, value) for every numeric metric in one record"""
+    symbol = record['symbol']
+    periods = record.get('periods') or {}
+    year = record.get('year')
+    facts = []
+    for metric in METRICS:
+        value = record.get(metric)
+        if value is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if metric in POINT_IN_TIME:
+            stamp = record.get(POINT_IN_TIME[metric]) or ''
+            if not stamp:
+                continue
+            facts.append((symbol, metric, stamp[:10], int(stamp[:4]), stamp[:10], float(value)))
+            continue
+        period = periods.get(metric) or periods.get(DERIVED_FROM.get(metric, '')) or {}
+        fy = period.get('fy') or year
+        if not fy:
+            continue
+        facts.append((symbol, metric, f'FY{fy}', int(fy), period.get('end'), float(value)))
+    return facts
+
+
+def upsert(conn: sqlite3.Connection, records: Sequence[dict], dataset_hash: str, version: Optional[int] = None,
+           taken_at: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Record one snapshot of the dataset in a single transaction.
+    Returns (snapshot id, facts written); an already stored snapshot writes nothing.
+    """
+    taken_at = taken_at or time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    with conn:
+        row = conn.execute('SELECT id FROM snapshots WHERE hash = ?', (dataset_hash,)).fetchone()
+        if row is not None:
+            return row[0], 0
+        snapshot = conn.execute('INSERT INTO snapshots (hash, version, taken_at, companies) VALUES (?, ?, ?, ?)',
+                                (dataset_hash, version, taken_at, len(records))).lastrowid
+        conn.executemany(UPSERT_COMPANY, [(r['symbol'], r.get('name'), r.get('sector'), snapshot, snapshot)
+                                          for r in records])
+        before = conn.total_changes
+        conn.executemany(UPSERT_FACT, [fact + (snapshot,) for record in records for fact in facts_of(record)])
+        return snapshot, conn.total_changes - before
+
+
+def record_snapshot(records: Sequence[dict], dataset_hash: str, version: Optional[int] = None,
+                    path: str = DB_FILE) -> str:
+    """The publish step: upsert one save; returns a line for progress output"""
+    start = time.perf_counter()
+    conn = connect(path)
+    try:
+        snapshot, written = upsert(conn, records, dataset_hash, version)
+    finally:
+        conn.close()
+    return f"{path} (snapshot {snapshot}, {written} facts upserted in {(time.perf_counter() - start) * 1000:.0f} ms)"
+
+
+def git_snapshots(path: str = DATA_FILE) -> Iterable[Tuple[str, str, bytes]]:
+    """(commit, commit time, file contents) for every committed version of the dataset, oldest first"""
+    relative = os.path.relpath(path)
+    log = subprocess.run(['git', 'log', '--reverse', '--format=%H %cI', '--', relative],
+                         capture_output=True, text=True, check=True).stdout.split('\n')
+    for line in filter(None, log):
+        commit, committed = line.split(' ', 1)
+        shown = subprocess.run(['git', 'show', f'{commit}:{relative}'], capture_output=True)
+        if shown.returncode == 0:
+            yield commit, committed, shown.stdout
+
+
+# ----------------------------------------------------------------------
+# Queries
+# ----------------------------------------------------------------------
+
+def metric_series(metric: str, since_fy: Optional[int] = None) -> Tuple[str, list]:
+    """
+    SQL (symbol, fy, value) rows for an annual metric, or for a ratio of two
+    ('free_cash_flow/revenue', positive denominators only), optionally from
+    one fiscal year on (a range on the (metric, period) index)
+    """
+    first = f'FY{since_fy}' if since_fy else 'FY'
+    if '/' in metric:
+        numerator, denominator = metric.split('/', 1)
+        return ("SELECT n.symbol, n.fy, n.value / d.value AS value FROM facts n "
+                "JOIN facts d ON d.symbol = n.symbol AND d.metric = ? AND d.period = n.period "
+                "WHERE n.metric = ? AND n.period >= ? AND n.period < 'FZ' AND d.value > 0",
+                [denominator, numerator, first])
+    return "SELECT symbol, fy, value FROM facts WHERE metric = ? AND period >= ? AND period < 'FZ'", [metric, first]
+
+
+def latest_fy(conn: sqlite3.Connection, metric: str) -> Optional[int]:
+    """Latest fiscal year reported for a metric (the numerator of a ratio)"""
+    period = conn.execute("SELECT MAX(period) FROM facts WHERE metric = ? AND period >= 'FY' AND period < 'FZ'",
+                          [metric.split('/', 1)[0]]).fetchone()[0]
+    return int(period[2:]) if period else None
+
+
+def history(conn: sqlite3.Connection, symbol: str, metrics: Sequence[str]) -> List[sqlite3.Row]:
+    """Every period of some metrics for one company, oldest first"""
+    marks = ','.join('?' * len(metrics))
+    return conn.execute(f"SELECT metric, period, fy, period_end, value FROM facts "
+                        f"WHERE symbol = ? AND metric IN ({marks}) ORDER BY metric, period",
+                        [symbol, *metrics]).fetchall()
+
+
+def rising(conn: sqlite3.Connection, metric: str, years: int = 3, falling: bool = False) -> List[sqlite3.Row]:
+    """
+    Companies whose metric (or ratio) moved the same way in each of their
+    last `years` consecutive fiscal years: (symbol, from_fy, to_fy, first, last).
+    Series that end more than a year before the latest fiscal year are left out.
+    """
+    latest = latest_fy(conn, metric)
+    if latest is None:
+        return []
+    series, params = metric_series(metric, since_fy=latest - years - 1)
+    compare = '<' if falling else '>'
+    return conn.execute(f"""
+        WITH series AS ({series}),
+        recent AS (
+            SELECT symbol, fy, value, ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY fy DESC) AS n FROM series
+        ),
+        steps AS (
+            SELECT symbol, fy, value,
+                   LAG(value) OVER ordered AS previous,
+                   LAG(fy) OVER ordered AS previous_fy,
+                   FIRST_VALUE(value) OVER whole AS first,
+                   LAST_VALUE(value) OVER whole AS last
+            FROM recent WHERE n <= ?
+            WINDOW ordered AS (PARTITION BY symbol ORDER BY fy),
+                   whole AS (PARTITION BY symbol ORDER BY fy ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+        )
+        SELECT symbol, MIN(fy) AS from_fy, MAX(fy) AS to_fy, MAX(first) AS first, MAX(last) AS last
+        FROM steps
+        GROUP BY symbol
+        HAVING SUM(previous IS NOT NULL AND fy = previous_fy + 1 AND value {compare} previous) = ?
+        ORDER BY last / first DESC
+    """, [*params, years + 1, years]).fetchall()
+
+
+def top(conn: sqlite3.Connection, metric: str, fy: Optional[int] = None, limit: int = 20,
+        ascending: bool = False) -> List[sqlite3.Row]:
+    """Companies ranked by a metric (or ratio) for one fiscal year (default: the latest with data)"""
+    fy = fy or latest_fy(conn, metric)
+    series, params = metric_series(metric, since_fy=fy)
+    return conn.execute(f"SELECT symbol, fy, value FROM ({series}) WHERE fy = ? "
+                        f"ORDER BY value {'ASC' if ascending else 'DESC'} LIMIT ?", [*params, fy, limit]).fetchall()
+
+
+def stats(conn: sqlite3.Connection) -> dict:
+    snapshots = conn.execute("SELECT COUNT(*), MIN(taken_at), MAX(taken_at) FROM snapshots").fetchone()
+    return {
+        'snapshots': snapshots[0], 'first': snapshots[1], 'last': snapshots[2],
+        'companies': conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0],
+        'facts': conn.execute("SELECT COUNT(*) FROM facts").fetchone()[0],
+        'fiscal_years': [r[0] for r in conn.execute("SELECT DISTINCT fy FROM facts WHERE period >= 'FY' "
+                                                    "AND period < 'FZ' ORDER BY fy")],
+    }
+
+
+def format_value(metric: str, value: float) -> str:
+    if '/' in metric or metric in schema.FLOAT_FIELDS:
+        return f"{value * 100:.1f}%" if '/' in metric else f"{value:g}"
+    return f"${value / 1e9:,.2f}B" if abs(value) >= 1e6 else f"{value:,.0f}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Query the SQLite store of every dataset snapshot')
+    parser.add_argument('--db', default=DB_FILE)
+    sub = parser.add_subparsers(dest='command', required=True)
+    backfill_parser = sub.add_parser('backfill', help='Load every committed version of the dataset from git')
+    backfill_parser.add_argument('--data-file', default=DATA_FILE)
+    load_parser = sub.add_parser('load', help='Load dataset files (e.g. exported snapshots)')
+    load_parser.add_argument('files', nargs='+')
+    sub.add_parser('stats', help='Snapshots, companies and facts stored')
+    history_parser = sub.add_parser('history', help='Every period of some metrics for a company')
+    history_parser.add_argument('symbol')
+    history_parser.add_argument('metrics', help='Comma-separated, e.g. revenue,earnings')
+    rising_parser = sub.add_parser('rising', help='Companies whose metric rose N fiscal years running')
+    rising_parser.add_argument('metric', help='A metric or a ratio, e.g. free_cash_flow/revenue')
+    rising_parser.add_argument('--years', type=int, default=3)
+    rising_parser.add_argument('--falling', action='store_true')
+    top_parser = sub.add_parser('top', help='Companies ranked by a metric for one fiscal year')
+    top_parser.add_argument('metric')
+    top_parser.add_argument('--fy', type=int)
+    top_parser.add_argument('--limit', type=int, default=20)
+    top_parser.add_argument('--ascending', action='store_true')
+    sql_parser = sub.add_parser('sql', help='Run a read-only SQL query')
+    sql_parser.add_argument('query')
+    args = parser.parse_args(argv)
+
+    if args.command in ('backfill', 'load'):
+        conn = connect(args.db)
+        if args.command == 'backfill':
+            snapshots = ((commit[:8], committed, body) for commit, committed, body in git_snapshots(args.data_file))
+        else:
+            snapshots = ((path, time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(os.path.getmtime(path))),
+                          open(path, 'rb').read()) for path in args.files)
+        for label, taken_at, body in snapshots:
+            text = body.decode('utf-8')
+            snapshot, written = upsert(conn, fastjson.loads(text), deltas.dataset_hash(text), taken_at=taken_at)
+            print(f"✓ {label} {taken_at}: snapshot {snapshot}, {written} facts upserted")
+        conn.close()
+        return 0
+
+    if not os.path.exists(args.db):
+        print(f"❌ {args.db} not found - run `python3 store.py backfill` (or any fetch) first")
+        return 1
+    conn = connect(args.db, readonly=True)
+    start = time.perf_counter()
+    if args.command == 'stats':
+        for key, value in stats(conn).items():
+            print(f"{key:14s} {value}")
+    elif args.command == 'history':
+        for row in history(conn, args.symbol.upper(), args.metrics.split(',')):
+            print(f"  {row['metric']:22s} {row['period']:12s} {format_value(row['metric'], row['value']):>14s}")
+    elif args.command == 'rising':
+        rows = rising(conn, args.metric, args.years, args.falling)
+        print(f"📈 {args.metric} {'fell' if args.falling else 'rose'} {args.years} fiscal years running: "
+              f"{len(rows)} companies")
+        for row in rows:
+            print(f"  {row['symbol']:6s} FY{row['from_fy']}-FY{row['to_fy']}  "
+                  f"{format_value(args.metric, row['first'])} -> {format_value(args.metric, row['last'])}")
+    elif args.command == 'top':
+        for row in top(conn, args.metric, args.fy, args.limit, args.ascending):
+            print(f"  {row['symbol']:6s} FY{row['fy']}  {format_value(args.metric, row['value']):>14s}")
+    else:
+        cursor = conn.execute(args.query)
+        print('\t'.join(column[0] for column in cursor.description or ()))
+        for row in cursor:
+            print('\t'.join('' if v is None else str(v) for v in row))
+    print(f"\n⚡ {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+    conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Unit tests for checkpoint.py
+Run with: pytest test_checkpoint.py
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+from checkpoint import CheckpointJournal
+from fetch_comprehensive_data import ComprehensiveDataFetcher
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / '.checkpoint_test.jsonl')
+
+
+class TestCheckpointJournal:
+    """Test suite for the checkpoint journal"""
+
+    def test_resume_restores_completed_only(self, journal_path):
+        journal = CheckpointJournal('test', journal_path)
+        journal.open()
+        journal.record('AAPL', 'ok', company={'symbol': 'AAPL', 'revenue': 100}, aliases={'revenue': 'Revenues'})
+        journal.record('FAKE', 'failed', reason='CIK not found for ticker')
+        journal.close()
+
+        resumed = CheckpointJournal('test', journal_path)
+        completed = resumed.open(resume=True)
+        company = {'symbol': 'AAPL', 'revenue': 1}
+
+        assert list(completed) == ['AAPL']
+        assert resumed.restore(company)['aliases'] == {'revenue': 'Revenues'}
+        assert company['revenue'] == 100
+        assert resumed.restore({'symbol': 'FAKE'}) is None
+
+    def test_torn_line_is_skipped_and_journal_stays_appendable(self, journal_path):
+        journal = CheckpointJournal('test', journal_path)
+        journal.open()
+        journal.record('AAPL', 'ok', company={'symbol': 'AAPL'})
+        journal.close()
+        with open(journal_path, 'a') as f:
+            f.write('{"symbol": "MSFT", "status": "o')       # crash mid-write
+
+        resumed = CheckpointJournal('test', journal_path)
+        resumed.open(resume=True)
+        resumed.record('NVDA', 'ok', company={'symbol': 'NVDA'})
+        resumed.close()
+
+        assert sorted(CheckpointJournal('test', journal_path).load()) == ['AAPL', 'NVDA']
+
+    def test_without_resume_starts_fresh(self, journal_path):
+        journal = CheckpointJournal('test', journal_path)
+        journal.open()
+        journal.record('AAPL', 'ok', company={'symbol': 'AAPL'})
+        journal.close()
+
+        assert CheckpointJournal('test', journal_path).open(resume=False) == {}
+
+    def test_stale_or_foreign_journal_ignored(self, journal_path):
+        started = (datetime.now(timezone.utc) - timedelta(days=3)).isoformat()
+        with open(journal_path, 'w') as f:
+            f.write(json.dumps({'job': 'test', 'started': started, 'version': 1}) + '\n')
+            f.write(json.dumps({'symbol': 'AAPL', 'status': 'ok', 'company': {}}) + '\n')
+
+        assert CheckpointJournal('test', journal_path).open(resume=True) == {}
+        assert CheckpointJournal('other', journal_path).open(resume=True) == {}
+
+    def test_finish_removes_journal(self, journal_path):
+        journal = CheckpointJournal('test', journal_path)
+        journal.open()
+        journal.finish()
+        assert not os.path.exists(journal_path)
+
+    @patch('fetch_comprehensive_data.time.sleep')
+    def test_process_companies_resumes(self, mock_sleep, journal_path):
+        """Completed companies are restored without requests; the rest are fetched and journaled"""
+        first = CheckpointJournal('test', journal_path)
+        first.open()
+        first.record('AAPL', 'ok', company={'symbol': 'AAPL', 'name': 'Apple', 'revenue': 383})
+        first.close()
+
+        fetcher = ComprehensiveDataFetcher()
+        tickers = Mock(ok=True, status_code=200, content=b'')
+        tickers.json.return_value = {"0": {"cik_str": 789019, "ticker": "MSFT"}}
+        facts = Mock(ok=True, status_code=200, content=json.dumps({"facts": {"us-gaap": {
+            "Revenues": {"units": {"USD": [{"end": "2023-06-30", "val": 200, "form": "10-K"}]}}
+        }}}).encode())
+        fetcher.session.get = Mock(side_effect=[tickers, facts])
+        companies = [{'symbol': 'AAPL', 'name': 'Apple'}, {'symbol': 'MSFT', 'name': 'Microsoft'}]
+
+        journal = CheckpointJournal('test', journal_path)
+        journal.open(resume=True)
+        fetcher.process_companies(companies, journal=journal)
+        journal.close()
+
+        assert companies[0]['revenue'] == 383
+        assert companies[1]['revenue'] == 200
+        assert fetcher.session.get.call_count == 2
+        assert fetcher.report.companies['AAPL']['status'] == 'skipped'
+        assert CheckpointJournal('test', journal_path).load()['MSFT']['company']['revenue'] == 200
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit tests for company_table.py
+Run with: pytest test_company_table.py
+"""
+
+import copy
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import fastjson
+from checkpoint import CheckpointJournal
+from company_table import CompanyTable
+from fetch_comprehensive_data import apply_fundamentals
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'financial_data.json')
+
+
+@pytest.fixture
+def records():
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class TestCompanyTable:
+    """Test suite for the columnar company table"""
+
+    def test_round_trip_is_byte_identical(self):
+        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+            original = f.read()
+        assert fastjson.dumps_pretty(CompanyTable.load(DATA_FILE).to_records()) == original
+
+    def test_columns_and_masks(self):
+        table = CompanyTable.from_records([
+            {'symbol': 'AAPL', 'name': 'Apple', 'revenue': 100, 'profit_margin': 25.0},
+            {'symbol': 'MSFT', 'name': 'Microsoft', 'revenue': None},
+        ])
+        revenue, has_revenue = table.column('revenue')
+
+        assert revenue.dtype == np.int64 and revenue[0] == 100
+        assert has_revenue.tolist() == [True, False]
+        assert table.index == {'AAPL': 0, 'MSFT': 1}
+        assert table.has_key('revenue').tolist() == [True, True]
+        assert table.to_records()[1] == {'symbol': 'MSFT', 'name': 'Microsoft', 'revenue': None}
+
+    def test_rows_behave_like_dicts(self):
+        table = CompanyTable.from_records([{'symbol': 'AAPL', 'name': 'Apple', 'revenue': 100}])
+        company = table['AAPL']
+
+        company['earnings'] = 25.0
+        company['analyst_estimates'] = {'eps': 6.1}
+        company.update({'capex': -5})
+        del company['revenue']
+
+        assert company['earnings'] == 25 and type(company['earnings']) is int
+        assert 'revenue' not in company and company.get('revenue') is None
+        assert list(company) == ['symbol', 'name', 'earnings', 'analyst_estimates', 'capex']
+        assert table.valid['earnings'][0] and not table.valid['revenue'][0]
+        with pytest.raises(TypeError):
+            company['capex'] = 'n/a'
+
+    def test_vectorized_derive_matches_apply_fundamentals(self, records):
+        expected = copy.deepcopy(records)
+        for company in expected:
+            company['operating_income'] = company.get('operating_income', 0) + 1
+            apply_fundamentals(company, {})
+        table = CompanyTable.from_records(records)
+        for company in table:
+            company['operating_income'] = company.get('operating_income', 0) + 1
+
+        table.derive()
+
+        assert table.to_records() == expected
+
+    def test_apply_fundamentals_on_row_derives_that_row_only(self):
+        table = CompanyTable.from_records([
+            {'symbol': 'AAPL', 'name': 'Apple', 'revenue': 1000},
+            {'symbol': 'MSFT', 'name': 'Microsoft', 'revenue': 1000, 'earnings': 300},
+        ])
+
+        apply_fundamentals(table['AAPL'], {'earnings': 250, 'capex': 40, 'operating_cash_flow': 100})
+
+        assert table['AAPL']['profit_margin'] == 25.0
+        assert table['AAPL']['free_cash_flow'] == 60
+        assert 'profit_margin' not in table['MSFT']
+
+    def test_rows_can_be_checkpointed(self, tmp_path):
+        table = CompanyTable.from_records([{'symbol': 'AAPL', 'name': 'Apple', 'revenue': 100}])
+        journal = CheckpointJournal('test', str(tmp_path / 'journal.jsonl'))
+        journal.open()
+        journal.record('AAPL', 'ok', company=table['AAPL'])
+        journal.close()
+
+        assert journal.load()['AAPL']['company'] == {'symbol': 'AAPL', 'name': 'Apple', 'revenue': 100}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
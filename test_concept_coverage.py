@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Unit tests for concept_coverage.py
+Run with: pytest test_concept_coverage.py
+"""
+
+import json
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import concept_coverage
+from concept_coverage import CoverageMatrix, iter_companyfacts, scan_companyfacts
+from mock_upstream import synthetic_cik, synthetic_companyfacts
+
+
+def write_sources(tmp_path, count):
+    """The same companyfacts documents as a directory and as a zip archive"""
+    directory = tmp_path / 'companyfacts'
+    directory.mkdir()
+    archive_path = tmp_path / 'companyfacts.zip'
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for i in range(count):
+            body = json.dumps(synthetic_companyfacts(i, filler_concepts=5)).encode()
+            (directory / f'CIK{synthetic_cik(i):010d}.json').write_bytes(body)
+            archive.writestr(f'CIK{synthetic_cik(i):010d}.json', body)
+    return str(directory), str(archive_path)
+
+
+class TestCoverage:
+    """Test suite for the concept coverage matrix"""
+
+    def test_scan_latest_and_latest_annual(self):
+        facts = {'units': {'USD': [{'end': '2023-12-31', 'form': '10-K', 'val': 1},
+                                   {'end': '2024-06-30', 'form': '10-Q', 'val': 2}]}}
+        body = json.dumps({'entityName': 'Co', 'facts': {'us-gaap': {'Revenues': facts},
+                                                         'dei': {'EntityCommonStockSharesOutstanding': {'units': {}}}}})
+
+        name, concepts, latest, annual, counts = scan_companyfacts(body.encode())
+
+        assert name == 'Co'
+        assert concepts == ['us-gaap:Revenues'] and counts == [2]
+        assert latest == ['2024-06-30'] and annual == ['2023-12-31']
+
+    def test_build_save_and_query(self, tmp_path):
+        directory, archive = write_sources(tmp_path, 12)
+        wanted = {synthetic_cik(i): f'S{i}' for i in range(10)}
+
+        matrix = CoverageMatrix.build(iter_companyfacts(archive, wanted), wanted)
+        from_directory = CoverageMatrix.build(iter_companyfacts(directory, wanted), wanted)
+        loaded = CoverageMatrix.load(matrix.save(str(tmp_path / 'coverage.npz')))
+
+        assert matrix.shape == (10, len(matrix.concepts)) and matrix.symbols[0] == 'S0'
+        for other in (from_directory, loaded):
+            assert other.cells == matrix.cells
+            assert np.array_equal(other.counts(), matrix.counts())
+            assert np.array_equal(other.latest, matrix.latest)
+
+        # Every company reports NetIncomeLoss; company 3 stopped tagging RevenueFromContract... after 2019
+        assert len(matrix.reporters('NetIncomeLoss')) == 10
+        stale = matrix.row('S3')
+        assert stale in matrix.reporters('RevenueFromContractWithCustomerExcludingAssessedTax')
+        assert stale not in matrix.reporters('RevenueFromContractWithCustomerExcludingAssessedTax', since=2020)
+
+        stats, uncovered = matrix.alias_coverage(['RevenueFromContractWithCustomerExcludingAssessedTax', 'Revenues'],
+                                                 since=2020)
+        assert len(uncovered) == 0
+        assert stats[0][2] + stats[1][2] == 10 and stats[1][1] >= stats[1][2]
+        assert matrix.top(1, like='NetIncome') == [('us-gaap:NetIncomeLoss', 10)]
+        assert matrix.company(stale)[0][1] >= '2024-01-01'
+
+    def test_parallel_build_matches(self, tmp_path):
+        _, archive = write_sources(tmp_path, 6)
+
+        serial = CoverageMatrix.build(iter_companyfacts(archive))
+        parallel = CoverageMatrix.build(iter_companyfacts(archive), workers=2)
+
+        assert np.array_equal(serial.ciks, parallel.ciks)
+        assert np.array_equal(serial.concepts, parallel.concepts)
+        assert np.array_equal(serial.annual, parallel.annual, equal_nan=True)
+
+    def test_parallel_build_streams_bodies(self, tmp_path, monkeypatch):
+        directory, _ = write_sources(tmp_path, 12)
+        monkeypatch.setattr(concept_coverage, 'IN_FLIGHT_PER_WORKER', 2)
+        to_dates, dated = concept_coverage.to_dates, []
+        monkeypatch.setattr(concept_coverage, 'to_dates', lambda values: dated.append(1) or to_dates(values))
+        ahead = []
+
+        def bodies():
+            for i, pair in enumerate(iter_companyfacts(directory)):
+                ahead.append(i + 1 - len(dated) // 2)   # documents read but not yet added (2 to_dates per add)
+                yield pair
+
+        matrix = CoverageMatrix.build(bodies(), workers=2)
+
+        assert len(matrix.ciks) == 12
+        assert max(ahead) == 4                          # 2 workers x 2 in flight, never the whole source
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
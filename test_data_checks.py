@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Unit tests for data_checks.py
+Run with: pytest test_data_checks.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import data_checks
+from company_table import CompanyTable
+from data_checks import Quarantine, find_anomalies
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'financial_data.json')
+
+
+def company(symbol, **fields):
+    record = {'symbol': symbol, 'name': symbol, 'revenue': 1000, 'earnings': 100, 'operating_income': 150,
+              'total_assets': 5000, 'total_liabilities': 3000, 'stockholders_equity': 2000,
+              'long_term_debt': 1000, 'market_cap': 20000}
+    record.update(fields)
+    return record
+
+
+def table_of(*records):
+    table = CompanyTable.from_records(list(records))
+    table.derive()
+    return table
+
+
+@pytest.fixture(autouse=True)
+def quarantine_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_checks, 'QUARANTINE_DIR', str(tmp_path))
+
+
+class TestDataChecks:
+    """Test suite for the pre-save sanity checks"""
+
+    def test_clean_data_passes(self):
+        assert find_anomalies(table_of(company('AAPL'), company('MSFT'))) == []
+
+    def test_nvda_margins_withhold_revenue_and_ratios(self):
+        """The checked-in NVDA row: earnings 4x revenue from a stale revenue concept"""
+        table = table_of(company('NVDA', revenue=26914000000, earnings=120067000000, operating_income=130387000000))
+
+        items = Quarantine('test').run(table, confirmed={})
+
+        assert {(i['metric'], i['action']) for i in items} == {
+            ('revenue', 'withheld'), ('operating_margin', 'withheld'), ('profit_margin', 'withheld')
+        }
+        record = table.to_records()[0]
+        assert 'revenue' not in record and 'profit_margin' not in record
+        assert record['earnings'] == 120067000000
+
+    def test_balance_sheet_identity_is_flagged_not_withheld(self):
+        table = table_of(company('AAPL'), company('AVGO', stockholders_equity=500))
+        quarantine = Quarantine('test')
+
+        items = quarantine.run(table, confirmed={})
+
+        assert sorted((i['symbol'], i['metric'], i['action']) for i in items) == [
+            ('AVGO', 'stockholders_equity', 'flagged'), ('AVGO', 'total_liabilities', 'flagged')
+        ]
+        assert quarantine.quarantined == [] and quarantine.to_dict()['totals']['flagged'] == 2
+        assert table.to_records()[1]['stockholders_equity'] == 500
+
+    def test_noncontrolling_interest_keeps_the_balance_sheet(self):
+        """Equity attributable to the parent only: 600 of noncontrolling interest is outside it"""
+        table = table_of(company('UNH', total_assets=5000, total_liabilities=3000, stockholders_equity=1400))
+
+        Quarantine('test').run(table, confirmed={})
+
+        record = table.to_records()[0]
+        assert (record['total_liabilities'], record['stockholders_equity']) == (3000, 1400)
+        assert record['debt_to_equity'] == round(1000 / 1400, 2)
+
+    def test_period_alignment_quarantines_older_input(self):
+        table = table_of(company('AAPL', profit_margin=10.0, operating_margin=15.0))
+        table['AAPL']['periods'] = {'revenue': {'fy': 2019, 'end': '2019-09-28'},
+                                    'earnings': {'fy': 2024, 'end': '2024-09-28'},
+                                    'operating_income': {'fy': 2024, 'end': '2024-09-28'},
+                                    'long_term_debt': {'fy': 2024, 'end': '2024-09-28'}}
+
+        items = Quarantine('test').run(table, confirmed={})
+
+        record = table.to_records()[0]
+        assert 'revenue' not in record and 'revenue' not in record['periods']
+        assert 'profit_margin' not in record and 'operating_margin' not in record
+        assert record['earnings'] == 100
+        # stockholders_equity has no recorded period: it is the older input
+        assert ('AAPL', 'stockholders_equity') in {(i['symbol'], i['metric']) for i in items}
+        assert record['long_term_debt'] == 1000
+
+    def test_jump_reverted_then_confirmed(self):
+        previous = table_of(company('AAPL'))
+        table = table_of(company('AAPL', revenue=9000))
+
+        quarantine = Quarantine('test')
+        items = quarantine.run(table, previous)
+        quarantine.write()
+
+        assert items == [{'symbol': 'AAPL', 'metric': 'revenue', 'value': 9000, 'check': 'jump',
+                          'reason': 'changed more than 3x since the last published run', 'action': 'reverted',
+                          'previous': 1000}]
+        assert table['AAPL']['revenue'] == 1000
+        assert table['AAPL']['profit_margin'] == 10.0
+
+        # Next run fetches the same value: it is published
+        table = table_of(company('AAPL', revenue=9000))
+        assert Quarantine('test').run(table, previous) == []
+        assert table['AAPL']['revenue'] == 9000
+
+    def test_previous_with_different_companies_is_aligned(self):
+        previous = table_of(company('MSFT', market_cap=100), company('AAPL'))
+        table = table_of(company('AAPL', market_cap=50000), company('NEW'))
+
+        items = Quarantine('test').run(table, previous, confirmed={})
+
+        assert [(i['symbol'], i['metric'], i['previous']) for i in items] == [('AAPL', 'market_cap', 20000)]
+
+    def test_checked_in_dataset_report(self):
+        table = CompanyTable.load(DATA_FILE)
+        quarantine = Quarantine('test')
+        quarantine.run(table, table.copy(), confirmed={})
+
+        with open(quarantine.write(), 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        assert report['totals']['companies'] == len(table)
+        nvda = {i['metric']: i for i in report['items'] if i['symbol'] == 'NVDA'}
+        assert nvda['revenue']['check'] == 'margin_bounds' and nvda['revenue']['action'] == 'withheld'
+        assert all(-100 <= c.get('operating_margin', 0) <= 100 for c in table.to_records())
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Unit tests for deltas.py
+Run with: pytest test_deltas.py
+"""
+
+import copy
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import deltas
+import fastjson
+from publish import publish_dataset
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'financial_data.json')
+
+
+@pytest.fixture
+def records():
+    return fastjson.load(DATA_FILE)
+
+
+def edited(records):
+    """A refresh: values changed, a ratio withheld, one company added, one removed"""
+    new = copy.deepcopy(records[1:])
+    new[0]['revenue'] = new[0]['revenue'] + 1_000_000_000
+    new[0].pop('profit_margin', None)
+    new[1]['analyst_estimates'] = {'eps': 6.1}
+    new.append({'symbol': 'NEW', 'name': 'New Co', 'sector': 'Technology'})
+    return new
+
+
+class TestDeltas:
+    """Test suite for dataset versions and deltas"""
+
+    def test_apply_reproduces_the_new_dataset(self, records):
+        new = edited(records)
+
+        delta = deltas.diff(records, new)
+
+        assert deltas.apply(records, delta) == new
+        assert delta['removed'] == [records[0]['symbol']]
+        assert [r['symbol'] for r in delta['added']] == ['NEW']
+        assert set(delta['changed']) == {new[0]['symbol'], new[1]['symbol']}
+        assert 'order' not in delta
+        assert deltas.diff(records, copy.deepcopy(records)) == {}
+
+    def test_reordering_is_recorded(self, records):
+        new = list(reversed(records))
+        delta = deltas.diff(records, new)
+        assert 'changed' not in delta and deltas.apply(records, delta) == new
+
+    def test_publish_chains_versions(self, records, tmp_path):
+        paths = (str(tmp_path / 'a' / 'financial_data.json'), str(tmp_path / 'b' / 'financial_data.json'))
+        for path in paths:
+            os.makedirs(os.path.dirname(path))
+
+        publish_dataset(records, paths)
+        publish_dataset(records, paths)                 # unchanged: no new version
+        new = edited(records)
+        publish_dataset(new, paths)
+
+        for path in paths:
+            manifest = deltas.load_manifest(os.path.dirname(path))
+            assert manifest['version'] == 2
+            assert [(d['from'], d['to']) for d in manifest['deltas']] == [(1, 2)]
+            assert os.path.exists(os.path.join(os.path.dirname(path), 'index.json'))
+        loaded = deltas.load_deltas(1, os.path.dirname(paths[0]))
+        assert deltas.apply(records, loaded[0]) == new
+        assert loaded[0]['hash'] == deltas.load_manifest(os.path.dirname(paths[0]))['hash']
+
+        # Edited outside the pipeline: the history restarts from the next delta
+        with open(paths[0], 'a', encoding='utf-8') as f:
+            f.write('\n')
+        publish_dataset(records, paths)
+        manifest = deltas.load_manifest(os.path.dirname(paths[0]))
+        assert [(d['from'], d['to']) for d in manifest['deltas']] == [(2, 3)]
+
+    def test_summary(self, records, tmp_path):
+        new = edited(records)
+        symbol = new[0]['symbol']
+        delta = dict(deltas.diff(records, new), **{'from': 4, 'to': 5})
+
+        text = deltas.summary([delta])
+
+        assert text.splitlines()[0] == 'Data v4 → v5: 2 companies changed, 1 added, 1 removed'
+        line = next(line for line in text.splitlines() if line.strip().startswith(symbol))
+        assert 'revenue $' in line and '→' in line and 'profit_margin removed' in line
+        assert deltas.summary([]) == 'No data changes.'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Unit tests for fastjson.py
+Run with: pytest test_fastjson.py
+"""
+
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import fastjson
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'financial_data.json')
+
+
+@pytest.fixture
+def stdlib_backend(monkeypatch):
+    monkeypatch.setenv('SP100_JSON_BACKEND', 'stdlib')
+    yield importlib.reload(fastjson)
+    monkeypatch.delenv('SP100_JSON_BACKEND')
+    importlib.reload(fastjson)
+
+
+class TestFastJson:
+    """Test suite for the fast JSON wrapper"""
+
+    def test_pretty_output_matches_stdlib_on_dataset(self):
+        """Switching backends must not churn the committed JSON files"""
+        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+            text = f.read()
+        companies = json.loads(text)
+
+        assert fastjson.dumps_pretty(companies) == json.dumps(companies, indent=2, ensure_ascii=False)
+        assert fastjson.loads(text.encode('utf-8')) == companies
+
+    def test_non_ascii_and_floats_round_trip(self):
+        data = [{'name': 'Société Générale', 'operating_margin': 21.3, 'revenue': 383285000000}]
+        assert fastjson.dumps_pretty(data) == json.dumps(data, indent=2, ensure_ascii=False)
+        assert fastjson.loads(fastjson.dumps(data)) == data
+
+    def test_big_int_falls_back_to_stdlib(self):
+        data = {'val': 2 ** 70}
+        assert fastjson.dumps_pretty(data) == json.dumps(data, indent=2)
+        assert json.loads(fastjson.dumps(data)) == data
+
+    def test_invalid_json_raises_value_error(self):
+        with pytest.raises(ValueError):
+            fastjson.loads(b'{"facts": ')
+
+    def test_backend_can_be_forced(self, stdlib_backend):
+        assert stdlib_backend.BACKEND == 'stdlib'
+        assert stdlib_backend.loads(b'{"a": 1}') == {'a': 1}
+
+    def test_file_round_trip(self, tmp_path):
+        path = str(tmp_path / 'data.json')
+        fastjson.dump(path, [{'symbol': 'AAPL'}])
+        assert fastjson.load(path) == [{'symbol': 'AAPL'}]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
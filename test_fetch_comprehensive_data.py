@@ -5,6 +5,7 @@ Run with: pytest test_fetch_comprehensive_data.py
 """
 
 import pytest
+import copy
 import json
 from unittest.mock import Mock, patch, MagicMock
 import sys
@@ -12,7 +13,11 @@ import os
 
 # Import the module to test
 sys.path.insert(0, os.path.dirname(__file__))
-from fetch_comprehensive_data import ComprehensiveDataFetcher
+import fetch_comprehensive_data
+import sec_frames
+from company_table import CompanyTable
+from fetch_comprehensive_data import ComprehensiveDataFetcher, apply_fundamentals, parse_companyfacts, select_period_facts
+from mock_upstream import LAST_YEAR, MockUpstreamServer, synthetic_companies, synthetic_companyfacts
 
 
 class TestComprehensiveDataFetcher:
@@ -227,6 +232,159 @@ class TestComprehensiveDataFetcher:
         assert company['debt_to_equity'] > 0
 
 
+class TestPipelinedProcessing:
+    """Test suite for the download → queue → process-pool pipeline"""
+    
+    def test_parse_companyfacts_selects_one_period(self):
+        """Every metric comes from the same fiscal year; a stale revenue alias falls through to the next one"""
+        fetcher = ComprehensiveDataFetcher()
+        data = synthetic_companyfacts(3, filler_concepts=5)    # stops reporting RevenueFromContract... after 2019
+        
+        values, aliases, periods, decode_s, extract_s = parse_companyfacts(json.dumps(data).encode(),
+                                                                           fetcher.metrics_map)
+        
+        assert fetcher.extract_latest_fact(data, fetcher.metrics_map['revenue'])[1] == \
+            'RevenueFromContractWithCustomerExcludingAssessedTax'
+        assert aliases['revenue'] == 'Revenues'
+        assert set(values) == set(fetcher.metrics_map)
+        assert {p['end'] for p in periods.values()} == {f'{LAST_YEAR}-12-31'}
+        assert {p['fy'] for p in periods.values()} == {LAST_YEAR}
+        assert decode_s >= 0 and extract_s >= 0
+    
+    def test_select_period_facts_skips_partial_years_and_prefers_latest_filing(self):
+        def fact(val, end, start=None, filed='2024-02-01', fy=2023):
+            return {'val': val, 'end': end, 'start': start, 'fy': fy, 'form': '10-K', 'filed': filed}
+        data = {'facts': {'us-gaap': {
+            'Revenues': {'units': {'USD': [
+                fact(400, '2023-12-31', '2023-01-01'),
+                fact(100, '2023-12-31', '2023-10-01'),                              # Q4 inside the 10-K
+                fact(410, '2023-12-31', '2023-01-01', filed='2024-06-01'),          # amended
+            ]}},
+            'NetIncomeLoss': {'units': {'USD': [fact(40, '2022-12-31', '2022-01-01', fy=2022)]}},
+            'Assets': {'units': {'USD': [fact(900, '2023-12-31')]}},
+        }}}
+        metrics_map = {'revenue': ['Revenues'], 'earnings': ['NetIncomeLoss'], 'total_assets': ['Assets']}
+        
+        values, aliases, periods = select_period_facts(data, metrics_map)
+        
+        assert values == {'revenue': 410, 'total_assets': 900}
+        assert periods['revenue'] == {'fy': 2023, 'end': '2023-12-31'}
+    
+    def test_select_period_facts_takes_fy_from_the_original_10k(self):
+        def fact(val, filed, fy=None):
+            return {'val': val, 'end': '2025-01-31', 'start': '2024-02-01', 'form': '10-K', 'filed': filed,
+                    **({'fy': fy} if fy else {})}
+        # Fiscal year ending in January: FY2024 ends 2025-01-31; the FY2025 10-K repeats it as a comparative
+        data = {'facts': {'us-gaap': {
+            'Revenues': {'units': {'USD': [fact(600, '2026-03-20', fy=2025), fact(590, '2025-03-21', fy=2024)]}},
+            'NetIncomeLoss': {'units': {'USD': [fact(20, '2025-03-21')]}},
+        }}}
+        metrics_map = {'revenue': ['Revenues'], 'earnings': ['NetIncomeLoss']}
+        
+        values, aliases, periods = select_period_facts(data, metrics_map)
+        
+        assert values == {'revenue': 600, 'earnings': 20}
+        assert periods == {'revenue': {'fy': 2024, 'end': '2025-01-31'}, 'earnings': {'end': '2025-01-31'}}
+    
+    def test_apply_fundamentals_drops_ratios_across_periods(self):
+        company = {'symbol': 'AAPL', 'name': 'Apple', 'revenue': 1000, 'earnings': 100, 'profit_margin': 10.0}
+        
+        apply_fundamentals(company, {'earnings': 300}, {'earnings': {'fy': 2024, 'end': '2024-09-28'}})
+        
+        assert company['earnings'] == 300 and 'profit_margin' not in company
+        assert company['periods'] == {'earnings': {'fy': 2024, 'end': '2024-09-28'}}
+        
+        apply_fundamentals(company, {'revenue': 1500}, {'revenue': {'fy': 2024, 'end': '2024-09-28'}})
+        
+        assert company['profit_margin'] == 20.0
+    
+    def test_table_allocates_period_columns_only_when_recorded(self):
+        table = CompanyTable.from_records([{'symbol': 'AAPL', 'name': 'Apple', 'revenue': 1000, 'earnings': 100,
+                                            'profit_margin': 10.0}])
+        table.derive()
+        assert table.period_end == {} and table['AAPL']['profit_margin'] == 10.0
+    
+        apply_fundamentals(table['AAPL'], {'earnings': 300}, {'earnings': {'fy': 2024, 'end': '2024-09-28'}})
+    
+        assert list(table.period_end) == ['earnings'] and 'profit_margin' not in table['AAPL']
+        assert table.to_records()[0]['periods'] == {'earnings': {'fy': 2024, 'end': '2024-09-28'}}
+    
+    @patch('fetch_comprehensive_data.time.sleep')
+    def test_pipelined_matches_sequential(self, mock_sleep, monkeypatch):
+        """Same companies, values and aliases as process_companies, with a tiny queue to force backpressure"""
+        with MockUpstreamServer(companies=6, filler_concepts=2) as server:
+            monkeypatch.setattr(fetch_comprehensive_data, 'SEC_TICKERS_URL', server.url('/files/company_tickers.json'))
+            monkeypatch.setattr(fetch_comprehensive_data, 'SEC_COMPANYFACTS_URL',
+                                server.url('/api/xbrl/companyfacts/CIK{cik}.json'))
+            companies = synthetic_companies(6) + [{'symbol': 'FAKE', 'name': 'Not Listed'}]
+            sequential, pipelined = ComprehensiveDataFetcher(), ComprehensiveDataFetcher()
+            
+            expected = sequential.process_companies(copy.deepcopy(companies))
+            actual = pipelined.process_companies_pipelined(copy.deepcopy(companies), io_workers=3,
+                                                           parse_workers=2, queue_size=1)
+        
+        assert actual == expected
+        assert pipelined.resolved_aliases == sequential.resolved_aliases
+        assert pipelined.failed == ['FAKE']
+        assert pipelined.report.companies['FAKE']['reason'] == 'CIK not found for ticker'
+        assert pipelined.report.companies[companies[0]['symbol']]['parse_seconds'] > 0
+        
+        # Both paths collect the same 10-Q/10-K quarters from the documents they already downloaded
+        assert pipelined.apply_ttm(actual) == sequential.apply_ttm(expected) == [c['symbol'] for c in companies[:6]]
+        assert pipelined.rollup.facts == sequential.rollup.facts == {}    # rolled up as parsed, not kept
+        assert actual == expected
+        assert actual[0]['ttm']['revenue'] == actual[0]['revenue']     # the latest quarter is a fiscal year end
+    
+    @patch('fetch_comprehensive_data.time.sleep')
+    def test_frames_match_companyfacts(self, mock_sleep, monkeypatch):
+        """XBRL frames give the same values, periods and aliases with one request per concept and period"""
+        with MockUpstreamServer(companies=12, filler_concepts=2) as server:
+            monkeypatch.setattr(fetch_comprehensive_data, 'SEC_TICKERS_URL', server.url('/files/company_tickers.json'))
+            monkeypatch.setattr(fetch_comprehensive_data, 'SEC_COMPANYFACTS_URL',
+                                server.url('/api/xbrl/companyfacts/CIK{cik}.json'))
+            monkeypatch.setattr(sec_frames, 'SEC_FRAMES_URL',
+                                server.url('/api/xbrl/frames/us-gaap/{concept}/{unit}/{period}.json'))
+            monkeypatch.setattr(fetch_comprehensive_data, 'RATE_LIMIT_DELAY', 0)
+            companies = synthetic_companies(12) + [{'symbol': 'FAKE', 'name': 'Not Listed'}]
+            per_company, frames = ComprehensiveDataFetcher(), ComprehensiveDataFetcher()
+            
+            expected = per_company.process_companies(copy.deepcopy(companies))
+            actual = frames.process_companies_frames(CompanyTable.from_records(copy.deepcopy(companies)),
+                                                     years=[LAST_YEAR + 1, LAST_YEAR], io_workers=4)
+            # Over a dataset companyfacts already filled in, the filing's fiscal years are kept
+            refreshed = ComprehensiveDataFetcher().process_companies_frames(
+                CompanyTable.from_records(copy.deepcopy(expected)), years=[LAST_YEAR + 1, LAST_YEAR], io_workers=4)
+        
+        assert refreshed.to_records() == expected
+        # Frames carry no fiscal year: fresh periods have only the end
+        for record in expected:
+            for period in record.get('periods', {}).values():
+                period.pop('fy', None)      # metrics of one period share a dict
+        assert actual.to_records() == expected
+        assert frames.resolved_aliases == per_company.resolved_aliases
+        assert frames.failed == ['FAKE']
+        # 10 duration aliases x 2 years + 8 instant aliases x 1 quarter, plus the ticker map
+        assert frames.api_calls == 28
+        assert frames.metrics.counter_total('http_requests_total') == 29
+    
+    def test_frames_reject_resume_and_skip_the_journal(self, monkeypatch, tmp_path):
+        with pytest.raises(SystemExit):
+            fetch_comprehensive_data.main(['--frames', '--resume'])
+        
+        (tmp_path / 'financial_data.json').write_text(json.dumps(synthetic_companies(2)))
+        monkeypatch.setattr(fetch_comprehensive_data, 'DATA_FILE', str(tmp_path / 'financial_data.json'))
+        journal = MagicMock()
+        monkeypatch.setattr(fetch_comprehensive_data, 'CheckpointJournal', journal)
+        monkeypatch.setattr(fetch_comprehensive_data, 'ComprehensiveDataFetcher', MagicMock())
+        monkeypatch.setattr(fetch_comprehensive_data, 'check_before_save', Mock())
+        
+        assert fetch_comprehensive_data.main(['--frames']) == 0
+        journal.assert_not_called()
+        assert fetch_comprehensive_data.main(['--resume']) == 0
+        journal.return_value.open.assert_called_once_with(resume=True)
+        journal.return_value.finish.assert_called_once()
+
+
 class TestDataIntegrity:
     """Test data integrity and validation"""
     
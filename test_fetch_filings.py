@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit tests for fetch_filings.py
+Run with: pytest test_fetch_filings.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import fetch_filings
+from fetch_filings import merge, news_article, parse_submissions, save, update_filings
+from instrumentation import Metrics
+from mock_upstream import MockUpstreamServer, synthetic_companies, synthetic_submissions
+from run_report import RunReport
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with MockUpstreamServer(companies=6) as server:
+        monkeypatch.setattr(fetch_filings, 'SEC_SUBMISSIONS_URL', server.url('/submissions/CIK{cik}.json'))
+        monkeypatch.setattr(fetch_filings, 'SEC_TICKERS_URL', server.url('/files/company_tickers.json'))
+        monkeypatch.setattr(fetch_filings, 'SEC_RATE', 0)
+        yield server
+
+
+def poll(companies, state, filings_doc, news_doc):
+    metrics = Metrics('test')
+    new = asyncio.run(update_filings(companies, state, filings_doc, news_doc, metrics, RunReport('test', metrics),
+                                     concurrency=3, timeout=5))
+    return new, metrics
+
+
+class TestFetchFilings:
+    """Test suite for the filings/news producer"""
+
+    def test_parse_submissions_stops_at_last_seen_accession(self):
+        feed = synthetic_submissions(2)
+        recent = feed['filings']['recent']
+        everything = parse_submissions(feed, '1000014')
+        newer = parse_submissions(feed, '1000014', since=recent['accessionNumber'][5])
+
+        assert '4' not in {filing['form'] for filing in everything}
+        assert [f['accession'] for f in newer] == [f['accession'] for f in everything
+                                                  if f['accession'] > recent['accessionNumber'][5]]
+        accession = everything[0]['accession']
+        assert everything[0]['url'].endswith(f"/1000014/{accession.replace('-', '')}/{accession}-index.htm")
+
+    def test_news_article_headline_skips_exhibit_item(self):
+        filing = {'form': '8-K', 'date': '2024-11-01', 'accession': 'a', 'description': '8-K',
+                  'timestamp': '2024-11-01T16:05:00.000Z', 'url': 'u', 'items': '2.02,9.01'}
+
+        article = news_article(filing, 'Apple Inc.')
+
+        assert article['title'] == 'Apple Inc.: Results of operations'
+        assert article['summary'] == 'Form 8-K filed 2024-11-01: Results of operations; Financial statements and exhibits'
+
+    def test_merge_dedupes_and_bounds(self):
+        existing = [{'accession': str(n)} for n in (3, 2, 1)]
+        merged = merge(existing, [{'accession': '4'}, {'accession': '3'}], limit=3)
+
+        assert [item['accession'] for item in merged] == ['4', '3', '2']
+
+    def test_incremental_polling(self, server, tmp_path, monkeypatch):
+        monkeypatch.setattr(fetch_filings, 'MAX_FILINGS', 12)
+        companies = synthetic_companies(6) + [{'symbol': 'FAKE', 'name': 'Not Listed'}]
+        state, filings_doc, news_doc = {'companies': {}}, {'companies': {}}, {'companies': {}}
+
+        first, _ = poll(companies, state, filings_doc, news_doc)
+        assert first > 0 and set(filings_doc['companies']) == {c['symbol'] for c in companies[:6]}
+        assert all(len(c['filings']) <= 12 for c in filings_doc['companies'].values())
+        assert all(a['form'] == '8-K' for c in news_doc['companies'].values() for a in c['news'])
+
+        # Nothing filed since: one conditional request per company, every one a 304, no ticker map
+        second, metrics = poll(companies, state, filings_doc, news_doc)
+        assert second == 0
+        assert metrics.counter_total('http_requests_total') == 6
+        assert server.stats.get('304') == 6
+
+        # One company files an 8-K and a Form 4
+        server.publish_filings(1, count=2)
+        top_before = news_doc['companies'][companies[1]['symbol']]['news'][0]['accession']
+        third, _ = poll(companies, state, filings_doc, news_doc)
+        news = news_doc['companies'][companies[1]['symbol']]['news']
+        assert third == 1
+        assert news[0]['title'].endswith('Other events') and news[1]['accession'] == top_before
+
+        written = save(filings_doc, news_doc, data_dirs=[str(tmp_path)])
+        saved = json.loads((tmp_path / 'company_filings.json').read_text())
+        assert len(written) == 2 and not list(tmp_path.glob('*.tmp'))
+        assert saved['total_filings'] == sum(len(c['filings']) for c in filings_doc['companies'].values())
+        assert json.loads((tmp_path / 'company_news.json').read_text())['total_articles'] > 0
+
+    def test_main_reports_schema_errors(self, tmp_path, monkeypatch, capsys):
+        path = tmp_path / 'financial_data.json'
+        path.write_text(json.dumps([{'symbol': 'AAPL', 'name': 'Apple', 'revenue': 'n/a'}]))
+        monkeypatch.setattr(fetch_filings, 'DATA_FILE', str(path))
+
+        assert fetch_filings.main([]) == 1
+        assert "AAPL.revenue: expected int, got str 'n/a'" in capsys.readouterr().out
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Unit tests for fetch_fundamentals.py
+Run with: pytest test_fetch_fundamentals.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import checkpoint
+import fetch_comprehensive_data
+import fetch_fundamentals
+import instrumentation
+import run_report
+from checkpoint import CheckpointJournal
+from fetch_fundamentals import (
+    FundamentalsEngine, Provider, SecEdgarProvider, YahooProvider, parse_precedence
+)
+from instrumentation import Metrics
+from mock_upstream import MockUpstreamServer, synthetic_companies
+
+
+class FakeProvider(Provider):
+    """Serves canned results and remembers which symbols it was asked for"""
+
+    def __init__(self, metrics, name, data):
+        self.name = name
+        self.data = data
+        self.supplies = tuple({m for values in data.values() for m in values})
+        self.asked = []
+        self.rate_limit = 1000.0
+        super().__init__(metrics)
+
+    def fetch(self, symbol):
+        self.asked.append(symbol)
+        values = self.data.get(symbol)
+        return {metric: (value, f'{self.name}-field') for metric, value in values.items()} if values else None
+
+
+@pytest.fixture
+def metrics():
+    return Metrics('test')
+
+
+class TestFundamentalsEngine:
+    """Test suite for precedence, fallback and merge"""
+
+    def test_fallback_only_asked_for_misses(self, metrics):
+        """The second source is only queried for companies the first one missed"""
+        primary = FakeProvider(metrics, 'sec', {'AAPL': {'earnings': 100, 'revenue': 1000}})
+        fallback = FakeProvider(metrics, 'yahoo', {'AAPL': {'earnings': 1}, 'MSFT': {'earnings': 90}})
+        engine = FundamentalsEngine([primary, fallback], metrics, wanted=['earnings'],
+                                    precedence={'earnings': ['sec', 'yahoo']})
+        companies = [{'symbol': 'AAPL', 'name': 'Apple'}, {'symbol': 'MSFT', 'name': 'Microsoft'}]
+
+        engine.run(companies)
+
+        assert sorted(primary.asked) == ['AAPL', 'MSFT']
+        assert fallback.asked == ['MSFT']
+        assert companies[0]['earnings'] == 100
+        assert companies[1]['earnings'] == 90
+        assert engine.sources['MSFT'] == {'earnings': 'yahoo:yahoo-field'}
+
+    def test_precedence_override_wins(self, metrics):
+        """A metric declared fmp-first takes fmp's value even when sec has one"""
+        sec = FakeProvider(metrics, 'sec', {'AAPL': {'earnings': 100, 'revenue': 1000}})
+        fmp = FakeProvider(metrics, 'fmp', {'AAPL': {'earnings': 120}})
+        precedence = parse_precedence(['earnings=fmp,sec'])
+        engine = FundamentalsEngine([sec, fmp], metrics, precedence=precedence)
+        company = {'symbol': 'AAPL', 'name': 'Apple'}
+
+        engine.run([company])
+
+        assert company['earnings'] == 120
+        assert company['revenue'] == 1000
+        assert company['profit_margin'] == 12.0
+        assert engine.report.companies['AAPL']['aliases'] == {
+            'revenue': 'sec:sec-field', 'earnings': 'fmp:fmp-field'
+        }
+
+    def test_only_missing_skips_complete_companies(self, metrics):
+        sec = FakeProvider(metrics, 'sec', {'MSFT': {'earnings': 90}})
+        engine = FundamentalsEngine([sec], metrics, wanted=['earnings'])
+
+        engine.run([{'symbol': 'AAPL', 'earnings': 5}, {'symbol': 'MSFT', 'earnings': None}], only_missing=True)
+
+        assert sec.asked == ['MSFT']
+        assert engine.skipped == ['AAPL']
+
+    def test_failure_reasons_are_combined(self, metrics):
+        sec = FakeProvider(metrics, 'sec', {})
+        sec.failure_reasons['FAKE'] = 'CIK not found for ticker'
+        engine = FundamentalsEngine([sec], metrics, wanted=['earnings'])
+
+        engine.run([{'symbol': 'FAKE'}])
+
+        assert engine.failed == ['FAKE']
+        assert engine.report.companies['FAKE']['reason'] == 'CIK not found for ticker'
+
+    def test_resume_skips_checkpointed_companies(self, metrics, tmp_path):
+        journal = CheckpointJournal('test', str(tmp_path / 'journal.jsonl'))
+        journal.open()
+        journal.record('AAPL', 'ok', company={'symbol': 'AAPL', 'earnings': 7})
+        journal.close()
+        sec = FakeProvider(metrics, 'sec', {'AAPL': {'earnings': 100}, 'MSFT': {'earnings': 90}})
+        engine = FundamentalsEngine([sec], metrics, wanted=['earnings'])
+        companies = [{'symbol': 'AAPL'}, {'symbol': 'MSFT'}]
+
+        journal.open(resume=True)
+        engine.run(companies, journal=journal)
+        journal.close()
+
+        assert sec.asked == ['MSFT']
+        assert companies[0]['earnings'] == 7
+        assert journal.load()['MSFT']['company']['earnings'] == 90
+
+    def test_invalid_precedence(self):
+        with pytest.raises(ValueError):
+            parse_precedence(['earnings'])
+
+
+class TestProvidersAgainstMockUpstream:
+    """SEC and Yahoo providers end to end against the local mock server"""
+
+    def test_sec_and_yahoo(self, metrics, monkeypatch):
+        with MockUpstreamServer(companies=3, filler_concepts=2) as server:
+            monkeypatch.setattr(fetch_comprehensive_data, 'SEC_TICKERS_URL', server.url('/files/company_tickers.json'))
+            monkeypatch.setattr(fetch_comprehensive_data, 'SEC_COMPANYFACTS_URL',
+                                server.url('/api/xbrl/companyfacts/CIK{cik}.json'))
+            monkeypatch.setattr('fetch_fundamentals.endpoints.YAHOO_QUOTE_SUMMARY_URL',
+                                server.url('/v10/finance/quoteSummary/{symbol}'))
+            engine = FundamentalsEngine([SecEdgarProvider(metrics), YahooProvider(metrics)], metrics,
+                                        precedence={'earnings': ['yahoo', 'sec']})
+            companies = synthetic_companies(3)
+
+            engine.run(companies)
+
+        assert sorted(engine.processed) == sorted(c['symbol'] for c in companies)
+        for company in companies:
+            assert engine.sources[company['symbol']]['earnings'] == 'yahoo:incomeStatementHistory.netIncome'
+            assert engine.sources[company['symbol']]['total_assets'] == 'sec:Assets'
+            assert engine.report.companies[company['symbol']]['requests'] == 2
+
+
+    def test_main_writes_ttm_before_the_checks(self, monkeypatch, tmp_path):
+        """The scheduled fetch rolls the 10-Q quarters it downloaded into "ttm", no extra requests"""
+        (tmp_path / 'financial_data.json').write_text(json.dumps(synthetic_companies(3)))
+        monkeypatch.setattr(fetch_fundamentals, 'DATA_FILE', str(tmp_path / 'financial_data.json'))
+        monkeypatch.setattr(checkpoint, 'CHECKPOINT_DIR', str(tmp_path))
+        monkeypatch.setattr(instrumentation, 'REPORT_DIR', str(tmp_path))
+        monkeypatch.setattr(run_report, 'REPORT_DIR', str(tmp_path))
+        checked, saved = [], []
+        monkeypatch.setattr(fetch_fundamentals, 'check_before_save',
+                            lambda companies, published, job: checked.append([c.get('ttm') for c in companies]))
+        monkeypatch.setattr(fetch_fundamentals, 'write_dataset',
+                            lambda companies: saved.append(companies.to_records()) or [])
+        with MockUpstreamServer(companies=3, filler_concepts=2) as server:
+            monkeypatch.setattr(fetch_comprehensive_data, 'SEC_TICKERS_URL', server.url('/files/company_tickers.json'))
+            monkeypatch.setattr(fetch_comprehensive_data, 'SEC_COMPANYFACTS_URL',
+                                server.url('/api/xbrl/companyfacts/CIK{cik}.json'))
+
+            assert fetch_fundamentals.main(['--providers', 'sec', '--parse-workers', '0']) == 0
+
+            requests = server.stats.get('200')
+        assert all(checked[0])
+        assert [record['ttm']['revenue'] for record in saved[0]] == [record['revenue'] for record in saved[0]]
+        assert requests == 4        # the ticker map and one companyfacts document per company
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
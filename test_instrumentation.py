@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for instrumentation.py
+Run with: pytest test_instrumentation.py
+"""
+
+import json
+import os
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+from instrumentation import Metrics, timed_get
+
+
+class TestMetrics:
+    """Test suite for the metrics registry"""
+
+    @pytest.fixture
+    def metrics(self):
+        return Metrics('test')
+
+    def test_histogram_buckets_are_cumulative(self, metrics):
+        """Observations count towards every bucket they fit in"""
+        metrics.observe('latency', 0.07, buckets=(0.05, 0.1, 1.0))
+        metrics.observe('latency', 0.5, buckets=(0.05, 0.1, 1.0))
+
+        hist = metrics.to_dict()['histograms']['latency'][0]
+        assert hist['count'] == 2
+        assert hist['buckets'] == {'0.05': 0, '0.1': 1, '1.0': 2}
+
+    def test_record_request_labels_by_host(self, metrics):
+        """Requests are grouped by upstream host, not full URL"""
+        metrics.record_request('https://data.sec.gov/api/xbrl/companyfacts/CIK1.json', 0.2, status=200, size=100)
+        metrics.record_request('https://data.sec.gov/api/xbrl/companyfacts/CIK2.json', 0.3, status=200, size=50)
+
+        assert metrics.counter_value('http_response_bytes_total', host='data.sec.gov') == 150
+        assert metrics.counter_value('http_requests_total', host='data.sec.gov', status=200) == 2
+
+    def test_cache_hit_ratio(self, metrics):
+        """Hit ratio is hits / (hits + misses)"""
+        assert metrics.cache_hit_ratio('tickers') is None
+        metrics.cache_miss('tickers')
+        for _ in range(3):
+            metrics.cache_hit('tickers')
+        assert metrics.cache_hit_ratio('tickers') == 0.75
+
+    def test_render_prometheus(self, metrics):
+        """Histogram exposition includes +Inf bucket, sum and count"""
+        metrics.record_request('https://query1.finance.yahoo.com/v8/finance/chart/AAPL', 0.2, status=200)
+        text = metrics.render_prometheus()
+
+        assert '# TYPE sp100_http_request_duration_seconds histogram' in text
+        assert 'sp100_http_request_duration_seconds_bucket{host="query1.finance.yahoo.com",job="test",le="+Inf"} 1' in text
+        assert 'sp100_http_request_duration_seconds_count{host="query1.finance.yahoo.com",job="test"} 1' in text
+
+    def test_write_report(self, metrics, tmp_path):
+        """JSON run report is valid and contains the job name"""
+        metrics.cache_hit('tickers')
+        path = metrics.write_report(str(tmp_path / 'metrics.json'))
+
+        with open(path) as f:
+            report = json.load(f)
+        assert report['job'] == 'test'
+        assert report['cache_hit_ratio'] == {'tickers': 1.0}
+
+
+class TestTimedGet:
+    """Test suite for the instrumented GET helper"""
+
+    def test_retries_on_server_error(self, monkeypatch):
+        """5xx responses are retried and counted"""
+        monkeypatch.setattr('instrumentation.time.sleep', lambda s: None)
+        bad = Mock(status_code=503, content=b'')
+        good = Mock(status_code=200, content=b'{}')
+        client = Mock()
+        client.get.side_effect = [bad, good]
+        metrics = Metrics('test')
+
+        response = timed_get(client, 'https://data.sec.gov/x', metrics, retries=2)
+
+        assert response is good
+        assert metrics.counter_value('http_retries_total', host='data.sec.gov') == 1
+        assert metrics.counter_value('http_requests_total', host='data.sec.gov', status=503) == 1
+
+    def test_no_retry_by_default(self):
+        """Without retries the first response is returned as-is"""
+        bad = Mock(status_code=429, content=b'')
+        client = Mock()
+        client.get.return_value = bad
+
+        assert timed_get(client, 'https://data.sec.gov/x', Metrics('test')) is bad
+        assert client.get.call_count == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
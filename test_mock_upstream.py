@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Unit tests for mock_upstream.py and endpoints.py
+Run with: pytest test_mock_upstream.py
+"""
+
+import importlib
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(__file__))
+import endpoints
+from instrumentation import Metrics, timed_get
+from mock_upstream import Faults, MockUpstreamServer, synthetic_cik
+
+
+@pytest.fixture
+def server():
+    with MockUpstreamServer(companies=5, filler_concepts=2) as srv:
+        yield srv
+
+
+class TestEndpoints:
+    """Test suite for base-URL overrides"""
+
+    def test_defaults_are_real_hosts(self, monkeypatch):
+        monkeypatch.delenv('UPSTREAM_BASE_URL', raising=False)
+        monkeypatch.delenv('SEC_DATA_BASE_URL', raising=False)
+        assert endpoints.base_url('SEC_DATA_BASE_URL') == 'https://data.sec.gov'
+
+    def test_upstream_override_and_per_host_precedence(self, monkeypatch):
+        monkeypatch.setenv('UPSTREAM_BASE_URL', 'http://127.0.0.1:8080/')
+        monkeypatch.setenv('FMP_BASE_URL', 'http://127.0.0.1:9090')
+        try:
+            module = importlib.reload(endpoints)
+            assert module.SEC_TICKERS_URL == 'http://127.0.0.1:8080/files/company_tickers.json'
+            assert module.FMP_API_URL == 'http://127.0.0.1:9090/api/v3'
+        finally:
+            monkeypatch.delenv('UPSTREAM_BASE_URL')
+            monkeypatch.delenv('FMP_BASE_URL')
+            importlib.reload(endpoints)
+
+
+class TestMockUpstreamServer:
+    """Test suite for the local stand-in server"""
+
+    def test_serves_every_fetcher_route(self, server):
+        """Tickers, companyfacts, chart, quoteSummary and FMP routes all answer"""
+        tickers = requests.get(server.url('/files/company_tickers.json'), timeout=5).json()
+        symbol = tickers['0']['ticker']
+        cik = str(tickers['0']['cik_str']).zfill(10)
+
+        facts = requests.get(server.url(f'/api/xbrl/companyfacts/CIK{cik}.json'), timeout=5).json()
+        assert 'us-gaap' in facts['facts']
+        for path in [f'/v8/finance/chart/{symbol}', f'/v10/finance/quoteSummary/{symbol}',
+                     f'/api/v3/income-statement/{symbol}', f'/api/v3/analyst-estimates/{symbol}',
+                     f'/api/v3/price-target-consensus?symbol={symbol}', f'/api/v3/grade/{symbol}']:
+            assert requests.get(server.url(path), timeout=5).status_code == 200, path
+
+    def test_unknown_cik_is_404(self, server):
+        response = requests.get(server.url(f'/api/xbrl/companyfacts/CIK{synthetic_cik(99):010d}.json'), timeout=5)
+        assert response.status_code == 404
+
+    def test_fail_first_exercises_retries(self, server):
+        """fail_first=2 answers 503 twice per path; timed_get recovers with retries"""
+        server.faults.fail_first = 2
+        metrics = Metrics('test')
+        response = timed_get(requests, server.url('/v8/finance/chart/AAPL'), metrics, retries=2, timeout=5)
+
+        assert response.status_code == 200
+        assert metrics.counter_total('http_retries_total') == 2
+        assert server.stats['503'] == 2
+
+    def test_error_rates(self, server):
+        """error_429=1.0 rejects every request with Retry-After"""
+        server.faults.update(error_429=1.0)
+        response = requests.get(server.url('/v8/finance/chart/AAPL'), timeout=5)
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '1'
+
+    def test_truncated_body_raises(self, server):
+        """truncate=1.0 cuts the body short, which requests surfaces as an error"""
+        server.faults.update(truncate=1.0)
+        with pytest.raises(requests.exceptions.RequestException):
+            requests.get(server.url('/files/company_tickers.json'), timeout=5)
+
+    def test_max_rps_throttles(self):
+        """Requests over the token bucket get 429"""
+        with MockUpstreamServer(companies=1, faults=Faults(max_rps=2)) as srv:
+            statuses = [requests.get(srv.url('/v8/finance/chart/AAPL'), timeout=5).status_code for _ in range(5)]
+        assert statuses.count(429) >= 2
+
+    def test_runtime_fault_update(self, server):
+        """POST /__faults changes settings; unknown keys are rejected"""
+        ok = requests.post(server.url('/__faults'), json={'error_5xx': 0.5}, timeout=5)
+        bad = requests.post(server.url('/__faults'), json={'nope': 1}, timeout=5)
+        assert ok.json()['error_5xx'] == 0.5
+        assert bad.status_code == 400
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Unit tests for peers.py
+Run with: pytest test_peers.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import peers
+from company_table import CompanyTable
+from publish import publish_dataset
+
+SECTORS = ('Technology', 'Energy', 'Utilities')
+
+
+def universe(count, seed=0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(count):
+        revenue = int(rng.uniform(1e9, 5e11))
+        record = {'symbol': f'S{i}', 'name': f'Company {i}', 'sector': SECTORS[i % 3], 'year': 2024,
+                  'revenue': revenue, 'earnings': int(revenue * rng.uniform(-0.1, 0.3)),
+                  'free_cash_flow': int(revenue * rng.uniform(-0.05, 0.25)),
+                  'gross_profit': int(revenue * rng.uniform(0.2, 0.7)), 'market_cap': int(revenue * rng.uniform(1, 8)),
+                  'stockholders_equity': int(revenue * rng.uniform(0.2, 2)), 'total_assets': int(revenue * 2),
+                  'operating_margin': float(rng.uniform(-5, 40)), 'debt_to_equity': float(rng.uniform(0, 3))}
+        if i % 7 == 0:
+            del record['gross_profit'], record['debt_to_equity']
+        records.append(record)
+    return records
+
+
+def naive_pairwise(x):
+    """Row distances/cosines and column correlations, one pair at a time"""
+    n, m = x.shape
+    distances, similarity = np.full((n, n), np.nan), np.full((n, n), np.nan)
+    for i in range(n):
+        for j in range(n):
+            both = ~np.isnan(x[i]) & ~np.isnan(x[j])
+            if both.sum() >= peers.MIN_SHARED:
+                a, b = x[i, both], x[j, both]
+                distances[i, j] = np.sqrt(((a - b) ** 2).sum() / both.sum() * m)
+                similarity[i, j] = a @ b / np.sqrt((a @ a) * (b @ b))
+    correlation = np.full((m, m), np.nan)
+    for a in range(m):
+        for b in range(m):
+            both = ~np.isnan(x[:, a]) & ~np.isnan(x[:, b])
+            if both.sum() >= peers.MIN_SHARED:
+                correlation[a, b] = np.corrcoef(x[both, a], x[both, b])[0, 1]
+    return distances, similarity, correlation
+
+
+class TestPeers:
+    """Test suite for the peer analytics stage"""
+
+    def test_sector_zscores(self):
+        records = universe(12)
+        records[0]['sector'] = None
+        table = CompanyTable.from_records(records)
+
+        analytics = peers.compute(table)
+
+        assert analytics.sectors == ['Energy', 'Technology', 'Unknown', 'Utilities']
+        matrix = peers.features(table)
+        j = peers.PEER_METRICS.index('operating_margin')
+        tech = [i for i, r in enumerate(records) if r['sector'] == 'Technology']
+        expected = (matrix[tech, j] - matrix[tech, j].mean()) / matrix[tech, j].std()
+        assert np.allclose(analytics.arrays['zscores'][tech, j], expected, atol=1e-5)
+        # Log10 size metrics, and too few peers for the lone Unknown company
+        assert np.isclose(matrix[0, peers.PEER_METRICS.index('revenue')], np.log10(records[0]['revenue']))
+        assert np.isnan(analytics.arrays['zscores'][0]).all()
+
+    def test_matrix_products_match_pairwise_loops(self):
+        rng = np.random.default_rng(1)
+        x = rng.normal(size=(30, 6))
+        x[rng.random(x.shape) < 0.2] = np.nan
+
+        distances, similarity = peers.pairwise(x)
+        expected = naive_pairwise(x)
+
+        assert np.allclose(distances, expected[0], equal_nan=True)
+        assert np.allclose(similarity, expected[1], equal_nan=True)
+        assert np.allclose(peers.correlation(x), expected[2], equal_nan=True)
+
+    def test_blobs_memory_map(self, tmp_path):
+        analytics = peers.compute(CompanyTable.from_records(universe(40)))
+
+        peers.write(analytics, str(tmp_path), dataset_hash='abc')
+        info, arrays = peers.load(str(tmp_path))
+
+        assert info['dataset_hash'] == 'abc' and info['companies'][:2] == ['S0', 'S1']
+        assert all(spec['offset'] % peers.ALIGN == 0 for spec in info['arrays'].values())
+        assert os.path.getsize(tmp_path / 'analytics' / 'peers.bin') == info['bytes']
+        assert isinstance(arrays['distances'], np.memmap) and arrays['distances'].shape == (40, 40)
+        for name, array in analytics.arrays.items():
+            assert np.array_equal(arrays[name], array, equal_nan=True)
+        nearest = peers.nearest(info, arrays, 'S3', limit=3, same_sector=True)
+        assert len(nearest) == 3 and all(int(symbol[1:]) % 3 == 0 for symbol, _ in nearest)
+        assert [d for _, d in nearest] == sorted(d for _, d in nearest)
+
+    def test_publish_writes_analytics_fast(self, tmp_path):
+        records = universe(1000)
+        paths = [str(tmp_path / 'data' / 'financial_data.json'), str(tmp_path / 'public' / 'financial_data.json')]
+        for path in paths:
+            os.makedirs(os.path.dirname(path))
+
+        started = time.perf_counter()
+        line = peers.publish(records, [os.path.dirname(path) for path in paths])
+        assert time.perf_counter() - started < 1.0
+        assert '1000 companies' in line
+
+        written = publish_dataset(records[:50], paths)
+        info, arrays = peers.load(str(tmp_path / 'public'))
+        assert any('peers.bin' in item for item in written)
+        assert len(info['companies']) == 50 and info['dataset_hash']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Unit tests for price_cache.py and the worker's price endpoints
+Run with: pytest test_price_cache.py
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import endpoints
+from instrumentation import Metrics
+from mock_upstream import Faults, MockUpstreamServer
+from price_cache import FRESH, STALE, PriceService, SingleFlight, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with MockUpstreamServer(companies=10, faults=Faults(latency_ms=100)) as server:
+        monkeypatch.setattr(endpoints, 'YAHOO_QUOTE_URL', server.url('/v7/finance/quote'))
+        yield server
+
+
+@pytest.fixture
+def service(server):
+    service = PriceService(Metrics('test'), ttl=60, stale_ttl=300)
+    yield service
+    service.close()
+
+
+class TestTTLCache:
+    """Test suite for the LRU + TTL cache"""
+
+    def test_fresh_stale_expired(self):
+        clock = FakeClock()
+        cache = TTLCache(max_entries=10, ttl=60, stale_ttl=300, clock=clock)
+        cache.set('AAPL', 1)
+
+        assert cache.get('AAPL') == (1, FRESH)
+        clock.now = 61
+        assert cache.get('AAPL') == (1, STALE)
+        clock.now = 361
+        assert cache.get('AAPL') == (None, None) and len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(max_entries=2)
+        cache.set('A', 1)
+        cache.set('B', 2)
+        cache.get('A')          # A is now the most recently used
+        cache.set('C', 3)
+
+        assert cache.get('B') == (None, None)
+        assert cache.get('A')[0] == 1 and cache.get('C')[0] == 3
+
+
+class TestSingleFlight:
+    """Test suite for request coalescing"""
+
+    def test_concurrent_callers_share_one_call(self):
+        flights = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return 42
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(flights.do, 'AAPL', work) for _ in range(8)]
+            time.sleep(0.1)
+            release.set()
+            assert [f.result() for f in futures] == [42] * 8
+        assert len(calls) == 1
+
+    def test_followers_see_the_leaders_error(self):
+        flights = SingleFlight()
+        call, leader = flights.begin('X')
+        follower, follows = flights.begin('X')
+        flights.finish('X', error=RuntimeError('upstream down'))
+
+        assert leader and not follows and follower is call
+        with pytest.raises(RuntimeError):
+            SingleFlight.wait(follower)
+
+
+class TestPriceService:
+    """Test suite for cached, coalesced quotes"""
+
+    def test_thundering_herd_costs_one_request(self, server, service):
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            quotes = list(pool.map(lambda _: service.quote('AAPL'), range(32)))
+
+        assert server.stats.get('200') == 1
+        assert len({q['price'] for q in quotes}) == 1
+        assert sum(not q['cached'] for q in quotes) == 1
+        assert service.metrics.counter_total('price_coalesced_total') >= 1
+
+    def test_batch_fetches_only_misses(self, server, service):
+        service.quote('AAPL')
+        quotes = service.quotes(['AAPL', 'MSFT', 'NVDA', 'AAPL'])
+
+        assert set(quotes) == {'AAPL', 'MSFT', 'NVDA'}
+        assert quotes['AAPL']['cached'] and not quotes['MSFT']['cached']
+        assert server.stats.get('200') == 2
+
+    def test_stale_is_served_while_refreshing(self, server, service):
+        clock = FakeClock()
+        service.cache.clock = clock
+        first = service.quote('AAPL')
+
+        clock.now = 120
+        started = time.perf_counter()
+        stale = service.quote('AAPL')
+        assert time.perf_counter() - started < 0.05      # no upstream wait
+        assert stale['stale'] and stale['price'] == first['price']
+
+        deadline = time.monotonic() + 5
+        while service.cache.get('AAPL')[1] != FRESH and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert service.cache.get('AAPL')[1] == FRESH
+        assert server.stats.get('200') == 2
+
+    def test_unknown_symbols_are_cached_briefly(self, server, service, monkeypatch):
+        fetch = service.fetch
+        monkeypatch.setattr(service, 'fetch', lambda symbols: {s: q for s, q in fetch(symbols).items() if s != 'NOPE'})
+        clock = FakeClock()
+        service.missing.clock = clock
+        assert set(service.quotes(['AAPL', 'NOPE'])) == {'AAPL'}
+        assert set(service.quotes(['AAPL', 'NOPE'])) == {'AAPL'}
+        assert service.quote('NOPE') is None
+        assert server.stats.get('200') == 1
+
+        clock.now = 31
+        assert service.quote('NOPE') is None
+        assert server.stats.get('200') == 2
+
+    def test_close_releases_queued_refreshes(self, server, service):
+        clock = FakeClock()
+        service.cache.clock = clock
+        service.quote('AAPL')
+        release = threading.Event()
+        for _ in range(2):                  # occupy both refresh threads
+            service._refresher.submit(release.wait, 5)
+
+        clock.now = 120
+        assert service.quote('AAPL')['stale']          # queues a refresh that can't start yet
+        follower, leader = service.flights.begin('AAPL')
+        assert not leader
+
+        service.close()
+        release.set()
+        with pytest.raises(RuntimeError, match='closed'):
+            SingleFlight.wait(follower, timeout=1)
+        assert service.flights.begin('AAPL')[1]        # the key was finished, a new call can lead
+
+
+class TestWorkerEndpoints:
+    """Test suite for /api/stock-price and /api/stock-prices"""
+
+    @pytest.fixture
+    def client(self, server, service, monkeypatch):
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'worker'))
+        import app as worker
+        # The mock quotes any symbol; upstream has none for NOPE
+        fetch = service.fetch
+        monkeypatch.setattr(service, 'fetch', lambda symbols: {s: q for s, q in fetch(symbols).items() if s != 'NOPE'})
+        monkeypatch.setattr(worker, 'prices', service)
+        return worker.app.test_client()
+
+    def test_single_and_batch(self, client):
+        single = client.get('/api/stock-price?symbol=aapl')
+        batch = client.get('/api/stock-prices?symbols=AAPL,MSFT,NOPE')
+
+        assert single.status_code == 200 and single.json['symbol'] == 'AAPL' and single.json['price'] > 0
+        assert 'stale-while-revalidate' in single.headers['Cache-Control']
+        assert batch.json['quotes']['AAPL']['cached'] is True
+        assert batch.json['missing'] == ['NOPE']
+
+    def test_validation(self, client):
+        assert client.get('/api/stock-price').status_code == 400
+        assert client.get('/api/stock-price?symbol=<script>').status_code == 400
+        assert client.get('/api/stock-price?symbol=NOPE').status_code == 404
+        assert client.get('/api/stock-prices?symbols=' + ','.join(['A'] * 201)).status_code == 400
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
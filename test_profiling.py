@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Unit tests for profiling.py
+Run with: pytest test_profiling.py
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import profiling
+from company_table import CompanyTable
+from instrumentation import Metrics
+from mock_upstream import MockUpstreamServer, synthetic_companies
+from update_market_caps import fetch_sequential
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def inner():
+    busy(0.02)
+
+
+def outer():
+    inner()
+    busy(0.01)
+
+
+def folded(profiler):
+    return {line.rsplit(' ', 1)[0]: int(line.rsplit(' ', 1)[1]) for line in profiler.folded()}
+
+
+class TestProfiling:
+    """Test suite for --profile output"""
+
+    def test_cprofile_folds_into_root_to_leaf_stacks(self, tmp_path):
+        profiler = profiling.Profiler('unit').start()
+        outer()
+        profiler.stop()
+
+        stacks = folded(profiler)
+        paths = [stack for stack in stacks if 'inner (test_profiling.py' in stack]
+        assert paths and all(stack.index('outer (') < stack.index('inner (') for stack in paths)
+        total = sum(count for stack, count in stacks.items() if 'outer (' in stack)
+        assert 25_000 < total < 60_000               # microseconds: ~30 ms spent under outer()
+
+        written = profiler.write(str(tmp_path))
+        assert [os.path.basename(path) for path in written] == [
+            'profile-unit.folded', 'profile-unit.pstats', 'profile-unit.trace.json']
+
+    def test_sampler_tags_stacks_with_the_open_phase(self):
+        profiler = profiling.Profiler('unit', 'sample', interval=0.002).start()
+        with profiling.span('parse', stage='companyfacts'):
+            busy(0.1)
+        profiler.stop()
+
+        tagged = [stack for stack in profiler.samples if stack.startswith('[parse];')]
+        assert tagged and any('busy (test_profiling.py' in stack for stack in tagged)
+        assert profiler.phases['parse']['count'] == 1
+        assert profiler.spans[0]['details'] == {'stage': 'companyfacts'}
+        assert profiling.active() is None
+
+    @patch('update_market_caps.time.sleep')
+    def test_run_records_fetch_parse_and_throttle_spans(self, mock_sleep, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiling, 'REPORT_DIR', str(tmp_path))
+        with MockUpstreamServer(companies=4) as server:
+            monkeypatch.setattr('update_market_caps.endpoints.YAHOO_CHART_URL',
+                                server.url('/v8/finance/chart/{symbol}'))
+            with profiling.profiled('market-caps', 'cprofile'):
+                fetch_sequential(CompanyTable.from_records(synthetic_companies(4)), Metrics('market-caps'))
+
+        with open(tmp_path / 'profile-market-caps.trace.json') as f:
+            trace = json.load(f)
+        assert {phase: totals['count'] for phase, totals in trace['phases'].items()} == {
+            'fetch': 4, 'parse': 4, 'throttle': 4}
+        fetches = [event for event in trace['traceEvents'] if event['name'] == 'fetch']
+        assert {event['args']['symbol'] for event in fetches} == {c['symbol'] for c in synthetic_companies(4)}
+        assert all(event['ph'] == 'X' and event['dur'] > 0 for event in fetches)
+        assert os.path.getsize(tmp_path / 'profile-market-caps.folded') > 0
+
+    def test_off_by_default_and_argument_parsing(self):
+        with profiling.profiled('unit', None) as profiler:
+            with profiling.span('save'):
+                pass
+            Metrics('unit').record_parse('extract', 0.1)
+        assert profiler is None and profiling.active() is None
+
+        parser = argparse.ArgumentParser()
+        profiling.add_profile_argument(parser)
+        assert parser.parse_args([]).profile is None
+        assert parser.parse_args(['--profile']).profile == 'cprofile'
+        assert parser.parse_args(['--profile', 'sample']).profile == 'sample'
+        assert profiling.profile_from_argv(['--batch', '50', '--profile']) == 'cprofile'
+        assert profiling.profile_from_argv(['--profile=sample']) == 'sample'
+        assert profiling.profile_from_argv(['--batch', '50']) is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
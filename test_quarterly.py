@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Unit tests for quarterly.py
+Run with: pytest test_quarterly.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+from mock_upstream import LAST_YEAR, synthetic_companyfacts
+from quarterly import QuarterlyRollup, TTM_METRICS, company_ttm, mark_checked, quarterly_facts, stale_companies
+
+METRICS_MAP = {
+    'revenue': ['RevenueFromContractWithCustomerExcludingAssessedTax', 'Revenues'],
+    'earnings': ['NetIncomeLoss'],
+    'operating_cash_flow': ['NetCashProvidedByUsedInOperatingActivities'],
+    'capex': ['PaymentsToAcquirePropertyPlantAndEquipment'],
+}
+
+
+def fact(val, start, end, form='10-Q', filed=None):
+    return {'start': start, 'end': end, 'val': val, 'form': form, 'filed': filed or end}
+
+
+def companyfacts(**concepts):
+    return {'facts': {'us-gaap': {concept: {'units': {'USD': facts}} for concept, facts in concepts.items()}}}
+
+
+# A 52/53-week fiscal year ending on the last Saturday of September, then Q1 of the next one
+QUARTER_ENDS = ('2023-12-30', '2024-03-30', '2024-06-29', '2024-09-28', '2024-12-28')
+FY_START, NEXT_START = '2023-10-01', '2024-09-29'
+REVENUE = (120, 90, 85, 95, 125)
+CASH_FLOW = (40, 25, 30, 35, 45)
+
+
+def fiscal_company():
+    """Revenue as 3-month facts (none for Q4), operating cash flow as year-to-date facts only"""
+    revenue = [fact(value, start, end) for value, start, end in
+               zip(REVENUE, (FY_START,) + QUARTER_ENDS[:2], QUARTER_ENDS[:3])]
+    revenue += [fact(sum(REVENUE[:4]), FY_START, QUARTER_ENDS[3], '10-K'),
+                fact(REVENUE[4], NEXT_START, QUARTER_ENDS[4])]
+    cash_flow = [fact(sum(CASH_FLOW[:n]), FY_START, QUARTER_ENDS[n - 1], '10-K' if n == 4 else '10-Q')
+                 for n in (1, 2, 3, 4)]
+    cash_flow.append(fact(CASH_FLOW[4], NEXT_START, QUARTER_ENDS[4]))
+    return companyfacts(Revenues=revenue, NetCashProvidedByUsedInOperatingActivities=cash_flow)
+
+
+class TestQuarterly:
+    """Test suite for the quarterly/TTM rollup"""
+
+    def test_q4_and_cash_flow_quarters_derived(self):
+        engine = QuarterlyRollup()
+
+        ttm = engine.update('FISC', quarterly_facts(fiscal_company(), METRICS_MAP))
+
+        assert ttm == {'end': '2024-12-28', 'filed': '2024-12-28', 'revenue': sum(REVENUE[1:]),
+                       'operating_cash_flow': sum(CASH_FLOW[1:])}
+        quarters = engine.quarters('FISC')
+        assert [q['end'] for q in quarters] == list(reversed(QUARTER_ENDS))
+        assert [q['revenue'] for q in quarters] == list(reversed(REVENUE))          # Q4 = FY - 9M
+        assert [q['operating_cash_flow'] for q in quarters] == list(reversed(CASH_FLOW))
+
+    def test_alias_order_restatements_and_partial_durations(self):
+        data = companyfacts(
+            RevenueFromContractWithCustomerExcludingAssessedTax=[
+                fact(100, '2024-01-01', '2024-03-31', filed='2024-05-01'),
+                fact(110, '2024-01-01', '2024-03-31', filed='2025-05-01'),      # restated a year later
+                fact(999, '2024-01-01', '2024-02-15'),                          # 6 weeks: not a quarter
+                fact(999, '2024-01-01', '2024-03-31', form='8-K'),
+            ],
+            Revenues=[fact(50, '2024-01-01', '2024-03-31'), fact(60, '2024-04-01', '2024-06-30')],
+            NetIncomeLoss=[fact(5, '2023-07-01', '2024-06-30', '10-K')],
+        )
+        engine = QuarterlyRollup()
+        engine.update('A', quarterly_facts(data, METRICS_MAP))
+
+        # Q2 only under the second alias; Q1 from the first alias, latest filing
+        assert [q.get('revenue') for q in engine.quarters('A')] == [60, 110]
+        # No revenue TTM: anchored on earnings instead
+        assert engine.results['A'] == {'end': '2024-06-30', 'filed': '2025-05-01', 'earnings': 5}
+
+    def test_one_pass_matches_per_company_and_new_10q_is_incremental(self):
+        engine = QuarterlyRollup()
+        documents = {f'S{i}': synthetic_companyfacts(i, filler_concepts=0) for i in range(60)}
+        for symbol, data in documents.items():
+            engine.add(symbol, quarterly_facts(data, METRICS_MAP))
+        together = dict(engine.compute())
+        assert together == {symbol: QuarterlyRollup().update(symbol, engine.facts[symbol]) for symbol in documents}
+        assert together == {symbol: company_ttm(engine.facts[symbol]) for symbol in documents}
+        assert company_ttm(quarterly_facts(companyfacts(), METRICS_MAP)) is None
+        assert together['S3']['end'] == f'{LAST_YEAR}-12-31' and set(together['S3']) >= set(TTM_METRICS)
+
+        # A Q1 10-Q lands for one company: only it is recomputed, its TTM moves forward a quarter
+        data = documents['S7']
+        us_gaap = data['facts']['us-gaap']
+        revenue = next(us_gaap[a] for a in METRICS_MAP['revenue'] if a in us_gaap)['units']['USD']
+        old_q1 = next(f['val'] for f in revenue if f['end'] == f'{LAST_YEAR}-03-31' and f['form'] == '10-Q')
+        revenue.append(fact(old_q1 + 1000, f'{LAST_YEAR + 1}-01-01', f'{LAST_YEAR + 1}-03-31',
+                            filed=f'{LAST_YEAR + 1}-05-02'))
+        started = time.perf_counter()
+        updated = engine.update('S7', quarterly_facts(data, METRICS_MAP))
+        assert time.perf_counter() - started < 0.05
+        assert updated['end'] == f'{LAST_YEAR + 1}-03-31' and updated['filed'] == f'{LAST_YEAR + 1}-05-02'
+        assert updated['revenue'] == together['S7']['revenue'] + 1000
+        assert 'earnings' not in updated            # no Q1 earnings yet: left out, not mixed with the FY
+        assert engine.results['S8'] == together['S8']
+
+    def test_only_facts_a_rollup_can_reach_are_kept(self):
+        data = fiscal_company()
+        revenue = data['facts']['us-gaap']['Revenues']['units']['USD']
+        # Ten years of older quarters, plus an old quarter restated in the latest filing
+        revenue += [fact(1, f'{year}-01-01', f'{year}-03-31') for year in range(2010, 2020)]
+        revenue.append(fact(2, '2015-01-01', '2015-03-31', filed='2025-02-01'))
+
+        facts = quarterly_facts(data, METRICS_MAP)
+
+        assert facts.end.min() == np.datetime64('2015-03-31') and len(facts.end) == 11
+        assert QuarterlyRollup().update('FISC', facts) == QuarterlyRollup().update('FISC', quarterly_facts(
+            fiscal_company(), METRICS_MAP)) | {'filed': '2025-02-01'}
+
+    def test_stale_companies_and_apply(self):
+        companies = [{'symbol': 'NEW', 'ttm': {'end': '2024-06-30', 'filed': '2024-08-01'}},
+                     {'symbol': 'SAME', 'ttm': {'end': '2024-06-30', 'filed': '2024-08-01'}},
+                     {'symbol': 'NONE'}, {'symbol': 'UNLISTED'}]
+        filings = {'companies': {
+            'NEW': {'cik': '0000000001', 'filings': [{'form': '8-K', 'date': '2024-12-01'},
+                                                     {'form': '10-Q', 'date': '2024-11-01'}]},
+            'SAME': {'cik': '0000000002', 'filings': [{'form': '8-K', 'date': '2024-12-01'},
+                                                      {'form': '10-Q', 'date': '2024-08-01'}]},
+            'NONE': {'cik': '0000000003', 'filings': [{'form': '10-K', 'date': '2024-02-01'}]},
+        }}
+
+        assert stale_companies(companies, filings) == {'NEW': '0000000001', 'NONE': '0000000003'}
+
+        engine = QuarterlyRollup()
+        engine.update('NEW', quarterly_facts(fiscal_company(), METRICS_MAP))
+        engine.update('NONE', quarterly_facts(companyfacts(), METRICS_MAP))
+        assert engine.apply(companies) == ['NEW']
+        assert companies[0]['ttm']['end'] == '2024-12-28' and 'ttm' not in companies[2]
+
+    def test_checked_companies_are_not_stale_again(self):
+        companies = [{'symbol': 'NONE'},
+                     {'symbol': 'AMENDED', 'ttm': {'end': '2024-06-30', 'filed': '2024-08-01'}}]
+        filings = {'companies': {
+            'NONE': {'cik': '0000000003', 'filings': [{'form': '10-K', 'date': '2024-02-01'}]},
+            'AMENDED': {'cik': '0000000004', 'filings': [{'form': '10-Q/A', 'date': '2024-09-15'}]},
+        }}
+        assert stale_companies(companies, filings) == {'NONE': '0000000003', 'AMENDED': '0000000004'}
+
+        # Read, rolled up: no TTM for NONE, the amendment left AMENDED's "filed" where it was
+        assert mark_checked(companies, {'NONE': '2024-02-01', 'AMENDED': '2024-09-15'}) == ['NONE', 'AMENDED']
+        assert mark_checked(companies, {'NONE': '2024-02-01'}) == []
+        assert stale_companies(companies, filings) == {}
+
+        filings['companies']['NONE']['filings'].append({'form': '10-Q', 'date': '2024-05-01'})
+        assert stale_companies(companies, filings) == {'NONE': '0000000003'}
+
+    def test_universe_rollup_is_fast(self):
+        engine = QuarterlyRollup()
+        base = quarterly_facts(synthetic_companyfacts(1, filler_concepts=0), METRICS_MAP)
+        for i in range(2000):
+            engine.add(f'S{i}', base._replace(value=base.value * (1 + i / 1000)))
+
+        started = time.perf_counter()
+        computed = engine.compute()
+        assert time.perf_counter() - started < 1.0
+        assert np.isclose(computed['S1000']['revenue'], computed['S0']['revenue'] * 2, rtol=1e-9)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
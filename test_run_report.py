@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for run_report.py
+Run with: pytest test_run_report.py
+"""
+
+import json
+import os
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+from instrumentation import Metrics
+from run_report import RunReport, diff_reports, main
+from fetch_comprehensive_data import ComprehensiveDataFetcher
+
+
+def make_report(companies: dict) -> dict:
+    return {'totals': {'companies': len(companies)}, 'companies': companies}
+
+
+class TestRunReport:
+    """Test suite for RunReport"""
+
+    def test_company_stats_are_attributed(self):
+        """Requests and parse time recorded inside a company scope land on that company"""
+        metrics = Metrics('test')
+        report = RunReport('test', metrics)
+
+        stats = metrics.begin_company('AAPL')
+        metrics.record_request('https://data.sec.gov/x', 0.5, status=200, size=1000)
+        with metrics.parse_timer('companyfacts'):
+            pass
+        report.record(metrics.end_company(stats), 'ok', aliases={'revenue': 'Revenues'})
+
+        entry = report.to_dict()['companies']['AAPL']
+        assert entry['requests'] == 1
+        assert entry['bytes'] == 1000
+        assert entry['fetch_seconds'] == 0.5
+        assert entry['aliases'] == {'revenue': 'Revenues'}
+
+    def test_failures_listed_with_reasons(self, tmp_path):
+        """Failed companies appear in failures with their reason"""
+        report = RunReport('test', Metrics('test'))
+        report.record({'symbol': 'FAKE'}, 'failed', reason='CIK not found for ticker')
+        report.record({'symbol': 'MSFT'}, 'skipped')
+
+        path = report.write(str(tmp_path / 'run_report.json'))
+        with open(path) as f:
+            data = json.load(f)
+
+        assert data['failures'] == [{'symbol': 'FAKE', 'reason': 'CIK not found for ticker'}]
+        assert data['totals']['failed'] == 1
+        assert data['totals']['skipped'] == 1
+
+    @patch('fetch_comprehensive_data.time.sleep')
+    def test_fetcher_records_aliases(self, mock_sleep):
+        """process_companies records resolved GAAP aliases per company"""
+        fetcher = ComprehensiveDataFetcher()
+        tickers = Mock(ok=True, status_code=200, content=b'')
+        tickers.json.return_value = {"0": {"cik_str": 789019, "ticker": "MSFT"}}
+        facts = Mock(ok=True, status_code=200, content=json.dumps({"facts": {"us-gaap": {
+            "Revenues": {"units": {"USD": [{"end": "2023-06-30", "val": 200, "form": "10-K"}]}}
+        }}}).encode())
+        fetcher.session.get = Mock(side_effect=[tickers, facts])
+
+        fetcher.process_companies([{'symbol': 'MSFT', 'name': 'Microsoft'}])
+
+        entry = fetcher.report.companies['MSFT']
+        assert entry['status'] == 'ok'
+        assert entry['aliases'] == {'revenue': 'Revenues'}
+        assert entry['requests'] == 2
+
+
+class TestDiffReports:
+    """Test suite for report diffing"""
+
+    def test_regression_detected(self):
+        """A company that got much slower is a regression; small noise is not"""
+        old = make_report({'AAPL': {'wall_seconds': 1.0}, 'MSFT': {'wall_seconds': 0.01}})
+        new = make_report({'AAPL': {'wall_seconds': 3.0}, 'MSFT': {'wall_seconds': 0.05}})
+
+        diff = diff_reports(old, new)
+        assert [r['symbol'] for r in diff['regressions']] == ['AAPL']
+
+    def test_new_failures_and_alias_changes(self):
+        """Status flips and alias switches are reported"""
+        old = make_report({
+            'NVDA': {'status': 'ok', 'aliases': {'revenue': 'Revenues'}},
+            'GOOG': {'status': 'failed'}
+        })
+        new = make_report({
+            'NVDA': {'status': 'failed', 'reason': 'companyfacts HTTP 403',
+                     'aliases': {'revenue': 'RevenueFromContractWithCustomerExcludingAssessedTax'}},
+            'GOOG': {'status': 'ok'}
+        })
+
+        diff = diff_reports(old, new)
+        assert diff['newly_failed'] == [{'symbol': 'NVDA', 'reason': 'companyfacts HTTP 403'}]
+        assert diff['recovered'] == ['GOOG']
+        assert diff['alias_changes'][0]['metric'] == 'revenue'
+
+    def test_cli_fail_on_regression(self, tmp_path, capsys):
+        """The diff CLI exits non-zero when asked to gate on regressions"""
+        old_path, new_path = tmp_path / 'old.json', tmp_path / 'new.json'
+        old_path.write_text(json.dumps(make_report({'AAPL': {'wall_seconds': 1.0}})))
+        new_path.write_text(json.dumps(make_report({'AAPL': {'wall_seconds': 5.0}})))
+
+        assert main(['diff', str(old_path), str(new_path)]) == 0
+        assert main(['diff', str(old_path), str(new_path), '--fail-on-regression']) == 1
+        assert 'AAPL' in capsys.readouterr().out
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
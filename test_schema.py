@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Unit tests for schema.py
+Run with: pytest test_schema.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import fastjson
+from schema import Company, SchemaError, load_companies, load_company_records, validate_companies
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'financial_data.json')
+
+
+class TestCompanySchema:
+    """Test suite for the typed Company record"""
+
+    def test_checked_in_dataset_is_valid(self):
+        records = load_company_records(DATA_FILE)
+        assert len(records) == len({r.symbol for r in records})
+        assert all(isinstance(r.revenue, (int, type(None))) for r in records)
+
+    def test_load_save_round_trip_is_byte_identical(self, tmp_path):
+        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+            original = f.read()
+        path = str(tmp_path / 'financial_data.json')
+
+        fastjson.dump(path, [r.to_dict() for r in load_company_records(DATA_FILE)])
+
+        with open(path, 'r', encoding='utf-8') as f:
+            assert f.read() == original
+
+    def test_whole_floats_normalised_and_extras_kept(self):
+        company = Company.from_dict({'symbol': 'AAPL', 'name': 'Apple', 'revenue': 100.0,
+                                     'profit_margin': 25, 'analyst_estimates': {'eps': 6.1}})
+
+        assert company.revenue == 100 and isinstance(company.revenue, int)
+        assert company.profit_margin == 25.0 and isinstance(company.profit_margin, float)
+        assert company['analyst_estimates'] == {'eps': 6.1}
+        assert list(company.to_dict()) == ['symbol', 'name', 'revenue', 'profit_margin', 'analyst_estimates']
+
+    def test_all_problems_reported(self):
+        companies = [
+            {'symbol': 'AAPL', 'name': 'Apple', 'revenue': '383B'},
+            {'symbol': 'MSFT', 'name': 'Microsoft', 'market_cap': True, 'profit_margin': 'high'},
+            {'symbol': 'AAPL', 'name': 'Apple again'},
+            {'symbol': 'XOM'},
+        ]
+        with pytest.raises(SchemaError) as exc:
+            validate_companies(companies)
+
+        assert exc.value.problems == [
+            "AAPL.revenue: expected int, got str '383B'",
+            'MSFT.market_cap: expected int, got bool True',
+            "MSFT.profit_margin: expected float, got str 'high'",
+            'AAPL: duplicate symbol',
+            'XOM: missing name',
+        ]
+
+    def test_setitem_validates(self):
+        company = Company('AAPL', 'Apple')
+        with pytest.raises(TypeError):
+            company['earnings'] = 'n/a'
+        company['earnings'] = 5
+        assert company.get('earnings') == 5 and company.get('capex', 0) == 0
+
+    def test_load_companies_validates_through_company(self, tmp_path):
+        path = str(tmp_path / 'financial_data.json')
+        fastjson.dump(path, [{'symbol': 'AAPL', 'name': 'Apple', 'revenue': 100.0, 'note': 'x'},
+                             {'symbol': 'MSFT', 'name': 'Microsoft', 'earnings': 'n/a'}])
+        with pytest.raises(SchemaError) as exc:
+            load_companies(path)
+        assert exc.value.problems == ["MSFT.earnings: expected int, got str 'n/a'"]
+
+        fastjson.dump(path, [{'symbol': 'AAPL', 'name': 'Apple', 'revenue': 100.0, 'note': 'x'}])
+        assert load_companies(path) == [r.to_dict() for r in load_company_records(path)]
+
+    def test_load_companies_rejects_non_list(self, tmp_path):
+        path = str(tmp_path / 'bad.json')
+        fastjson.dump(path, {'symbol': 'AAPL'})
+        with pytest.raises(SchemaError):
+            load_companies(path)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
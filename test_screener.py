@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Unit tests for screener.py
+Run with: pytest test_screener.py
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+from company_table import CompanyTable
+from screener import ScreenError, Screener, tokenize
+
+
+def company(symbol, sector, revenue, operating_margin, free_cash_flow, market_cap, debt_to_equity=0.3, year=2024):
+    return {'symbol': symbol, 'name': f'{symbol} Inc.', 'sector': sector, 'year': year, 'revenue': revenue,
+            'operating_margin': operating_margin, 'free_cash_flow': free_cash_flow, 'market_cap': market_cap,
+            'debt_to_equity': debt_to_equity}
+
+
+COMPANIES = [
+    company('AAA', 'Technology', 100e9, 30.0, 20e9, 1000e9),        # fcf_yield 2%
+    company('BBB', 'Technology', 50e9, 25.0, 10e9, 200e9),          # 5%
+    company('CCC', 'Energy', 80e9, 22.0, 12e9, 300e9, 1.5),         # 4%, too much debt
+    company('DDD', 'Health Care', 40e9, 10.0, 4e9, 100e9),          # 4%, thin margin
+    {'symbol': 'EEE', 'name': 'EEE Inc.', 'sector': 'Technology', 'year': 2024, 'operating_margin': 40.0},
+]
+
+
+@pytest.fixture
+def screener():
+    return Screener(CompanyTable.from_records(COMPANIES), 'v1')
+
+
+def symbols(screener, text):
+    result = screener.run(text)
+    return [screener.symbols[row] for row in result.rows]
+
+
+class TestScreener:
+    """Test suite for the screening language"""
+
+    def test_tokenize_suffixes(self):
+        tokens = tokenize('market_cap > 1.5T and operating_margin >= 20%')
+
+        assert [t[1] for t in tokens if t[0] == 'number'] == [1.5e12, 20.0]
+        assert tokens[3] == ('keyword', 'and', 18)
+
+    def test_filter_rank_limit(self, screener):
+        text = 'operating_margin > 20% and debt_to_equity < 0.5 rank by fcf_yield desc'
+
+        assert symbols(screener, text) == ['BBB', 'AAA']
+        assert symbols(screener, 'rank by fcf_yield asc limit 3') == ['AAA', 'CCC', 'DDD']
+        assert symbols(screener, 'revenue / 1B > 60 and not sector == "Energy"') == ['AAA']
+        result = screener.run('rank by free_cash_flow / revenue * 100 limit 1')
+        assert screener.records(result, ['revenue'])[0] == {
+            'symbol': 'AAA', 'name': 'AAA Inc.', 'sector': 'Technology', 'rank': 20.0, 'revenue': 100e9}
+
+    def test_missing_values(self, screener):
+        # EEE has no revenue: excluded by any comparison on it, included by its negation, never ranked
+        assert 'EEE' not in symbols(screener, 'revenue != 0')
+        assert 'EEE' in symbols(screener, 'not revenue > 0')
+        assert 'EEE' not in symbols(screener, 'operating_margin > 0 rank by fcf_yield')
+        assert symbols(screener, 'max(revenue, 0) < 1') == []
+
+    def test_errors_point_at_position(self, screener):
+        with pytest.raises(ScreenError, match=r"unknown field 'revenu' \(did you mean revenue\?\) at position 0"):
+            screener.run('revenu > 5')
+        with pytest.raises(ScreenError, match='position 7'):
+            screener.run('sector > "Energy"')
+        with pytest.raises(ScreenError):
+            screener.run('revenue > ')
+        with pytest.raises(ScreenError):
+            screener.run('revenue + 1')
+
+    def test_results_cached_per_data_version(self, screener):
+        screener.run('revenue > 50B')
+        screener.run('revenue  >  50B')
+        assert (screener.hits, screener.misses) == (1, 1)
+
+        screener.update(CompanyTable.from_records(COMPANIES[:1]), 'v2')
+        assert symbols(screener, 'revenue > 50B') == ['AAA']
+        assert screener.misses == 2
+
+    def test_snapshot_survives_concurrent_updates(self, screener):
+        data, expected = screener.data, symbols(screener, 'revenue > 0')
+        screener.update(CompanyTable.from_records(COMPANIES[:1]), 'v2')
+
+        result = screener.run('revenue > 0', data)
+        rendered = [record['symbol'] for record in screener.records(result, ['revenue'], data)]
+        assert rendered == expected == ['AAA', 'BBB', 'CCC', 'DDD']
+
+        tables = [CompanyTable.from_records(COMPANIES), CompanyTable.from_records(COMPANIES[:2])]
+        stop, errors = threading.Event(), []
+
+        def reload():
+            for i in range(200):
+                screener.update(tables[i % 2], f'r{i}')
+            stop.set()
+
+        def request():
+            while not stop.is_set():
+                try:
+                    data = screener.data
+                    rows = screener.records(screener.run(f'revenue > {len(data.symbols)}', data), [], data)
+                    assert len(rows) <= len(data.symbols) and {r['symbol'] for r in rows} <= set(data.symbols)
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        threads = [threading.Thread(target=reload)] + [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+
+    def test_refresh_reloads_changed_file(self, tmp_path):
+        path = tmp_path / 'financial_data.json'
+        path.write_text(json.dumps(COMPANIES))
+        screener = Screener.load(str(path))
+        assert not screener.refresh(str(path))
+
+        path.write_text(json.dumps(COMPANIES[:2]))
+        os.utime(path, ns=(time.time_ns() + 10 ** 9,) * 2)
+        assert screener.refresh(str(path))
+        assert symbols(screener, 'revenue > 0') == ['AAA', 'BBB']
+
+    def test_many_screens_are_fast(self):
+        rng = np.random.default_rng(0)
+        records = [company(f'S{i}', 'Technology', float(rng.uniform(1e9, 1e11)), float(rng.uniform(-10, 50)),
+                           float(rng.uniform(-1e9, 1e10)), float(rng.uniform(1e9, 1e12)), float(rng.uniform(0, 3)))
+                   for i in range(1000)]
+        screener = Screener(CompanyTable.from_records(records), 'v1')
+
+        started = time.perf_counter()
+        for threshold in range(300):
+            screener.run(f'operating_margin > {threshold / 10} and debt_to_equity < 1 rank by fcf_yield desc limit 20')
+        assert time.perf_counter() - started < 1.0
+        assert screener.misses == 300
+
+    def test_worker_endpoint(self, tmp_path, monkeypatch):
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'worker'))
+        import app as worker
+        path = tmp_path / 'financial_data.json'
+        path.write_text(json.dumps(COMPANIES))
+        monkeypatch.setattr(worker, 'DATA_FILE', str(path))
+        monkeypatch.setattr(worker, '_screener', None)
+        client = worker.app.test_client()
+
+        response = client.get('/api/screen', query_string={'q': 'operating_margin > 20 rank by fcf_yield', 'limit': 2})
+        body = response.get_json()
+        assert response.status_code == 200
+        assert body['count'] == 3
+        assert [c['symbol'] for c in body['companies']] == ['BBB', 'CCC']
+        assert body['companies'][0]['operating_margin'] == 25.0
+
+        response = client.get('/api/screen', query_string={'q': 'revenue >'})
+        assert response.status_code == 400 and 'position' in response.get_json()['error']
+        assert client.get('/api/screen').status_code == 400
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Unit tests for shards.py
+Run with: pytest test_shards.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import fastjson
+from shards import build_shards, write_shards
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'financial_data.json')
+
+
+def shard_files(data_dir):
+    return sorted(os.listdir(os.path.join(data_dir, 'companies')))
+
+
+class TestShards:
+    """Test suite for the per-company shards and index"""
+
+    def test_index_and_shards_cover_the_dataset(self, tmp_path):
+        records = fastjson.load(DATA_FILE)
+
+        result = write_shards(records, str(tmp_path))
+
+        with open(tmp_path / 'index.json', 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        assert result['written'] == index['count'] == len(records)
+        first = index['companies'][0]
+        assert set(first) == {'symbol', 'name', 'sector', 'market_cap', 'shard'}
+        with open(tmp_path / first['shard'], 'r', encoding='utf-8') as f:
+            assert json.load(f) == records[0]
+
+    def test_shard_names_depend_only_on_content(self):
+        records = [{'symbol': 'BRK.B', 'name': 'Berkshire', 'revenue': 1}, {'symbol': 'AAPL', 'name': 'Apple'}]
+        index, shards = build_shards(records)
+        again, _ = build_shards([dict(records[0]), dict(records[1])])
+        changed, _ = build_shards([dict(records[0], revenue=2), records[1]])
+
+        paths = [c['shard'] for c in index['companies']]
+        assert paths == [c['shard'] for c in again['companies']]
+        assert paths[0].startswith('companies/BRK.B.') and paths[0] != changed['companies'][0]['shard']
+        assert paths[1] == changed['companies'][1]['shard']
+
+    def test_unchanged_shards_are_not_rewritten_and_old_ones_pruned(self, tmp_path):
+        data_dir = str(tmp_path)
+        records = [{'symbol': 'AAPL', 'name': 'Apple', 'revenue': 1}, {'symbol': 'MSFT', 'name': 'Microsoft'}]
+        write_shards(records, data_dir)
+        first = shard_files(data_dir)
+
+        records[0]['revenue'] = 2
+        result = write_shards(records, data_dir)
+        assert (result['written'], result['removed']) == (1, 0)
+        assert len(shard_files(data_dir)) == 3      # previous AAPL shard kept for clients on the old index
+
+        result = write_shards(records, data_dir)
+        assert (result['written'], result['removed']) == (0, 1)
+        assert first[0] not in shard_files(data_dir) and first[1] in shard_files(data_dir)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
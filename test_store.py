@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Unit tests for store.py
+Run with: pytest test_store.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import store
+from publish import publish_dataset
+
+
+def snapshot(fy, fcf_margins):
+    """One yearly dataset: {symbol: FCF margin} at revenue 100B"""
+    return [{'symbol': symbol, 'name': f'{symbol} Inc.', 'sector': 'Technology', 'year': fy,
+             'revenue': 100_000_000_000, 'free_cash_flow': int(margin * 100_000_000_000),
+             'market_cap': 10 ** 12, 'market_cap_updated': f'{fy + 1}-02-01T22:00:00'}
+            for symbol, margin in fcf_margins.items()]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = store.connect(str(tmp_path / 'financial.db'))
+    history = [
+        (2021, {'UP': 0.10, 'FLAT': 0.20, 'GAP': 0.10}),
+        (2022, {'UP': 0.12, 'FLAT': 0.25, 'GAP': 0.12}),
+        (2023, {'UP': 0.15, 'FLAT': 0.22}),
+        (2024, {'UP': 0.18, 'FLAT': 0.30, 'GAP': 0.20}),
+    ]
+    for fy, margins in history:
+        store.upsert(conn, snapshot(fy, margins), dataset_hash=f'h{fy}')
+    yield conn
+    conn.close()
+
+
+class TestStore:
+    """Test suite for the SQLite snapshot store"""
+
+    def test_facts_of_periods(self):
+        record = {'symbol': 'A', 'year': 2024, 'revenue': 10, 'operating_margin': 5.0,
+                  'periods': {'revenue': {'fy': 2025, 'end': '2025-06-30'}},
+                  'market_cap': 7, 'market_cap_updated': '2025-10-03T20:00:00', 'analyst': {'rating': 'buy'}}
+
+        facts = {f[1]: f[2:] for f in store.facts_of(record)}
+
+        assert facts['revenue'] == ('FY2025', 2025, '2025-06-30', 10.0)
+        assert facts['operating_margin'] == ('FY2025', 2025, '2025-06-30', 5.0)     # derived: revenue's period
+        assert facts['market_cap'] == ('2025-10-03', 2025, '2025-10-03', 7.0)
+        assert set(facts) == {'revenue', 'operating_margin', 'market_cap'}
+
+    def test_upsert_is_per_period_and_idempotent(self, conn):
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert store.stats(conn)['fiscal_years'] == [2021, 2022, 2023, 2024]
+        assert store.upsert(conn, snapshot(2024, {'UP': 0.18}), dataset_hash='h2024')[1] == 0
+
+        # A restatement overwrites its period instead of adding a row
+        facts = store.stats(conn)['facts']
+        _, written = store.upsert(conn, snapshot(2024, {'UP': 0.19}), dataset_hash='restated')
+        assert written == 1 and store.stats(conn)['facts'] == facts
+        rows = store.history(conn, 'UP', ['free_cash_flow'])
+        assert [r['period'] for r in rows] == ['FY2021', 'FY2022', 'FY2023', 'FY2024']
+        assert rows[-1]['value'] == 19_000_000_000
+
+    def test_rising_ratio(self, conn):
+        rising = store.rising(conn, 'free_cash_flow/revenue', years=3)
+        falling = store.rising(conn, 'free_cash_flow/revenue', years=1, falling=True)
+
+        # GAP skipped FY2023, FLAT dipped in FY2023
+        assert [(r['symbol'], r['from_fy'], r['to_fy']) for r in rising] == [('UP', 2021, 2024)]
+        assert rising[0]['first'] == pytest.approx(0.10) and rising[0]['last'] == pytest.approx(0.18)
+        assert [r['symbol'] for r in falling] == []
+        assert [r['symbol'] for r in store.top(conn, 'free_cash_flow/revenue', limit=2)] == ['FLAT', 'GAP']
+
+    def test_publish_records_snapshot(self, tmp_path):
+        paths = (str(tmp_path / 'data' / 'financial_data.json'), str(tmp_path / 'public' / 'financial_data.json'))
+        for path in paths:
+            os.makedirs(os.path.dirname(path))
+
+        written = publish_dataset(snapshot(2024, {'UP': 0.1}), paths)
+        conn = store.connect(str(tmp_path / 'data' / store.DB_NAME), readonly=True)
+
+        assert 'snapshot 1' in written[-1]
+        assert store.stats(conn)['companies'] == 1
+        assert not (tmp_path / 'public' / store.DB_NAME).exists()
+        conn.close()
+
+    def test_worker_endpoints(self, conn, monkeypatch):
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'worker'))
+        import app as worker
+        monkeypatch.setattr(worker, 'STORE_PATH', conn.execute('PRAGMA database_list').fetchone()[2])
+        monkeypatch.setattr(worker, '_store_local', type(worker._store_local)())
+        client = worker.app.test_client()
+
+        history = client.get('/api/history?symbol=up&metrics=revenue,free_cash_flow').json
+        rising = client.get('/api/rising?metric=free_cash_flow/revenue&years=3').json
+
+        assert len(history['series']['free_cash_flow']) == 4
+        assert [c['symbol'] for c in rising['companies']] == ['UP']
+        assert client.get('/api/rising?metric=1;drop').status_code == 400
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
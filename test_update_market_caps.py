@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Unit tests for update_market_caps.py
+Run with: pytest test_update_market_caps.py
+"""
+
+import asyncio
+import os
+import sys
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+import async_http
+from company_table import CompanyTable
+from instrumentation import Metrics
+from mock_upstream import MockUpstreamServer, synthetic_companies
+from update_market_caps import (apply_quotes, fetch_async, fetch_once_async, fetch_sequential, load_share_counts,
+                                save_share_counts)
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    with MockUpstreamServer(companies=12) as server:
+        monkeypatch.setattr('update_market_caps.endpoints.YAHOO_CHART_URL', server.url('/v8/finance/chart/{symbol}'))
+        monkeypatch.setattr('update_market_caps.endpoints.YAHOO_QUOTE_URL', server.url('/v7/finance/quote'))
+        monkeypatch.setattr('update_market_caps.SHARE_COUNTS_FILE', str(tmp_path / 'share_counts.json'))
+        yield server
+
+
+def table(n=12):
+    return CompanyTable.from_records(synthetic_companies(n))
+
+
+def values(quotes):
+    return {symbol: quote[:2] for symbol, quote in quotes.items()}
+
+
+class TestUpdateMarketCaps:
+    """Test suite for the market cap updater"""
+
+    @patch('update_market_caps.time.sleep')
+    @pytest.mark.parametrize('backend', ['httpx', 'requests'])
+    def test_async_matches_sequential(self, mock_sleep, server, backend, monkeypatch):
+        if backend == 'requests':
+            monkeypatch.setattr(async_http, 'httpx', None)
+        elif async_http.httpx is None:
+            pytest.skip('httpx not installed')
+        metrics = Metrics('test')
+
+        expected = fetch_sequential(table(), metrics)
+        actual = asyncio.run(fetch_once_async(table(), metrics, concurrency=4, timeout=5))
+
+        assert values(actual) == values(expected)
+        assert all(market_cap for market_cap, _, _ in actual.values())
+        assert metrics.counter_total('http_requests_total') == 24
+
+    def test_timeouts_give_partial_results(self, server):
+        server.faults.update(latency_ms=400)
+        companies = table()
+        companies['ZAAAA']['market_cap'] = 123
+
+        async def run():
+            client = async_http.open_client(4, timeout=0.1)
+            try:
+                return await fetch_async(client, companies, Metrics('test'), 4, 0.1, verbose=False)
+            finally:
+                await client.aclose()
+
+        quotes = asyncio.run(run())
+
+        assert len(quotes) == 12
+        assert all(market_cap is None for market_cap, _, _ in quotes.values())
+        assert any('timed out' in how for _, how, _ in quotes.values())
+        assert apply_quotes(companies, quotes) == 0
+        assert companies['ZAAAA']['market_cap'] == 123
+
+    def test_prices_only_matches_full_fetch(self, server):
+        full = asyncio.run(fetch_once_async(table(), Metrics('test'), concurrency=4, timeout=5))
+        assert len(load_share_counts()) == 12
+
+        metrics = Metrics('test')
+        fast = asyncio.run(fetch_once_async(table(), metrics, concurrency=4, timeout=5, prices_only=True))
+
+        assert {how for _, how, _ in fast.values()} == {'Priced'}
+        for symbol, (market_cap, _, _) in fast.items():
+            assert market_cap == pytest.approx(full[symbol][0], rel=1e-9)
+        assert metrics.counter_total('http_requests_total') == 1   # one batched quote request
+
+    def test_prices_only_refetches_stale_share_counts(self, server):
+        companies = table()
+        asyncio.run(fetch_once_async(companies, Metrics('test'), concurrency=4, timeout=5))
+        counts = load_share_counts()
+        counts['ZAAAB']['as_of'] = (date.today() - timedelta(days=30)).isoformat()
+        save_share_counts(counts)
+        companies['ZAAAC']['shares_outstanding'] = 1_000_000   # a new filing since the count was cached
+
+        quotes = asyncio.run(fetch_once_async(companies, Metrics('test'), concurrency=4, timeout=5, prices_only=True))
+
+        assert {symbol for symbol, (_, how, _) in quotes.items() if how != 'Priced'} == {'ZAAAB', 'ZAAAC'}
+        assert quotes['ZAAAB'][1] == 'Updated'
+        assert load_share_counts()['ZAAAB']['as_of'] == date.today().isoformat()
+        assert load_share_counts()['ZAAAC']['reported'] == 1_000_000
+
+    def test_threshold_skips_small_moves(self):
+        companies = CompanyTable.from_records([
+            {'symbol': 'AAPL', 'name': 'Apple', 'market_cap': 1000},
+            {'symbol': 'MSFT', 'name': 'Microsoft', 'market_cap': 1000},
+        ])
+        quotes = {'AAPL': (1001, 'Updated', {}), 'MSFT': (1100, 'Updated', {})}
+
+        assert apply_quotes(companies, quotes, threshold=0.005) == 1
+
+        assert companies['AAPL']['market_cap'] == 1000 and 'market_cap_updated' not in companies['AAPL']
+        assert companies['MSFT']['market_cap'] == 1100 and companies['MSFT']['market_cap_updated']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Unit tests for worker/app.py startup (app factory, lazy imports, warm-up)
+Run with: pytest test_worker_app.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+from mock_upstream import MockUpstreamServer
+
+WORKER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker')
+HEAVY_MODULES = ('numpy', 'requests', 'asyncio', 'price_cache', 'store', 'screener')
+
+
+def run_worker(script, **env):
+    """Run `script` in a fresh interpreter with the worker importable; returns its last stdout line as JSON"""
+    result = subprocess.run([sys.executable, '-c', 'import app\n' + script], cwd=WORKER_DIR, capture_output=True,
+                            text=True, timeout=60, env={**os.environ, **env})
+    assert result.returncode == 0, result.stderr
+    return result.stdout, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestWorkerStartup:
+    """Test suite for the worker's cold start"""
+
+    def test_import_leaves_pipeline_modules_unloaded(self):
+        _, loaded = run_worker(
+            'import json, sys\n'
+            'client = app.app.test_client()\n'
+            'client.get("/healthz")\n'
+            f'print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))',
+            WORKER_PREWARM='0')
+
+        assert loaded == []
+
+    def test_first_request_warms_modules_and_pools(self):
+        with MockUpstreamServer(companies=3) as server:
+            output, health = run_worker(
+                'import json, time\n'
+                'client = app.create_app({"COLD_START_BUDGET": 0.0}).test_client()\n'
+                'client.get("/healthz")\n'
+                'while "prewarm" not in app._startup:\n'
+                '    time.sleep(0.01)\n'
+                'print(json.dumps({**client.get("/healthz").get_json(), "metrics": client.get("/metrics").text}))',
+                UPSTREAM_BASE_URL=server.base_url, GITHUB_TOKEN='')
+
+        assert 'over the 0.000s budget' in output
+        assert set(health['imports']) == {'price_cache', 'store', 'screener'}
+        startup = health['startup']
+        assert startup['cold_start'] == pytest.approx(startup['ready'] + startup['first_response'], abs=1e-3)
+        assert 'sp100_worker_cold_start_over_budget_total{job="worker"} 1' in health['metrics']
+        assert 'prewarm_errors_total' not in health['metrics']        # screener data and quote pool both ready
+
+    def test_factory_builds_independent_apps_on_shared_services(self, tmp_path, monkeypatch):
+        sys.path.insert(0, WORKER_DIR)
+        import app as worker
+        monkeypatch.setattr(worker, 'DATA_FILE', str(tmp_path / 'financial_data.json'))
+        monkeypatch.setattr(worker, '_screener', None)
+        (tmp_path / 'financial_data.json').write_text(json.dumps([{'symbol': 'AAA', 'name': 'A', 'revenue': 5}]))
+
+        first, second = worker.create_app({'PREWARM': False}), worker.create_app({'PREWARM': False})
+
+        assert first is not second and first.config['PREWARM'] is False
+        assert first.test_client().get('/api/screen?q=revenue > 1').get_json()['count'] == 1
+        assert second.test_client().get('/healthz').get_json()['status'] == 'ok'
+        assert 'endpoint="screen"' in second.test_client().get('/metrics').text
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -1,76 +1,472 @@
 #!/usr/bin/env python3
-"""Update market caps from Yahoo Finance"""
+"""
+Update market caps from Yahoo Finance
+
+Modes:
+- default         asyncio: one pooled client (async_http.py) with --concurrency
+                  requests in flight and a --timeout per request. Symbols that
+                  fail or time out keep their previous market cap; the rest
+                  are still saved.
+- --prices-only   fast path for intraday refreshes: last prices only, in
+                  batched quote requests, and market_cap = price x cached
+                  shares outstanding for the whole table in one array
+                  multiply. Only symbols whose cached share count is stale
+                  get the full chart fetch (see SHARE_COUNTS_FILE)
+- --sequential    the original one-symbol-at-a-time loop
+- --watch SECS    keep running and refresh every SECS seconds on the same warm
+                  connections; only saves when a market cap moved more than
+                  --threshold (relative) since it was last saved
+
+Usage:
+    python3 update_market_caps.py
+    python3 update_market_caps.py --watch 300 --threshold 0.005 --prices-only
+    python3 update_market_caps.py --profile sample     # writes reports/profile-market-caps.*
+
+Share counts (data/share_counts.json) - {symbol: {"shares", "reported",
+"as_of", "source"}}: the share count behind Yahoo's market cap
+(marketCap / price) as of the last full fetch of that symbol, and the
+shares_outstanding our dataset had then. Every full fetch refreshes it. An
+entry is stale - and the symbol gets a full fetch even in --prices-only mode -
+when it is older than SHARES_MAX_AGE_DAYS or the dataset's
+shares_outstanding has changed since (a new 10-Q/10-K was picked up).
+"""
+import argparse
+import asyncio
 import json
+import os
+import sys
 import requests
 import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import async_http
+import endpoints
+import fastjson
+import profiling
+from company_table import CompanyTable
+from data_checks import check_before_save
+from instrumentation import Metrics, timed_get, timed_get_async
+from publish import publish_dataset
+from run_report import RunReport
+from schema import SchemaError
+
+DATA_FILE = 'data/financial_data.json'
+LAST_UPDATED_FILES = ('data/last_updated.json', 'public/data/last_updated.json')
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+DEFAULT_CONCURRENCY = 16
+REQUEST_TIMEOUT = 10.0
+WATCH_THRESHOLD = 0.001
+SHARE_COUNTS_FILE = 'data/share_counts.json'
+SHARES_MAX_AGE_DAYS = 7
+PRICE_BATCH = 50
+
+# symbol -> (market cap or None, how it was obtained / why it failed, per-company stats)
+Quotes = Dict[str, Tuple[Optional[int], str, dict]]
+
+
+def chart_meta(data: dict) -> dict:
+    result = ((data.get('chart') or {}).get('result') or [{}])[0]
+    return result.get('meta', {})
 
-print("📊 Updating market caps from Yahoo Finance...")
 
-# Load current data
-with open('data/financial_data.json', 'r') as f:
-    companies = json.load(f)
+def market_cap_from_chart(data: dict, company) -> Tuple[Optional[int], str]:
+    """(market cap, how) from a chart response: Yahoo's marketCap, else price x shares outstanding"""
+    meta = chart_meta(data)
+    price = meta.get('regularMarketPrice')
+    market_cap = meta.get('marketCap')
+    if market_cap:
+        return market_cap, 'Updated'
+    if price and company.get('shares_outstanding'):
+        return int(price * company['shares_outstanding']), 'Calculated'
+    return None, 'no marketCap and no price x shares fallback'
 
-updated_count = 0
-failed = []
 
-for i, company in enumerate(companies):
+def print_quote(position: str, symbol: str, market_cap: Optional[int], how: str):
+    if market_cap:
+        print(f"{position} {symbol:6s} ✓ {how}: ${market_cap/1e9:.2f}B")
+    else:
+        print(f"{position} {symbol:6s} ✗ {how}")
+
+
+def fetch_sequential(companies: CompanyTable, metrics: Metrics) -> Quotes:
+    """The original loop: one request at a time, 0.1s apart"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    quotes = {}
+    for i, company in enumerate(companies):
+        symbol = company['symbol']
+        stats = metrics.begin_company(symbol)
+        try:
+            url = endpoints.YAHOO_CHART_URL.format(symbol=symbol)
+            response = timed_get(session, url, metrics, retries=1, timeout=REQUEST_TIMEOUT)
+            if response.ok:
+                with metrics.parse_timer('chart'):
+                    data = fastjson.response_json(response)
+                market_cap, how = market_cap_from_chart(data, company)
+            else:
+                market_cap, how = None, f'chart HTTP {response.status_code}'
+            with profiling.span('throttle'):
+                time.sleep(0.1)  # Rate limiting
+        except Exception as e:
+            market_cap, how = None, f'error: {str(e)}'
+        quotes[symbol] = (market_cap, how, metrics.end_company(stats))
+        print_quote(f"[{i+1}/{len(companies)}]", symbol, market_cap, how)
+    return quotes
+
+
+async def fetch_quote(client, semaphore: asyncio.Semaphore, company, metrics: Metrics,
+                      timeout: float, prices: Optional[dict] = None) -> Tuple[Optional[int], str, dict]:
+    """One chart request; never raises, so one bad symbol can't sink the round. Records the price in `prices`"""
     symbol = company['symbol']
-    print(f"[{i+1}/{len(companies)}] Fetching {symbol}...")
-    
-    try:
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
-        response = requests.get(url, timeout=10, headers={
-            'User-Agent': 'Mozilla/5.0'
-        })
-        
-        if response.ok:
-            data = response.json()
-            result = data.get('chart', {}).get('result', [{}])[0]
-            meta = result.get('meta', {})
-            
-            price = meta.get('regularMarketPrice')
-            market_cap = meta.get('marketCap')
-            
-            if market_cap:
-                company['market_cap'] = market_cap
-                company['market_cap_updated'] = time.strftime('%Y-%m-%dT%H:%M:%S')
-                updated_count += 1
-                print(f"  ✓ Updated: ${market_cap/1e9:.2f}B")
-            elif price and 'shares_outstanding' in company:
-                # Calculate from price x shares
-                market_cap = int(price * company['shares_outstanding'])
-                company['market_cap'] = market_cap
-                company['market_cap_updated'] = time.strftime('%Y-%m-%dT%H:%M:%S')
-                updated_count += 1
-                print(f"  ✓ Calculated: ${market_cap/1e9:.2f}B")
+    stats = metrics.begin_company(symbol, attach=False)
+    async with semaphore:
+        try:
+            url = endpoints.YAHOO_CHART_URL.format(symbol=symbol)
+            # Per-request timeout on each attempt, and a hard cap on the retried total
+            response = await asyncio.wait_for(
+                timed_get_async(client, url, metrics, retries=1, stats=stats, timeout=timeout), timeout * 2 + 1)
+            if response.status_code == 200:
+                with metrics.company_scope(stats), metrics.parse_timer('chart'):
+                    data = fastjson.loads(response.content)
+                market_cap, how = market_cap_from_chart(data, company)
+                if prices is not None and chart_meta(data).get('regularMarketPrice'):
+                    prices[symbol] = chart_meta(data)['regularMarketPrice']
             else:
-                print(f"  ⊘ No market cap data")
-                failed.append(symbol)
+                market_cap, how = None, f'chart HTTP {response.status_code}'
+        except async_http.TIMEOUT_ERRORS:
+            market_cap, how = None, f'timed out after {timeout:g}s'
+        except Exception as e:
+            market_cap, how = None, f'error: {str(e) or type(e).__name__}'
+    return market_cap, how, metrics.end_company(stats)
+
+
+async def fetch_async(client, companies, metrics: Metrics, concurrency: int,
+                      timeout: float, verbose: bool = True, prices: Optional[dict] = None) -> Quotes:
+    """Every symbol (a table, or a list of its rows) through one client, at most `concurrency` requests in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def one(company):
+        nonlocal done
+        quote = await fetch_quote(client, semaphore, company, metrics, timeout, prices)
+        done += 1
+        if verbose:
+            print_quote(f"[{done}/{len(companies)}]", company['symbol'], quote[0], quote[1])
+        return company['symbol'], quote
+
+    return dict(await asyncio.gather(*(one(company) for company in companies)))
+
+
+# -- price-only fast path ---------------------------------------------------------
+
+def load_share_counts(path: Optional[str] = None) -> Dict[str, dict]:
+    try:
+        counts = fastjson.load(path or SHARE_COUNTS_FILE)
+    except (OSError, ValueError):
+        return {}
+    return counts if isinstance(counts, dict) else {}
+
+
+def save_share_counts(counts: Dict[str, dict], path: Optional[str] = None):
+    path = path or SHARE_COUNTS_FILE
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(fastjson.dumps_pretty(dict(sorted(counts.items()))))
+    os.replace(tmp_path, path)
+
+
+def stale_share_counts(companies: CompanyTable, counts: Dict[str, dict], today: date,
+                       max_age_days: int = SHARES_MAX_AGE_DAYS) -> Dict[str, str]:
+    """{symbol: why} for the symbols whose cached share count can't be used for price x shares"""
+    stale = {}
+    for company in companies:
+        entry = counts.get(company['symbol'])
+        if not entry or not entry.get('shares'):
+            stale[company['symbol']] = 'no cached share count'
+        elif entry.get('reported') != company.get('shares_outstanding'):
+            stale[company['symbol']] = 'new shares_outstanding reported'
+        elif (today - date.fromisoformat(entry['as_of'])).days > max_age_days:
+            stale[company['symbol']] = f"share count from {entry['as_of']}"
+    return stale
+
+
+def refresh_share_counts(counts: Dict[str, dict], companies: CompanyTable, quotes: Quotes,
+                         prices: Dict[str, float], today: date) -> int:
+    """Cache the share count behind each full-fetch market cap; returns how many entries were written"""
+    refreshed = 0
+    for symbol, (market_cap, how, _) in quotes.items():
+        if not market_cap:
+            continue
+        reported = companies[symbol].get('shares_outstanding')
+        if how == 'Updated' and prices.get(symbol):
+            shares, source = round(market_cap / prices[symbol]), 'marketCap / price'
+        elif reported:
+            shares, source = reported, 'shares_outstanding'
         else:
-            print(f"  ✗ HTTP {response.status_code}")
+            continue
+        counts[symbol] = {'shares': shares, 'reported': reported, 'as_of': today.isoformat(), 'source': source}
+        refreshed += 1
+    return refreshed
+
+
+def prices_from_quote(data: dict) -> Dict[str, float]:
+    result = (data.get('quoteResponse') or {}).get('result') or []
+    return {item['symbol']: item['regularMarketPrice'] for item in result
+            if item.get('symbol') and item.get('regularMarketPrice')}
+
+
+async def fetch_price_batch(client, semaphore: asyncio.Semaphore, symbols: List[str], metrics: Metrics,
+                            timeout: float) -> Tuple[Dict[str, float], Optional[str]]:
+    """Last prices for up to PRICE_BATCH symbols in one request; (prices, error)"""
+    url = f"{endpoints.YAHOO_QUOTE_URL}?symbols={','.join(symbols)}&fields=regularMarketPrice"
+    async with semaphore:
+        try:
+            response = await asyncio.wait_for(
+                timed_get_async(client, url, metrics, retries=1, timeout=timeout), timeout * 2 + 1)
+            if response.status_code != 200:
+                return {}, f'quote HTTP {response.status_code}'
+            with metrics.parse_timer('quote'):
+                return prices_from_quote(fastjson.loads(response.content)), None
+        except async_http.TIMEOUT_ERRORS:
+            return {}, f'timed out after {timeout:g}s'
+        except Exception as e:
+            return {}, f'error: {str(e) or type(e).__name__}'
+
+
+async def fetch_prices(client, symbols: List[str], metrics: Metrics, concurrency: int,
+                       timeout: float) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """(prices, {symbol: why it has no price}) for every symbol, PRICE_BATCH per request"""
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = [symbols[i:i + PRICE_BATCH] for i in range(0, len(symbols), PRICE_BATCH)]
+    results = await asyncio.gather(*(fetch_price_batch(client, semaphore, batch, metrics, timeout)
+                                     for batch in batches))
+    prices, errors = {}, {}
+    for batch, (batch_prices, error) in zip(batches, results):
+        prices.update(batch_prices)
+        errors.update({symbol: error or 'no price in quote batch' for symbol in batch if symbol not in batch_prices})
+    return prices, errors
+
+
+def price_market_caps(companies: CompanyTable, prices: Dict[str, float], counts: Dict[str, dict]) -> np.ndarray:
+    """price x cached shares for every row at once (NaN where either is missing)"""
+    price = np.array([prices.get(symbol, np.nan) for symbol in companies.symbols], dtype=np.float64)
+    shares = np.array([(counts.get(symbol) or {}).get('shares') or np.nan for symbol in companies.symbols],
+                      dtype=np.float64)
+    return price * shares
+
+
+async def fetch_prices_only(client, companies: CompanyTable, counts: Dict[str, dict], metrics: Metrics,
+                            concurrency: int, timeout: float, max_age_days: int = SHARES_MAX_AGE_DAYS,
+                            verbose: bool = True) -> Quotes:
+    """
+    Batched prices x cached share counts; a full chart fetch only for the
+    symbols whose share count is stale (which also refreshes `counts`)
+    """
+    today = date.today()
+    stale = stale_share_counts(companies, counts, today, max_age_days)
+    fresh = [symbol for symbol in companies.symbols if symbol not in stale]
+    if verbose:
+        print(f"⚡ {len(fresh)} symbols priced from cached share counts, {len(stale)} need a full fetch")
+        for symbol, why in list(stale.items())[:5]:
+            print(f"   ↺ {symbol}: {why}")
+
+    chart_prices = {}
+    (prices, errors), quotes = await asyncio.gather(
+        fetch_prices(client, fresh, metrics, concurrency, timeout),
+        fetch_async(client, [companies[symbol] for symbol in stale], metrics, concurrency, timeout,
+                    verbose=verbose, prices=chart_prices))
+    refresh_share_counts(counts, companies, quotes, chart_prices, today)
+
+    market_caps = price_market_caps(companies, prices, counts)
+    for symbol in fresh:
+        market_cap = market_caps[companies.index[symbol]]
+        if np.isfinite(market_cap):
+            quotes[symbol] = (int(np.rint(market_cap)), 'Priced', {'symbol': symbol})
+        else:
+            quotes[symbol] = (None, errors.get(symbol, 'no price'), {'symbol': symbol})
+    return quotes
+
+
+def apply_market_caps(companies: CompanyTable, market_caps: np.ndarray, threshold: float = 0.0) -> int:
+    """
+    Vectorized write of a market cap per row (NaN = no new value); with a
+    threshold, skip moves smaller than it. Returns how many changed
+    """
+    previous, has_previous = companies.column('market_cap')
+    new = np.isfinite(market_caps) & (market_caps > 0)
+    if threshold:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moved = np.abs(market_caps / previous - 1) > threshold
+        new &= moved | ~has_previous | (previous == 0)
+    companies.set_column('market_cap', np.rint(np.where(new, market_caps, 0)).astype(np.int64), new)
+    now = time.strftime('%Y-%m-%dT%H:%M:%S')
+    for row in np.flatnonzero(new).tolist():
+        companies.set_value(row, 'market_cap_updated', now)
+    return int(new.sum())
+
+
+def apply_quotes(companies: CompanyTable, quotes: Quotes, threshold: float = 0.0) -> int:
+    """Write fetched market caps; with a threshold, skip moves smaller than it. Returns how many changed"""
+    market_caps = np.full(len(companies), np.nan)
+    for symbol, (market_cap, _, _) in quotes.items():
+        if market_cap:
+            market_caps[companies.index[symbol]] = market_cap
+    return apply_market_caps(companies, market_caps, threshold)
+
+
+def record_quotes(report: RunReport, quotes: Quotes) -> list:
+    """Add every quote to the run report; returns the failed symbols"""
+    failed = []
+    for symbol, (market_cap, how, stats) in quotes.items():
+        report.record(stats, 'ok' if market_cap else 'failed', reason=None if market_cap else how)
+        if not market_cap:
             failed.append(symbol)
-        
-        time.sleep(0.1)  # Rate limiting
-        
-    except Exception as e:
-        print(f"  ✗ Error: {str(e)}")
-        failed.append(symbol)
+    return failed
+
+
+def save(companies: CompanyTable, published: CompanyTable):
+    """Quarantine, publish and stamp last_updated.json"""
+    # Quarantine implausible values (e.g. a market cap that doubled overnight) instead of publishing them
+    check_before_save(companies, published, 'market-caps')
+
+    for path in publish_dataset(companies.to_records()):
+        print(f"✓ Saved {path}")
 
-# Save updated data
-with open('data/financial_data.json', 'w') as f:
-    json.dump(companies, f, indent=2)
+    for path in LAST_UPDATED_FILES:
+        with open(path, 'w') as f:
+            json.dump({'market_caps': time.strftime('%Y-%m-%dT%H:%M:%S')}, f)
+
+
+async def fetch_round(client, companies: CompanyTable, metrics: Metrics, concurrency: int, timeout: float,
+                      prices_only: bool = False, verbose: bool = True) -> Quotes:
+    """One round of quotes: full chart fetches, or the --prices-only fast path. Keeps share_counts.json current"""
+    counts = load_share_counts()
+    before = dict(counts)
+    if prices_only:
+        quotes = await fetch_prices_only(client, companies, counts, metrics, concurrency, timeout, verbose=verbose)
+    else:
+        prices = {}
+        quotes = await fetch_async(client, companies, metrics, concurrency, timeout, verbose, prices=prices)
+        refresh_share_counts(counts, companies, quotes, prices, date.today())
+    if counts != before:
+        save_share_counts(counts)
+    return quotes
+
+
+async def watch(interval: float, threshold: float, concurrency: int, timeout: float,
+                prices_only: bool = False) -> int:
+    """Refresh every `interval` seconds until interrupted, saving only meaningful moves"""
+    companies = CompanyTable.load(DATA_FILE)
+    loaded_mtime = os.path.getmtime(DATA_FILE)
+    client = async_http.open_client(concurrency, HEADERS, timeout)
+    print(f"👀 Watching {len(companies)} market caps every {interval:g}s "
+          f"(threshold {threshold:.2%}, {concurrency} concurrent, {async_http.BACKEND}"
+          f"{', prices only' if prices_only else ''})")
+    rounds = 0
+    try:
+        while True:
+            started = time.monotonic()
+            rounds += 1
+            if os.path.getmtime(DATA_FILE) != loaded_mtime:
+                # Another job (e.g. the weekly fundamentals refresh) rewrote the dataset
+                companies = CompanyTable.load(DATA_FILE)
+                loaded_mtime = os.path.getmtime(DATA_FILE)
+                print("↺ Dataset changed on disk, reloaded")
+
+            metrics = Metrics('market-caps')
+            report = RunReport('market-caps', metrics)
+            published = companies.copy()
+            quotes = await fetch_round(client, companies, metrics, concurrency, timeout, prices_only, verbose=False)
+            failed = record_quotes(report, quotes)
+            changed = apply_quotes(companies, quotes, threshold)
+            took = time.monotonic() - started
+            stamp = time.strftime('%H:%M:%S')
+            if changed:
+                print(f"[{stamp}] round {rounds}: {changed} moved more than {threshold:.2%} "
+                      f"({len(failed)} failed, {took:.1f}s)")
+                save(companies, published)
+                loaded_mtime = os.path.getmtime(DATA_FILE)
+                report.write()
+            else:
+                print(f"[{stamp}] round {rounds}: no moves above {threshold:.2%} "
+                      f"({len(failed)} failed, {took:.1f}s) - nothing written")
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        await client.aclose()
+
+
+async def fetch_once_async(companies: CompanyTable, metrics: Metrics, concurrency: int, timeout: float,
+                           prices_only: bool = False) -> Quotes:
+    client = async_http.open_client(concurrency, HEADERS, timeout)
+    try:
+        return await fetch_round(client, companies, metrics, concurrency, timeout, prices_only)
+    finally:
+        await client.aclose()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Update market caps from Yahoo Finance')
+    parser.add_argument('--sequential', action='store_true',
+                        help='One request at a time (the original loop) instead of asyncio')
+    parser.add_argument('--prices-only', action='store_true',
+                        help='Batched last prices x cached share counts; full fetches only for stale share counts')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Requests in flight in async mode (default {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT,
+                        help=f'Per-request timeout in seconds (default {REQUEST_TIMEOUT:g})')
+    parser.add_argument('--watch', type=float, metavar='INTERVAL',
+                        help='Keep running, refreshing every INTERVAL seconds')
+    parser.add_argument('--threshold', type=float, default=WATCH_THRESHOLD,
+                        help=f'--watch: relative move needed before a value is saved (default {WATCH_THRESHOLD:g})')
+    profiling.add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    if args.sequential and args.prices_only:
+        parser.error('--prices-only runs on asyncio; drop --sequential')
+    with profiling.profiled('market-caps', args.profile):
+        return run(args)
+
+
+def run(args) -> int:
+    """One update (or --watch loop) with parsed command-line options"""
+    print("📊 Updating market caps from Yahoo Finance...")
+
+    # Load current data (validated against the Company schema, held column-wise)
+    try:
+        if args.watch:
+            try:
+                return asyncio.run(watch(args.watch, args.threshold, args.concurrency, args.timeout,
+                                         args.prices_only))
+            except KeyboardInterrupt:
+                print("\n⏹  Stopped watching")
+                return 0
+        companies = CompanyTable.load(DATA_FILE)
+    except SchemaError as e:
+        print(f"❌ {DATA_FILE} failed validation: {e}")
+        return 1
+    published = companies.copy()
 
-with open('public/data/financial_data.json', 'w') as f:
-    json.dump(companies, f, indent=2)
+    metrics = Metrics('market-caps')
+    report = RunReport('market-caps', metrics)
+    if args.sequential:
+        quotes = fetch_sequential(companies, metrics)
+    else:
+        quotes = asyncio.run(fetch_once_async(companies, metrics, args.concurrency, args.timeout,
+                                              args.prices_only))
+    failed = record_quotes(report, quotes)
+    updated_count = apply_quotes(companies, quotes)
 
-# Update timestamp
-with open('data/last_updated.json', 'w') as f:
-    json.dump({'market_caps': time.strftime('%Y-%m-%dT%H:%M:%S')}, f)
+    save(companies, published)
 
-with open('public/data/last_updated.json', 'w') as f:
-    json.dump({'market_caps': time.strftime('%Y-%m-%dT%H:%M:%S')}, f)
+    print(f"\n✅ Updated {updated_count}/{len(companies)} companies")
+    if failed:
+        print(f"❌ Failed: {', '.join(failed[:5])}")
+    print(f"📈 Metrics report: {metrics.write_report()}")
+    print(f"📋 Run report: {report.write()}")
+    return 0
 
-print(f"\n✅ Updated {updated_count}/{len(companies)} companies")
-if failed:
-    print(f"❌ Failed: {', '.join(failed[:5])}")
 
+if __name__ == '__main__':
+    sys.exit(main())
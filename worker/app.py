@@ -1,15 +1,131 @@
+"""
+Python worker (Flask)
+
+create_app() builds the app; `app` is the instance `python app.py` and WSGI
+servers (app:app) run. Startup only imports Flask and the light shared
+modules: the pipeline modules (price cache, SQLite store, screener, and the
+requests/NumPy stacks behind them) are imported on first use, and the first
+request starts a background warm-up that imports them and opens the upstream
+connection pools. Per-module import times and the cold start (startup plus
+first response, against COLD_START_BUDGET) are on /metrics.
+"""
+
+import argparse
+import atexit
 import os
+import sys
+import time
 import hashlib
 import base64
+import importlib
 import json
+import re
+import threading
 from datetime import datetime, timezone
-from typing import Optional
+from types import ModuleType
+from typing import TYPE_CHECKING, Dict, Optional
+
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify  # noqa: E402
+
+# Shared modules (instrumentation, fetchers) live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import Metrics, timed_get  # noqa: E402
+import profiling  # noqa: E402
+
+if TYPE_CHECKING:
+    from price_cache import PriceService
+    from screener import Screener
+
+
+bp = Blueprint("worker", __name__)
+metrics = Metrics("worker")
+prices: Optional["PriceService"] = None         # built on first use (_prices)
+_prices_lock = threading.Lock()
+
+# Imported on first use and by the warm-up, not at startup (so should any fetcher the update-* endpoints run)
+PIPELINE_MODULES = ("price_cache", "store", "screener")
+_modules: Dict[str, ModuleType] = {}
+_import_seconds: Dict[str, float] = {}
+# Seconds from import to the end of the first response; override with WORKER_COLD_START_BUDGET
+COLD_START_BUDGET = 0.35
+STARTUP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.35, 0.5, 1.0, 2.5, 5.0)
+WARM_TIMEOUT = 5
+_startup: Dict[str, float] = {}        # seconds: create_app, ready, first_response, cold_start, prewarm
+_first_request_seen = False
+_first_request_lock = threading.Lock()
+
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9.\-^=]{1,12}$")
+MAX_SYMBOLS = 200
+
+STORE_PATH = os.environ.get("STORE_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "financial.db")   # store.DB_NAME
+METRIC_PATTERN = re.compile(r"^[a-z_]+(/[a-z_]+)?$")
+_store_local = threading.local()
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "financial_data.json")
+MAX_SCREEN_LENGTH = 500
+_screener: Optional["Screener"] = None
+_screener_lock = threading.Lock()
+
+_github_session = None
+_github_lock = threading.Lock()
+
+
+def _module(name: str) -> ModuleType:
+    """A pipeline module, imported (and its import timed) on first use"""
+    module = _modules.get(name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(name)      # waits if another thread is mid-import
+        if name not in _import_seconds:
+            _import_seconds[name] = time.perf_counter() - started
+            metrics.observe("worker_import_seconds", _import_seconds[name], buckets=STARTUP_BUCKETS, module=name)
+        _modules[name] = module
+    return module
+
 
-import requests
-from flask import Flask, request, jsonify
+def _prices() -> "PriceService":
+    """The shared quote service (LRU cache + pooled Yahoo session)"""
+    global prices
+    if prices is None:
+        with _prices_lock:
+            if prices is None:
+                prices = _module("price_cache").PriceService(metrics)
+    return prices
 
 
-app = Flask(__name__)
+def _github():
+    """Pooled session for the GitHub Contents API"""
+    global _github_session
+    if _github_session is None:
+        with _github_lock:
+            if _github_session is None:
+                session = _module("requests").Session()
+                adapter = _module("requests.adapters").HTTPAdapter(pool_connections=2, pool_maxsize=4)
+                session.mount("https://", adapter)
+                _github_session = session
+    return _github_session
+
+
+def _start_profiler(mode: Optional[str]) -> Optional[profiling.Profiler]:
+    """Profile every request from now on; the output is written when the process exits"""
+    if not mode:
+        return None
+    started = profiling.Profiler("worker", mode).start()
+
+    def finish():
+        started.stop()
+        for path in started.write():
+            print(f"⚡ Profile: {path}")
+
+    atexit.register(finish)
+    return started
+
+
+# WORKER_PROFILE=cprofile|sample (e.g. under gunicorn), or `python app.py --profile`
+profiler = _start_profiler(os.environ.get("WORKER_PROFILE"))
 
 
 REPO_FULL_NAME = (
@@ -32,7 +148,7 @@ def _get_github_headers() -> dict:
 
 def _get_file_sha(path: str, branch: str = "master") -> Optional[str]:
     url = f"https://api.github.com/repos/{REPO_FULL_NAME}/contents/{path}?ref={branch}"
-    r = requests.get(url, headers=_get_github_headers(), timeout=30)
+    r = timed_get(_github(), url, metrics, headers=_get_github_headers(), timeout=30)
     if r.status_code == 200:
         data = r.json()
         return data.get("sha")
@@ -49,7 +165,9 @@ def _put_file(path: str, content_bytes: bytes, message: str, branch: str = "mast
     if existing_sha:
         payload["sha"] = existing_sha
     url = f"https://api.github.com/repos/{REPO_FULL_NAME}/contents/{path}"
-    r = requests.put(url, headers=_get_github_headers(), data=json.dumps(payload), timeout=60)
+    started = time.perf_counter()
+    r = _github().put(url, headers=_get_github_headers(), data=json.dumps(payload), timeout=60)
+    metrics.record_request(url, time.perf_counter() - started, status=r.status_code)
     if r.status_code not in (200, 201):
         raise RuntimeError(f"GitHub write failed: {r.status_code} {r.text}")
     return r.json()
@@ -64,7 +182,7 @@ def _write_json_if_changed(path: str, data: dict | list, branch: str = "master")
 
     # Fetch current file for content comparison
     url = f"https://raw.githubusercontent.com/{REPO_FULL_NAME}/{branch}/{path}"
-    r = requests.get(url, timeout=30)
+    r = timed_get(_github(), url, metrics, timeout=30)
     if r.status_code == 200:
         if r.content == new_bytes:
             return None
@@ -80,7 +198,211 @@ def _require_bearer_auth() -> None:
         raise RuntimeError("Unauthorized")
 
 
-@app.post("/update-data")
+def _endpoint() -> str:
+    return (request.endpoint or "unknown").rsplit(".", 1)[-1]
+
+
+def _start_timer() -> None:
+    global _first_request_seen
+    g.request_started = time.perf_counter()
+    if not _first_request_seen:
+        with _first_request_lock:
+            if not _first_request_seen:
+                _first_request_seen = g.first_request = True
+                if current_app.config["PREWARM"]:
+                    threading.Thread(target=_prewarm, name="worker-prewarm", daemon=True).start()
+    if profiler is not None:
+        g.profile = profiler.begin_thread()
+
+
+def _record_request(response: Response) -> Response:
+    started = g.pop("request_started", None)
+    if started is not None and _endpoint() != "prometheus_metrics":
+        metrics.observe("worker_request_duration_seconds", time.perf_counter() - started,
+                        endpoint=_endpoint())
+        metrics.inc("worker_requests_total", endpoint=_endpoint(), status=response.status_code)
+        if profiler is not None:
+            profiler.record_span("request", started, time.perf_counter() - started,
+                                 endpoint=_endpoint(), status=response.status_code)
+    if g.pop("first_request", False):
+        _record_cold_start(time.perf_counter() - started, current_app.config["COLD_START_BUDGET"])
+    return response
+
+
+def _end_profile(_error=None) -> None:
+    if profiler is not None:
+        profiler.end_thread(g.pop("profile", None))
+
+
+def _record_cold_start(first_response: float, budget: float):
+    """Startup (import + create_app) plus the first response, which pays for any lazy import it needs"""
+    _startup["first_response"] = first_response
+    _startup["cold_start"] = _startup["ready"] + first_response
+    metrics.observe("worker_first_response_seconds", first_response, buckets=STARTUP_BUCKETS)
+    metrics.observe("worker_cold_start_seconds", _startup["cold_start"], buckets=STARTUP_BUCKETS)
+    if _startup["cold_start"] > budget:
+        metrics.inc("worker_cold_start_over_budget_total")
+        print(f"⚠️  Cold start {_startup['cold_start']:.3f}s over the {budget:.3f}s budget "
+              f"(startup {_startup['ready']:.3f}s, first response {first_response:.3f}s)")
+
+
+def _warm_pool(session, url: str):
+    """Open a pooled keep-alive connection (DNS + TCP + TLS) so the first real request doesn't pay for it"""
+    session.head(url, timeout=WARM_TIMEOUT, allow_redirects=False)
+
+
+def _prewarm() -> None:
+    """Background, once per process: import the pipeline modules, load the screener, open the upstream pools"""
+    started = time.perf_counter()
+    steps = [(name, lambda name=name: _module(name)) for name in PIPELINE_MODULES]
+    steps += [
+        ("screener_data", _current_screener),
+        ("prices_pool", lambda: _warm_pool(_prices().session, _module("price_cache").endpoints.YAHOO_QUOTE_URL)),
+    ]
+    if GITHUB_TOKEN:
+        steps.append(("github_pool", lambda: _warm_pool(_github(), "https://api.github.com/")))
+    for step, warm in steps:
+        try:
+            warm()
+        except Exception:
+            metrics.inc("worker_prewarm_errors_total", step=step)
+    _startup["prewarm"] = time.perf_counter() - started
+    metrics.observe("worker_prewarm_seconds", _startup["prewarm"], buckets=STARTUP_BUCKETS)
+
+
+@bp.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@bp.get("/healthz")
+def healthz():
+    """Liveness/readiness probe: no pipeline imports, no upstream calls"""
+    return jsonify({"status": "ok", "startup": {k: round(v, 4) for k, v in _startup.items()},
+                    "imports": {k: round(v, 4) for k, v in _import_seconds.items()}})
+
+
+def _error(message: str, status: int) -> Response:
+    response = jsonify({"error": message})
+    response.status_code = status
+    return response
+
+
+def _price_response(body: dict) -> Response:
+    price_cache = _module("price_cache")
+    response = jsonify(body)
+    response.headers["Cache-Control"] = (f"public, max-age={price_cache.FRESH_SECONDS}, "
+                                         f"stale-while-revalidate={price_cache.STALE_SECONDS}")
+    return response
+
+
+@bp.get("/api/stock-price")
+def stock_price():
+    symbol = request.args.get("symbol", "").strip().upper()
+    if not symbol:
+        return _error("Symbol parameter required", 400)
+    if not SYMBOL_PATTERN.match(symbol):
+        return _error(f"Invalid symbol: {symbol}", 400)
+    try:
+        quote = _prices().quote(symbol)
+    except Exception as e:
+        return _error(f"Unable to fetch stock price from Yahoo Finance: {e}", 502)
+    if quote is None:
+        return _error(f"No price for {symbol}", 404)
+    return _price_response(quote)
+
+
+@bp.get("/api/stock-prices")
+def stock_prices():
+    symbols = [s for s in request.args.get("symbols", "").upper().replace(" ", "").split(",") if s]
+    if not symbols:
+        return _error("symbols parameter required (comma-separated)", 400)
+    if len(symbols) > MAX_SYMBOLS:
+        return _error(f"At most {MAX_SYMBOLS} symbols per request", 400)
+    invalid = [s for s in symbols if not SYMBOL_PATTERN.match(s)]
+    if invalid:
+        return _error(f"Invalid symbols: {', '.join(invalid)}", 400)
+    try:
+        quotes = _prices().quotes(symbols)
+    except Exception as e:
+        return _error(f"Unable to fetch stock prices from Yahoo Finance: {e}", 502)
+    return _price_response({"quotes": quotes, "missing": [s for s in dict.fromkeys(symbols) if s not in quotes]})
+
+
+def _store():
+    """This thread's read-only connection to the SQLite store (None until a fetch or backfill created it)"""
+    conn = getattr(_store_local, "conn", None)
+    if conn is None and os.path.exists(STORE_PATH):
+        conn = _store_local.conn = _module("store").connect(STORE_PATH, readonly=True)
+    return conn
+
+
+@bp.get("/api/history")
+def metric_history():
+    symbol = request.args.get("symbol", "").strip().upper()
+    metrics_arg = [m for m in request.args.get("metrics", "").split(",") if m]
+    if not SYMBOL_PATTERN.match(symbol) or not metrics_arg or not all(METRIC_PATTERN.match(m) for m in metrics_arg):
+        return _error("symbol and metrics (comma-separated) parameters required", 400)
+    conn = _store()
+    if conn is None:
+        return _error("Store not built yet", 503)
+    series = {}
+    for row in _module("store").history(conn, symbol, metrics_arg):
+        series.setdefault(row["metric"], []).append(
+            {"period": row["period"], "fy": row["fy"], "end": row["period_end"], "value": row["value"]})
+    return jsonify({"symbol": symbol, "series": series})
+
+
+@bp.get("/api/rising")
+def rising_metric():
+    metric = request.args.get("metric", "")
+    if not METRIC_PATTERN.match(metric):
+        return _error("metric parameter required, e.g. free_cash_flow/revenue", 400)
+    years = request.args.get("years", 3, type=int)
+    if not 1 <= years <= 20:
+        return _error("years must be between 1 and 20", 400)
+    conn = _store()
+    if conn is None:
+        return _error("Store not built yet", 503)
+    rows = _module("store").rising(conn, metric, years, falling=request.args.get("falling") == "1")
+    return jsonify({"metric": metric, "years": years, "companies": [dict(row) for row in rows]})
+
+
+def _current_screener() -> "Screener":
+    """The shared screener, reloaded when financial_data.json changes (which drops its cached results)"""
+    global _screener
+    with _screener_lock:
+        if _screener is None:
+            _screener = _module("screener").Screener.load(DATA_FILE)
+        else:
+            _screener.refresh(DATA_FILE)
+        return _screener
+
+
+@bp.get("/api/screen")
+def screen():
+    text = request.args.get("q", "").strip()
+    if not text or len(text) > MAX_SCREEN_LENGTH:
+        return _error(f"q parameter required (at most {MAX_SCREEN_LENGTH} characters)", 400)
+    screener = _current_screener()
+    data = screener.data            # one version for the whole request, even if another thread reloads
+    screener_module = _module("screener")
+    try:
+        compiled = screener.compile(text)
+        result = screener.run(text, data)
+    except screener_module.ScreenError as e:
+        return _error(str(e), 400)
+    limit = request.args.get("limit", 100, type=int)
+    columns = [f for f in compiled.fields if f not in screener_module.STRING_COLUMNS]
+    return jsonify({
+        "screen": compiled.text,
+        "version": data.version,
+        "count": len(result.rows),
+        "companies": screener.records(result, columns, data)[:limit],
+    })
+
+
+@bp.post("/update-data")
 def update_data():
     _require_bearer_auth()
 
@@ -94,7 +416,7 @@ def update_data():
     return jsonify(result)
 
 
-@app.post("/update-market-caps")
+@bp.post("/update-market-caps")
 def update_market_caps():
     _require_bearer_auth()
 
@@ -108,7 +430,7 @@ def update_market_caps():
     return jsonify(result)
 
 
-@app.post("/update-news")
+@bp.post("/update-news")
 def update_news():
     _require_bearer_auth()
 
@@ -122,7 +444,42 @@ def update_news():
     return jsonify(result)
 
 
+def create_app(config: Optional[dict] = None) -> Flask:
+    """
+    Build the Flask app. Services (metrics, price cache, store connections,
+    screener) are per process and shared by every app built here.
+
+    Config: PREWARM (WORKER_PREWARM, default on) starts the background warm-up
+    on the first request; COLD_START_BUDGET (WORKER_COLD_START_BUDGET) is the
+    seconds from import to first response before a warning is logged.
+    """
+    started = time.perf_counter()
+    flask_app = Flask(__name__)
+    flask_app.config.update(
+        PREWARM=os.environ.get("WORKER_PREWARM", "1") != "0",
+        COLD_START_BUDGET=float(os.environ.get("WORKER_COLD_START_BUDGET") or COLD_START_BUDGET),
+    )
+    flask_app.config.update(config or {})
+    flask_app.register_blueprint(bp)
+    flask_app.before_request(_start_timer)
+    flask_app.after_request(_record_request)
+    flask_app.teardown_request(_end_profile)
+    if "ready" not in _startup:
+        _startup["create_app"] = time.perf_counter() - started
+        _startup["ready"] = time.perf_counter() - _IMPORT_STARTED
+        metrics.observe("worker_startup_seconds", _startup["ready"], buckets=STARTUP_BUCKETS)
+    return flask_app
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the worker on $PORT (default 8000)")
+    profiling.add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.profile and profiler is None:
+        profiler = _start_profiler(args.profile)
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 8000)))
 
 